@@ -0,0 +1,141 @@
+"""Compare per-row commit+refresh writes with repository writes in a unit of work.
+
+Each iteration creates a customer, its provider link and a subscription, the
+writes behind `PaymentService.create_subscription`. The "legacy" run commits
+and refreshes after every row, as the repositories used to; the "unit of work"
+run uses the repositories inside `unit_of_work`. Statement and commit counts
+come from engine events, so they do not depend on disk speed.
+
+    python scripts/bench_unit_of_work.py [iterations]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from fastapi_payments.db.migrations import create_schema
+from fastapi_payments.db.models import (
+    Customer,
+    Plan,
+    Product,
+    ProviderCustomer,
+    Subscription,
+)
+from fastapi_payments.db.repositories import (
+    CustomerRepository,
+    SubscriptionRepository,
+    unit_of_work,
+)
+
+
+async def legacy(session, plan_id, i):
+    now = datetime.now(timezone.utc)
+    customer = Customer(email=f"legacy{i}@example.com")
+    session.add(customer)
+    await session.commit()
+    await session.refresh(customer)
+    link = ProviderCustomer(
+        customer_id=customer.id,
+        provider="stripe",
+        provider_customer_id=f"cus_l{i}",
+    )
+    session.add(link)
+    await session.commit()
+    await session.refresh(link)
+    subscription = Subscription(
+        customer_id=customer.id,
+        plan_id=plan_id,
+        provider="stripe",
+        provider_subscription_id=f"sub_l{i}",
+        status="active",
+        quantity=1,
+        current_period_start=now,
+        current_period_end=now,
+    )
+    session.add(subscription)
+    await session.commit()
+    await session.refresh(subscription)
+
+
+async def batched(session, plan_id, i):
+    now = datetime.now(timezone.utc)
+    async with unit_of_work(session):
+        customers = CustomerRepository(session)
+        customer = await customers.create(email=f"uow{i}@example.com")
+        await customers.add_provider_customer(
+            customer.id, "stripe", f"cus_u{i}"
+        )
+        await SubscriptionRepository(session).create(
+            customer_id=customer.id,
+            plan_id=plan_id,
+            provider="stripe",
+            provider_subscription_id=f"sub_u{i}",
+            status="active",
+            quantity=1,
+            current_period_start=now,
+            current_period_end=now,
+            cancel_at_period_end=False,
+        )
+
+
+async def run(name, write, iterations, directory):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{(directory / f'{name}.db').as_posix()}"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+    counts = {"statements": 0, "commits": 0}
+
+    def _statement(*args):
+        counts["statements"] += 1
+
+    def _commit(conn):
+        counts["commits"] += 1
+
+    async with sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )() as session:
+        product = Product(name="Bench")
+        session.add(product)
+        await session.flush()
+        plan = Plan(
+            product_id=product.id,
+            name="Bench",
+            pricing_model="subscription",
+            amount=1.0,
+            currency="USD",
+        )
+        session.add(plan)
+        await session.commit()
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _statement)
+        event.listen(engine.sync_engine, "commit", _commit)
+        started = time.perf_counter()
+        for i in range(iterations):
+            await write(session, plan.id, i)
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    print(
+        f"{name:>12}: {counts['statements'] / iterations:5.1f} statements, "
+        f"{counts['commits'] / iterations:4.1f} commits, "
+        f"{elapsed / iterations * 1000:6.2f} ms per operation"
+    )
+
+
+async def main(iterations):
+    with tempfile.TemporaryDirectory() as directory:
+        await run("legacy", legacy, iterations, Path(directory))
+        await run("unit of work", batched, iterations, Path(directory))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
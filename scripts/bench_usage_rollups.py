@@ -0,0 +1,149 @@
+"""Compare invoice-time usage totals from raw records and from usage rollups.
+
+Creates `subscriptions` metered subscriptions with `records` usage records
+each, spread over one month, and builds their rollups with
+`UsageRollupRepository.rebuild`. Then totals every subscription's usage for
+a billing period twice: with one GROUP BY over the raw records, and with
+`UsageRollupRepository.totals`.
+
+    python scripts/bench_usage_rollups.py [subscriptions] [records]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from fastapi_payments.db.migrations import create_schema
+from fastapi_payments.db.models import (
+    Customer,
+    Plan,
+    Product,
+    Subscription,
+    UsageRecord,
+    generate_uuid,
+)
+from fastapi_payments.db.repositories import UsageRollupRepository
+
+PERIOD_START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+PERIOD_END = datetime(2026, 4, 1, tzinfo=timezone.utc)
+BATCH = 5000
+
+
+async def populate(session, subscriptions, records):
+    product = Product(name="Bench")
+    session.add(product)
+    await session.flush()
+    plan = Plan(
+        product_id=product.id,
+        name="Bench",
+        pricing_model="usage_based",
+        amount=0.01,
+        currency="USD",
+    )
+    customer = Customer(email="bench@example.com")
+    session.add_all([plan, customer])
+    await session.commit()
+
+    ids = [generate_uuid() for _ in range(subscriptions)]
+    for i in range(0, subscriptions, BATCH):
+        await session.execute(
+            insert(Subscription),
+            [
+                {
+                    "id": sid,
+                    "customer_id": customer.id,
+                    "plan_id": plan.id,
+                    "provider": "stripe",
+                    "status": "active",
+                    "quantity": 1,
+                    "current_period_start": PERIOD_START,
+                    "current_period_end": PERIOD_END,
+                }
+                for sid in ids[i : i + BATCH]
+            ],
+        )
+    await session.commit()
+
+    span = (PERIOD_END - PERIOD_START).total_seconds()
+    rng = random.Random(0)
+    rows = []
+    for sid in ids:
+        for _ in range(records):
+            rows.append(
+                {
+                    "id": generate_uuid(),
+                    "subscription_id": sid,
+                    "quantity": float(rng.randint(1, 10)),
+                    "timestamp": PERIOD_START
+                    + timedelta(seconds=rng.random() * span),
+                    "description": None,
+                }
+            )
+            if len(rows) == BATCH:
+                await session.execute(insert(UsageRecord), rows)
+                rows = []
+    if rows:
+        await session.execute(insert(UsageRecord), rows)
+    await session.commit()
+    await UsageRollupRepository(session).rebuild(PERIOD_START, PERIOD_END)
+
+
+async def raw_totals(session, start, end):
+    result = await session.execute(
+        select(UsageRecord.subscription_id, func.sum(UsageRecord.quantity))
+        .where(UsageRecord.timestamp >= start, UsageRecord.timestamp < end)
+        .group_by(UsageRecord.subscription_id)
+    )
+    return dict(result.all())
+
+
+async def main(subscriptions, records):
+    with tempfile.TemporaryDirectory() as directory:
+        path = (Path(directory) / "usage.db").as_posix()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(create_schema)
+
+        async with sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )() as session:
+            started = time.perf_counter()
+            await populate(session, subscriptions, records)
+            print(
+                f"populated {subscriptions} subscriptions x {records} records "
+                f"in {time.perf_counter() - started:.1f} s"
+            )
+
+            # A period that starts and ends mid-hour, as most billing periods do
+            start = PERIOD_START + timedelta(hours=9, minutes=41)
+            end = PERIOD_END - timedelta(hours=14, minutes=22)
+            for name, measure in (
+                ("raw records", lambda: raw_totals(session, start, end)),
+                (
+                    "rollups",
+                    lambda: UsageRollupRepository(session).totals(
+                        None, start, end
+                    ),
+                ),
+            ):
+                started = time.perf_counter()
+                totals = await measure()
+                elapsed = time.perf_counter() - started
+                print(
+                    f"{name:>12}: {elapsed:6.2f} s for {len(totals)} subscriptions "
+                    f"(sum {sum(totals.values()):.0f})"
+                )
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [2000, 500][len(args) :])))
@@ -3,6 +3,7 @@ from .config.config_schema import PaymentConfig
 from .db.repositories import initialize_db
 from .api.routes import router as payment_router
 from .api.dependencies import set_config
+from .lifespan import PaymentsLifespan
 import logging
 
 
@@ -13,6 +14,10 @@ class FastAPIPayments:
         """
         Initialize the FastAPI Payments module.
 
+        Only configuration and the database engine are set up here; pass
+        `lifespan` to the application to create the schema, warm the
+        connection pool and provider clients before the first request.
+
         Args:
             config: Configuration dictionary or PaymentConfig instance
         """
@@ -39,6 +44,7 @@ class FastAPIPayments:
             if self.config.debug:
                 raise
 
+        self.lifespan = PaymentsLifespan(self.config)
         self.logger.info("FastAPI Payments initialized")
 
     def include_router(self, app: FastAPI, prefix: str = "/payments"):
@@ -3,14 +3,16 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..config.config_schema import PaymentConfig
+from ..providers import ProviderRegistry
 from ..services.payment_service import PaymentService
 from ..messaging.publishers import PaymentEventPublisher
-from ..db.repositories import get_db as get_db_session
+from ..db.repositories import get_db as get_db_session, read_from_replica
 
 # Global instances that will be initialized at app startup
 _config = None
 _payment_service = None
 _event_publisher = None
+_provider_registry = None
 
 
 def set_config(config: PaymentConfig):
@@ -29,12 +31,14 @@ def set_config(config: PaymentConfig):
 
 def initialize_dependencies(config: PaymentConfig):
     """Initialize global dependencies."""
-    global _config, _payment_service, _event_publisher
+    global _config, _payment_service, _event_publisher, _provider_registry
     set_config(config)  # Use set_config to maintain consistency
     _event_publisher = PaymentEventPublisher(config.messaging)
+    # Provider clients are built once here and shared by every request
+    _provider_registry = ProviderRegistry.from_config(config)
     _payment_service = PaymentService(
-        config, _event_publisher, None
-    )  # No DB session yet
+        config, _event_publisher, None, registry=_provider_registry
+    )  # No DB session yet; requests get their own handle via bind()
 
 
 async def get_config():
@@ -63,10 +67,25 @@ async def get_payment_service_with_db(
     """
     Get payment service with database session.
 
-    This dependency handles setting the DB session on the payment service,
-    so route handlers don't need to do it manually.
+    Returns a request-scoped handle bound to this request's session. The
+    shared service is never mutated, so concurrent requests cannot overwrite
+    each other's repositories.
     """
-    payment_service.set_db_session(db)
+    return payment_service.bind(db)
+
+
+async def get_payment_service_with_read_db(
+    payment_service: PaymentService = Depends(get_payment_service_with_db),
+) -> PaymentService:
+    """
+    Get payment service bound to a session that may read from a replica.
+
+    Used by list and get routes. Queries that follow a write in the same
+    request still read from the primary.
+    """
+    session = getattr(payment_service, "db_session", None)
+    if isinstance(session, AsyncSession):
+        read_from_replica(session)
     return payment_service
 
 
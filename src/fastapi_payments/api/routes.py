@@ -1,22 +1,35 @@
 import json
 import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
 from urllib.parse import parse_qsl
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
     Request,
+    Response,
     Header,
     Body,
     Query,
     Path,
 )
-from typing import Dict, Any, Optional, List
-from fastapi import BackgroundTasks
-from pydantic import BaseModel, Field, EmailStr
+from fastapi.responses import StreamingResponse
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Any,
+    Iterator,
+    Optional,
+    List,
+)
+from pydantic import BaseModel, Field, EmailStr, ValidationError
 
 from ..schemas.payment import (
     CustomerCreate,
+    CustomerImportRequest,
+    CustomerImportResponse,
     CustomerResponse,
     CustomerUpdate,
     PaymentMethodCreate,
@@ -28,14 +41,25 @@ from ..schemas.payment import (
     PlanResponse,
     SubscriptionCreate,
     SubscriptionResponse,
+    PaymentBatchRequest,
     PaymentCreate,
     PaymentResponse,
     SyncJobResponse,
     SyncRequest,
     SyncResult,
+    UsageBatchRequest,
+    UsageBatchResponse,
 )
+from ..db.repositories import get_pool_stats
+from ..db.repositories.base import next_cursor
 from ..services.payment_service import PaymentService
-from .dependencies import get_payment_service_with_db
+from ..utils.exceptions import IdempotencyError, UsageBufferFullError
+from .dependencies import (
+    get_db,
+    get_payment_service,
+    get_payment_service_with_db,
+    get_payment_service_with_read_db,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
@@ -43,17 +67,123 @@ logger = logging.getLogger(__name__)
 router = APIRouter(tags=["payments"])
 
 
+_CURSOR_QUERY = Query(
+    None,
+    description=(
+        "`X-Next-Cursor` header of the previous page; "
+        "use instead of offset for deep pages"
+    ),
+)
+
+_META_INFO_QUERY = Query(
+    False,
+    description=(
+        "Include meta_info (and provider_data) in each item; "
+        "omitted by default to keep pages small"
+    ),
+)
+
+_EXPORT_FORMAT_QUERY = Query("ndjson", description="`ndjson` or `csv`")
+_EXPORT_FROM_QUERY = Query(
+    None, description="Only rows created at or after this time"
+)
+_EXPORT_TO_QUERY = Query(
+    None, description="Only rows created before this time"
+)
+_EXPORT_RESPONSES = {
+    200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}
+}
+
+
+async def _paginated(
+    response: Response, limit: int, page: Awaitable[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Await a list page and expose the cursor of the next one as a header."""
+    try:
+        items = await page
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(items, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return items
+
+
+def _export(
+    payment_service: PaymentService, resource: str, format: str, **filters: Any
+) -> StreamingResponse:
+    """Start a streaming export, rejecting bad arguments before it starts."""
+    try:
+        chunks = payment_service.export(resource, format, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{resource}.{format}"'
+            )
+        },
+    )
+
+
+def _idempotency_http_error(error: IdempotencyError) -> HTTPException:
+    # A reused key is a client error; an in-flight duplicate may be retried
+    status_code = 409 if error.code == "idempotency_in_progress" else 422
+    return HTTPException(status_code=status_code, detail=error.message)
+
+
 @router.get("/customers", response_model=List[CustomerResponse])
 async def list_customers(
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
     search: Optional[str] = Query(None, description="Search by name or email"),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    cursor: Optional[str] = _CURSOR_QUERY,
+    include_meta_info: bool = _META_INFO_QUERY,
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> List[Dict[str, Any]]:
-    """Return stored customers."""
+    """Return stored customers, newest first."""
+
+    return await _paginated(
+        response,
+        limit,
+        payment_service.list_customers(
+            limit=limit,
+            offset=offset,
+            search=search,
+            cursor=cursor,
+            include_meta_info=include_meta_info,
+        ),
+    )
+
 
-    return await payment_service.list_customers(
-        limit=limit, offset=offset, search=search
+@router.get(
+    "/customers/export",
+    response_class=StreamingResponse,
+    responses=_EXPORT_RESPONSES,
+)
+async def export_customers(
+    format: str = _EXPORT_FORMAT_QUERY,
+    provider: Optional[str] = Query(
+        None, description="Only customers registered at this provider"
+    ),
+    created_from: Optional[datetime] = _EXPORT_FROM_QUERY,
+    created_to: Optional[datetime] = _EXPORT_TO_QUERY,
+    payment_service: PaymentService = Depends(get_payment_service),
+) -> StreamingResponse:
+    """Stream all matching customers, oldest first, as NDJSON or CSV."""
+    return _export(
+        payment_service,
+        "customers",
+        format,
+        provider=provider,
+        created_from=created_from,
+        created_to=created_to,
     )
 
 
@@ -75,6 +205,81 @@ async def create_customer(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post(
+    "/customers/import",
+    response_model=CustomerImportResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def import_customers(
+    request: Request,
+    provider: Optional[str] = Query(
+        None, description="Provider to create customers at"
+    ),
+    payment_service: PaymentService = Depends(get_payment_service),
+):
+    """Import customers in bulk.
+
+    Send a JSON document (`{"customers": [...], "provider": ...}`) to get all
+    results at once, or an `application/x-ndjson` body with one customer per
+    line to stream one result per line back while the import runs.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        try:
+            payment_service.get_provider(provider)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Read the body before responding: once a streaming response starts,
+        # the server's disconnect listener competes for request messages.
+        items = _ndjson_items(await request.body())
+
+        async def stream() -> AsyncIterator[str]:
+            # The import outlives the request scope, so it uses its own session
+            async with asynccontextmanager(get_db)() as session:
+                results = payment_service.bind(session).import_customers(
+                    items, provider=provider
+                )
+                async for result in results:
+                    yield json.dumps(result) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    try:
+        payload = CustomerImportRequest(**await request.json())
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        payment_service.get_provider(payload.provider or provider)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with asynccontextmanager(get_db)() as session:
+        results = [
+            result
+            async for result in payment_service.bind(session).import_customers(
+                payload.customers, provider=payload.provider or provider
+            )
+        ]
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
+
+
+def _ndjson_items(body: bytes) -> Iterator[Any]:
+    """Parse an NDJSON body lazily, one item per non-empty line."""
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield ValueError(f"Invalid JSON on line {line_number}")
+
+
     @router.patch("/customers/{customer_id}", response_model=CustomerResponse)
     async def update_customer(
         customer_id: str,
@@ -98,10 +303,17 @@ async def create_customer(
 @router.get("/customers/{customer_id}", response_model=CustomerResponse)
 async def get_customer(
     customer_id: str = Path(..., title="Customer ID"),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    include_provider_data: bool = Query(
+        True, description="Fetch live data from linked providers"
+    ),
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> Dict[str, Any]:
     """Get customer details."""
-    result = await payment_service.get_customer(customer_id)
+    result = await payment_service.get_customer(
+        customer_id, include_provider_data=include_provider_data
+    )
     if not result:
         raise HTTPException(status_code=404, detail="Customer not found")
     return result
@@ -205,8 +417,12 @@ async def delete_payment_method(
 )
 async def list_payment_methods(
     customer_id: str,
-    provider: Optional[str] = Query(None, description="Filter by provider name"),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    provider: Optional[str] = Query(
+        None, description="Filter by provider name"
+    ),
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> List[Dict[str, Any]]:
     """List payment methods for a customer."""
     result = await payment_service.list_payment_methods(customer_id, provider=provider)
@@ -215,13 +431,23 @@ async def list_payment_methods(
 
 @router.get("/products", response_model=List[ProductResponse])
 async def list_products(
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    cursor: Optional[str] = _CURSOR_QUERY,
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> List[Dict[str, Any]]:
     """Return stored products."""
 
-    return await payment_service.list_products(limit=limit, offset=offset)
+    return await _paginated(
+        response,
+        limit,
+        payment_service.list_products(
+            limit=limit, offset=offset, cursor=cursor
+        ),
+    )
 
 
 @router.post("/products", response_model=ProductResponse)
@@ -249,17 +475,25 @@ async def create_product(
 
 @router.get("/plans", response_model=List[PlanResponse])
 async def list_plans(
+    response: Response,
     product_id: Optional[str] = Query(
         None, description="Filter plans for a specific product"
     ),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    cursor: Optional[str] = _CURSOR_QUERY,
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> List[Dict[str, Any]]:
     """Return price plans."""
 
-    return await payment_service.list_plans(
-        product_id=product_id, limit=limit, offset=offset
+    return await _paginated(
+        response,
+        limit,
+        payment_service.list_plans(
+            product_id=product_id, limit=limit, offset=offset, cursor=cursor
+        ),
     )
 
 
@@ -268,14 +502,22 @@ async def list_plans(
 )
 async def list_product_plans(
     product_id: str,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    cursor: Optional[str] = _CURSOR_QUERY,
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> List[Dict[str, Any]]:
     """Return plans belonging to a product."""
 
-    return await payment_service.list_plans(
-        product_id=product_id, limit=limit, offset=offset
+    return await _paginated(
+        response,
+        limit,
+        payment_service.list_plans(
+            product_id=product_id, limit=limit, offset=offset, cursor=cursor
+        ),
     )
 
 
@@ -312,21 +554,32 @@ async def create_plan(
 
 @router.get("/subscriptions", response_model=List[SubscriptionResponse])
 async def list_subscriptions(
+    response: Response,
     customer_id: Optional[str] = Query(
         None, description="Filter by customer ID"
     ),
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    cursor: Optional[str] = _CURSOR_QUERY,
+    include_meta_info: bool = _META_INFO_QUERY,
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> List[Dict[str, Any]]:
     """Return subscriptions."""
 
-    return await payment_service.list_subscriptions(
-        customer_id=customer_id,
-        status=status,
-        limit=limit,
-        offset=offset,
+    return await _paginated(
+        response,
+        limit,
+        payment_service.list_subscriptions(
+            customer_id=customer_id,
+            status=status,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_meta_info=include_meta_info,
+        ),
     )
 
 
@@ -335,16 +588,27 @@ async def list_subscriptions(
 )
 async def list_customer_subscriptions(
     customer_id: str,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    cursor: Optional[str] = _CURSOR_QUERY,
+    include_meta_info: bool = _META_INFO_QUERY,
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> List[Dict[str, Any]]:
     """Return subscriptions for a specific customer."""
 
-    return await payment_service.list_subscriptions(
-        customer_id=customer_id,
-        limit=limit,
-        offset=offset,
+    return await _paginated(
+        response,
+        limit,
+        payment_service.list_subscriptions(
+            customer_id=customer_id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_meta_info=include_meta_info,
+        ),
     )
 
 
@@ -355,6 +619,7 @@ async def create_subscription(
     customer_id: str,
     subscription: SubscriptionCreate,
     request: Request,
+    idempotency_key: Optional[str] = Header(None),
     payment_service: PaymentService = Depends(get_payment_service_with_db),
 ) -> Dict[str, Any]:
     """Subscribe a customer to a plan.
@@ -384,16 +649,46 @@ async def create_subscription(
             quantity=subscription.quantity,
             trial_period_days=subscription.trial_period_days,
             meta_info=meta_info,
+            idempotency_key=idempotency_key,
         )
         return result
+    except IdempotencyError as e:
+        raise _idempotency_http_error(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get(
+    "/subscriptions/export",
+    response_class=StreamingResponse,
+    responses=_EXPORT_RESPONSES,
+)
+async def export_subscriptions(
+    format: str = _EXPORT_FORMAT_QUERY,
+    status: Optional[str] = Query(None, description="Filter by status"),
+    provider: Optional[str] = Query(None, description="Filter by provider"),
+    created_from: Optional[datetime] = _EXPORT_FROM_QUERY,
+    created_to: Optional[datetime] = _EXPORT_TO_QUERY,
+    payment_service: PaymentService = Depends(get_payment_service),
+) -> StreamingResponse:
+    """Stream all matching subscriptions, oldest first, as NDJSON or CSV."""
+    return _export(
+        payment_service,
+        "subscriptions",
+        format,
+        status=status,
+        provider=provider,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
 @router.get("/subscriptions/{subscription_id}", response_model=SubscriptionResponse)
 async def get_subscription(
     subscription_id: str,
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> Dict[str, Any]:
     """Get subscription details."""
     result = await payment_service.get_subscription(subscription_id)
@@ -418,45 +713,161 @@ async def cancel_subscription(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get(
+    "/subscriptions/{subscription_id}/usage", response_model=Dict[str, Any]
+)
+async def get_subscription_usage(
+    subscription_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
+) -> Dict[str, Any]:
+    """Get a subscription's total usage, for its current period by default."""
+    try:
+        return await payment_service.get_usage_summary(
+            subscription_id, start=start, end=end
+        )
+    except ValueError as e:
+        status_code = 404 if "not found" in str(e) else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+
+
+@router.post("/usage", response_model=UsageBatchResponse)
+async def ingest_usage(
+    request: Request,
+    payment_service: PaymentService = Depends(get_payment_service),
+) -> Dict[str, Any]:
+    """Record metered usage events in bulk.
+
+    Send a JSON document (`{"events": [...]}`) or an `application/x-ndjson`
+    body with one event per line. Events are buffered and written together
+    with other requests' events; the response is sent once they are
+    committed. Providers are not called on this path. When the buffer is
+    full the request is rejected with 503 and nothing is recorded.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        items: Any = list(_ndjson_items(await request.body()))
+    else:
+        try:
+            payload = UsageBatchRequest(**await request.json())
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        items = payload.events
+    try:
+        return await payment_service.ingest_usage(items)
+    except UsageBufferFullError as e:
+        raise HTTPException(
+            status_code=503, detail=e.message, headers={"Retry-After": "1"}
+        )
+
+
 @router.get("/payments", response_model=List[PaymentResponse])
 async def list_payments(
+    response: Response,
     customer_id: Optional[str] = Query(
         None, description="Filter by customer ID"
     ),
     status: Optional[str] = Query(None, description="Filter by payment status"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    payment_service: PaymentService = Depends(get_payment_service_with_db),
+    cursor: Optional[str] = _CURSOR_QUERY,
+    include_meta_info: bool = _META_INFO_QUERY,
+    include_archived: bool = Query(
+        False,
+        description=(
+            "Continue with archived payments after the oldest live one"
+        ),
+    ),
+    payment_service: PaymentService = Depends(
+        get_payment_service_with_read_db
+    ),
 ) -> List[Dict[str, Any]]:
-    """Return processed payments."""
+    """Return processed payments, newest first."""
+
+    return await _paginated(
+        response,
+        limit,
+        payment_service.list_payments(
+            customer_id=customer_id,
+            status=status,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_meta_info=include_meta_info,
+            include_archived=include_archived,
+        ),
+    )
 
-    return await payment_service.list_payments(
-        customer_id=customer_id,
+
+@router.get(
+    "/payments/export",
+    response_class=StreamingResponse,
+    responses=_EXPORT_RESPONSES,
+)
+async def export_payments(
+    format: str = _EXPORT_FORMAT_QUERY,
+    status: Optional[str] = Query(
+        None, description="Filter by payment status"
+    ),
+    provider: Optional[str] = Query(None, description="Filter by provider"),
+    created_from: Optional[datetime] = _EXPORT_FROM_QUERY,
+    created_to: Optional[datetime] = _EXPORT_TO_QUERY,
+    payment_service: PaymentService = Depends(get_payment_service),
+) -> StreamingResponse:
+    """Stream all matching payments, oldest first, as NDJSON or CSV.
+
+    Unlike paging through `GET /payments`, the export runs one query
+    through a server-side cursor, so its memory use stays flat however
+    many payments there are. Archived payments are not included.
+    """
+    return _export(
+        payment_service,
+        "payments",
+        format,
         status=status,
-        limit=limit,
-        offset=offset,
+        provider=provider,
+        created_from=created_from,
+        created_to=created_to,
     )
 
+
+@router.get("/metrics/pool", response_model=Dict[str, Any])
+async def pool_metrics() -> Dict[str, Any]:
+    """Live connection pool state of the primary and replicas.
+
+    Reports connections checked out, overflow, checkout timeouts and a
+    cumulative histogram of checkout wait times, for sizing pools.
+    """
+    try:
+        return get_pool_stats()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 @router.post("/sync", response_model=SyncJobResponse)
 async def sync_resources(
     request: SyncRequest,
-    background_tasks: BackgroundTasks,
     payment_service: PaymentService = Depends(get_payment_service_with_db),
 ) -> Dict[str, Any]:
     """Synchronize local database entities with provider state.
 
     You can request a subset of resources to sync by providing `resources`.
     Supported names: customers, products, plans, payments, subscriptions, payment_methods.
+
+    The job is queued and executed by the sync worker pool
+    (`python -m fastapi_payments.workers`), not by the web process.
     """
     try:
-        # Create a job record and schedule background execution; return job id
+        # Create a queued job record; a sync worker claims and runs it
         job = await payment_service.create_sync_job(
-            resources=request.resources, provider=request.provider, filters=request.filters
+            resources=request.resources,
+            provider=request.provider,
+            filters=request.filters,
+            mode=request.mode,
         )
 
-        # schedule background execution of the job
-        background_tasks.add_task(payment_service.execute_sync_job, job["id"])
-
         return job
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -476,15 +887,21 @@ async def get_sync_job(
         "created_at": job.created_at.isoformat() if job.created_at else None,
         "updated_at": job.updated_at.isoformat() if job.updated_at else None,
         "result": job.result,
+        "progress": getattr(job, "progress", None),
     }
 
 
 @router.post("/payments", response_model=PaymentResponse)
 async def process_payment(
     payment: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None),
     payment_service: PaymentService = Depends(get_payment_service_with_db),
 ) -> Dict[str, Any]:
-    """Process a one-time payment."""
+    """Process a one-time payment.
+
+    Send an `Idempotency-Key` header to make retries safe: repeated requests
+    with the same key and body return the first response.
+    """
     try:
         result = await payment_service.process_payment(
             customer_id=payment.customer_id,
@@ -495,24 +912,74 @@ async def process_payment(
             description=payment.description,
             meta_info=payment.meta_info,
             provider=payment.provider,
+            idempotency_key=idempotency_key,
         )
         return result
+    except IdempotencyError as e:
+        raise _idempotency_http_error(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post(
+    "/payments/batch",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def process_payments(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    payment_service: PaymentService = Depends(get_payment_service),
+) -> StreamingResponse:
+    """Process a batch of one-time payments, such as mandate debits.
+
+    Send a JSON document (`{"payments": [...]}`) or an `application/x-ndjson`
+    body with one payment per line. One NDJSON result line is streamed back
+    per payment, in input order, as each batch is stored.
+
+    The batch keeps running if the client disconnects. Give each payment an
+    `idempotency_key`, or send an `Idempotency-Key` header for the batch, so
+    that resending the batch after a disconnect does not charge twice.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        items: Any = _ndjson_items(await request.body())
+    else:
+        try:
+            payload = PaymentBatchRequest(**await request.json())
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        items = payload.payments
+
+    # The batch runs detached with its own session; the stream only relays
+    # its results, so a disconnect cannot stop payments from being stored
+    results = payment_service.process_payments(
+        items, idempotency_key=idempotency_key
+    )
+
+    async def stream() -> AsyncIterator[str]:
+        async for result in results:
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post("/payments/{payment_id}/refund", response_model=Dict[str, Any])
 async def refund_payment(
     payment_id: str,
     amount: Optional[float] = None,
+    idempotency_key: Optional[str] = Header(None),
     payment_service: PaymentService = Depends(get_payment_service_with_db),
 ) -> Dict[str, Any]:
     """Refund a payment."""
     try:
         result = await payment_service.refund_payment(
-            payment_id=payment_id, amount=amount
+            payment_id=payment_id,
+            amount=amount,
+            idempotency_key=idempotency_key,
         )
         return result
+    except IdempotencyError as e:
+        raise _idempotency_http_error(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
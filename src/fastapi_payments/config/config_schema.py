@@ -22,6 +22,65 @@ class PricingConfig(BaseModel):
     additional_settings: Dict[str, Any] = Field(default_factory=dict)
 
 
+class SQLiteConfig(BaseModel):
+    """SQLite connection pragmas and write serialization.
+
+    Every setting left as None keeps SQLite's default, unless `profile` is
+    "high_throughput", which fills in WAL journaling, synchronous=NORMAL,
+    a 256 MiB mmap, a 64 MiB page cache and the single-writer queue.
+    """
+
+    # "high_throughput" presets the settings below; explicit values win
+    profile: Optional[str] = None
+    # PRAGMA journal_mode, e.g. "WAL" so readers never block the writer
+    journal_mode: Optional[str] = None
+    # PRAGMA synchronous, e.g. "NORMAL": with WAL, fsync at checkpoints only
+    synchronous: Optional[str] = None
+    # PRAGMA mmap_size in bytes
+    mmap_size: Optional[int] = None
+    # PRAGMA cache_size; negative values are KiB
+    cache_size: Optional[int] = None
+    # PRAGMA busy_timeout in milliseconds
+    busy_timeout: Optional[int] = None
+    # Let one session at a time write, queueing the others in this process
+    single_writer: Optional[bool] = None
+    # Seconds a session waits for its turn to write before failing
+    writer_timeout: float = 30.0
+
+    @validator("profile")
+    @classmethod
+    def validate_profile(cls, v):
+        """Validate the SQLite profile name."""
+        if v not in (None, "high_throughput"):
+            raise ValueError("profile must be 'high_throughput' or unset")
+        return v
+
+    def resolved(self) -> Dict[str, Any]:
+        """Effective settings after applying the profile."""
+        values = {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "mmap_size": self.mmap_size,
+            "cache_size": self.cache_size,
+            "busy_timeout": self.busy_timeout,
+            "single_writer": self.single_writer,
+        }
+        if self.profile == "high_throughput":
+            preset = {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "mmap_size": 256 * 1024 * 1024,
+                "cache_size": -64 * 1024,
+                "busy_timeout": 5000,
+                "single_writer": True,
+            }
+            values = {
+                key: preset[key] if value is None else value
+                for key, value in values.items()
+            }
+        return values
+
+
 class DatabaseConfig(BaseModel):
     """Database configuration."""
 
@@ -29,6 +88,34 @@ class DatabaseConfig(BaseModel):
     echo: bool = False
     pool_size: int = 5
     max_overflow: int = 10
+    # Seconds to wait for a free connection before raising a timeout
+    pool_timeout: float = 30.0
+    # Replace connections older than this many seconds; -1 never does
+    pool_recycle: int = -1
+    # Test connections with a round trip on checkout
+    pool_pre_ping: bool = False
+    # asyncpg prepared statement cache per connection; 0 disables it
+    # (PgBouncer)
+    statement_cache_size: Optional[int] = None
+    # Connections opened per engine at startup; defaults to pool_size
+    warm_connections: Optional[int] = None
+    # Read replicas for list/get traffic; reads go to the primary when empty
+    replica_urls: List[str] = Field(default_factory=list)
+    # How a replica is picked per query: "round_robin" or "least_connections"
+    replica_selection: str = "round_robin"
+    # Pragmas and write queueing for sqlite URLs; ignored for other databases
+    sqlite: SQLiteConfig = Field(default_factory=SQLiteConfig)
+
+    @validator("replica_selection")
+    @classmethod
+    def validate_replica_selection(cls, v):
+        """Validate the replica selection policy."""
+        if v not in ("round_robin", "least_connections"):
+            raise ValueError(
+                "replica_selection must be 'round_robin' or "
+                "'least_connections'"
+            )
+        return v
 
 
 class MessagingConfig(BaseModel):
@@ -51,6 +138,187 @@ class MessagingConfig(BaseModel):
         return v
 
 
+class ProviderCacheConfig(BaseModel):
+    """Configuration for the provider read-through cache."""
+
+    # Opt-in: cached reads can be up to the resource's TTL out of date
+    enabled: bool = False
+    backend: str = "memory"
+    url: Optional[str] = None
+    key_prefix: str = "payments:provider:"
+    max_entries: int = 10000
+    default_ttl: float = 60.0
+    # Seconds to keep each resource type, keyed by resource name
+    ttl: Dict[str, float] = Field(
+        default_factory=lambda: {
+            "customer": 300.0,
+            "subscription": 60.0,
+            "payment": 30.0,
+            "price": 3600.0,
+            "product": 3600.0,
+        }
+    )
+
+    @validator("backend")
+    @classmethod
+    def validate_backend(cls, v):
+        """Validate cache backend."""
+        allowed_backends = ["memory", "redis"]
+        if v not in allowed_backends:
+            raise ValueError(f"backend must be one of {allowed_backends}")
+        return v
+
+
+class SyncConfig(BaseModel):
+    """Provider sync pipeline configuration."""
+
+    # Local rows read and written per transaction
+    batch_size: int = 100
+    # Provider calls in flight across all providers
+    concurrency: int = 10
+    # Optional lower limits for individual providers, keyed by provider name
+    provider_concurrency: Dict[str, int] = Field(default_factory=dict)
+    # Worker pool settings (see fastapi_payments.workers.sync_worker)
+    workers: int = 1
+    lease_seconds: float = 60.0
+    heartbeat_interval: float = 15.0
+    poll_interval: float = 2.0
+    max_attempts: int = 5
+
+    @validator("batch_size", "concurrency", "workers", "max_attempts")
+    @classmethod
+    def validate_positive(cls, v):
+        """Validate limits are positive."""
+        if v < 1:
+            raise ValueError("must be at least 1")
+        return v
+
+    @validator("heartbeat_interval")
+    @classmethod
+    def validate_heartbeat_interval(cls, v, values):
+        """Validate leases are renewed before they expire."""
+        if "lease_seconds" in values and v >= values["lease_seconds"]:
+            raise ValueError(
+                "heartbeat_interval must be shorter than lease_seconds"
+            )
+        return v
+
+
+class BulkConfig(BaseModel):
+    """Bulk import, batch submission and export configuration."""
+
+    # Items written per multi-row INSERT and transaction
+    batch_size: int = 500
+    # Provider calls in flight for one bulk request
+    concurrency: int = 10
+    # Optional lower limits for individual providers, keyed by provider name
+    provider_concurrency: Dict[str, int] = Field(default_factory=dict)
+    # Rows fetched from the server-side cursor per chunk of an export
+    export_chunk_size: int = 1000
+
+    @validator("batch_size", "concurrency", "export_chunk_size")
+    @classmethod
+    def validate_positive(cls, v):
+        """Validate limits are positive."""
+        if v < 1:
+            raise ValueError("must be at least 1")
+        return v
+
+
+class UsageConfig(BaseModel):
+    """Buffered usage ingestion and provider usage push configuration."""
+
+    # Buffered events that trigger an immediate flush
+    flush_size: int = 1000
+    # Longest time in seconds an event waits in the buffer before a flush
+    flush_interval: float = 0.2
+    # Events accepted but not yet written; further submissions are rejected
+    max_buffered: int = 50000
+    # Seconds between aggregated usage pushes to providers
+    push_interval: float = 3600.0
+    # Provider usage calls in flight at once during a push
+    push_concurrency: int = 8
+
+    @validator("flush_size", "max_buffered", "push_concurrency")
+    @classmethod
+    def validate_positive(cls, v):
+        """Validate limits are positive."""
+        if v < 1:
+            raise ValueError("must be at least 1")
+        return v
+
+    @validator("flush_interval", "push_interval")
+    @classmethod
+    def validate_interval(cls, v):
+        """Validate intervals are positive."""
+        if v <= 0:
+            raise ValueError("must be positive")
+        return v
+
+
+class ArchiveConfig(BaseModel):
+    """Archival of old payments and usage records to files."""
+
+    # Local directory, or any fsspec URL such as s3://bucket/payments-archive
+    path: str = "./archive"
+    # Extra options passed to fsspec for URLs, e.g. credentials
+    storage_options: Dict[str, Any] = Field(default_factory=dict)
+    # "ndjson" (gzip-compressed) or "parquet" (requires pyarrow)
+    format: str = "ndjson"
+    # Age in days after which rows are archived; None keeps them in the
+    # database
+    payments_after_days: Optional[int] = None
+    usage_after_days: Optional[int] = None
+    # Rows read per query while archiving
+    batch_size: int = 5000
+    # Rows per archive file; their IDs are held until the file is written
+    rows_per_file: int = 100000
+    # Rows deleted per transaction once archived
+    delete_chunk: int = 1000
+    # Seconds between archive runs in the worker pool
+    interval: float = 86400.0
+
+    @validator("format")
+    @classmethod
+    def validate_format(cls, v):
+        """Validate the archive file format."""
+        if v not in ("ndjson", "parquet"):
+            raise ValueError("format must be 'ndjson' or 'parquet'")
+        return v
+
+    @validator("batch_size", "rows_per_file", "delete_chunk")
+    @classmethod
+    def validate_positive(cls, v):
+        """Validate sizes are positive."""
+        if v < 1:
+            raise ValueError("must be at least 1")
+        return v
+
+    @validator("interval")
+    @classmethod
+    def validate_interval(cls, v):
+        """Validate the archive interval."""
+        if v <= 0:
+            raise ValueError("interval must be positive")
+        return v
+
+
+class IdempotencyConfig(BaseModel):
+    """Idempotency-Key handling for mutating requests."""
+
+    # How long a key and its stored response are kept
+    ttl_seconds: float = 86400.0
+    # Completed responses kept in the in-process hot cache
+    cache_max_entries: int = 10000
+    # How long an in-progress key stays locked without a renewal; running
+    # requests renew it every lock_seconds / 3, so this only bounds how long
+    # a request whose process died blocks retries
+    lock_seconds: float = 60.0
+    # How long a duplicate waits for a request running in another process
+    wait_timeout: float = 30.0
+    poll_interval: float = 0.1
+
+
 class ProviderConfig(BaseModel):
     """Payment provider configuration."""
 
@@ -58,6 +326,9 @@ class ProviderConfig(BaseModel):
     api_secret: Optional[str] = None
     webhook_secret: Optional[str] = None
     sandbox_mode: bool = True
+    # Per-call deadline in seconds; falls back to
+    # PaymentConfig.provider_timeout
+    timeout: Optional[float] = None
     additional_settings: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -68,9 +339,19 @@ class PaymentConfig(BaseModel):
     database: DatabaseConfig
     messaging: MessagingConfig = Field(default_factory=MessagingConfig)
     pricing: PricingConfig = PricingConfig()
+    provider_cache: ProviderCacheConfig = Field(
+        default_factory=ProviderCacheConfig
+    )
+    sync: SyncConfig = Field(default_factory=SyncConfig)
+    bulk: BulkConfig = Field(default_factory=BulkConfig)
+    idempotency: IdempotencyConfig = Field(default_factory=IdempotencyConfig)
+    usage: UsageConfig = Field(default_factory=UsageConfig)
+    archive: ArchiveConfig = Field(default_factory=ArchiveConfig)
     default_provider: str = "stripe"
     retry_attempts: int = 3
     retry_delay: int = 5
+    # Default deadline in seconds for read calls fanned out to providers
+    provider_timeout: float = 10.0
     logging_level: str = "INFO"
     debug: bool = False
     allowed_currencies: List[str] = ["USD", "EUR", "GBP"]
@@ -6,12 +6,17 @@ from sqlalchemy.ext.asyncio import AsyncEngine
 
 from .repositories import initialize_db as _initialize_db
 from .models import Base
+from .migrations import (  # noqa: F401
+	create_missing_columns,
+	create_missing_indexes,
+	create_schema,
+)
 
 
 async def init_engine_and_schema(engine: AsyncEngine) -> None:
-	"""Create database schema if it does not exist."""
+	"""Create missing tables, columns and indexes."""
 	async with engine.begin() as conn:
-		await conn.run_sync(Base.metadata.create_all)
+		await conn.run_sync(create_schema)
 
 
 def setup_database(config) -> AsyncEngine:
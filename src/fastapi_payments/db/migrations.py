@@ -0,0 +1,113 @@
+"""Schema upgrades for databases created by earlier versions."""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import inspect, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+from .models import Base, Plan, Product
+
+logger = logging.getLogger(__name__)
+
+# Columns that copy a meta_info key; filled from meta_info when added
+_META_INFO_COLUMNS: Dict[Tuple[str, str], Tuple[type, str]] = {
+    ("products", "provider"): (Product, "provider"),
+    ("products", "provider_product_id"): (Product, "provider_product_id"),
+    ("plans", "provider"): (Plan, "provider"),
+    ("plans", "provider_price_id"): (Plan, "provider_price_id"),
+}
+
+
+def create_missing_columns(connection: Connection) -> List[str]:
+    """
+    Add model columns that are missing from existing tables.
+
+    NOT NULL columns are added with their server default filling existing
+    rows. Columns that copy a meta_info key are filled in from meta_info as
+    they are added. NOT NULL columns without a server default, and columns
+    that are part of a key, are left for a real migration. Safe to run
+    repeatedly.
+
+    Returns:
+        "table.column" names of the columns that were added
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    added: List[str] = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {
+            column["name"] for column in inspector.get_columns(table.name)
+        }
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            required = not column.nullable and column.server_default is None
+            if required or column.primary_key or column.foreign_keys:
+                logger.warning(
+                    f"Not adding column {table.name}.{column.name}; "
+                    "migrate it explicitly"
+                )
+                continue
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            table_name = connection.dialect.identifier_preparer.format_table(
+                table
+            )
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table_name} ADD COLUMN {ddl}"
+            )
+            added.append(f"{table.name}.{column.name}")
+            copied = _META_INFO_COLUMNS.get((table.name, column.name))
+            if copied:
+                model, key = copied
+                connection.execute(
+                    update(model.__table__).values(
+                        {column.name: model.meta_info[key].as_string()}
+                    )
+                )
+    if added:
+        logger.info(f"Added missing columns: {', '.join(added)}")
+    return added
+
+
+def create_missing_indexes(connection: Connection) -> List[str]:
+    """
+    Create model indexes that are missing from existing tables.
+
+    `Base.metadata.create_all` only creates indexes together with new
+    tables, so databases created before an index was added never get it.
+    Run this with `AsyncConnection.run_sync` (or on a sync connection)
+    after `create_all`; it is safe to run repeatedly.
+
+    Returns:
+        Names of the indexes that were created
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    created: List[str] = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {
+            index["name"] for index in inspector.get_indexes(table.name)
+        }
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                continue
+            index.create(connection)
+            created.append(index.name)
+    if created:
+        logger.info(f"Created missing indexes: {', '.join(created)}")
+    return created
+
+
+def create_schema(connection: Connection) -> None:
+    """Create missing tables, then missing columns and indexes on the rest."""
+    Base.metadata.create_all(connection)
+    create_missing_columns(connection)
+    create_missing_indexes(connection)
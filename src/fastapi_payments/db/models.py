@@ -7,8 +7,11 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Enum,
+    Index,
     JSON,
+    LargeBinary,
     Text,
+    func,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -23,6 +26,12 @@ def generate_uuid():
     return str(uuid.uuid4())
 
 
+def utcnow() -> datetime:
+    # Evaluated per row; the server_default covers rows inserted outside
+    # the ORM
+    return datetime.now(timezone.utc)
+
+
 class PaymentStatus(enum.Enum):
     PENDING = "pending"
     PROCESSING = "processing"
@@ -51,11 +60,12 @@ class Customer(Base):
     external_id = Column(String, nullable=True, unique=True)
     email = Column(String, nullable=False)
     name = Column(String)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
     )
     meta_info = Column(JSON, nullable=True)
     # First-class address field stored as JSON (line1, line2, city, state, postal_code, country)
@@ -68,6 +78,9 @@ class Customer(Base):
     # Stored payment methods saved on the platform for this customer
     payment_methods = relationship("PaymentMethod", back_populates="customer")
 
+    # Keyset pagination order for list endpoints
+    __table_args__ = (Index("ix_customers_created_id", "created_at", "id"),)
+
 
 class ProviderCustomer(Base):
     __tablename__ = "provider_customers"
@@ -79,6 +92,20 @@ class ProviderCustomer(Base):
 
     customer = relationship("Customer", back_populates="provider_customers")
 
+    __table_args__ = (
+        Index(
+            "ix_provider_customers_customer_provider",
+            "customer_id",
+            "provider",
+        ),
+        # Webhook and sync lookups by the provider's customer ID
+        Index(
+            "ix_provider_customers_provider_customer",
+            "provider",
+            "provider_customer_id",
+        ),
+    )
+
 
 class SyncJob(Base):
     """Represents an asynchronous synchronization job request."""
@@ -86,17 +113,89 @@ class SyncJob(Base):
     __tablename__ = "sync_jobs"
 
     id = Column(String, primary_key=True, default=lambda: f"job_{uuid.uuid4().hex[:8]}")
-    status = Column(String, nullable=False, default="queued")
+    status = Column(String, nullable=False, default="queued", index=True)
+    # "full" walks every local row; "incremental" pulls provider changes
+    mode = Column(
+        String, nullable=False, default="full", server_default="full"
+    )
     resources = Column(JSON, nullable=True)
     provider = Column(String, nullable=True)
     filters = Column(JSON, nullable=True)
     result = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    # Per-resource keyset cursor ({"after": <last id>, "done": bool}) used to
+    # resume an interrupted job, and the running counters for each resource
+    checkpoint = Column(JSON, nullable=True)
+    progress = Column(JSON, nullable=True)
+    # Lease held by the sync worker running the job; an expired lease lets
+    # another worker claim the job and resume it from its checkpoint
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
+    updated_at = Column(
+        DateTime, default=utcnow, server_default=func.now(), onupdate=utcnow
+    )
 
     __table_args__ = ({"sqlite_autoincrement": True},)
 
 
+class SyncCursor(Base):
+    """High-water mark for incremental sync of one provider resource."""
+
+    __tablename__ = "sync_cursors"
+
+    provider = Column(String, primary_key=True)
+    resource = Column(String, primary_key=True)
+    # Provider-specific position, e.g. {"event_id": ...} or {"from": <unix ts>}
+    cursor = Column(JSON, nullable=True)
+    updated_at = Column(
+        DateTime,
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
+    )
+
+
+class IdempotencyKey(Base):
+    """Outcome of a mutating request made with an Idempotency-Key header."""
+
+    __tablename__ = "idempotency_keys"
+
+    # Operation the key was used for, e.g. "process_payment"
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    # Hash of the request parameters; a reused key must match it
+    fingerprint = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="in_progress")
+    response = Column(JSON, nullable=True)
+    # While in progress, other requests with the key wait until this time
+    locked_until = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
+
+
+class ProviderSnapshot(Base):
+    """A version of the payload a provider returned for a local row.
+
+    Full provider responses are kept here, compressed, instead of in the
+    row's meta_info, so payments and subscriptions stay small. A new version
+    is written only when the payload changes.
+    """
+
+    __tablename__ = "provider_snapshots"
+
+    # Kind of local row, e.g. "payment" or "subscription"
+    entity_type = Column(String, primary_key=True)
+    entity_id = Column(String, primary_key=True)
+    provider = Column(String, primary_key=True)
+    version = Column(Integer, primary_key=True)
+    # sha256 of the uncompressed JSON, to detect unchanged payloads
+    digest = Column(String, nullable=False)
+    # zlib-compressed JSON
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
+
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -105,15 +204,28 @@ class Product(Base):
     description = Column(Text)
     active = Column(Boolean, default=True)
     meta_info = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    # Copies of meta_info["provider"] / ["provider_product_id"], for lookups
+    provider = Column(String, nullable=True)
+    provider_product_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
     )
 
     plans = relationship("Plan", back_populates="product")
 
+    __table_args__ = (
+        Index("ix_products_created_id", "created_at", "id"),
+        Index(
+            "ix_products_provider_product_id",
+            "provider_product_id",
+            "provider",
+        ),
+    )
+
 
 class Plan(Base):
     __tablename__ = "plans"
@@ -130,11 +242,15 @@ class Plan(Base):
     trial_period_days = Column(Integer, nullable=True)
     is_active = Column(Boolean, default=True)
     meta_info = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    # Copies of meta_info["provider"] / ["provider_price_id"], for lookups
+    provider = Column(String, nullable=True)
+    provider_price_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
     )
 
     product = relationship("Product", back_populates="plans")
@@ -142,6 +258,12 @@ class Plan(Base):
     features = relationship("PlanFeature", back_populates="plan")
     tiers = relationship("PricingTier", back_populates="plan")
 
+    __table_args__ = (
+        Index("ix_plans_product_id", "product_id"),
+        Index("ix_plans_created_id", "created_at", "id"),
+        Index("ix_plans_provider_price_id", "provider_price_id", "provider"),
+    )
+
 
 class PlanFeature(Base):
     __tablename__ = "plan_features"
@@ -188,11 +310,12 @@ class Subscription(Base):
     trial_start = Column(DateTime, nullable=True)
     trial_end = Column(DateTime, nullable=True)
     meta_info = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
     )
 
     customer = relationship("Customer", back_populates="subscriptions")
@@ -200,6 +323,15 @@ class Subscription(Base):
     usage_records = relationship("UsageRecord", back_populates="subscription")
     invoices = relationship("Invoice", back_populates="subscription")
 
+    __table_args__ = (
+        Index("ix_subscriptions_customer_status", "customer_id", "status"),
+        Index(
+            "ix_subscriptions_provider_subscription_id",
+            "provider_subscription_id",
+        ),
+        Index("ix_subscriptions_created_id", "created_at", "id"),
+    )
+
 
 class UsageRecord(Base):
     __tablename__ = "usage_records"
@@ -208,12 +340,91 @@ class UsageRecord(Base):
     subscription_id = Column(String, ForeignKey(
         "subscriptions.id"), nullable=False)
     quantity = Column(Float, nullable=False)
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc))
+    timestamp = Column(DateTime, default=utcnow, server_default=func.now())
     description = Column(String, nullable=True)
     meta_info = Column(JSON, nullable=True)
 
     subscription = relationship("Subscription", back_populates="usage_records")
 
+    __table_args__ = (
+        Index(
+            "ix_usage_records_subscription_timestamp",
+            "subscription_id",
+            "timestamp",
+        ),
+        # Partial-hour reads for usage totals across all subscriptions
+        Index("ix_usage_records_timestamp", "timestamp"),
+    )
+
+
+class UsageRollup(Base):
+    """Usage of one subscription summed over an hour or a day.
+
+    Maintained alongside usage_records so period totals read a few buckets
+    instead of every raw record. Buckets start on UTC hour or day
+    boundaries.
+    """
+
+    __tablename__ = "usage_rollups"
+
+    subscription_id = Column(
+        String, ForeignKey("subscriptions.id"), primary_key=True
+    )
+    # "hour" or "day"
+    granularity = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    quantity = Column(Float, nullable=False, default=0.0)
+    record_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(
+        DateTime, default=utcnow, onupdate=utcnow, server_default=func.now()
+    )
+
+    __table_args__ = (
+        # Totals over all subscriptions read one granularity and time range
+        Index(
+            "ix_usage_rollups_granularity_bucket",
+            "granularity",
+            "bucket_start",
+            "subscription_id",
+            "quantity",
+        ),
+    )
+
+
+class UsagePush(Base):
+    """Usage of one subscription period already reported to its provider.
+
+    A push is claimed by writing its target total and idempotency key to
+    the pending columns before the provider is called, and completed by
+    moving the target into pushed_quantity. A push that failed or was
+    interrupted is retried with the same quantity and key.
+    """
+
+    __tablename__ = "usage_pushes"
+
+    subscription_id = Column(
+        String, ForeignKey("subscriptions.id"), primary_key=True
+    )
+    period_start = Column(DateTime, primary_key=True)
+    period_end = Column(DateTime, nullable=True)
+    provider = Column(String, nullable=False)
+    # Period total the provider has acknowledged
+    pushed_quantity = Column(Integer, nullable=False, default=0)
+    # Period total being pushed, and the idempotency key used for it
+    pending_quantity = Column(Integer, nullable=True)
+    pending_key = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(String, nullable=True)
+    provider_usage_record_id = Column(String, nullable=True)
+    # Set once the final total of an ended period has been pushed
+    closed = Column(Boolean, nullable=False, default=False)
+    pushed_at = Column(DateTime, nullable=True)
+    updated_at = Column(
+        DateTime, default=utcnow, onupdate=utcnow, server_default=func.now()
+    )
+
+    __table_args__ = (Index("ix_usage_pushes_closed", "closed"),)
+
 
 class Invoice(Base):
     __tablename__ = "invoices"
@@ -231,11 +442,12 @@ class Invoice(Base):
     tax_amount = Column(Float, default=0.0)
     due_date = Column(DateTime, nullable=True)
     paid_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
     )
 
     customer = relationship("Customer", backref="invoices")
@@ -276,16 +488,23 @@ class Payment(Base):
     error_message = Column(String, nullable=True)
     refunded_amount = Column(Float, default=0.0)
     meta_info = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
     )
 
     customer = relationship("Customer", back_populates="payments")
     invoice = relationship("Invoice", back_populates="payments")
 
+    __table_args__ = (
+        Index("ix_payments_customer_created", "customer_id", "created_at"),
+        Index("ix_payments_provider_payment_id", "provider_payment_id"),
+        Index("ix_payments_created_id", "created_at", "id"),
+    )
+
 
 class PaymentMethod(Base):
     __tablename__ = "payment_methods"
@@ -306,11 +525,25 @@ class PaymentMethod(Base):
     card_exp_year = Column(Integer, nullable=True)
 
     meta_info = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
     )
 
     customer = relationship("Customer", back_populates="payment_methods")
+
+    __table_args__ = (
+        # Leads with the provider method ID so lookups that omit the
+        # provider can use it too
+        Index(
+            "ix_payment_methods_provider_method",
+            "provider_payment_method_id",
+            "provider",
+        ),
+        Index(
+            "ix_payment_methods_customer_created", "customer_id", "created_at"
+        ),
+    )
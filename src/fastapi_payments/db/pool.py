@@ -0,0 +1,115 @@
+"""Connection pool with live usage metrics."""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class PoolMetrics:
+    """Counters for one pool: checkouts, timeouts and time spent waiting."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        # One count per bucket plus one for waits above the last bound
+        self._buckets: List[int] = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_sum += waited
+            self.wait_max = max(self.wait_max, waited)
+            self._buckets[bisect.bisect_left(WAIT_BUCKETS, waited)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            # Cumulative counts, as in a Prometheus histogram
+            buckets: Dict[str, int] = {}
+            total = 0
+            for bound, count in zip(
+                [*map(str, WAIT_BUCKETS), "+Inf"], self._buckets
+            ):
+                total += count
+                buckets[bound] = total
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds": {
+                    "count": total,
+                    "sum": self.wait_sum,
+                    "max": self.wait_max,
+                    "buckets": buckets,
+                },
+            }
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waits.
+
+    The wait covers everything `connect()` does to hand out a connection:
+    waiting for a free one, opening a new one, and a pre-ping if enabled.
+    Checkouts that give up after `pool_timeout` count as timeouts.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self) -> Any:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started, timed_out=False)
+        return connection
+
+    def recreate(self) -> "MeteredQueuePool":
+        # Engine.dispose() swaps in a new pool; keep counting across it
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def pool_stats(pool: Any) -> Dict[str, Any]:
+    """Current state of `pool`, plus metrics if it is a MeteredQueuePool."""
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name.replace("checked", "checked_")] = method()
+    if hasattr(pool, "timeout") and callable(pool.timeout):
+        stats["timeout"] = pool.timeout()
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
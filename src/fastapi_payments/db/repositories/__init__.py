@@ -1,13 +1,17 @@
 """Database repositories package."""
 
 import asyncio
-from typing import Optional, AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Optional
+from sqlalchemy import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker
 
 from ...config.config_schema import DatabaseConfig
-from ..models import Base
-from .base import BaseRepository
+from ..migrations import create_schema
+from ..pool import MeteredQueuePool, pool_stats
+from ..sqlite import configure_sqlite
+from .base import BaseRepository, unit_of_work
+from .routing import ReplicaSet, RoutingSession, read_from_replica, use_primary
 from .customer_repository import CustomerRepository
 from .payment_repository import PaymentRepository
 from .payment_method_repository import PaymentMethodRepository
@@ -15,65 +19,185 @@ from .subscription_repository import SubscriptionRepository
 from .product_repository import ProductRepository
 from .plan_repository import PlanRepository
 from .sync_job_repository import SyncJobRepository
+from .sync_cursor_repository import SyncCursorRepository
+from .idempotency_key_repository import IdempotencyKeyRepository
+from .provider_snapshot_repository import ProviderSnapshotRepository
+from .usage_push_repository import UsagePushRepository
+from .usage_record_repository import UsageRecordRepository
+from .usage_rollup_repository import UsageRollupRepository
 
 # Global engine
 _engine: Optional[AsyncEngine] = None
+_replicas: Optional[ReplicaSet] = None
 _sessionmaker = None
+_schema_ready = False
 
 
-def initialize_db(config: DatabaseConfig) -> AsyncEngine:
-    """Initialize the database connection."""
-    global _engine, _sessionmaker
-
-    # Create engine with appropriate parameters based on dialect
-    if config.url.startswith("sqlite"):
-        # SQLite doesn't support connection pooling parameters
-        _engine = create_async_engine(config.url, echo=config.echo)
-    else:
-        # Use connection pool parameters for other database engines
-        _engine = create_async_engine(
-            config.url,
-            echo=config.echo,
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return url.startswith("sqlite") and (
+        not database or database == ":memory:" or "mode=memory" in url
+    )
+
+
+def _create_engine(url: str, config: DatabaseConfig) -> AsyncEngine:
+    kwargs: Dict[str, Any] = {
+        "echo": config.echo,
+        "pool_recycle": getattr(config, "pool_recycle", -1),
+        "pool_pre_ping": getattr(config, "pool_pre_ping", False),
+    }
+    # In-memory SQLite keeps a single connection, so it has no pool to size
+    if not _is_memory_sqlite(url):
+        kwargs.update(
+            poolclass=MeteredQueuePool,
             pool_size=getattr(config, "pool_size", 5),
             max_overflow=getattr(config, "max_overflow", 10),
+            pool_timeout=getattr(config, "pool_timeout", 30.0),
+        )
+    statement_cache_size = getattr(config, "statement_cache_size", None)
+    if statement_cache_size is not None and "+asyncpg" in url:
+        # asyncpg's own cache and SQLAlchemy's prepared statement cache
+        kwargs["connect_args"] = {
+            "statement_cache_size": statement_cache_size,
+            "prepared_statement_cache_size": statement_cache_size,
+        }
+    engine = create_async_engine(url, **kwargs)
+    sqlite = getattr(config, "sqlite", None)
+    if sqlite is not None and url.startswith("sqlite"):
+        settings = sqlite.resolved()
+        # A single connection has nobody to queue behind
+        if _is_memory_sqlite(url):
+            settings["single_writer"] = False
+        configure_sqlite(engine, settings, sqlite.writer_timeout)
+    return engine
+
+
+def initialize_db(config: DatabaseConfig) -> AsyncEngine:
+    """Initialize the database connection.
+
+    With `replica_urls` configured, sessions from `get_read_db` send their
+    read-only queries to the replicas (see `RoutingSession`).
+    """
+    global _engine, _replicas, _sessionmaker, _schema_ready
+
+    _engine = _create_engine(config.url, config)
+    replica_urls = getattr(config, "replica_urls", None) or []
+    _replicas = (
+        ReplicaSet(
+            [_create_engine(url, config) for url in replica_urls],
+            getattr(config, "replica_selection", "round_robin"),
         )
+        if replica_urls
+        else None
+    )
 
     # Create sessionmaker
     _sessionmaker = sessionmaker(
-        _engine, class_=AsyncSession, expire_on_commit=False)
+        _engine,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        replicas=_replicas,
+        expire_on_commit=False,
+    )
 
-    # Defer schema creation to avoid event loop issues in multiprocessing
-    # Schema will be created on first database access
+    # Schema creation needs a running event loop; see ensure_schema
+    _schema_ready = False
     return _engine
 
 
-def _create_schema_sync(engine: AsyncEngine) -> None:
-    """Create database schema using the async engine from any context."""
+async def ensure_schema() -> bool:
+    """
+    Create missing tables and indexes once per `initialize_db`.
+
+    Run at startup by the application lifespan; `get_db` only falls back to
+    it when the application was started without one.
+
+    Returns:
+        True if the schema was checked now, False if it already had been
+    """
+    global _schema_ready
+    if _engine is None:
+        raise RuntimeError("Database not initialized")
+    if _schema_ready:
+        return False
+    async with _engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    _schema_ready = True
+    return True
+
+
+async def warm_pool(connections: Optional[int] = None) -> int:
+    """
+    Open pooled connections ahead of the first requests.
+
+    Opens `connections` connections at once on the primary and on each
+    replica (default: the pool size), checks each with a round trip and
+    returns them to the pool.
+
+    Returns:
+        Number of connections opened
+    """
+    if _engine is None:
+        raise RuntimeError("Database not initialized")
+    engines = [_engine, *(_replicas.engines if _replicas else [])]
+    opened = 0
+    for engine in engines:
+        count = connections
+        if count is None:
+            size = getattr(engine.sync_engine.pool, "size", None)
+            count = size() if callable(size) else 1
+        conns = await asyncio.gather(
+            *(engine.connect().start() for _ in range(count))
+        )
+        try:
+            await asyncio.gather(
+                *(conn.exec_driver_sql("SELECT 1") for conn in conns)
+            )
+        finally:
+            for conn in conns:
+                await conn.close()
+        opened += len(conns)
+    return opened
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Live connection pool state of the primary and each replica.
+
+    Each pool reports its size, connections checked in and out, overflow,
+    and since startup: checkouts, timeouts and a histogram of how long
+    checkouts waited (`wait_seconds`).
+    """
+    if _engine is None:
+        raise RuntimeError("Database not initialized")
+    return {
+        "primary": pool_stats(_engine.sync_engine.pool),
+        "replicas": [
+            pool_stats(engine.sync_engine.pool)
+            for engine in (_replicas.engines if _replicas else [])
+        ],
+    }
 
-    async def _create_schema():
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
 
-    try:
-        loop = asyncio.get_running_loop()
-        # If we're in a running loop, try to run the task in it
-        if loop.is_running():
-            # Schedule the task and wait for it
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, _create_schema())
-                future.result()  # Wait for completion
-        else:
-            loop.run_until_complete(_create_schema())
-    except RuntimeError:
-        # No loop running, use asyncio.run
-        asyncio.run(_create_schema())
+async def dispose_db() -> None:
+    """Close every pooled connection of the primary and the replicas."""
+    for engine in [_engine, *(_replicas.engines if _replicas else [])]:
+        if engine is not None:
+            await engine.dispose()
 
 
-async def _create_schema_async(engine: AsyncEngine) -> None:
-    """Create database schema asynchronously."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+def new_session() -> AsyncSession:
+    """
+    Open a session outside a request, for background work.
+
+    The caller owns the session and closes it, e.g. with ``async with``.
+
+    Raises:
+        RuntimeError: If the database has not been initialized
+    """
+    if _sessionmaker is None:
+        raise RuntimeError("Database not initialized")
+    return _sessionmaker()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -86,10 +210,9 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     if _sessionmaker is None:
         raise RuntimeError("Database not initialized")
 
-    # Create schema on first access if not already done
-    if not hasattr(get_db, '_schema_created'):
-        await _create_schema_async(_engine)
-        get_db._schema_created = True
+    # Normally done by the application lifespan before the first request
+    if not _schema_ready:
+        await ensure_schema()
 
     # Use the sessionmaker async context to manage the session lifecycle. The
     # context manager will close the session for us when the dependency exits.
@@ -97,11 +220,37 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Get a database session whose read-only queries may use a replica.
+
+    Writes still go to the primary, and after its first write the session
+    reads from the primary too. Without configured replicas this is the
+    same as `get_db`.
+
+    Returns:
+        AsyncGenerator yielding an SQLAlchemy AsyncSession
+    """
+    async for session in get_db():
+        read_from_replica(session)
+        yield session
+
+
 # Export repository classes
 __all__ = [
     "initialize_db",
     "get_db",
+    "new_session",
+    "ensure_schema",
+    "warm_pool",
+    "dispose_db",
+    "get_pool_stats",
+    "get_read_db",
+    "read_from_replica",
+    "use_primary",
+    "RoutingSession",
     "BaseRepository",
+    "unit_of_work",
     "CustomerRepository",
     "PaymentRepository",
     "SubscriptionRepository",
@@ -109,4 +258,10 @@ __all__ = [
     "PlanRepository",
     "PaymentMethodRepository",
     "SyncJobRepository",
+    "SyncCursorRepository",
+    "IdempotencyKeyRepository",
+    "ProviderSnapshotRepository",
+    "UsagePushRepository",
+    "UsageRecordRepository",
+    "UsageRollupRepository",
 ]
@@ -2,13 +2,215 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar
+import base64
+import binascii
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
-from sqlalchemy import delete, select
+from sqlalchemy import and_, delete, inspect, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from sqlalchemy.orm.attributes import set_committed_value
 
 ModelType = TypeVar("ModelType")
 
+_UNIT_OF_WORK = "fastapi_payments.unit_of_work"
+
+
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Group repository writes into one transaction that commits on exit.
+
+    Inside the block repositories flush their changes instead of committing,
+    so a service operation that writes several rows pays for one commit and
+    leaves nothing behind if it fails halfway: an exception rolls the whole
+    transaction back. Nested blocks join the outermost one.
+    """
+    depth = session.info.get(_UNIT_OF_WORK, 0)
+    session.info[_UNIT_OF_WORK] = depth + 1
+    try:
+        yield session
+        if depth == 0:
+            await session.commit()
+    except BaseException:
+        if depth == 0:
+            await session.rollback()
+        raise
+    finally:
+        session.info[_UNIT_OF_WORK] = depth
+
+
+def in_unit_of_work(session: AsyncSession) -> bool:
+    return session.info.get(_UNIT_OF_WORK, 0) > 0
+
+
+async def commit_or_flush(session: AsyncSession) -> None:
+    """Commit, or only flush when a unit of work will commit later."""
+    if in_unit_of_work(session):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+async def persist(session: AsyncSession, *instances: Any) -> None:
+    """Write pending changes, then load only columns the database generated.
+
+    Client-side defaults (IDs, timestamps) are already on the instances after
+    the flush, so the usual `refresh()` round-trip is skipped unless a column
+    is filled in by a server default. A session with `expire_on_commit`
+    expires every attribute on commit; those instances are refreshed in
+    full.
+    """
+    inserted = [inspect(instance).pending for instance in instances]
+    await commit_or_flush(session)
+    for instance, is_new in zip(instances, inserted):
+        state = inspect(instance)
+        if state.expired:
+            await session.refresh(instance)
+            continue
+        unloaded = state.unloaded
+        generated = []
+        for attr in state.mapper.column_attrs:
+            if attr.key not in unloaded:
+                continue
+            column = attr.columns[0]
+            if (
+                column.server_default is not None
+                or column.server_onupdate is not None
+            ):
+                generated.append(attr.key)
+            elif is_new:
+                # Omitted from the INSERT and nothing fills it in: it is NULL
+                set_committed_value(instance, attr.key, None)
+        if generated:
+            await session.refresh(instance, attribute_names=generated)
+
+
+async def save_batch(
+    session: AsyncSession,
+    updates: Iterable[Tuple[Any, Dict[str, Any]]] = (),
+    creates: Iterable[Any] = (),
+) -> None:
+    """Apply field updates to loaded instances and add new ones in one commit.
+
+    Used by bulk paths (such as provider sync) that would otherwise pay a
+    get, commit and refresh round-trip per row.
+    """
+    for instance, fields in updates:
+        for field, value in fields.items():
+            setattr(instance, field, value)
+    session.add_all(list(creates))
+    try:
+        await commit_or_flush(session)
+    except Exception:
+        if not in_unit_of_work(session):
+            await session.rollback()
+        raise
+
+
+def keyset_after(
+    stmt: Any, id_column: Any, after_id: Optional[Any], limit: int
+) -> Any:
+    """Page `stmt` by primary key: up to `limit` rows after `after_id`.
+
+    Unlike offset paging this stays cheap deep into large tables and does not
+    skip or repeat rows when earlier rows are inserted or deleted.
+    """
+    if after_id is not None:
+        stmt = stmt.where(id_column > after_id)
+    return stmt.order_by(id_column).limit(limit)
+
+
+def encode_cursor(created_at: Any, obj_id: str) -> str:
+    """Opaque page cursor for the row at (`created_at`, `obj_id`)."""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, obj_id], separators=(",", ":")).encode(
+        "utf-8"
+    )
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of `encode_cursor`; raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, obj_id = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if created_at.tzinfo is not None:
+        # Timestamp columns hold naive UTC
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at, str(obj_id)
+
+
+def keyset_before(
+    stmt: Any, created_column: Any, id_column: Any, cursor: Optional[str]
+) -> Any:
+    """Order `stmt` newest first by (created_at, id), resuming at `cursor`.
+
+    The cursor names the last row of the previous page, so every page is an
+    index range read no matter how deep it is.
+    """
+    if cursor:
+        created_at, obj_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < obj_id),
+            )
+        )
+    return stmt.order_by(created_column.desc(), id_column.desc())
+
+
+def next_cursor(items: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Cursor for the page after `items`, or None when it was the last page."""
+    if not limit or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last["created_at"], last["id"])
+
+
+def without_blobs(stmt: Any, model: Any, include: bool) -> Any:
+    """Leave `model.meta_info` out of the SELECT unless `include` is set.
+
+    meta_info holds whole provider responses, often many times the size of
+    the rest of the row, and list views rarely need it. Touching the
+    deferred attribute raises instead of issuing one query per row.
+    """
+    if include:
+        return stmt
+    return stmt.options(defer(model.meta_info, raiseload=True))
+
+
+def release_partial(
+    session: AsyncSession,
+    instances: Iterable[Any],
+    attribute: str = "meta_info",
+) -> None:
+    """Detach instances loaded without `attribute`.
+
+    A later `get()` in the same session would otherwise return the partial
+    instance from the identity map instead of loading the full row.
+    """
+    for instance in instances:
+        if instance in session and attribute in inspect(instance).unloaded:
+            session.expunge(instance)
+
 
 class BaseRepository(Generic[ModelType]):
     """Lightweight repository that performs basic CRUD operations."""
@@ -20,8 +222,7 @@ class BaseRepository(Generic[ModelType]):
     async def create(self, **kwargs: Any) -> ModelType:
         instance = self._model(**kwargs)
         self._session.add(instance)
-        await self._session.commit()
-        await self._session.refresh(instance)
+        await persist(self._session, instance)
         return instance
 
     async def get_by_id(self, obj_id: Any) -> Optional[ModelType]:
@@ -41,20 +242,24 @@ class BaseRepository(Generic[ModelType]):
         for field, value in kwargs.items():
             setattr(instance, field, value)
         self._session.add(instance)
-        await self._session.commit()
-        await self._session.refresh(instance)
+        await persist(self._session, instance)
         return instance
 
+    async def update_many(
+        self, updates: Iterable[Tuple[ModelType, Dict[str, Any]]]
+    ) -> None:
+        await save_batch(self._session, updates=updates)
+
     async def delete(self, obj_id: Any) -> None:
         instance = await self.get_by_id(obj_id)
         if not instance:
             return
         await self._session.delete(instance)
-        await self._session.commit()
+        await commit_or_flush(self._session)
 
     async def delete_where(self, **filters: Any) -> None:
         stmt = delete(self._model)
         for field, value in filters.items():
             stmt = stmt.where(getattr(self._model, field) == value)
         await self._session.execute(stmt)
-        await self._session.commit()
+        await commit_or_flush(self._session)
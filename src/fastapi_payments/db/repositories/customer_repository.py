@@ -2,13 +2,38 @@
 
 from __future__ import annotations
 
-from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Iterable, Sequence, Tuple
 
-from sqlalchemy import select, or_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import insert, select, or_
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models import Customer, ProviderCustomer
+from .base import (
+    commit_or_flush,
+    keyset_after,
+    keyset_before,
+    persist,
+    release_partial,
+    save_batch,
+    without_blobs,
+)
+from ..models import Customer, ProviderCustomer, generate_uuid
+
+
+def _split_address(
+    meta_info: Optional[Dict[str, Any]], address: Optional[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Move an address embedded in meta_info into the dedicated column."""
+    meta_info = dict(meta_info or {})
+    if address:
+        if isinstance(meta_info.get("address"), dict):
+            # remove duplicate from meta_info
+            meta_info.pop("address", None)
+    else:
+        if isinstance(meta_info.get("address"), dict):
+            address = meta_info.pop("address")
+    return meta_info, address
 
 
 class CustomerRepository:
@@ -26,21 +51,62 @@ class CustomerRepository:
     ) -> Customer:
         # If an address exists inside meta_info but address param is empty,
         # move it into the dedicated address column for structured queries.
-        meta_info = dict(meta_info or {})
-        if address:
-            if isinstance(meta_info.get("address"), dict):
-                # remove duplicate from meta_info
-                meta_info.pop("address", None)
-        else:
-            if isinstance(meta_info.get("address"), dict):
-                address = meta_info.pop("address")
+        meta_info, address = _split_address(meta_info, address)
 
         customer = Customer(email=email, name=name, meta_info=meta_info or {}, address=address)
         self.session.add(customer)
-        await self.session.commit()
-        await self.session.refresh(customer)
+        await persist(self.session, customer)
         return customer
 
+    async def create_many(
+        self, customers: Sequence[Dict[str, Any]], provider: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert customers and their provider links with multi-row INSERTs.
+
+        Each entry carries email, name, meta_info, address and the
+        provider_customer_id already created at `provider`. Both tables are
+        written in one transaction; nothing is loaded back into the session.
+
+        Returns:
+            The inserted customer rows as dicts, in input order
+        """
+        if not customers:
+            return []
+        now = datetime.now(timezone.utc)
+        rows = []
+        links = []
+        for entry in customers:
+            meta_info, address = _split_address(
+                entry.get("meta_info"), entry.get("address")
+            )
+            row = {
+                "id": generate_uuid(),
+                "email": entry["email"],
+                "name": entry.get("name"),
+                "meta_info": meta_info,
+                "address": address,
+                "created_at": now,
+                "updated_at": now,
+            }
+            rows.append(row)
+            links.append(
+                {
+                    "id": generate_uuid(),
+                    "customer_id": row["id"],
+                    "provider": provider,
+                    "provider_customer_id": entry["provider_customer_id"],
+                }
+            )
+        try:
+            await self.session.execute(insert(Customer).values(rows))
+            await self.session.execute(insert(ProviderCustomer).values(links))
+            await commit_or_flush(self.session)
+        except Exception:
+            await self.session.rollback()
+            raise
+        return rows
+
     async def update(self, customer_id: str, **fields: Any) -> Optional[Customer]:
         customer = await self.get_by_id(customer_id)
         if not customer:
@@ -76,10 +142,31 @@ class CustomerRepository:
             if value is not None and hasattr(customer, attr):
                 setattr(customer, attr, value)
         self.session.add(customer)
-        await self.session.commit()
-        await self.session.refresh(customer)
+        await persist(self.session, customer)
         return customer
 
+    async def list_after(
+        self,
+        after_id: Optional[str] = None,
+        *,
+        limit: int = 100,
+        include_provider_customers: bool = True,
+    ) -> List[Customer]:
+        """List customers in primary-key order after `after_id`."""
+        stmt = select(Customer)
+        if include_provider_customers:
+            stmt = stmt.options(selectinload(Customer.provider_customers))
+        result = await self.session.execute(
+            keyset_after(stmt, Customer.id, after_id, limit)
+        )
+        return result.scalars().all()
+
+    async def update_many(
+        self, updates: Iterable[Tuple[Customer, Dict[str, Any]]]
+    ) -> None:
+        """Apply field updates to loaded customers and commit once."""
+        await save_batch(self.session, updates=updates)
+
     async def get_by_id(self, customer_id: str) -> Optional[Customer]:
         return await self.session.get(Customer, customer_id)
 
@@ -92,8 +179,7 @@ class CustomerRepository:
             provider_customer_id=provider_customer_id,
         )
         self.session.add(link)
-        await self.session.commit()
-        await self.session.refresh(link)
+        await persist(self.session, link)
         return link
 
     async def get_provider_customers(self, customer_id: str) -> List[ProviderCustomer]:
@@ -115,6 +201,21 @@ class CustomerRepository:
         # to ensure a single Customer instance is returned.
         return result.unique().scalars().first()
 
+    async def get_many_with_provider_customers(
+        self, customer_ids: Iterable[str]
+    ) -> Dict[str, Customer]:
+        """Return customers with their provider links, keyed by ID."""
+        ids = list(set(customer_ids))
+        if not ids:
+            return {}
+        stmt = (
+            select(Customer)
+            .options(selectinload(Customer.provider_customers))
+            .where(Customer.id.in_(ids))
+        )
+        result = await self.session.execute(stmt)
+        return {customer.id: customer for customer in result.scalars().all()}
+
     async def get_provider_customer(
         self, customer_id: str, provider: str
     ) -> Optional[ProviderCustomer]:
@@ -125,6 +226,27 @@ class CustomerRepository:
         result = await self.session.execute(stmt)
         return result.scalars().first()
 
+    async def get_by_provider_customer_ids(
+        self, provider: str, provider_customer_ids: Iterable[str]
+    ) -> Dict[str, Customer]:
+        """Return local customers keyed by their ID at `provider`."""
+        ids = list(set(provider_customer_ids))
+        if not ids:
+            return {}
+        stmt = (
+            select(ProviderCustomer)
+            .options(joinedload(ProviderCustomer.customer))
+            .where(
+                ProviderCustomer.provider == provider,
+                ProviderCustomer.provider_customer_id.in_(ids),
+            )
+        )
+        result = await self.session.execute(stmt)
+        return {
+            pc.provider_customer_id: pc.customer
+            for pc in result.scalars().all()
+        }
+
     async def list(
         self,
         *,
@@ -132,12 +254,21 @@ class CustomerRepository:
         offset: int = 0,
         search: Optional[str] = None,
         include_provider_customers: bool = True,
+        cursor: Optional[str] = None,
+        include_meta_info: bool = True,
     ) -> List[Customer]:
-        """List customers with optional search and pagination."""
+        """List customers newest first, with optional search.
 
-        stmt = select(Customer)
+        Pass the `cursor` of the previous page's last row instead of an
+        `offset` to page through large tables at constant cost. With
+        `include_meta_info=False` the meta_info column is not loaded and the
+        returned customers are detached from the session.
+        """
+
+        stmt = without_blobs(select(Customer), Customer, include_meta_info)
         if include_provider_customers:
-            stmt = stmt.options(joinedload(Customer.provider_customers))
+            # A second IN query instead of a join keeps one row per customer
+            stmt = stmt.options(selectinload(Customer.provider_customers))
 
         if search:
             pattern = f"%{search}%"
@@ -148,13 +279,13 @@ class CustomerRepository:
                 )
             )
 
-        stmt = stmt.order_by(Customer.created_at.desc())
+        stmt = keyset_before(stmt, Customer.created_at, Customer.id, cursor)
         if offset:
             stmt = stmt.offset(offset)
         if limit:
             stmt = stmt.limit(limit)
 
         result = await self.session.execute(stmt)
-        # Call unique() because we often joinload the provider_customers
-        # collection which causes duplicated parent rows for Customers.
-        return result.unique().scalars().all()
+        customers = result.scalars().all()
+        release_partial(self.session, customers)
+        return customers
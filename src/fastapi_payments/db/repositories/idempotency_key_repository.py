@@ -0,0 +1,145 @@
+"""Repository for idempotency keys of mutating requests."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import IdempotencyKey
+
+
+def _utcnow() -> datetime:
+    # Stored as naive UTC to suit TIMESTAMP columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class IdempotencyKeyRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, scope: str, key: str) -> Optional[IdempotencyKey]:
+        stmt = (
+            select(IdempotencyKey)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().first()
+
+    async def claim(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        lock_seconds: float,
+        ttl_seconds: float,
+    ) -> Tuple[Optional[IdempotencyKey], bool]:
+        """
+        Try to become the request that executes `key`.
+
+        A new key is inserted as in progress. An existing key is taken over
+        only if its record expired, or it is still in progress but its lock
+        ran out (the request that held it died); the takeover is a
+        conditional update, so only one contender wins.
+
+        Returns:
+            (row, owned): the current record and whether this caller now
+            owns it
+        """
+        now = _utcnow()
+        fields = {
+            "fingerprint": fingerprint,
+            "status": "in_progress",
+            "response": None,
+            "locked_until": now + timedelta(seconds=lock_seconds),
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+        }
+        row = IdempotencyKey(scope=scope, key=key, **fields)
+        self.session.add(row)
+        try:
+            await self.session.commit()
+            return row, True
+        except IntegrityError:
+            await self.session.rollback()
+
+        existing = await self.get(scope, key)
+        if existing is None:
+            return None, False
+        expired = (
+            existing.expires_at is not None and existing.expires_at <= now
+        )
+        abandoned = existing.status != "completed" and (
+            existing.locked_until is None or existing.locked_until <= now
+        )
+        if not (expired or abandoned):
+            return existing, False
+
+        stmt = (
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status == existing.status,
+                (
+                    IdempotencyKey.locked_until.is_(None)
+                    if existing.locked_until is None
+                    else IdempotencyKey.locked_until == existing.locked_until
+                ),
+            )
+            .values(**fields)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return await self.get(scope, key), result.rowcount == 1
+
+    async def renew(self, scope: str, key: str, lock_seconds: float) -> bool:
+        """Extend the lock of an in-progress key; False if it was released."""
+        stmt = (
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status == "in_progress",
+            )
+            .values(locked_until=_utcnow() + timedelta(seconds=lock_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.rowcount == 1
+
+    async def complete(self, scope: str, key: str, response: Any) -> None:
+        """Store the final response and release the lock."""
+        stmt = (
+            update(IdempotencyKey)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            .values(status="completed", response=response, locked_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
+        await self.session.commit()
+
+    async def release(self, scope: str, key: str) -> None:
+        """Forget an in-progress key whose request failed, allowing retries."""
+        await self.session.rollback()
+        stmt = delete(IdempotencyKey).where(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status == "in_progress",
+        )
+        await self.session.execute(stmt)
+        await self.session.commit()
+
+    async def purge_expired(self) -> int:
+        """Delete expired records; returns the number removed."""
+        stmt = delete(IdempotencyKey).where(
+            IdempotencyKey.expires_at <= _utcnow()
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.rowcount or 0
@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional, List
+from typing import Any, Dict, Iterable, Optional, List, Tuple
 
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from .base import commit_or_flush, persist, save_batch, unit_of_work
 from ..models import PaymentMethod
 
 
@@ -42,8 +43,7 @@ class PaymentMethodRepository:
             meta_info=meta_info or {},
         )
         self.session.add(pm)
-        await self.session.commit()
-        await self.session.refresh(pm)
+        await persist(self.session, pm)
         return pm
 
     async def get_by_id(self, method_id: str) -> Optional[PaymentMethod]:
@@ -66,6 +66,34 @@ class PaymentMethodRepository:
         result = await self.session.execute(stmt)
         return result.scalars().first()
 
+    async def get_by_provider_method_ids(
+        self, provider: str, provider_method_ids: Iterable[str]
+    ) -> Dict[str, PaymentMethod]:
+        """Return stored methods for a provider keyed by provider method ID."""
+        ids = list(set(provider_method_ids))
+        if not ids:
+            return {}
+        stmt = select(PaymentMethod).where(
+            PaymentMethod.provider == provider,
+            PaymentMethod.provider_payment_method_id.in_(ids),
+        )
+        result = await self.session.execute(stmt)
+        return {
+            pm.provider_payment_method_id: pm for pm in result.scalars().all()
+        }
+
+    async def save_many(
+        self,
+        updates: Iterable[Tuple[PaymentMethod, Dict[str, Any]]] = (),
+        creates: Iterable[Dict[str, Any]] = (),
+    ) -> None:
+        """Update loaded methods and insert new ones in a single commit."""
+        new_methods = [
+            PaymentMethod(**{"is_default": False, "meta_info": {}, **fields})
+            for fields in creates
+        ]
+        await save_batch(self.session, updates=updates, creates=new_methods)
+
     async def list_for_customer(
         self,
         customer_id: str,
@@ -94,8 +122,7 @@ class PaymentMethodRepository:
                 setattr(pm, attr, value)
 
         self.session.add(pm)
-        await self.session.commit()
-        await self.session.refresh(pm)
+        await persist(self.session, pm)
         return pm
 
     async def delete(self, method_id: str) -> bool:
@@ -108,16 +135,15 @@ class PaymentMethodRepository:
             return False
 
         await self.session.delete(pm)
-        await self.session.commit()
+        await commit_or_flush(self.session)
         return True
 
     async def set_default(self, customer_id: str, method_id: str) -> Optional[PaymentMethod]:
-        # Unset any existing default methods for this customer
-        await self.session.execute(
-            update(PaymentMethod)
-            .where(PaymentMethod.customer_id == customer_id)
-            .values(is_default=False)
-        )
-        await self.session.commit()
-
-        return await self.update(method_id, is_default=True)
+        async with unit_of_work(self.session):
+            # Unset any existing default methods for this customer
+            await self.session.execute(
+                update(PaymentMethod)
+                .where(PaymentMethod.customer_id == customer_id)
+                .values(is_default=False)
+            )
+            return await self.update(method_id, is_default=True)
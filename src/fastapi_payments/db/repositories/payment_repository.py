@@ -2,13 +2,23 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional
+from datetime import datetime, timezone
+from typing import Any, Optional, Dict, Iterable, List, Sequence, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models import Payment, PaymentStatus
+from .base import (
+    commit_or_flush,
+    keyset_after,
+    keyset_before,
+    persist,
+    release_partial,
+    save_batch,
+    without_blobs,
+)
+from ..models import Payment, PaymentStatus, generate_uuid
 
 
 def _normalize_status(status: Optional[str]) -> PaymentStatus:
@@ -62,10 +72,50 @@ class PaymentRepository:
             meta_info=meta_info or {},
         )
         self.session.add(payment)
-        await self.session.commit()
-        await self.session.refresh(payment)
+        await persist(self.session, payment)
         return payment
 
+    async def create_many(
+        self, payments: Sequence[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert payments with a single multi-row INSERT and commit once.
+
+        Each entry takes the keyword arguments of create(). Nothing is loaded
+        back into the session.
+
+        Returns:
+            The inserted rows as dicts, in input order
+        """
+        if not payments:
+            return []
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "id": generate_uuid(),
+                "customer_id": entry["customer_id"],
+                "provider": entry["provider"],
+                "provider_payment_id": entry["provider_payment_id"],
+                "amount": entry["amount"],
+                "currency": entry["currency"],
+                "status": _normalize_status(entry.get("status")),
+                "payment_method": entry.get("payment_method"),
+                "error_message": entry.get("error_message"),
+                "refunded_amount": 0.0,
+                "meta_info": entry.get("meta_info") or {},
+                "created_at": now,
+                "updated_at": now,
+            }
+            for entry in payments
+        ]
+        try:
+            await self.session.execute(insert(Payment).values(rows))
+            await commit_or_flush(self.session)
+        except Exception:
+            await self.session.rollback()
+            raise
+        return rows
+
     async def get_by_id(self, payment_id: str) -> Optional[Payment]:
         return await self.session.get(Payment, payment_id)
 
@@ -82,10 +132,21 @@ class PaymentRepository:
                 setattr(payment, attr, value)
 
         self.session.add(payment)
-        await self.session.commit()
-        await self.session.refresh(payment)
+        await persist(self.session, payment)
         return payment
 
+    async def update_many(
+        self, updates: Iterable[Tuple[Payment, Dict[str, Any]]]
+    ) -> None:
+        """Apply field updates to loaded payments and commit once."""
+        normalized = []
+        for payment, fields in updates:
+            fields = dict(fields)
+            if "status" in fields:
+                fields["status"] = _normalize_status(fields["status"])
+            normalized.append((payment, fields))
+        await save_batch(self.session, updates=normalized)
+
     async def list(
         self,
         *,
@@ -94,8 +155,15 @@ class PaymentRepository:
         limit: int = 50,
         offset: int = 0,
         include_customer: bool = True,
+        cursor: Optional[str] = None,
+        include_meta_info: bool = True,
     ) -> list[Payment]:
-        stmt = select(Payment)
+        """List payments newest first.
+
+        With `include_meta_info=False` the meta_info column is not loaded
+        and the returned payments are detached from the session.
+        """
+        stmt = without_blobs(select(Payment), Payment, include_meta_info)
         if include_customer:
             stmt = stmt.options(joinedload(Payment.customer))
 
@@ -104,11 +172,52 @@ class PaymentRepository:
         if status:
             stmt = stmt.where(Payment.status == _normalize_status(status))
 
-        stmt = stmt.order_by(Payment.created_at.desc())
+        stmt = keyset_before(stmt, Payment.created_at, Payment.id, cursor)
         if offset:
             stmt = stmt.offset(offset)
         if limit:
             stmt = stmt.limit(limit)
 
+        result = await self.session.execute(stmt)
+        payments = result.scalars().all()
+        release_partial(self.session, payments)
+        return payments
+
+    async def count(
+        self,
+        *,
+        customer_id: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> int:
+        """Count payments matching the `list` filters."""
+        stmt = select(func.count()).select_from(Payment)
+        if customer_id:
+            stmt = stmt.where(Payment.customer_id == customer_id)
+        if status:
+            stmt = stmt.where(Payment.status == _normalize_status(status))
+        return (await self.session.execute(stmt)).scalar_one()
+
+    async def get_by_provider_payment_ids(
+        self, provider: str, provider_payment_ids: Iterable[str]
+    ) -> Dict[str, Payment]:
+        """Return local payments keyed by their ID at `provider`."""
+        ids = list(set(provider_payment_ids))
+        if not ids:
+            return {}
+        stmt = select(Payment).where(
+            Payment.provider == provider,
+            Payment.provider_payment_id.in_(ids),
+        )
+        result = await self.session.execute(stmt)
+        return {
+            payment.provider_payment_id: payment
+            for payment in result.scalars().all()
+        }
+
+    async def list_after(
+        self, after_id: Optional[str] = None, *, limit: int = 100
+    ) -> list[Payment]:
+        """List payments in primary-key order after `after_id`."""
+        stmt = keyset_after(select(Payment), Payment.id, after_id, limit)
         result = await self.session.execute(stmt)
         return result.scalars().all()
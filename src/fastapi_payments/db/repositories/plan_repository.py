@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional
+from typing import Any, Optional, Dict, Iterable, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from .base import keyset_after, keyset_before, persist, save_batch
 from ..models import Plan, PricingModel
 
 
@@ -19,6 +20,17 @@ def _coerce_pricing_model(value: Any) -> PricingModel:
     return PricingModel(normalized)
 
 
+def _lookup_columns(
+    meta_info: Optional[dict[str, Any]],
+) -> Dict[str, Optional[str]]:
+    # The indexed columns mirror these meta_info keys
+    meta_info = meta_info or {}
+    return {
+        "provider": meta_info.get("provider"),
+        "provider_price_id": meta_info.get("provider_price_id"),
+    }
+
+
 class PlanRepository:
     """Repository for plan persistence."""
 
@@ -51,27 +63,38 @@ class PlanRepository:
             trial_period_days=trial_period_days,
             is_active=is_active,
             meta_info=meta_info or {},
+            **_lookup_columns(meta_info),
         )
         self.session.add(plan)
-        await self.session.commit()
-        await self.session.refresh(plan)
+        await persist(self.session, plan)
         return plan
 
     async def get_by_id(self, plan_id: str) -> Optional[Plan]:
         return await self.session.get(Plan, plan_id)
 
+    async def get_by_provider_price_id(
+        self, provider_price_id: str, provider: Optional[str] = None
+    ) -> Optional[Plan]:
+        """Find the plan a provider knows as `provider_price_id`."""
+        stmt = select(Plan).where(Plan.provider_price_id == provider_price_id)
+        if provider:
+            stmt = stmt.where(Plan.provider == provider)
+        result = await self.session.execute(stmt.limit(1))
+        return result.scalars().first()
+
     async def list(
         self,
         *,
         product_id: Optional[str] = None,
         limit: int = 50,
         offset: int = 0,
+        cursor: Optional[str] = None,
     ) -> list[Plan]:
         stmt = select(Plan)
         if product_id:
             stmt = stmt.where(Plan.product_id == product_id)
 
-        stmt = stmt.order_by(Plan.created_at.desc())
+        stmt = keyset_before(stmt, Plan.created_at, Plan.id, cursor)
         if offset:
             stmt = stmt.offset(offset)
         if limit:
@@ -83,14 +106,29 @@ class PlanRepository:
     async def list_for_product(self, product_id: str, *, limit: int = 50, offset: int = 0) -> list[Plan]:
         return await self.list(product_id=product_id, limit=limit, offset=offset)
 
+    async def list_after(
+        self, after_id: Optional[str] = None, *, limit: int = 100
+    ) -> list[Plan]:
+        """List plans in primary-key order after `after_id`."""
+        stmt = keyset_after(select(Plan), Plan.id, after_id, limit)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def update_many(
+        self, updates: Iterable[Tuple[Plan, Dict[str, Any]]]
+    ) -> None:
+        """Apply field updates to loaded plans and commit once."""
+        await save_batch(self.session, updates=updates)
+
     async def update(self, plan_id: str, **fields: Any) -> Optional[Plan]:
         plan = await self.get_by_id(plan_id)
         if not plan:
             return None
+        if "meta_info" in fields:
+            fields = {**fields, **_lookup_columns(fields["meta_info"])}
         for attr, value in fields.items():
             if hasattr(plan, attr):
                 setattr(plan, attr, value)
         self.session.add(plan)
-        await self.session.commit()
-        await self.session.refresh(plan)
+        await persist(self.session, plan)
         return plan
@@ -2,14 +2,26 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional
+from typing import Any, Optional, Dict, Iterable, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from .base import keyset_after, keyset_before, persist, save_batch
 from ..models import Product
 
 
+def _lookup_columns(
+    meta_info: Optional[dict[str, Any]],
+) -> Dict[str, Optional[str]]:
+    # The indexed columns mirror these meta_info keys
+    meta_info = meta_info or {}
+    return {
+        "provider": meta_info.get("provider"),
+        "provider_product_id": meta_info.get("provider_product_id"),
+    }
+
+
 class ProductRepository:
     """Repository for product CRUD operations."""
 
@@ -22,17 +34,37 @@ class ProductRepository:
         description: Optional[str] = None,
         meta_info: Optional[dict[str, Any]] = None,
     ) -> Product:
-        product = Product(name=name, description=description, meta_info=meta_info or {})
+        product = Product(
+            name=name,
+            description=description,
+            meta_info=meta_info or {},
+            **_lookup_columns(meta_info),
+        )
         self.session.add(product)
-        await self.session.commit()
-        await self.session.refresh(product)
+        await persist(self.session, product)
         return product
 
     async def get_by_id(self, product_id: str) -> Optional[Product]:
         return await self.session.get(Product, product_id)
 
-    async def list(self, *, limit: int = 50, offset: int = 0) -> list[Product]:
-        stmt = select(Product).order_by(Product.created_at.desc())
+    async def get_by_provider_product_id(
+        self, provider_product_id: str, provider: Optional[str] = None
+    ) -> Optional[Product]:
+        """Find the product a provider knows as `provider_product_id`."""
+        stmt = select(Product).where(
+            Product.provider_product_id == provider_product_id
+        )
+        if provider:
+            stmt = stmt.where(Product.provider == provider)
+        result = await self.session.execute(stmt.limit(1))
+        return result.scalars().first()
+
+    async def list(
+        self, *, limit: int = 50, offset: int = 0, cursor: Optional[str] = None
+    ) -> list[Product]:
+        stmt = keyset_before(
+            select(Product), Product.created_at, Product.id, cursor
+        )
         if offset:
             stmt = stmt.offset(offset)
         if limit:
@@ -40,14 +72,29 @@ class ProductRepository:
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def list_after(
+        self, after_id: Optional[str] = None, *, limit: int = 100
+    ) -> list[Product]:
+        """List products in primary-key order after `after_id`."""
+        stmt = keyset_after(select(Product), Product.id, after_id, limit)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def update_many(
+        self, updates: Iterable[Tuple[Product, Dict[str, Any]]]
+    ) -> None:
+        """Apply field updates to loaded products and commit once."""
+        await save_batch(self.session, updates=updates)
+
     async def update(self, product_id: str, **fields: Any) -> Optional[Product]:
         product = await self.get_by_id(product_id)
         if not product:
             return None
+        if "meta_info" in fields:
+            fields = {**fields, **_lookup_columns(fields["meta_info"])}
         for attr, value in fields.items():
             if hasattr(product, attr):
                 setattr(product, attr, value)
         self.session.add(product)
-        await self.session.commit()
-        await self.session.refresh(product)
+        await persist(self.session, product)
         return product
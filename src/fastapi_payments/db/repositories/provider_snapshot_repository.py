@@ -0,0 +1,198 @@
+"""Repository for compressed provider payload snapshots."""
+
+from __future__ import annotations
+
+import enum
+import hashlib
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import commit_or_flush
+from ..models import ProviderSnapshot
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_payload(payload: Any) -> Tuple[bytes, str]:
+    """Return (compressed JSON, sha256 of the JSON) for `payload`."""
+    raw = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), default=_json_default
+    )
+    data = raw.encode("utf-8")
+    return zlib.compress(data), hashlib.sha256(data).hexdigest()
+
+
+def decode_payload(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ProviderSnapshotRepository:
+    """Versioned provider payloads keyed by (entity, provider, version).
+
+    `stage` and `stage_many` add snapshots without committing, so they are
+    written by the same commit as the rows they describe. Payloads are only
+    decompressed by the `latest*` readers.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def stage(
+        self,
+        entity_type: str,
+        entity_id: str,
+        provider: str,
+        payload: Any,
+        *,
+        check_latest: bool = True,
+    ) -> Optional[ProviderSnapshot]:
+        """
+        Add a new version of a snapshot without committing.
+
+        Args:
+            check_latest: Look up the current version first. Pass False for
+                a row that was just created and cannot have one yet.
+
+        Returns:
+            The staged snapshot, or None if `payload` matches the latest
+            version
+        """
+        staged = await self.stage_many(
+            entity_type,
+            [(entity_id, provider, payload)],
+            check_latest=check_latest,
+        )
+        return staged[0] if staged else None
+
+    async def stage_many(
+        self,
+        entity_type: str,
+        entries: Iterable[Tuple[str, str, Any]],
+        *,
+        check_latest: bool = True,
+    ) -> List[ProviderSnapshot]:
+        """Stage (entity_id, provider, payload) snapshots in one lookup."""
+        entries = [entry for entry in entries if entry[2] is not None]
+        if not entries:
+            return []
+        current: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        if check_latest:
+            current = await self._latest_versions(
+                entity_type, {e[0] for e in entries}
+            )
+
+        staged = []
+        for entity_id, provider, payload in entries:
+            blob, digest = encode_payload(payload)
+            version, latest_digest = current.get(
+                (entity_id, provider), (0, None)
+            )
+            if digest == latest_digest:
+                continue
+            snapshot = ProviderSnapshot(
+                entity_type=entity_type,
+                entity_id=entity_id,
+                provider=provider,
+                version=version + 1,
+                digest=digest,
+                payload=blob,
+            )
+            current[(entity_id, provider)] = (version + 1, digest)
+            staged.append(snapshot)
+        self.session.add_all(staged)
+        return staged
+
+    async def save(
+        self, entity_type: str, entity_id: str, provider: str, payload: Any
+    ) -> Optional[ProviderSnapshot]:
+        """Stage a snapshot and commit it."""
+        snapshot = await self.stage(entity_type, entity_id, provider, payload)
+        await commit_or_flush(self.session)
+        return snapshot
+
+    async def latest(
+        self, entity_type: str, entity_id: str, provider: Optional[str] = None
+    ) -> Optional[Any]:
+        """Decoded payload of the newest snapshot of one row."""
+        stmt = select(ProviderSnapshot.payload).where(
+            ProviderSnapshot.entity_type == entity_type,
+            ProviderSnapshot.entity_id == entity_id,
+        )
+        if provider:
+            stmt = stmt.where(ProviderSnapshot.provider == provider)
+        stmt = stmt.order_by(ProviderSnapshot.version.desc()).limit(1)
+        blob = (await self.session.execute(stmt)).scalar_one_or_none()
+        return decode_payload(blob) if blob is not None else None
+
+    async def latest_many(
+        self, entity_type: str, entity_ids: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Decoded newest payloads keyed by entity ID, then provider."""
+        ids = list(set(entity_ids))
+        if not ids:
+            return {}
+        newest = self._newest_subquery(entity_type, ids)
+        stmt = select(
+            ProviderSnapshot.entity_id,
+            ProviderSnapshot.provider,
+            ProviderSnapshot.payload,
+        ).join(newest, self._matches(newest))
+        result = await self.session.execute(stmt)
+        found: Dict[str, Dict[str, Any]] = {}
+        for entity_id, provider, blob in result.all():
+            found.setdefault(entity_id, {})[provider] = decode_payload(blob)
+        return found
+
+    async def _latest_versions(
+        self, entity_type: str, entity_ids: Iterable[str]
+    ) -> Dict[Tuple[str, str], Tuple[int, str]]:
+        newest = self._newest_subquery(entity_type, list(entity_ids))
+        stmt = select(
+            ProviderSnapshot.entity_id,
+            ProviderSnapshot.provider,
+            ProviderSnapshot.version,
+            ProviderSnapshot.digest,
+        ).join(newest, self._matches(newest))
+        result = await self.session.execute(stmt)
+        return {(row[0], row[1]): (row[2], row[3]) for row in result.all()}
+
+    @staticmethod
+    def _newest_subquery(entity_type: str, entity_ids: List[str]) -> Any:
+        return (
+            select(
+                ProviderSnapshot.entity_type,
+                ProviderSnapshot.entity_id,
+                ProviderSnapshot.provider,
+                func.max(ProviderSnapshot.version).label("version"),
+            )
+            .where(
+                ProviderSnapshot.entity_type == entity_type,
+                ProviderSnapshot.entity_id.in_(entity_ids),
+            )
+            .group_by(
+                ProviderSnapshot.entity_type,
+                ProviderSnapshot.entity_id,
+                ProviderSnapshot.provider,
+            )
+            .subquery()
+        )
+
+    @staticmethod
+    def _matches(newest: Any) -> Any:
+        return and_(
+            ProviderSnapshot.entity_type == newest.c.entity_type,
+            ProviderSnapshot.entity_id == newest.c.entity_id,
+            ProviderSnapshot.provider == newest.c.provider,
+            ProviderSnapshot.version == newest.c.version,
+        )
@@ -0,0 +1,101 @@
+"""Routing of read-only queries to read replicas."""
+
+from __future__ import annotations
+
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+_REPLICA_READS = "fastapi_payments.replica_reads"
+_PRIMARY = "fastapi_payments.primary"
+_WROTE = "fastapi_payments.wrote"
+
+
+class ReplicaSet:
+    """Replica engines and the policy for picking one per query.
+
+    "round_robin" cycles through the replicas; "least_connections" picks
+    the replica with the fewest connections checked out of its pool.
+    """
+
+    def __init__(
+        self, engines: List[AsyncEngine], selection: str = "round_robin"
+    ):
+        self.engines = engines
+        self.selection = selection
+        self._cycle = itertools.cycle(engines)
+        self._lock = threading.Lock()
+
+    def choose(self) -> AsyncEngine:
+        if self.selection == "least_connections":
+            return min(self.engines, key=lambda engine: _checked_out(engine))
+        with self._lock:
+            return next(self._cycle)
+
+
+def _checked_out(engine: AsyncEngine) -> int:
+    checkedout = getattr(engine.sync_engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+def _is_read(clause: Any) -> bool:
+    # Locking reads (SELECT ... FOR UPDATE) take part in writes
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to a replica when allowed.
+
+    Only sessions opted in with `read_from_replica` (as `get_read_db`
+    sessions are) use replicas; everything else, and every write, flush and
+    locking read, goes to the primary. Once such a session writes, it reads
+    from the primary for the rest of its life, so a request sees its own
+    writes even before the replicas have caught up. `use_primary` pins a
+    session to the primary explicitly.
+    """
+
+    def __init__(
+        self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(
+        self, mapper: Any = None, clause: Any = None, **kwargs: Any
+    ) -> Any:
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self._flushing or (clause is not None and not _is_read(clause)):
+            self.info[_WROTE] = True
+            return primary
+        if (
+            self.replicas is None
+            or clause is None
+            or not self.info.get(_REPLICA_READS)
+            or self.info.get(_PRIMARY)
+            or self.info.get(_WROTE)
+        ):
+            return primary
+        return self.replicas.choose().sync_engine
+
+
+def read_from_replica(session: Any, enabled: bool = True) -> None:
+    """Allow (or stop) `session` sending its read-only queries to replicas."""
+    session.info[_REPLICA_READS] = enabled
+
+
+@contextmanager
+def use_primary(session: Any) -> Iterator[Any]:
+    """Read from the primary inside the block, e.g. right after a write
+    made through another session."""
+    info = session.info
+    pinned = info.get(_PRIMARY, False)
+    info[_PRIMARY] = True
+    try:
+        yield session
+    finally:
+        info[_PRIMARY] = pinned
@@ -2,12 +2,20 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional
+from typing import Any, Optional, Dict, Iterable, Set, Tuple
 
 from sqlalchemy import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from .base import (
+    keyset_after,
+    keyset_before,
+    persist,
+    release_partial,
+    save_batch,
+    without_blobs,
+)
 from ..models import Subscription
 
 
@@ -43,8 +51,7 @@ class SubscriptionRepository:
             meta_info=meta_info or {},
         )
         self.session.add(subscription)
-        await self.session.commit()
-        await self.session.refresh(subscription)
+        await persist(self.session, subscription)
         return subscription
 
     async def get_with_plan(self, subscription_id: str) -> Optional[Subscription]:
@@ -67,10 +74,15 @@ class SubscriptionRepository:
             if hasattr(subscription, attr):
                 setattr(subscription, attr, value)
         self.session.add(subscription)
-        await self.session.commit()
-        await self.session.refresh(subscription)
+        await persist(self.session, subscription)
         return subscription
 
+    async def update_many(
+        self, updates: Iterable[Tuple[Subscription, Dict[str, Any]]]
+    ) -> None:
+        """Apply field updates to loaded subscriptions and commit once."""
+        await save_batch(self.session, updates=updates)
+
     async def list(
         self,
         *,
@@ -79,23 +91,79 @@ class SubscriptionRepository:
         limit: int = 50,
         offset: int = 0,
         include_plan: bool = True,
+        cursor: Optional[str] = None,
+        include_meta_info: bool = True,
     ) -> list[Subscription]:
-        stmt = select(Subscription)
+        """List subscriptions newest first.
+
+        With `include_meta_info=False` the meta_info column is not loaded
+        and the returned subscriptions are detached from the session.
+        """
+        stmt = without_blobs(
+            select(Subscription), Subscription, include_meta_info
+        )
         if include_plan:
-            stmt = stmt.options(joinedload(Subscription.plan))
+            # Loads each distinct plan once rather than once per subscription
+            stmt = stmt.options(selectinload(Subscription.plan))
 
         if customer_id:
             stmt = stmt.where(Subscription.customer_id == customer_id)
         if status:
             stmt = stmt.where(Subscription.status == status)
 
-        stmt = stmt.order_by(Subscription.created_at.desc())
+        stmt = keyset_before(
+            stmt, Subscription.created_at, Subscription.id, cursor
+        )
         if offset:
             stmt = stmt.offset(offset)
         if limit:
             stmt = stmt.limit(limit)
 
         result = await self.session.execute(stmt)
+        subscriptions = result.scalars().all()
+        release_partial(self.session, subscriptions)
+        return subscriptions
+
+    async def existing_ids(self, subscription_ids: Iterable[str]) -> Set[str]:
+        """Return which of `subscription_ids` exist, with one query."""
+        ids = list(set(subscription_ids))
+        if not ids:
+            return set()
+        result = await self.session.execute(
+            select(Subscription.id).where(Subscription.id.in_(ids))
+        )
+        return set(result.scalars().all())
+
+    async def get_by_provider_subscription_ids(
+        self, provider: str, provider_subscription_ids: Iterable[str]
+    ) -> Dict[str, Subscription]:
+        """Return local subscriptions keyed by their ID at `provider`."""
+        ids = list(set(provider_subscription_ids))
+        if not ids:
+            return {}
+        stmt = select(Subscription).where(
+            Subscription.provider == provider,
+            Subscription.provider_subscription_id.in_(ids),
+        )
+        result = await self.session.execute(stmt)
+        return {
+            sub.provider_subscription_id: sub for sub in result.scalars().all()
+        }
+
+    async def list_after(
+        self,
+        after_id: Optional[str] = None,
+        *,
+        limit: int = 100,
+        include_plan: bool = True,
+    ) -> list[Subscription]:
+        """List subscriptions in primary-key order after `after_id`."""
+        stmt = select(Subscription)
+        if include_plan:
+            stmt = stmt.options(joinedload(Subscription.plan))
+        result = await self.session.execute(
+            keyset_after(stmt, Subscription.id, after_id, limit)
+        )
         return result.scalars().all()
 
     async def list_for_customer(
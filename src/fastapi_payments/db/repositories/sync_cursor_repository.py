@@ -0,0 +1,39 @@
+"""Repository for incremental sync high-water marks."""
+
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import SyncCursor
+
+
+class SyncCursorRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, provider: str, resource: str) -> Optional[SyncCursor]:
+        return await self.session.get(SyncCursor, (provider, resource))
+
+    async def get_cursor(
+        self, provider: str, resource: str
+    ) -> Optional[Dict[str, Any]]:
+        row = await self.get(provider, resource)
+        return copy.deepcopy(row.cursor) if row and row.cursor else None
+
+    async def stage(
+        self, provider: str, resource: str, cursor: Optional[Dict[str, Any]]
+    ) -> SyncCursor:
+        """Set a cursor without committing.
+
+        The cursor is written by the caller's next commit, so it can be saved
+        atomically with the rows synced up to that position.
+        """
+        row = await self.get(provider, resource)
+        if row is None:
+            row = SyncCursor(provider=provider, resource=resource)
+            self.session.add(row)
+        row.cursor = copy.deepcopy(cursor)
+        return row
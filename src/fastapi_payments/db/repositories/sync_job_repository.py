@@ -2,20 +2,38 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional
+import copy
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
 
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import SyncJob
 
+# Statuses after which a job is never claimed again
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def _utcnow() -> datetime:
+    # Lease timestamps are stored as naive UTC to suit TIMESTAMP columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class SyncJobRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create(self, resources: Optional[Any] = None, provider: Optional[str] = None, filters: Optional[Any] = None) -> SyncJob:
-        job = SyncJob(resources=resources, provider=provider, filters=filters)
+    async def create(
+        self,
+        resources: Optional[Any] = None,
+        provider: Optional[str] = None,
+        filters: Optional[Any] = None,
+        mode: str = "full",
+    ) -> SyncJob:
+        job = SyncJob(
+            resources=resources, provider=provider, filters=filters, mode=mode
+        )
         self.session.add(job)
         await self.session.commit()
         await self.session.refresh(job)
@@ -31,7 +49,154 @@ class SyncJobRepository:
         job.status = status
         if result is not None:
             job.result = result
+        if status in TERMINAL_STATUSES:
+            job.lease_owner = None
+            job.lease_expires_at = None
         self.session.add(job)
         await self.session.commit()
         await self.session.refresh(job)
         return job
+
+    async def save_checkpoint(
+        self, job_id: str, checkpoint: Dict[str, Any], progress: Dict[str, Any]
+    ) -> Optional[SyncJob]:
+        """Persist the resume cursor and running counters for a job."""
+        job = await self.get_by_id(job_id)
+        if not job:
+            return None
+        # Assign copies so the JSON columns are flagged as changed
+        job.checkpoint = copy.deepcopy(checkpoint)
+        job.progress = copy.deepcopy(progress)
+        await self.session.commit()
+        return job
+
+    def _claimable(
+        self, now: datetime, max_attempts: Optional[int] = None
+    ) -> Any:
+        # Queued jobs, and running jobs whose worker stopped renewing its lease
+        condition = or_(
+            SyncJob.status == "queued",
+            and_(
+                SyncJob.status == "running",
+                or_(
+                    SyncJob.lease_expires_at.is_(None),
+                    SyncJob.lease_expires_at < now,
+                ),
+            ),
+        )
+        if max_attempts is not None:
+            condition = and_(
+                condition, func.coalesce(SyncJob.attempts, 0) < max_attempts
+            )
+        return condition
+
+    async def claim_next(
+        self,
+        worker_id: str,
+        lease_seconds: float,
+        max_attempts: Optional[int] = None,
+    ) -> Optional[SyncJob]:
+        """Lease the oldest claimable job to `worker_id`.
+
+        On PostgreSQL the candidate row is selected with FOR UPDATE SKIP
+        LOCKED so concurrent workers pick different jobs. The lease is then
+        taken with a conditional UPDATE that re-checks the job is still
+        claimable, which is what makes the claim safe on SQLite (where
+        writes are serialized and FOR UPDATE is not supported).
+
+        Returns:
+            The claimed job, or None if no job is available
+        """
+        for _ in range(3):
+            now = _utcnow()
+            stmt = (
+                select(SyncJob.id)
+                .where(self._claimable(now, max_attempts))
+                .order_by(SyncJob.created_at, SyncJob.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job_id = (await self.session.execute(stmt)).scalar_one_or_none()
+            if job_id is None:
+                await self.session.commit()
+                return None
+
+            result = await self.session.execute(
+                update(SyncJob)
+                .where(
+                    SyncJob.id == job_id, self._claimable(now, max_attempts)
+                )
+                .values(
+                    status="running",
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    attempts=func.coalesce(SyncJob.attempts, 0) + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.session.commit()
+            if result.rowcount == 1:
+                return await self.session.get(
+                    SyncJob, job_id, populate_existing=True
+                )
+            # Another worker won the race for this job; try the next one
+        return None
+
+    async def heartbeat(
+        self, job_id: str, worker_id: str, lease_seconds: float
+    ) -> bool:
+        """Extend a held lease; False if the worker no longer owns it."""
+        result = await self.session.execute(
+            update(SyncJob)
+            .where(
+                SyncJob.id == job_id,
+                SyncJob.lease_owner == worker_id,
+                SyncJob.status == "running",
+            )
+            .values(
+                lease_expires_at=_utcnow() + timedelta(seconds=lease_seconds)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+        return result.rowcount == 1
+
+    async def release(self, job_id: str, worker_id: str) -> bool:
+        """Give up a lease so another worker can resume the job right away."""
+        result = await self.session.execute(
+            update(SyncJob)
+            .where(
+                SyncJob.id == job_id,
+                SyncJob.lease_owner == worker_id,
+                SyncJob.status == "running",
+            )
+            .values(status="queued", lease_owner=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+        return result.rowcount == 1
+
+    async def fail_exhausted(self, max_attempts: int) -> int:
+        """Mark jobs failed whose lease expired after `max_attempts` claims."""
+        now = _utcnow()
+        result = await self.session.execute(
+            update(SyncJob)
+            .where(
+                SyncJob.status == "running",
+                SyncJob.lease_expires_at < now,
+                func.coalesce(SyncJob.attempts, 0) >= max_attempts,
+            )
+            .values(
+                status="failed",
+                lease_owner=None,
+                lease_expires_at=None,
+                result={
+                    "error": (
+                        f"Sync job abandoned after {max_attempts} attempts"
+                    )
+                },
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+        return result.rowcount
@@ -0,0 +1,204 @@
+"""Repository for usage pushed to providers."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import exists, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import commit_or_flush
+from ..models import Subscription, UsagePush, UsageRollup, utcnow
+
+
+class UsagePushRepository:
+    """Push state per (subscription, billing period).
+
+    `claim` and `complete` are conditional updates, so two pushers working
+    on the same period cannot both send the same usage.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def subscriptions_to_push(self) -> List[Subscription]:
+        """
+        Subscriptions with usage recorded in their current period.
+
+        Returned rows are only a candidate set: whether anything is left
+        to push is decided by comparing period totals with pushed_quantity.
+        """
+        recent_usage = exists().where(
+            UsageRollup.subscription_id == Subscription.id,
+            UsageRollup.granularity == "hour",
+            or_(
+                UsageRollup.bucket_start >= Subscription.current_period_start,
+                UsageRollup.updated_at >= Subscription.current_period_start,
+            ),
+        )
+        stmt = select(Subscription).where(
+            Subscription.current_period_start.isnot(None), recent_usage
+        )
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def open_pushes(
+        self, subscription_ids: Optional[List[str]] = None
+    ) -> List[UsagePush]:
+        """Pushes whose period is still open, optionally per subscription."""
+        stmt = select(UsagePush).where(UsagePush.closed.is_(False))
+        if subscription_ids is not None:
+            stmt = stmt.where(UsagePush.subscription_id.in_(subscription_ids))
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def claim(
+        self,
+        subscription_id: str,
+        period_start: datetime,
+        period_end: Optional[datetime],
+        provider: str,
+        pushed_quantity: int,
+        target: int,
+        key: str,
+    ) -> bool:
+        """
+        Record that `target` is about to be pushed with `key`, and commit.
+
+        Succeeds only if the period still has `pushed_quantity` pushed and
+        no other push pending (or the same one, when retrying).
+
+        Returns:
+            True if the caller now owns the push
+        """
+        stmt = (
+            update(UsagePush)
+            .where(
+                UsagePush.subscription_id == subscription_id,
+                UsagePush.period_start == period_start,
+                UsagePush.pushed_quantity == pushed_quantity,
+                or_(
+                    UsagePush.pending_key.is_(None),
+                    UsagePush.pending_key == key,
+                ),
+            )
+            .values(
+                pending_quantity=target,
+                pending_key=key,
+                attempts=UsagePush.attempts + 1,
+                updated_at=utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await self.session.execute(stmt)
+            if result.rowcount == 0:
+                if pushed_quantity != 0 or await self._exists(
+                    subscription_id, period_start
+                ):
+                    await self.session.rollback()
+                    return False
+                self.session.add(
+                    UsagePush(
+                        subscription_id=subscription_id,
+                        period_start=period_start,
+                        period_end=period_end,
+                        provider=provider,
+                        pushed_quantity=0,
+                        pending_quantity=target,
+                        pending_key=key,
+                        attempts=1,
+                        closed=False,
+                    )
+                )
+            await commit_or_flush(self.session)
+        except IntegrityError:
+            # Another pusher created the row first
+            await self.session.rollback()
+            return False
+        return True
+
+    async def complete(
+        self,
+        subscription_id: str,
+        period_start: datetime,
+        key: str,
+        provider_usage_record_id: Optional[str],
+        close: bool = False,
+    ) -> bool:
+        """Mark the pending push with `key` as acknowledged, and commit."""
+        now = utcnow()
+        values: Dict[str, Any] = {
+            "pushed_quantity": UsagePush.pending_quantity,
+            "pending_quantity": None,
+            "pending_key": None,
+            "last_error": None,
+            "provider_usage_record_id": provider_usage_record_id,
+            "pushed_at": now,
+            "updated_at": now,
+        }
+        if close:
+            values["closed"] = True
+        return await self._update_pending(
+            subscription_id, period_start, key, values
+        )
+
+    async def fail(
+        self,
+        subscription_id: str,
+        period_start: datetime,
+        key: str,
+        error: str,
+    ) -> bool:
+        """Keep the pending push for a retry and record why it failed."""
+        return await self._update_pending(
+            subscription_id,
+            period_start,
+            key,
+            {"last_error": error[:500], "updated_at": utcnow()},
+        )
+
+    async def close(
+        self, subscription_id: str, period_start: datetime
+    ) -> None:
+        """Mark an ended period as fully pushed."""
+        await self.session.execute(
+            update(UsagePush)
+            .where(
+                UsagePush.subscription_id == subscription_id,
+                UsagePush.period_start == period_start,
+                UsagePush.pending_key.is_(None),
+            )
+            .values(closed=True, updated_at=utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await commit_or_flush(self.session)
+
+    async def _update_pending(
+        self,
+        subscription_id: str,
+        period_start: datetime,
+        key: str,
+        values: Dict[str, Any],
+    ) -> bool:
+        result = await self.session.execute(
+            update(UsagePush)
+            .where(
+                UsagePush.subscription_id == subscription_id,
+                UsagePush.period_start == period_start,
+                UsagePush.pending_key == key,
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await commit_or_flush(self.session)
+        return result.rowcount > 0
+
+    async def _exists(
+        self, subscription_id: str, period_start: datetime
+    ) -> bool:
+        stmt = select(UsagePush.subscription_id).where(
+            UsagePush.subscription_id == subscription_id,
+            UsagePush.period_start == period_start,
+        )
+        return (await self.session.execute(stmt)).first() is not None
@@ -0,0 +1,55 @@
+"""Repository for metered usage records."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import commit_or_flush
+from .usage_rollup_repository import UsageRollupRepository
+from ..models import UsageRecord, generate_uuid, utcnow
+
+
+class UsageRecordRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(self, **kwargs: Any) -> Dict[str, Any]:
+        """Insert one usage record, with its rollups, and commit."""
+        row = {
+            "id": generate_uuid(),
+            "timestamp": utcnow(),
+            "description": None,
+            **kwargs,
+        }
+        created = await self.create_many([row])
+        return created[0]
+
+    async def create_many(
+        self, rows: Sequence[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert usage records with multi-row INSERTs and commit once.
+
+        Rows carry the UsageRecord columns, including `id` and `timestamp`.
+        SQLAlchemy splits the INSERT into as many statements as the
+        driver's parameter limit requires. The rows' hourly and daily
+        rollups are updated in the same transaction. Nothing is loaded back
+        into the session.
+
+        Returns:
+            The inserted rows, in input order
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        try:
+            await self.session.execute(insert(UsageRecord), rows)
+            await UsageRollupRepository(self.session).add(rows)
+            await commit_or_flush(self.session)
+        except Exception:
+            await self.session.rollback()
+            raise
+        return rows
@@ -0,0 +1,339 @@
+"""Repository for hourly and daily usage rollups."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import commit_or_flush
+from ..models import UsageRecord, UsageRollup
+
+HOUR = "hour"
+DAY = "day"
+
+# Subscription IDs per IN (...) list, below every driver's parameter limit
+_ID_CHUNK = 900
+
+_Key = Tuple[str, str, datetime]
+
+
+def as_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values are taken to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    """Start of the UTC hour or day bucket holding `value`."""
+    value = as_utc(value).replace(minute=0, second=0, microsecond=0)
+    if granularity == DAY:
+        value = value.replace(hour=0)
+    return value
+
+
+def _ceil(value: datetime, granularity: str) -> datetime:
+    start = bucket_start(value, granularity)
+    if start == value:
+        return start
+    return start + (
+        timedelta(days=1) if granularity == DAY else timedelta(hours=1)
+    )
+
+
+def _parse_bucket(value: Any) -> datetime:
+    # SQLite returns the strftime() text, other databases a datetime
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return as_utc(value)
+
+
+class UsageRollupRepository:
+    """Per-subscription usage totals in UTC hour and day buckets.
+
+    Rollups are incremented in the same transaction as the raw records they
+    summarize (see UsageRecordRepository), so they never disagree with
+    usage_records for rows written through the repositories. `rebuild`
+    recomputes a time range from raw records, to backfill usage written
+    before rollups existed or outside the repositories.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add raw usage rows to their hour and day buckets without committing.
+
+        Args:
+            rows: Dicts with "subscription_id", "quantity" and "timestamp"
+        """
+        deltas: Dict[_Key, List[float]] = defaultdict(lambda: [0.0, 0])
+        for row in rows:
+            for granularity in (HOUR, DAY):
+                delta = deltas[
+                    (
+                        row["subscription_id"],
+                        granularity,
+                        bucket_start(row["timestamp"], granularity),
+                    )
+                ]
+                delta[0] += row["quantity"]
+                delta[1] += 1
+        if deltas:
+            await self._increment(deltas)
+
+    async def rebuild(
+        self,
+        start: datetime,
+        end: datetime,
+        subscription_ids: Optional[Sequence[str]] = None,
+    ) -> int:
+        """
+        Recompute the rollups covering [start, end) from raw records and
+        commit.
+
+        The range is widened to whole UTC days, so every bucket it touches
+        is rewritten completely. Run it once after upgrading to backfill
+        existing usage, or periodically over recent days to fold in rows
+        inserted outside the repositories. Usage recorded into the range
+        while it is being rebuilt can be missed, so prefer closed days.
+
+        Returns:
+            Number of hourly buckets written
+        """
+        start = bucket_start(start, DAY)
+        end = _ceil(as_utc(end), DAY)
+        hour = self._hour_bucket(UsageRecord.timestamp)
+        stmt = (
+            select(
+                UsageRecord.subscription_id,
+                hour,
+                func.sum(UsageRecord.quantity),
+                func.count(UsageRecord.id),
+            )
+            .where(UsageRecord.timestamp >= start, UsageRecord.timestamp < end)
+            .group_by(UsageRecord.subscription_id, hour)
+        )
+        clear = delete(UsageRollup).where(
+            UsageRollup.bucket_start >= start, UsageRollup.bucket_start < end
+        )
+        if subscription_ids is not None:
+            stmt = stmt.where(
+                UsageRecord.subscription_id.in_(list(subscription_ids))
+            )
+            clear = clear.where(
+                UsageRollup.subscription_id.in_(list(subscription_ids))
+            )
+
+        now = datetime.now(timezone.utc)
+        buckets: Dict[_Key, List[float]] = defaultdict(lambda: [0.0, 0])
+        for subscription_id, hour_start, quantity, count in (
+            await self.session.execute(stmt)
+        ).all():
+            hour_start = _parse_bucket(hour_start)
+            for key in (
+                (subscription_id, HOUR, hour_start),
+                (subscription_id, DAY, bucket_start(hour_start, DAY)),
+            ):
+                buckets[key][0] += quantity or 0.0
+                buckets[key][1] += count
+        try:
+            await self.session.execute(clear)
+            if buckets:
+                await self.session.execute(
+                    insert(UsageRollup),
+                    [
+                        {
+                            "subscription_id": subscription_id,
+                            "granularity": granularity,
+                            "bucket_start": bucket,
+                            "quantity": quantity,
+                            "record_count": count,
+                            "updated_at": now,
+                        }
+                        for (subscription_id, granularity, bucket), (
+                            quantity,
+                            count,
+                        ) in buckets.items()
+                    ],
+                )
+            await commit_or_flush(self.session)
+        except Exception:
+            await self.session.rollback()
+            raise
+        return sum(1 for key in buckets if key[1] == HOUR)
+
+    async def total(
+        self, subscription_id: str, start: datetime, end: datetime
+    ) -> float:
+        """Usage of one subscription in [start, end)."""
+        totals = await self.totals([subscription_id], start, end)
+        return totals.get(subscription_id, 0.0)
+
+    async def totals(
+        self,
+        subscription_ids: Optional[Sequence[str]],
+        start: datetime,
+        end: datetime,
+    ) -> Dict[str, float]:
+        """
+        Usage per subscription in [start, end).
+
+        Whole days inside the range are read from daily rollups, whole hours
+        around them from hourly rollups, and only the partial hours at
+        either end (such as the current, still open hour) from raw records.
+
+        Args:
+            subscription_ids: Subscriptions to total, or None for all. For
+                invoicing every subscription at once, None is one query
+                per bucket size instead of one per chunk of IDs.
+
+        Returns:
+            Total quantity keyed by subscription ID; subscriptions without
+            usage in the range are omitted
+        """
+        start, end = as_utc(start), as_utc(end)
+        if start >= end:
+            return {}
+        if subscription_ids is not None and len(subscription_ids) > _ID_CHUNK:
+            ids = list(subscription_ids)
+            merged: Dict[str, float] = {}
+            for i in range(0, len(ids), _ID_CHUNK):
+                merged.update(
+                    await self.totals(ids[i:i + _ID_CHUNK], start, end)
+                )
+            return merged
+        ids = list(subscription_ids) if subscription_ids is not None else None
+        totals: Dict[str, float] = defaultdict(float)
+
+        hours = (_ceil(start, HOUR), bucket_start(end, HOUR))
+        if hours[0] >= hours[1]:
+            await self._add_raw(totals, ids, start, end)
+            return dict(totals)
+        await self._add_raw(totals, ids, start, hours[0])
+        await self._add_raw(totals, ids, hours[1], end)
+
+        days = (_ceil(hours[0], DAY), bucket_start(hours[1], DAY))
+        if days[0] >= days[1]:
+            await self._add_rollups(totals, ids, HOUR, *hours)
+        else:
+            await self._add_rollups(totals, ids, HOUR, hours[0], days[0])
+            await self._add_rollups(totals, ids, DAY, *days)
+            await self._add_rollups(totals, ids, HOUR, days[1], hours[1])
+        return dict(totals)
+
+    async def _add_raw(
+        self,
+        totals: Dict[str, float],
+        ids: Optional[List[str]],
+        start: datetime,
+        end: datetime,
+    ) -> None:
+        if start >= end:
+            return
+        stmt = (
+            select(UsageRecord.subscription_id, func.sum(UsageRecord.quantity))
+            .where(UsageRecord.timestamp >= start, UsageRecord.timestamp < end)
+            .group_by(UsageRecord.subscription_id)
+        )
+        if ids is not None:
+            stmt = stmt.where(UsageRecord.subscription_id.in_(ids))
+        for subscription_id, quantity in (
+            await self.session.execute(stmt)
+        ).all():
+            totals[subscription_id] += quantity or 0.0
+
+    async def _add_rollups(
+        self,
+        totals: Dict[str, float],
+        ids: Optional[List[str]],
+        granularity: str,
+        start: datetime,
+        end: datetime,
+    ) -> None:
+        if start >= end:
+            return
+        stmt = (
+            select(UsageRollup.subscription_id, func.sum(UsageRollup.quantity))
+            .where(
+                UsageRollup.granularity == granularity,
+                UsageRollup.bucket_start >= start,
+                UsageRollup.bucket_start < end,
+            )
+            .group_by(UsageRollup.subscription_id)
+        )
+        if ids is not None:
+            stmt = stmt.where(UsageRollup.subscription_id.in_(ids))
+        for subscription_id, quantity in (
+            await self.session.execute(stmt)
+        ).all():
+            totals[subscription_id] += quantity or 0.0
+
+    async def _increment(self, deltas: Dict[_Key, List[float]]) -> None:
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "subscription_id": subscription_id,
+                "granularity": granularity,
+                "bucket_start": bucket,
+                "quantity": quantity,
+                "record_count": count,
+                "updated_at": now,
+            }
+            for (subscription_id, granularity, bucket), (
+                quantity,
+                count,
+            ) in deltas.items()
+        ]
+        dialect = self.session.bind.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            stmt = upsert(UsageRollup)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    "subscription_id",
+                    "granularity",
+                    "bucket_start",
+                ],
+                set_={
+                    "quantity": UsageRollup.quantity + stmt.excluded.quantity,
+                    "record_count": UsageRollup.record_count
+                    + stmt.excluded.record_count,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+        elif dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert as upsert
+
+            stmt = upsert(UsageRollup)
+            stmt = stmt.on_duplicate_key_update(
+                quantity=UsageRollup.quantity + stmt.inserted.quantity,
+                record_count=UsageRollup.record_count
+                + stmt.inserted.record_count,
+                updated_at=stmt.inserted.updated_at,
+            )
+        else:
+            raise NotImplementedError(
+                f"Usage rollups are not supported on {dialect}"
+            )
+        await self.session.execute(stmt, rows)
+
+    def _hour_bucket(self, column: Any) -> Any:
+        dialect = self.session.bind.dialect.name
+        if dialect == "sqlite":
+            return func.strftime("%Y-%m-%d %H:00:00", column)
+        if dialect == "postgresql":
+            return func.date_trunc("hour", column)
+        if dialect == "mysql":
+            return func.date_format(column, "%Y-%m-%d %H:00:00")
+        raise NotImplementedError(
+            f"Usage rollups are not supported on {dialect}"
+        )
@@ -0,0 +1,130 @@
+"""SQLite pragmas and a single-writer queue for file databases."""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.util import await_
+
+# Pragmas set on every new connection, in this order: journal_mode first,
+# since WAL changes what synchronous=NORMAL means
+_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "busy_timeout",
+)
+
+# Statements that never take SQLite's write lock
+_READ_ONLY = ("SELECT", "PRAGMA", "EXPLAIN")
+
+_HOLDS_WRITER = "fastapi_payments.holds_writer"
+
+
+def sqlite_pragmas(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """The pragmas from resolved `SQLiteConfig` settings that are set."""
+    return {
+        name: settings[name]
+        for name in _PRAGMAS
+        if settings.get(name) is not None
+    }
+
+
+class WriterQueue:
+    """Lets one connection at a time write; the others wait their turn.
+
+    SQLite allows a single writer per database. When several connections
+    write at once, all but one get SQLITE_BUSY and spin in `busy_timeout`
+    until they win or fail with "database is locked". The queue hands the
+    write lock over in arrival order instead: a connection waits (without
+    blocking the event loop) before its first write statement and holds
+    its turn until it goes back to the pool, after its commit or rollback.
+
+    Turns are tracked per event loop, so the queue only orders writers of
+    one process.
+    """
+
+    def __init__(self, timeout: Optional[float] = 30.0):
+        self.timeout = timeout
+        # One lock per event loop
+        self._locks: "weakref.WeakKeyDictionary[Any, asyncio.Lock]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.waits = 0
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    async def acquire(self) -> asyncio.Lock:
+        lock = self._lock()
+        if lock.locked():
+            self.waits += 1
+        try:
+            await asyncio.wait_for(lock.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise exc.TimeoutError(
+                f"Waited {self.timeout} s for the SQLite writer queue; is "
+                "another session in this task holding an uncommitted write?"
+            ) from None
+        return lock
+
+    def install(self, engine: AsyncEngine) -> None:
+        """Queue the write transactions of `engine`'s connections."""
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _wait_turn(
+            conn, cursor, statement, parameters, context, executemany
+        ):
+            info = conn.connection.info
+            if info.get(_HOLDS_WRITER) is not None:
+                return
+            if statement.lstrip()[:7].upper().startswith(_READ_ONLY):
+                return
+            info[_HOLDS_WRITER] = await_(self.acquire())
+
+        @event.listens_for(sync_engine, "checkin")
+        def _end_turn(dbapi_connection, connection_record):
+            lock = connection_record.info.pop(_HOLDS_WRITER, None)
+            if lock is not None and lock.locked():
+                lock.release()
+
+
+def configure_sqlite(
+    engine: AsyncEngine, settings: Dict[str, Any], timeout: float = 30.0
+) -> Optional[WriterQueue]:
+    """
+    Apply resolved `SQLiteConfig` settings to a SQLite engine.
+
+    Pragmas are set on each new connection; `single_writer` installs a
+    `WriterQueue` on the engine.
+
+    Returns:
+        The installed WriterQueue, or None without `single_writer`
+    """
+    pragmas = sqlite_pragmas(settings)
+    if pragmas:
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+    if not settings.get("single_writer"):
+        return None
+    queue = WriterQueue(timeout)
+    queue.install(engine)
+    return queue
@@ -0,0 +1,103 @@
+"""Application startup and shutdown for FastAPI Payments."""
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .config.config_schema import PaymentConfig
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentsLifespan:
+    """Prepares the payments module before the application serves requests.
+
+    Pass it as the application's lifespan,
+    ``FastAPI(lifespan=payments.lifespan)``, or call `startup` and
+    `shutdown` from an existing lifespan. Startup runs
+    these phases in order and records how long each took in `timings`:
+
+    - ``dependencies``: build the shared service and provider clients
+    - ``schema``: create missing tables and indexes, once
+    - ``pool``: open `database.warm_connections` pooled connections per engine
+    - ``providers``: warm provider clients, e.g. fetch the PayPal access token
+
+    Without it the first request creates the schema and opens connections.
+    """
+
+    def __init__(self, config: PaymentConfig):
+        self.config = config
+        self.timings: Dict[str, float] = {}
+        self.provider_errors: Dict[str, Optional[str]] = {}
+        self.ready = False
+
+    async def startup(self) -> Dict[str, float]:
+        """
+        Run every startup phase.
+
+        Returns:
+            Seconds taken per phase
+        """
+        from .api import dependencies
+        from .db.repositories import ensure_schema, warm_pool
+
+        started = time.perf_counter()
+        async with self._phase("dependencies"):
+            if dependencies._payment_service is None:
+                dependencies.initialize_dependencies(self.config)
+        async with self._phase("schema"):
+            await ensure_schema()
+        async with self._phase("pool"):
+            opened = await warm_pool(self.config.database.warm_connections)
+        async with self._phase("providers"):
+            self.provider_errors = (
+                await dependencies._provider_registry.warm_up()
+            )
+
+        self.ready = True
+        logger.info(
+            f"FastAPI Payments ready in {time.perf_counter() - started:.3f}s "
+            f"({opened} connections warmed, "
+            f"{len(self.provider_errors)} providers)"
+        )
+        return dict(self.timings)
+
+    async def shutdown(self) -> None:
+        """Finish payment batches, flush buffered usage and close provider
+        clients and pooled connections."""
+        from .api import dependencies
+        from .db.repositories import dispose_db
+        from .services.payment_batch import wait_for_batches
+
+        self.ready = False
+        # Batches may have charges in flight that still have to be stored
+        await wait_for_batches()
+        service = dependencies._payment_service
+        if service is not None:
+            try:
+                await service.usage_ingestor.aclose()
+            except Exception as e:
+                logger.error(f"Error flushing buffered usage: {str(e)}")
+        if dependencies._provider_registry is not None:
+            await dependencies._provider_registry.close()
+        await dispose_db()
+
+    @asynccontextmanager
+    async def __call__(self, app: Any = None) -> AsyncIterator[None]:
+        await self.startup()
+        try:
+            yield
+        finally:
+            await self.shutdown()
+
+    @asynccontextmanager
+    async def _phase(self, name: str) -> AsyncIterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - started
+            logger.info(
+                f"Startup phase {name}: {self.timings[name] * 1000:.1f} ms"
+            )
@@ -1,6 +1,6 @@
 import json
 from enum import Enum
-from typing import Dict, Any, Optional, Union, List, Callable
+from typing import Dict, Any, Iterable, Optional, Tuple, Union, List, Callable
 from datetime import datetime, timezone
 import logging
 import importlib
@@ -264,3 +264,66 @@ class PaymentEventPublisher:
             logger.error(f"Failed to publish event {event_type}: {str(e)}")
             # Consider implementing retry logic here
             raise
+
+    async def publish_events(
+        self, events: Iterable[Tuple[str, Dict[str, Any]]]
+    ) -> int:
+        """
+        Publish several events concurrently.
+
+        Used by bulk operations so a batch is not published one awaited
+        round-trip at a time. A failed publish is logged and does not stop
+        the others.
+
+        Args:
+            events: (event_type, data) pairs
+
+        Returns:
+            Number of events that failed to publish
+        """
+        results = await asyncio.gather(
+            *(
+                self.publish_event(event_type, data)
+                for event_type, data in events
+            ),
+            return_exceptions=True,
+        )
+        return sum(1 for result in results if isinstance(result, Exception))
+
+
+async def publish_batch(
+    publisher: Any, events: List[Tuple[str, Dict[str, Any]]], label: str
+) -> None:
+    """
+    Publish a batch of events with any publisher, logging instead of raising.
+
+    Uses `publish_events` when the publisher has it and falls back to
+    concurrent `publish_event` calls otherwise.
+
+    Args:
+        publisher: Event publisher
+        events: (event_type, data) pairs
+        label: What the events are, for log messages
+    """
+    publish_events = getattr(publisher, "publish_events", None)
+    try:
+        if callable(publish_events):
+            failed = await publish_events(events)
+        else:
+            results = await asyncio.gather(
+                *(
+                    publisher.publish_event(event_type, data)
+                    for event_type, data in events
+                ),
+                return_exceptions=True,
+            )
+            failed = sum(
+                1 for result in results if isinstance(result, Exception)
+            )
+    except Exception as e:
+        logger.error(f"Error publishing {label} events: {str(e)}")
+        return
+    if failed:
+        logger.error(
+            f"Failed to publish {failed} of {len(events)} {label} events"
+        )
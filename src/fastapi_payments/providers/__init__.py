@@ -6,6 +6,7 @@ import logging
 
 from .base import PaymentProvider
 from .stripe import StripeProvider
+from .registry import ProviderRegistry  # noqa: F401
 
 # Import other providers conditionally to avoid dependency issues
 
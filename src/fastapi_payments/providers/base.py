@@ -29,6 +29,17 @@ class PaymentProvider(ABC):
         """Initialize the provider with configuration."""
         pass
 
+    async def warm_up(self) -> None:
+        """
+        Prepare for the first request, e.g. open HTTP clients and fetch
+        access tokens. Called once at application startup; optional.
+        """
+        pass
+
+    async def close(self) -> None:
+        """Release clients opened by `warm_up`. Called at shutdown."""
+        pass
+
     @abstractmethod
     async def create_customer(
         self,
@@ -333,6 +344,7 @@ class PaymentProvider(ABC):
         subscription_item_id: str,
         quantity: int,
         timestamp: Optional[datetime] = None,
+        action: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Record usage for usage-based billing.
@@ -341,6 +353,9 @@ class PaymentProvider(ABC):
             subscription_item_id: Subscription item ID
             quantity: Usage quantity
             timestamp: Usage timestamp
+            action: "increment" to add `quantity` to the usage so far, or
+                "set" to replace the usage reported for `timestamp`;
+                providers choose a default
 
         Returns:
             Usage record data
@@ -0,0 +1,326 @@
+"""Read-through cache for provider retrieve_* calls."""
+
+import asyncio
+import copy
+import functools
+import importlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+)
+
+logger = logging.getLogger(__name__)
+
+# Provider read methods that are cached, mapped to their resource name
+CACHED_READS: Dict[str, str] = {
+    "retrieve_customer": "customer",
+    "retrieve_subscription": "subscription",
+    "retrieve_payment": "payment",
+    "retrieve_price": "price",
+    "retrieve_product": "product",
+}
+
+# Provider write methods whose first argument identifies a cached object
+INVALIDATING_WRITES: Dict[str, str] = {
+    "update_customer": "customer",
+    "delete_customer": "customer",
+    "update_subscription": "subscription",
+    "cancel_subscription": "subscription",
+    "refund_payment": "payment",
+}
+
+# Keys inside webhook payloads that carry provider object identifiers
+_WEBHOOK_ID_KEYS = {
+    "id",
+    "customer",
+    "customer_id",
+    "subscription",
+    "subscription_id",
+    "payment_intent",
+    "payment_id",
+    "price",
+}
+
+
+class InMemoryCacheBackend:
+    """Bounded LRU cache with per-entry expiry, local to this process."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by all workers through Redis.
+
+    Values are stored as JSON, so non-JSON types in provider payloads (such
+    as datetimes) come back as strings.
+    """
+
+    def __init__(self, url: str):
+        redis_module = importlib.import_module("redis.asyncio")
+        self.client = redis_module.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self.client.set(
+            key, json.dumps(value, default=str), px=max(1, int(ttl * 1000))
+        )
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+def create_cache_backend(config: Any):
+    """
+    Create the cache backend described by a ProviderCacheConfig.
+
+    Falls back to the in-process backend when the shared backend's
+    dependencies are not installed.
+    """
+    if config.backend == "redis":
+        try:
+            return RedisCacheBackend(config.url or "redis://localhost:6379")
+        except ImportError:
+            logger.warning(
+                "Redis cache backend requested but redis is not installed. "
+                "Falling back to in-memory provider cache."
+            )
+    return InMemoryCacheBackend(max_entries=config.max_entries)
+
+
+class ProviderReadCache:
+    """TTL cache with single-flight loading, shared by all cached providers."""
+
+    def __init__(self, config: Any, backend: Any = None):
+        self.config = config
+        self.backend = backend or create_cache_backend(config)
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+
+    def key(self, provider_name: str, resource: str, obj_id: str) -> str:
+        return f"{self.config.key_prefix}{provider_name}:{resource}:{obj_id}"
+
+    def ttl_for(self, resource: str) -> float:
+        return float(self.config.ttl.get(resource, self.config.default_ttl))
+
+    async def read(
+        self,
+        provider_name: str,
+        resource: str,
+        obj_id: str,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Return the cached value for an object, loading it on a miss.
+
+        Concurrent misses for the same key share one loader call. The load
+        runs as its own task, so a caller that is cancelled (for example by
+        a deadline) does not abort the fetch for the other waiters.
+        """
+        key = self.key(provider_name, resource, obj_id)
+        cached = await self.backend.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, resource, loader))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _load(
+        self, key: str, resource: str, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        current = asyncio.current_task()
+        try:
+            value = await loader()
+            # An invalidation while the load was in flight drops it from
+            # _inflight; don't cache a value that may already be stale.
+            if value is not None and self._inflight.get(key) is current:
+                await self.backend.set(key, value, self.ttl_for(resource))
+            return value
+        finally:
+            if self._inflight.get(key) is current:
+                self._inflight.pop(key, None)
+
+    async def invalidate(
+        self, provider_name: str, resource: str, obj_id: str
+    ) -> None:
+        key = self.key(provider_name, resource, obj_id)
+        self._inflight.pop(key, None)
+        await self.backend.delete(key)
+
+    async def invalidate_ids(
+        self, provider_name: str, obj_ids: Iterable[str]
+    ) -> None:
+        """Drop every cached resource type for the given provider IDs."""
+        keys = []
+        for obj_id in obj_ids:
+            for resource in set(CACHED_READS.values()):
+                key = self.key(provider_name, resource, obj_id)
+                self._inflight.pop(key, None)
+                keys.append(key)
+        await self.backend.delete(*keys)
+
+
+def _consume_exception(task: "asyncio.Future[Any]") -> None:
+    # Mark failures as retrieved when every waiter has gone away
+    if not task.cancelled():
+        task.exception()
+
+
+def collect_object_ids(data: Any, max_depth: int = 4) -> Set[str]:
+    """Collect provider object identifiers referenced by a webhook payload."""
+    found: Set[str] = set()
+
+    def _walk(node: Any, depth: int) -> None:
+        if depth > max_depth:
+            return
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if (
+                    key in _WEBHOOK_ID_KEYS
+                    and isinstance(value, str)
+                    and value
+                ):
+                    found.add(value)
+                else:
+                    _walk(value, depth + 1)
+        elif isinstance(node, list):
+            for item in node:
+                _walk(item, depth + 1)
+
+    _walk(data, 0)
+    return found
+
+
+class CachedProvider:
+    """Wrap a PaymentProvider so its retrieve_* calls read through a cache.
+
+    All other attributes are proxied to the wrapped provider, including
+    attribute assignment and deletion. Writes made through the wrapper to
+    a cached object and webhooks that mention it invalidate the cached
+    entry. Changes made any other way (another process without a shared
+    backend, the provider dashboard, a write with no webhook) are seen only
+    once the entry's TTL runs out.
+    """
+
+    def __init__(
+        self, provider_name: str, provider: Any, cache: ProviderReadCache
+    ):
+        object.__setattr__(self, "_provider_name", provider_name)
+        object.__setattr__(self, "_provider", provider)
+        object.__setattr__(self, "_cache", cache)
+
+    @property
+    def wrapped(self) -> Any:
+        """The underlying provider instance."""
+        return self._provider
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._provider, name)
+        if name in CACHED_READS:
+            return self._cached_read(CACHED_READS[name], attr)
+        if name in INVALIDATING_WRITES:
+            return self._invalidating_write(INVALIDATING_WRITES[name], attr)
+        return attr
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._provider, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._provider, name)
+
+    def _cached_read(
+        self, resource: str, method: Callable[..., Awaitable[Any]]
+    ):
+        @functools.wraps(method)
+        async def read(*args: Any, **kwargs: Any) -> Any:
+            # Only plain single-ID lookups are cacheable
+            if len(args) != 1 or kwargs or not args[0]:
+                return await method(*args, **kwargs)
+            obj_id = args[0]
+            return await self._cache.read(
+                self._provider_name, resource, obj_id, lambda: method(obj_id)
+            )
+
+        return read
+
+    def _invalidating_write(
+        self, resource: str, method: Callable[..., Awaitable[Any]]
+    ):
+        @functools.wraps(method)
+        async def write(*args: Any, **kwargs: Any) -> Any:
+            obj_id = args[0] if args else next(iter(kwargs.values()), None)
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                if isinstance(obj_id, str) and obj_id:
+                    await self._cache.invalidate(
+                        self._provider_name, resource, obj_id
+                    )
+
+        return write
+
+    async def webhook_handler(
+        self, payload: Any, signature: Optional[str] = None
+    ) -> Any:
+        result = await self._provider.webhook_handler(payload, signature)
+        obj_ids = collect_object_ids((result or {}).get("data"))
+        if obj_ids:
+            try:
+                await self._cache.invalidate_ids(self._provider_name, obj_ids)
+            except Exception as e:
+                logger.error(
+                    f"Error invalidating provider cache from webhook: {str(e)}"
+                )
+        return result
+
+    async def invalidate(self, resource: str, obj_id: str) -> None:
+        """Drop a single cached object for this provider."""
+        await self._cache.invalidate(self._provider_name, resource, obj_id)
+
+    def __repr__(self) -> str:
+        return f"CachedProvider({self._provider!r})"
@@ -1,6 +1,7 @@
 from .base import PaymentProvider
 from ..config.config_schema import ProviderConfig
-from typing import Dict, Any, Optional, List
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, Optional, List
 import aiohttp
 import json
 from datetime import datetime, timezone, timedelta
@@ -46,6 +47,27 @@ class PayPalProvider(PaymentProvider):
                 self.sandbox_mode}"
         )
 
+    async def warm_up(self) -> None:
+        """Open the shared HTTP client and fetch an access token."""
+        if self.http_client is None or self.http_client.closed:
+            self.http_client = aiohttp.ClientSession()
+        await self._get_access_token()
+
+    async def close(self) -> None:
+        """Close the shared HTTP client."""
+        if self.http_client is not None and not self.http_client.closed:
+            await self.http_client.close()
+        self.http_client = None
+
+    @asynccontextmanager
+    async def _http_session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        # The client opened by warm_up keeps connections alive between calls
+        if self.http_client is not None and not self.http_client.closed:
+            yield self.http_client
+        else:
+            async with aiohttp.ClientSession() as session:
+                yield session
+
     async def _get_access_token(self) -> str:
         """
         Get an access token for API requests.
@@ -70,7 +92,7 @@ class PayPalProvider(PaymentProvider):
 
         auth = aiohttp.BasicAuth(login=self.api_key, password=self.api_secret)
 
-        async with aiohttp.ClientSession() as session:
+        async with self._http_session() as session:
             async with session.post(
                 url,
                 headers=headers,
@@ -122,7 +144,7 @@ class PayPalProvider(PaymentProvider):
             "Content-Type": "application/json",
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self._http_session() as session:
             method_func = getattr(session, method.lower())
 
             kwargs = {"headers": headers}
@@ -71,6 +71,9 @@ class RazorpayProvider(PaymentProvider):
         "refund.processed": "payment.refunded",
     }
 
+    # Resources incremental sync can list by creation time
+    incremental_resources = ("subscriptions", "payments")
+
     def initialize(self):
         """Initialize Razorpay provider with configuration."""
         try:
@@ -748,6 +751,71 @@ class RazorpayProvider(PaymentProvider):
             logger.error(f"Failed to refund Razorpay payment: {e}")
             raise
 
+    async def list_changes(
+        self,
+        resource: str,
+        cursor: Optional[Dict[str, Any]] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """List subscriptions or orders created since `cursor`.
+
+        Razorpay has no events API, so the list endpoints are filtered with
+        their `from` timestamp and paged with `skip`. Status changes to
+        objects created before the mark arrive through webhooks or a full
+        sync. Without a cursor the current time is recorded as the mark.
+
+        Args:
+            resource: "subscriptions" or "payments" (Razorpay orders)
+            cursor: Cursor returned by the previous call, if any
+            limit: Page size
+
+        Returns:
+            Dict with objects under "items", the next "cursor" and
+            "has_more" when more pages remain
+        """
+        if resource not in self.incremental_resources:
+            raise ValueError(f"Incremental sync not supported for {resource}")
+        if not cursor or cursor.get("from") is None:
+            now = int(datetime.now(timezone.utc).timestamp())
+            return {"items": [], "cursor": {"from": now}, "has_more": False}
+
+        since = int(cursor["from"])
+        skip = int(cursor.get("skip") or 0)
+        newest = int(cursor.get("newest") or since)
+        client = (
+            self.client.subscription
+            if resource == "subscriptions"
+            else self.client.order
+        )
+        try:
+            page = client.all({"from": since, "count": limit, "skip": skip})
+        except Exception as e:
+            logger.error(f"Failed to list Razorpay {resource}: {e}")
+            raise
+
+        entities = page.get("items", [])
+        for entity in entities:
+            newest = max(newest, int(entity.get("created_at") or since))
+        if resource == "subscriptions":
+            items = [self._format_subscription(entity) for entity in entities]
+        else:
+            items = [self._format_order(entity) for entity in entities]
+
+        if len(entities) >= limit:
+            # Keep the window fixed while paging; remember the newest seen
+            return {
+                "items": items,
+                "cursor": {
+                    "from": since,
+                    "skip": skip + len(entities),
+                    "newest": newest,
+                },
+                "has_more": True,
+            }
+        # `from` is inclusive, so objects at the newest second are re-read
+        # once next time; applying them again is harmless.
+        return {"items": items, "cursor": {"from": newest}, "has_more": False}
+
     # ------------------------------------------------------------------
     # Provider interface implementation - Webhooks
     # ------------------------------------------------------------------
@@ -1062,6 +1130,24 @@ class RazorpayProvider(PaymentProvider):
             },
         }
 
+    def _format_order(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """Format a Razorpay order as a normalized payment."""
+        currency = order.get("currency", "INR")
+        return {
+            "provider_payment_id": order.get("id"),
+            "amount": self._from_razorpay_amount(
+                order.get("amount"), currency
+            ),
+            "currency": currency,
+            "status": self._map_order_status(order.get("status", "created")),
+            "created_at": self._timestamp_to_iso(order.get("created_at")),
+            "meta_info": {
+                "order_id": order.get("id"),
+                "receipt": order.get("receipt"),
+                "notes": order.get("notes"),
+            },
+        }
+
     def _format_token(self, token: Dict[str, Any]) -> Dict[str, Any]:
         """Format Razorpay token to payment method format."""
         return {
@@ -0,0 +1,116 @@
+"""Process-wide registry of configured payment providers."""
+
+import asyncio
+import logging
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from .base import PaymentProvider
+from .cache import CachedProvider, ProviderReadCache
+
+logger = logging.getLogger(__name__)
+
+
+async def _call(provider: Any, method: str) -> None:
+    # Providers that do not derive from PaymentProvider may lack the hook
+    hook = getattr(provider, method, None)
+    if hook is not None:
+        await hook()
+
+
+class ProviderRegistry(Mapping):
+    """Immutable mapping of provider name to provider instance.
+
+    Provider instances hold SDK clients and parsed configuration, so they are
+    built once at startup and shared by every request-scoped PaymentService
+    handle instead of being re-created per request or per background job.
+    """
+
+    def __init__(
+        self, providers: Optional[Mapping[str, PaymentProvider]] = None
+    ):
+        self._providers = MappingProxyType(dict(providers or {}))
+
+    @classmethod
+    def from_config(cls, config: Any) -> "ProviderRegistry":
+        """
+        Build a registry from a PaymentConfig.
+
+        Args:
+            config: Payment configuration with a `providers` mapping
+
+        Returns:
+            ProviderRegistry holding one instance per configured provider,
+            wrapped in a read-through cache when `provider_cache` is enabled
+        """
+        # Imported lazily to avoid a circular import with the package factory
+        from . import get_provider
+
+        providers = {
+            provider_name: get_provider(provider_name, provider_config)
+            for provider_name, provider_config in config.providers.items()
+        }
+
+        cache_config = getattr(config, "provider_cache", None)
+        if cache_config is not None and cache_config.enabled:
+            cache = ProviderReadCache(cache_config)
+            providers = {
+                provider_name: CachedProvider(provider_name, provider, cache)
+                for provider_name, provider in providers.items()
+            }
+
+        return cls(providers)
+
+    async def warm_up(self) -> Dict[str, Optional[str]]:
+        """
+        Warm up every provider concurrently.
+
+        A provider that fails to warm up is logged and still used; its
+        first request pays the cost instead.
+
+        Returns:
+            Error message per provider, None for providers that warmed up
+        """
+        names = list(self._providers)
+        results = await asyncio.gather(
+            *(_call(self._providers[name], "warm_up") for name in names),
+            return_exceptions=True,
+        )
+        errors: Dict[str, Optional[str]] = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.warning(
+                    f"Provider {name} failed to warm up: {str(result)}"
+                )
+                errors[name] = str(result)
+            else:
+                errors[name] = None
+        return errors
+
+    async def close(self) -> None:
+        """Close every provider's clients."""
+        for name, provider in self._providers.items():
+            try:
+                await _call(provider, "close")
+            except Exception as e:
+                logger.error(f"Error closing provider {name}: {str(e)}")
+
+    def with_overrides(
+        self, **providers: PaymentProvider
+    ) -> "ProviderRegistry":
+        """Return a new registry with the given providers replaced or added."""
+        merged: Dict[str, PaymentProvider] = dict(self._providers)
+        merged.update(providers)
+        return ProviderRegistry(merged)
+
+    def __getitem__(self, provider_name: str) -> PaymentProvider:
+        return self._providers[provider_name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._providers)
+
+    def __len__(self) -> int:
+        return len(self._providers)
+
+    def __repr__(self) -> str:
+        return f"ProviderRegistry({sorted(self._providers)})"
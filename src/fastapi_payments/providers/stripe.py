@@ -46,6 +46,26 @@ class StripeProvider(PaymentProvider):
         "charge.refunded": "payment.refunded",
     }
 
+    # Event types read by incremental sync, per local resource
+    INCREMENTAL_EVENT_TYPES = {
+        "customers": ["customer.created", "customer.updated"],
+        "subscriptions": [
+            "customer.subscription.created",
+            "customer.subscription.updated",
+            "customer.subscription.deleted",
+            "customer.subscription.paused",
+            "customer.subscription.resumed",
+        ],
+        "payments": [
+            "payment_intent.created",
+            "payment_intent.processing",
+            "payment_intent.succeeded",
+            "payment_intent.payment_failed",
+            "payment_intent.canceled",
+        ],
+    }
+    incremental_resources = tuple(INCREMENTAL_EVENT_TYPES)
+
     def initialize(self):
         """Initialize Stripe with configuration."""
         self.api_key = self.config.api_key
@@ -352,6 +372,7 @@ class StripeProvider(PaymentProvider):
         quantity: int = 1,
         trial_period_days: Optional[int] = None,
         meta_info: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Create a subscription in Stripe."""
         params: Dict[str, Any] = {
@@ -365,6 +386,8 @@ class StripeProvider(PaymentProvider):
             params["metadata"] = metadata
         if trial_period_days:
             params["trial_period_days"] = trial_period_days
+        if idempotency_key:
+            params["idempotency_key"] = idempotency_key
 
         subscription = await self._call_stripe(
             self.stripe.Subscription.create, **params
@@ -451,6 +474,7 @@ class StripeProvider(PaymentProvider):
         description: Optional[str] = None,
         meta_info: Optional[Dict[str, Any]] = None,
         mandate_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Process a one-time payment with Stripe using PaymentIntents."""
         params: Dict[str, Any] = {
@@ -475,6 +499,8 @@ class StripeProvider(PaymentProvider):
         else:
             params["automatic_payment_methods"] = {"enabled": True}
             params["confirm"] = False
+        if idempotency_key:
+            params["idempotency_key"] = idempotency_key
 
         payment_intent = await self._call_stripe(
             self.stripe.PaymentIntent.create, **params
@@ -482,10 +508,16 @@ class StripeProvider(PaymentProvider):
         return self._format_payment_intent(payment_intent)
 
     async def refund_payment(
-        self, provider_payment_id: str, amount: Optional[float] = None
+        self,
+        provider_payment_id: str,
+        amount: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Refund a payment in Stripe."""
         refund_params: Dict[str, Any] = {"payment_intent": provider_payment_id}
+        if idempotency_key:
+            # Only the create call is keyed; the lookup below is a read
+            refund_params["idempotency_key"] = idempotency_key
         refund_currency: Optional[str] = None
 
         if amount is not None:
@@ -536,18 +568,93 @@ class StripeProvider(PaymentProvider):
         subscription_item_id: str,
         quantity: int,
         timestamp: Optional[datetime] = None,
+        action: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Record usage for metered billing with Stripe."""
         ts = int((timestamp or datetime.now(timezone.utc)).timestamp())
+        params: Dict[str, Any] = {
+            "subscription_item": subscription_item_id,
+            "quantity": quantity,
+            "timestamp": ts,
+            "action": action or self.default_usage_action,
+        }
+        if idempotency_key:
+            params["idempotency_key"] = idempotency_key
         usage_record = await self._call_stripe(
-            self.stripe.UsageRecord.create,
-            subscription_item=subscription_item_id,
-            quantity=quantity,
-            timestamp=ts,
-            action=self.default_usage_action,
+            self.stripe.UsageRecord.create, **params
         )
         return self._format_usage_record(usage_record)
 
+    async def list_changes(
+        self,
+        resource: str,
+        cursor: Optional[Dict[str, Any]] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        List objects changed since `cursor` using the Events API.
+
+        The cursor is the ID of the newest event already applied. Events are
+        paged forward with `ending_before`, and each object is returned once
+        per page in the state captured by its latest event. Without a cursor
+        only the current newest event is recorded, establishing the mark for
+        the next call.
+
+        Args:
+            resource: One of `incremental_resources`
+            cursor: Cursor returned by the previous call, if any
+            limit: Maximum events to read
+
+        Returns:
+            Dict with changed objects under "items", the next "cursor" and
+            "has_more" when newer events remain
+        """
+        if resource not in self.INCREMENTAL_EVENT_TYPES:
+            raise ValueError(f"Incremental sync not supported for {resource}")
+        params: Dict[str, Any] = {
+            "types": self.INCREMENTAL_EVENT_TYPES[resource],
+            "limit": limit,
+        }
+
+        if not cursor or not cursor.get("event_id"):
+            response = await self._call_stripe(
+                self.stripe.Event.list, **{**params, "limit": 1}
+            )
+            events = self._to_plain_dict(response).get("data", [])
+            newest = events[0]["id"] if events else None
+            return {
+                "items": [],
+                "cursor": {"event_id": newest} if newest else None,
+                "has_more": False,
+            }
+
+        response = await self._call_stripe(
+            self.stripe.Event.list, ending_before=cursor["event_id"], **params
+        )
+        page = self._to_plain_dict(response)
+        events = page.get("data", [])
+        if not events:
+            return {"items": [], "cursor": cursor, "has_more": False}
+
+        format_object = {
+            "customers": self._format_customer,
+            "subscriptions": self._format_subscription,
+            "payments": self._format_payment_intent,
+        }[resource]
+        # Events are newest first; replay oldest first so the latest state wins
+        latest: Dict[str, Dict[str, Any]] = {}
+        for event in reversed(events):
+            obj = (event.get("data") or {}).get("object") or {}
+            if obj.get("id"):
+                latest[obj["id"]] = format_object(obj)
+
+        return {
+            "items": list(latest.values()),
+            "cursor": {"event_id": events[0]["id"]},
+            "has_more": bool(page.get("has_more")),
+        }
+
     async def _call_stripe(self, func, *args, **kwargs):
         """Execute Stripe SDK calls safely from async context."""
         self._ensure_client()
@@ -662,6 +769,7 @@ class StripeProvider(PaymentProvider):
             "provider_subscription_id": data.get("id"),
             "customer_id": data.get("customer"),
             "price_id": self._extract_price_id(data),
+            "subscription_item_id": self._extract_item_id(data),
             "status": data.get("status"),
             "quantity": self._extract_quantity(data),
             "current_period_start": self._timestamp_to_iso(period_start),
@@ -719,6 +827,15 @@ class StripeProvider(PaymentProvider):
             return plan.get("id")
         return plan
 
+    @staticmethod
+    def _extract_item_id(subscription_data: Dict[str, Any]) -> Optional[str]:
+        items = subscription_data.get("items")
+        if isinstance(items, dict):
+            data = items.get("data", [])
+            if data:
+                return data[0].get("id")
+        return None
+
     @staticmethod
     def _extract_quantity(subscription_data: Dict[str, Any]) -> Optional[int]:
         items = subscription_data.get("items")
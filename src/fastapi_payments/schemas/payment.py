@@ -19,6 +19,38 @@ class CustomerUpdate(BaseModel):
     meta_info: Optional[Dict[str, Any]] = None
 
 
+class CustomerImportRequest(BaseModel):
+    """Schema for a bulk customer import sent as a JSON document.
+
+    Items are validated one by one during the import, so a bad item is
+    reported in its result instead of rejecting the whole request.
+    """
+
+    customers: List[Dict[str, Any]]
+    provider: Optional[str] = None
+
+
+class CustomerImportResult(BaseModel):
+    """Outcome of importing a single customer."""
+
+    index: int
+    status: str
+    id: Optional[str] = None
+    email: Optional[str] = None
+    name: Optional[str] = None
+    created_at: Optional[str] = None
+    provider_customer_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class CustomerImportResponse(BaseModel):
+    """Schema for a bulk customer import response."""
+
+    created: int
+    failed: int
+    results: List[CustomerImportResult]
+
+
 class ProviderCustomerInfo(BaseModel):
     """Represents a mapping between a customer and provider."""
 
@@ -169,6 +201,45 @@ class SubscriptionResponse(BaseModel):
     meta_info: Optional[Dict[str, Any]] = None
 
 
+class UsageEventCreate(BaseModel):
+    """Schema for a single usage event."""
+
+    subscription_id: str
+    quantity: float
+    timestamp: Optional[datetime] = None
+    description: Optional[str] = None
+
+
+class UsageBatchRequest(BaseModel):
+    """Schema for a bulk usage submission.
+
+    Events are validated one by one, so a bad event is reported in its
+    result instead of rejecting the whole submission.
+    """
+
+    events: List[Dict[str, Any]]
+
+
+class UsageEventResult(BaseModel):
+    """Outcome of recording a single usage event."""
+
+    index: int
+    status: str
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class UsageBatchResponse(BaseModel):
+    """Schema for a bulk usage submission response.
+
+    Events reported as "recorded" are committed to the database.
+    """
+
+    recorded: int
+    failed: int
+    results: List[UsageEventResult]
+
+
 class PaymentCreate(BaseModel):
     """Schema for creating a payment."""
 
@@ -182,6 +253,23 @@ class PaymentCreate(BaseModel):
     provider: Optional[str] = None
 
 
+class PaymentBatchItem(PaymentCreate):
+    """Schema for one payment of a batch."""
+
+    # Forwarded to the provider, so resending the item never charges twice
+    idempotency_key: Optional[str] = None
+
+
+class PaymentBatchRequest(BaseModel):
+    """Schema for a batch of payments sent as a JSON document.
+
+    Items are validated one by one during processing, so a bad item is
+    reported in its result instead of rejecting the whole batch.
+    """
+
+    payments: List[Dict[str, Any]]
+
+
 class PaymentResponse(BaseModel):
     """Schema for payment response."""
 
@@ -196,6 +284,7 @@ class PaymentResponse(BaseModel):
     provider: str
     provider_payment_id: str
     created_at: str
+    provider_data: Optional[Dict[str, Any]] = None
     meta_info: Optional[Dict[str, Any]] = None
 
 
@@ -205,12 +294,24 @@ class SyncRequest(BaseModel):
     `resources` is an optional list of resource names to sync. If omitted,
     all supported resources will be synced. The `provider` can be used to
     limit the sync to a single provider. `filters` may contain resource
-    specific filters (e.g. customer_id, product_id).
+    specific filters (e.g. customer_id, product_id). `mode` is "full" to
+    re-check every local row, or "incremental" to pull only objects changed
+    at the provider since the last incremental sync.
     """
 
     resources: Optional[List[str]] = None
     provider: Optional[str] = None
     filters: Optional[Dict[str, Any]] = None
+    mode: str = "full"
+
+    @validator("mode")
+    @classmethod
+    def validate_mode(cls, v):
+        """Validate sync mode."""
+        allowed_modes = ["full", "incremental"]
+        if v not in allowed_modes:
+            raise ValueError(f"mode must be one of {allowed_modes}")
+        return v
 
 
 class SyncResultItem(BaseModel):
@@ -218,10 +319,14 @@ class SyncResultItem(BaseModel):
     updated: int = 0
     created: int = 0
     errors: Optional[List[str]] = None
+    duration_seconds: Optional[float] = None
+    rows_per_second: Optional[float] = None
 
 
 class SyncResult(BaseModel):
     summary: Dict[str, SyncResultItem] = Field(default_factory=dict)
+    duration_seconds: Optional[float] = None
+    rows_per_second: Optional[float] = None
 
 
 class SyncJobResponse(BaseModel):
@@ -230,3 +335,4 @@ class SyncJobResponse(BaseModel):
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
     result: Optional[Dict[str, Any]] = None
+    progress: Optional[Dict[str, Any]] = None
@@ -0,0 +1,522 @@
+"""Archival of old payments and usage records to time-partitioned files."""
+
+import asyncio
+import enum
+import gzip
+import heapq
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import JSON, Boolean, Float, Integer, and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import Payment, ProviderSnapshot, UsageRecord
+from ..db.repositories import ProviderSnapshotRepository, new_session
+from ..db.repositories.payment_repository import _normalize_status
+
+logger = logging.getLogger(__name__)
+
+# Archived table -> (model, column that decides its age and partition)
+ARCHIVED_TABLES: Dict[str, Tuple[Any, str]] = {
+    "payments": (Payment, "created_at"),
+    "usage_records": (UsageRecord, "timestamp"),
+}
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Timestamp columns hold naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return _naive_utc(value).isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _columns(table: str) -> List[Tuple[str, Any]]:
+    """(name, SQLAlchemy type) of every archived column, in file order."""
+    model, _ = ARCHIVED_TABLES[table]
+    columns = [
+        (column.name, column.type) for column in model.__table__.columns
+    ]
+    if table == "payments":
+        # The latest provider snapshot travels with the payment
+        columns.append(("provider_data", JSON()))
+    return columns
+
+
+class ArchiveStorage:
+    """Archive files under a local directory or an fsspec URL."""
+
+    def __init__(
+        self, path: str, storage_options: Optional[Dict[str, Any]] = None
+    ):
+        if "://" in path and not path.startswith("file://"):
+            try:
+                import fsspec
+            except ImportError:
+                raise ImportError(
+                    "Archiving to URLs requires fsspec. "
+                    "Install with: pip install fsspec"
+                )
+            self.fs, self.root = fsspec.core.url_to_fs(
+                path, **(storage_options or {})
+            )
+        else:
+            self.fs = None
+            self.root = (
+                path[len("file://"):] if path.startswith("file://") else path
+            )
+        self.root = self.root.rstrip("/")
+
+    def _full(self, name: str) -> str:
+        return f"{self.root}/{name}"
+
+    def open_write(self, name: str) -> Any:
+        full = self._full(name)
+        if self.fs is not None:
+            return self.fs.open(full, "wb")
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        return open(full, "wb")
+
+    def open_read(self, name: str) -> Any:
+        full = self._full(name)
+        return (
+            self.fs.open(full, "rb")
+            if self.fs is not None
+            else open(full, "rb")
+        )
+
+    def publish(self, temp_name: str, name: str) -> None:
+        """Move a fully written file to its final name."""
+        if self.fs is not None:
+            self.fs.mv(self._full(temp_name), self._full(name))
+        else:
+            os.replace(self._full(temp_name), self._full(name))
+
+    def list(self, prefix: str) -> List[str]:
+        """Names of all files under `prefix`, relative to the root."""
+        full = self._full(prefix)
+        if self.fs is not None:
+            if not self.fs.exists(full):
+                return []
+            return [path[len(self.root) + 1:] for path in self.fs.find(full)]
+        names = []
+        for directory, _, files in os.walk(full):
+            for file_name in files:
+                names.append(
+                    os.path.relpath(
+                        os.path.join(directory, file_name), self.root
+                    ).replace(os.sep, "/")
+                )
+        return names
+
+
+class _NdjsonPart:
+    suffix = ".ndjson.gz"
+
+    def __init__(self, raw: Any, columns: List[Tuple[str, Any]]):
+        self.gzip = gzip.GzipFile(fileobj=raw, mode="wb")
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        lines = "".join(
+            json.dumps(row, separators=(",", ":"), default=str) + "\n"
+            for row in rows
+        )
+        self.gzip.write(lines.encode("utf-8"))
+
+    def close(self) -> None:
+        self.gzip.close()
+
+    @staticmethod
+    def read(
+        raw: Any, columns: List[Tuple[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        with gzip.GzipFile(fileobj=raw, mode="rb") as lines:
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class _ParquetPart:
+    suffix = ".parquet"
+
+    def __init__(self, raw: Any, columns: List[Tuple[str, Any]]):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(
+                "The parquet archive format requires pyarrow. "
+                "Install with: pip install pyarrow"
+            )
+        self.pa = pyarrow
+        self.columns = columns
+        self.schema = pyarrow.schema(
+            [(name, self._arrow_type(kind)) for name, kind in columns]
+        )
+        self.writer = pyarrow.parquet.ParquetWriter(
+            raw, self.schema, compression="zstd"
+        )
+
+    def _arrow_type(self, kind: Any) -> Any:
+        if isinstance(kind, Boolean):
+            return self.pa.bool_()
+        if isinstance(kind, Integer):
+            return self.pa.int64()
+        if isinstance(kind, Float):
+            return self.pa.float64()
+        # Strings, ISO timestamps and JSON text
+        return self.pa.string()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        data = {
+            name: [
+                (
+                    json.dumps(row.get(name), default=str)
+                    if isinstance(kind, JSON)
+                    else row.get(name)
+                )
+                for row in rows
+            ]
+            for name, kind in self.columns
+        }
+        # Each batch becomes one row group, so memory stays per batch
+        self.writer.write_table(
+            self.pa.Table.from_pydict(data, schema=self.schema)
+        )
+
+    def close(self) -> None:
+        self.writer.close()
+
+    @staticmethod
+    def read(
+        raw: Any, columns: List[Tuple[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        import pyarrow.parquet
+
+        json_columns = {
+            name for name, kind in columns if isinstance(kind, JSON)
+        }
+        parquet = pyarrow.parquet.ParquetFile(raw)
+        for group in range(parquet.num_row_groups):
+            for row in parquet.read_row_group(group).to_pylist():
+                for name in json_columns:
+                    if row.get(name) is not None:
+                        row[name] = json.loads(row[name])
+                yield row
+
+
+_FORMATS = {"ndjson": _NdjsonPart, "parquet": _ParquetPart}
+
+
+class _Segment:
+    """Archive files being written in one run, one per month partition."""
+
+    def __init__(
+        self,
+        storage: ArchiveStorage,
+        table: str,
+        file_format: str,
+        run_id: str,
+    ):
+        self.storage = storage
+        self.table = table
+        self.part_class = _FORMATS[file_format]
+        self.columns = _columns(table)
+        self.run_id = run_id
+        self.time_column = ARCHIVED_TABLES[table][1]
+        self.ids: List[str] = []
+        self._parts: Dict[str, Tuple[Any, Any, str]] = {}
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        by_partition: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            # ISO timestamps start with YYYY-MM
+            stamp = row[self.time_column]
+            partition = f"{self.table}/year={stamp[:4]}/month={stamp[5:7]}"
+            by_partition.setdefault(partition, []).append(row)
+        for partition, partition_rows in by_partition.items():
+            if partition not in self._parts:
+                name = (
+                    f"{partition}/part-{self.run_id}{self.part_class.suffix}"
+                )
+                raw = self.storage.open_write(name + ".tmp")
+                self._parts[partition] = (
+                    raw,
+                    self.part_class(raw, self.columns),
+                    name,
+                )
+            self._parts[partition][1].write(partition_rows)
+        self.ids.extend(row["id"] for row in rows)
+
+    def close(self) -> int:
+        """Finish every file durably; returns the number of files written."""
+        for raw, part, name in self._parts.values():
+            part.close()
+            if not raw.closed:
+                raw.flush()
+                try:
+                    os.fsync(raw.fileno())
+                except (AttributeError, OSError, ValueError):
+                    # Remote files have no descriptor; closing uploads them
+                    pass
+                raw.close()
+            self.storage.publish(name + ".tmp", name)
+        return len(self._parts)
+
+    def abort(self) -> None:
+        for raw, _, _ in self._parts.values():
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+
+class Archiver:
+    """Moves rows past their retention horizon from the database to files.
+
+    Rows are read oldest first in batches of `batch_size` and appended to
+    one file per month partition, e.g.
+    ``payments/year=2025/month=03/part-<run>.ndjson.gz``. After
+    `rows_per_file` rows the files are completed (flushed, fsynced and
+    renamed from ``.tmp``) and only then are their rows deleted, in
+    transactions of `delete_chunk` rows. A run that stops early leaves at
+    worst a ``.tmp`` file and rows still in the database, which the next
+    run archives again. Payments take their latest provider snapshot with
+    them.
+    """
+
+    def __init__(
+        self,
+        config: Any,
+        sessionmaker: Optional[Callable[[], AsyncSession]] = None,
+    ):
+        self.config = config
+        self._sessionmaker = sessionmaker or new_session
+        self._storage: Optional[ArchiveStorage] = None
+
+    @property
+    def storage(self) -> ArchiveStorage:
+        if self._storage is None:
+            self._storage = ArchiveStorage(
+                self.config.path, self.config.storage_options
+            )
+        return self._storage
+
+    async def archive_expired(
+        self, now: Optional[datetime] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """Archive every table that has a horizon configured."""
+        now = now or datetime.now(timezone.utc)
+        horizons = {
+            "payments": self.config.payments_after_days,
+            "usage_records": self.config.usage_after_days,
+        }
+        results = {}
+        for table, days in horizons.items():
+            if days is not None:
+                results[table] = await self.archive(
+                    table, now - timedelta(days=days)
+                )
+        return results
+
+    async def archive(self, table: str, before: datetime) -> Dict[str, int]:
+        """
+        Archive and delete the rows of `table` older than `before`.
+
+        Returns:
+            Number of rows "archived" and archive "files" written
+        """
+        model, time_attr = ARCHIVED_TABLES[table]
+        time_column = getattr(model, time_attr)
+        before = _naive_utc(before)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        run_id = f"{stamp}-{uuid.uuid4().hex[:8]}"
+        archived = files = 0
+        last: Optional[Tuple[Any, str]] = None
+        segment = _Segment(self.storage, table, self.config.format, run_id)
+
+        async with self._sessionmaker() as session:
+            try:
+                while True:
+                    stmt = select(*model.__table__.columns).where(
+                        time_column < before
+                    )
+                    if last is not None:
+                        stmt = stmt.where(
+                            or_(
+                                time_column > last[0],
+                                and_(
+                                    time_column == last[0], model.id > last[1]
+                                ),
+                            )
+                        )
+                    stmt = stmt.order_by(time_column, model.id).limit(
+                        self.config.batch_size
+                    )
+                    rows = [
+                        dict(row)
+                        for row in (await session.execute(stmt))
+                        .mappings()
+                        .all()
+                    ]
+                    await session.commit()
+                    if not rows:
+                        break
+                    last = (rows[-1][time_attr], rows[-1]["id"])
+                    if table == "payments":
+                        snapshots = await ProviderSnapshotRepository(
+                            session
+                        ).latest_many("payment", [row["id"] for row in rows])
+                        for row in rows:
+                            row["provider_data"] = snapshots.get(
+                                row["id"], {}
+                            ).get(row["provider"])
+                    records = [
+                        {name: _jsonable(value) for name, value in row.items()}
+                        for row in rows
+                    ]
+                    await asyncio.to_thread(segment.write, records)
+
+                    if len(segment.ids) >= self.config.rows_per_file:
+                        files += await asyncio.to_thread(segment.close)
+                        archived += await self._delete(
+                            session, table, segment.ids
+                        )
+                        # Suffix keeps later segments of this run from
+                        # reusing file names
+                        segment = _Segment(
+                            self.storage,
+                            table,
+                            self.config.format,
+                            f"{run_id}-{files}",
+                        )
+                if segment.ids:
+                    files += await asyncio.to_thread(segment.close)
+                    archived += await self._delete(session, table, segment.ids)
+            except BaseException:
+                segment.abort()
+                raise
+
+        if archived:
+            logger.info(
+                f"Archived {archived} {table} rows older than "
+                f"{before.isoformat()} to {files} files"
+            )
+        return {"archived": archived, "files": files}
+
+    async def _delete(
+        self, session: AsyncSession, table: str, ids: List[str]
+    ) -> int:
+        model, _ = ARCHIVED_TABLES[table]
+        chunk = self.config.delete_chunk
+        for i in range(0, len(ids), chunk):
+            batch = ids[i:i + chunk]
+            await session.execute(delete(model).where(model.id.in_(batch)))
+            if table == "payments":
+                await session.execute(
+                    delete(ProviderSnapshot).where(
+                        ProviderSnapshot.entity_type == "payment",
+                        ProviderSnapshot.entity_id.in_(batch),
+                    )
+                )
+            # One short transaction per chunk keeps locks brief
+            await session.commit()
+        return len(ids)
+
+    async def list_payments(
+        self,
+        *,
+        customer_id: Optional[str] = None,
+        status: Optional[str] = None,
+        before: Optional[Tuple[datetime, str]] = None,
+        limit: int = 50,
+        skip: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Archived payments, newest first, as stored by `archive`.
+
+        Month partitions are read newest first, and only until `skip` +
+        `limit` matches are found; partitions newer than `before` are not
+        opened at all.
+
+        Args:
+            before: (created_at, id) of the last payment already returned;
+                only older payments are read
+        """
+        wanted = skip + limit
+        if wanted <= 0:
+            return []
+        before_key = None
+        if before is not None:
+            before_key = (_naive_utc(before[0]).isoformat(), before[1])
+        status_value = _normalize_status(status).value if status else None
+        found = await asyncio.to_thread(
+            self._read_payments, customer_id, status_value, before_key, wanted
+        )
+        return found[skip:]
+
+    def _read_payments(
+        self,
+        customer_id: Optional[str],
+        status: Optional[str],
+        before_key: Optional[Tuple[str, str]],
+        wanted: int,
+    ) -> List[Dict[str, Any]]:
+        partitions: Dict[str, List[str]] = {}
+        for name in self.storage.list("payments"):
+            if name.endswith(".tmp"):
+                continue
+            partitions.setdefault(name.rsplit("/", 1)[0], []).append(name)
+
+        found: List[Dict[str, Any]] = []
+        for partition in sorted(partitions, reverse=True):
+            if before_key is not None:
+                # payments/year=YYYY/month=MM holds YYYY-MM timestamps only
+                _, year, month = partition.split("/")
+                if f"{year[5:]}-{month[6:]}" > before_key[0][:7]:
+                    continue
+
+            def matches(row: Dict[str, Any]) -> bool:
+                if customer_id and row.get("customer_id") != customer_id:
+                    return False
+                if status and row.get("status") != status:
+                    return False
+                return (
+                    before_key is None
+                    or (row["created_at"], row["id"]) < before_key
+                )
+
+            rows = (
+                row
+                for name in partitions[partition]
+                for row in self._read_file(name, "payments")
+                if matches(row)
+            )
+            found.extend(
+                heapq.nlargest(
+                    wanted - len(found),
+                    rows,
+                    key=lambda r: (r["created_at"], r["id"]),
+                )
+            )
+            if len(found) >= wanted:
+                break
+        return found
+
+    def _read_file(self, name: str, table: str) -> Iterator[Dict[str, Any]]:
+        part_class = (
+            _ParquetPart if name.endswith(_ParquetPart.suffix) else _NdjsonPart
+        )
+        with self.storage.open_read(name) as raw:
+            yield from part_class.read(raw, _columns(table))
@@ -0,0 +1,159 @@
+"""Bulk customer import with concurrent provider creation."""
+
+import asyncio
+import logging
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from pydantic import ValidationError
+
+from ..db.repositories import CustomerRepository
+from ..schemas.payment import CustomerCreate
+from ..utils.helpers import abatched
+
+logger = logging.getLogger(__name__)
+
+
+class CustomerImporter:
+    """Create many customers at a provider and store them in batches.
+
+    Input is consumed in batches of `batch_size` items. Provider customers
+    for a batch are created concurrently, at most `concurrency` at a time,
+    and the successful ones are inserted with one multi-row INSERT per table
+    in a single transaction. A result is yielded for every input item, in
+    input order, as soon as its batch is stored.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        provider: Optional[str] = None,
+        batch_size: int = 500,
+        concurrency: int = 10,
+    ):
+        self.service = service
+        self.provider_name = provider or service.default_provider
+        self.provider = service.get_provider(self.provider_name)
+        self.repo = CustomerRepository(service.db_session)
+        self.batch_size = batch_size
+        self._limit = asyncio.Semaphore(concurrency)
+
+    async def run(
+        self, customers: Union[Iterable[Any], AsyncIterable[Any]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Import customers, yielding one result per input item.
+
+        Args:
+            customers: Customer payloads (dicts with email, name, meta_info,
+                address). An item that is an exception, such as a line that
+                failed to parse, is reported as a failed result.
+
+        Yields:
+            Dicts with the item "index", "status" ("created" or "failed")
+            and either the stored customer fields or an "error"
+        """
+        index = 0
+        async for batch in abatched(customers, self.batch_size):
+            for result in await self._import_batch(index, batch):
+                yield result
+            index += len(batch)
+
+    async def _import_batch(
+        self, start: int, batch: List[Any]
+    ) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        valid = []
+        for offset, item in enumerate(batch):
+            result: Dict[str, Any] = {"index": start + offset}
+            results.append(result)
+            try:
+                if isinstance(item, Exception):
+                    raise item
+                customer = (
+                    item
+                    if isinstance(item, CustomerCreate)
+                    else CustomerCreate(**item)
+                )
+            except (ValidationError, ValueError, TypeError) as e:
+                result.update(status="failed", error=str(e))
+                continue
+            result["email"] = customer.email
+            valid.append((result, customer))
+
+        created = await asyncio.gather(
+            *(self._create_at_provider(c) for _, c in valid)
+        )
+
+        stored = []
+        for (result, customer), outcome in zip(valid, created):
+            if isinstance(outcome, Exception):
+                result.update(status="failed", error=str(outcome))
+                continue
+            provider_customer_id = outcome.get(
+                "provider_customer_id"
+            ) or outcome.get("id")
+            if not provider_customer_id:
+                result.update(
+                    status="failed",
+                    error="Provider did not return a customer identifier",
+                )
+                continue
+            stored.append(
+                (
+                    result,
+                    {
+                        "email": customer.email,
+                        "name": customer.name,
+                        "meta_info": customer.meta_info,
+                        "address": customer.address,
+                        "provider_customer_id": provider_customer_id,
+                    },
+                )
+            )
+
+        try:
+            rows = await self.repo.create_many(
+                [entry for _, entry in stored], self.provider_name
+            )
+        except Exception as e:
+            logger.error(f"Error storing imported customers: {str(e)}")
+            # Provider customers exist but were not stored; report their IDs
+            # so they can be reconciled.
+            for result, entry in stored:
+                result.update(
+                    status="failed",
+                    error=str(e),
+                    provider_customer_id=entry["provider_customer_id"],
+                )
+            return results
+
+        for (result, entry), row in zip(stored, rows):
+            result.update(
+                status="created",
+                id=row["id"],
+                name=row["name"],
+                created_at=row["created_at"].isoformat(),
+                provider_customer_id=entry["provider_customer_id"],
+            )
+        return results
+
+    async def _create_at_provider(self, customer: CustomerCreate) -> Any:
+        async with self._limit:
+            try:
+                return await self.provider.create_customer(
+                    email=customer.email,
+                    name=customer.name,
+                    meta_info=customer.meta_info,
+                    address=customer.address,
+                )
+            except Exception as e:
+                return e
@@ -0,0 +1,278 @@
+"""Idempotency-Key support for mutating service calls."""
+
+import asyncio
+import copy
+import enum
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import time
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.repositories import IdempotencyKeyRepository, new_session
+from ..providers.cache import InMemoryCacheBackend
+from ..utils.exceptions import IdempotencyError
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _to_json(value: Any) -> Any:
+    """Round-trip through JSON so stored and replayed responses match."""
+    return json.loads(json.dumps(value, default=_json_default))
+
+
+def request_fingerprint(scope: str, params: Dict[str, Any]) -> str:
+    """Hash the operation and its parameters, independent of key order."""
+    payload = json.dumps(
+        [scope, params], sort_keys=True, default=_json_default
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Runs each (scope, key) once and replays its response afterwards.
+
+    Completed responses are kept in the `idempotency_keys` table and in an
+    in-process LRU hot cache. A duplicate arriving while the first request
+    is still running waits on it: in the same process it awaits the
+    in-flight result directly, across processes it polls the table until
+    the record completes. A key reused with different parameters is
+    rejected. If the request fails, the key is released so it can be
+    retried.
+
+    Keys are recorded in their own session, never the caller's, so
+    claiming a key does not commit the request's work. The lock on an
+    in-progress key is renewed every third of `lock_seconds` while the
+    request runs; `lock_seconds` only bounds how long a request whose
+    process died keeps its key from being retried.
+    """
+
+    def __init__(
+        self,
+        config: Any,
+        sessionmaker: Optional[Callable[[], AsyncSession]] = None,
+    ):
+        self.config = config
+        self._sessionmaker = sessionmaker or new_session
+        self._cache = InMemoryCacheBackend(
+            max_entries=config.cache_max_entries
+        )
+        self._inflight: Dict[str, Tuple[str, "asyncio.Future[Any]"]] = {}
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Execute `call` at most once for `key`, returning the stored response.
+
+        Args:
+            scope: Operation name; keys are unique per scope
+            key: Client-supplied Idempotency-Key
+            fingerprint: Hash of the request parameters
+            call: Performs the operation and returns its response
+
+        Returns:
+            The response of the first successful execution
+        """
+        cache_key = f"{scope}:{key}"
+        cached = await self._cache.get(cache_key)
+        if cached is not None:
+            self._check(fingerprint, cached[0])
+            return cached[1]
+
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self._check(fingerprint, inflight[0])
+            return copy.deepcopy(await asyncio.shield(inflight[1]))
+
+        future: "asyncio.Future[Any]" = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._inflight[cache_key] = (fingerprint, future)
+        try:
+            response = await self._execute(scope, key, fingerprint, call)
+        except BaseException as e:
+            error = (
+                e
+                if isinstance(e, Exception)
+                else IdempotencyError(
+                    "The original request was cancelled; retry",
+                    code="idempotency_in_progress",
+                )
+            )
+            future.set_exception(error)
+            # Waiters, if any, re-raise it; don't warn when there are none
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+
+        future.set_result(response)
+        await self._cache.set(
+            cache_key, (fingerprint, response), self.config.ttl_seconds
+        )
+        return copy.deepcopy(response)
+
+    async def _execute(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        async with self._sessionmaker() as session:
+            repo = IdempotencyKeyRepository(session)
+            return await self._execute_in(
+                repo, scope, key, fingerprint, call
+            )
+
+    async def _execute_in(
+        self,
+        repo: IdempotencyKeyRepository,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        deadline = time.monotonic() + self.config.wait_timeout
+        while True:
+            row, owned = await repo.claim(
+                scope,
+                key,
+                fingerprint,
+                self.config.lock_seconds,
+                self.config.ttl_seconds,
+            )
+            if owned:
+                break
+            if row is not None:
+                self._check(fingerprint, row.fingerprint)
+                if row.status == "completed":
+                    return row.response
+            if time.monotonic() >= deadline:
+                raise IdempotencyError(
+                    "A request with this Idempotency-Key is still in progress",
+                    code="idempotency_in_progress",
+                )
+            await asyncio.sleep(self.config.poll_interval)
+
+        renewing = asyncio.ensure_future(self._renew(scope, key))
+        try:
+            response = _to_json(await call())
+        except BaseException:
+            renewing.cancel()
+            try:
+                await asyncio.shield(repo.release(scope, key))
+            except Exception as e:
+                logger.error(
+                    f"Error releasing idempotency key {scope}:{key}: {str(e)}"
+                )
+            raise
+        renewing.cancel()
+
+        try:
+            await repo.complete(scope, key, response)
+        except Exception as e:
+            # The operation succeeded; retries are blocked until the lock
+            # expires
+            logger.error(
+                f"Error storing idempotent response for {scope}:{key}: "
+                f"{str(e)}"
+            )
+        return response
+
+    async def _renew(self, scope: str, key: str) -> None:
+        lock_seconds = self.config.lock_seconds
+        while True:
+            await asyncio.sleep(lock_seconds / 3)
+            try:
+                async with self._sessionmaker() as session:
+                    repo = IdempotencyKeyRepository(session)
+                    if not await repo.renew(scope, key, lock_seconds):
+                        return
+            except Exception as e:
+                logger.error(
+                    f"Error renewing idempotency key {scope}:{key}: {str(e)}"
+                )
+
+    @staticmethod
+    def _check(fingerprint: str, stored: str) -> None:
+        if fingerprint != stored:
+            raise IdempotencyError(
+                "Idempotency-Key was already used with different request "
+                "parameters",
+                code="idempotency_key_reused",
+            )
+
+
+def idempotent(
+    scope: str,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Make a PaymentService method honour its `idempotency_key` argument.
+
+    Calls without a key run as before. With a key, the call's other
+    arguments are fingerprinted and it is run through the service's
+    IdempotencyStore. The key is still passed to the method so it can be
+    forwarded to providers.
+    """
+
+    def decorator(
+        method: Callable[..., Awaitable[Any]],
+    ) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = bound.arguments.get("idempotency_key")
+            if not key or not self.db_session:
+                return await method(self, *args, **kwargs)
+            params = {
+                name: value
+                for name, value in bound.arguments.items()
+                if name not in ("self", "idempotency_key")
+            }
+            return await self.idempotency.run(
+                scope,
+                key,
+                request_fingerprint(scope, params),
+                lambda: method(self, *args, **kwargs),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def provider_idempotency_kwargs(
+    method: Any, scope: str, key: Optional[str]
+) -> Dict[str, str]:
+    """Keyword arguments forwarding `key` to a provider method taking one."""
+    if not key:
+        return {}
+    try:
+        parameters = inspect.signature(method).parameters
+    except (TypeError, ValueError):
+        return {}
+    if "idempotency_key" not in parameters:
+        return {}
+    return {"idempotency_key": f"{scope}:{key}"}
@@ -0,0 +1,461 @@
+"""Batch payment submission with per-provider concurrency limits."""
+
+import asyncio
+import logging
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Union,
+)
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.repositories import (
+    CustomerRepository,
+    PaymentRepository,
+    ProviderSnapshotRepository,
+    new_session,
+    unit_of_work,
+)
+from ..messaging.publishers import publish_batch
+from ..schemas.payment import PaymentBatchItem, PaymentCreate
+from ..utils.helpers import abatched
+from .idempotency import provider_idempotency_kwargs
+
+logger = logging.getLogger(__name__)
+
+# Batches still charging or storing; held so they are not garbage collected
+_running: Set["asyncio.Task[None]"] = set()
+_DONE = object()
+
+
+async def wait_for_batches(timeout: Optional[float] = None) -> int:
+    """
+    Wait for running payment batches to finish storing their payments.
+
+    Returns:
+        Number of batches still running when `timeout` ran out
+    """
+    if not _running:
+        return 0
+    _, pending = await asyncio.wait(list(_running), timeout=timeout)
+    return len(pending)
+
+
+def _payment_json(
+    values: Mapping[str, Any], provider_data: Any
+) -> Dict[str, Any]:
+    return {
+        "id": values["id"],
+        "customer_id": values["customer_id"],
+        "amount": values["amount"],
+        "currency": values["currency"],
+        "status": values["status"].value,
+        "payment_method": values["payment_method"],
+        "error_message": values["error_message"],
+        "provider": values["provider"],
+        "provider_payment_id": values["provider_payment_id"],
+        "created_at": values["created_at"].isoformat(),
+        "provider_data": provider_data,
+        "meta_info": values["meta_info"],
+    }
+
+
+class _Charge:
+    """One payment in a batch and its outcome."""
+
+    __slots__ = (
+        "result",
+        "payment",
+        "provider",
+        "payment_method_id",
+        "customer",
+        "provider_customer_id",
+        "idempotency_key",
+        "outcome",
+    )
+
+    def __init__(
+        self,
+        result: Dict[str, Any],
+        payment: Optional[PaymentCreate],
+        provider: Optional[str],
+        payment_method_id: Optional[str],
+        idempotency_key: Optional[str] = None,
+    ):
+        self.result = result
+        self.payment = payment
+        self.provider = provider
+        self.payment_method_id = payment_method_id
+        self.idempotency_key = idempotency_key
+        self.customer: Any = None
+        self.provider_customer_id: Optional[str] = None
+        self.outcome: Any = None
+
+
+class PaymentBatch:
+    """Charge many payments concurrently and store them in batches.
+
+    Input is consumed in batches of `batch_size`. Customers for a batch are
+    loaded with one query, provider calls run concurrently under a global
+    limit and optional per-provider limits, and the resulting payments are
+    inserted with one multi-row INSERT before their events are published
+    together. While one batch is being charged, the previous batch is
+    stored and its results are reported, in input order.
+
+    The work runs in a background task with its own database session, so
+    a consumer that stops reading (a client disconnecting from a streamed
+    response) cannot cancel it: every charge sent to a provider is stored.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        batch_size: int = 500,
+        concurrency: int = 10,
+        provider_concurrency: Optional[Dict[str, int]] = None,
+        sessionmaker: Optional[Callable[[], AsyncSession]] = None,
+    ):
+        self.service = service
+        self._sessionmaker = sessionmaker or new_session
+        self.batch_size = batch_size
+        self._global_limit = asyncio.Semaphore(concurrency)
+        self._provider_limits = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in (provider_concurrency or {}).items()
+        }
+
+    def run(
+        self,
+        payments: Union[Iterable[Any], AsyncIterable[Any]],
+        idempotency_key: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Start processing payments and return an iterator over the results.
+
+        Processing starts right away and runs to the end whether or not the
+        results are read.
+
+        Args:
+            payments: Payment payloads (dicts with the PaymentBatchItem
+                fields). An item that is an exception, such as a line that
+                failed to parse, is reported as a failed result.
+            idempotency_key: Key for the whole batch; items without their
+                own `idempotency_key` are sent to the provider with this key
+                and their index, so resending the batch never charges twice
+
+        Yields:
+            Dicts with the item "index", "status" ("created" or "failed")
+            and either the stored "payment" or an "error"
+        """
+        results: "asyncio.Queue[Any]" = asyncio.Queue()
+        task = asyncio.ensure_future(
+            self._process(payments, idempotency_key, results)
+        )
+        _running.add(task)
+        task.add_done_callback(_running.discard)
+        return self._relay(task, results)
+
+    @staticmethod
+    async def _relay(
+        task: "asyncio.Task[None]", results: "asyncio.Queue[Any]"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            result = await results.get()
+            if result is _DONE:
+                break
+            yield result
+        # Re-raise a failure of the batch; shielded so it is never cancelled
+        await asyncio.shield(task)
+
+    async def _process(
+        self,
+        payments: Union[Iterable[Any], AsyncIterable[Any]],
+        idempotency_key: Optional[str],
+        results: "asyncio.Queue[Any]",
+    ) -> None:
+        try:
+            async with self._sessionmaker() as session:
+                self.customer_repo = CustomerRepository(session)
+                self.payment_repo = PaymentRepository(session)
+                self.snapshot_repo = ProviderSnapshotRepository(session)
+                index = 0
+                charging: Optional["asyncio.Future[List[_Charge]]"] = None
+                try:
+                    async for chunk in abatched(payments, self.batch_size):
+                        prepared = await self._prepare(
+                            index, chunk, idempotency_key
+                        )
+                        index += len(chunk)
+                        # Charge this batch while the previous one is stored
+                        pending, charging = charging, asyncio.ensure_future(
+                            self._charge_all(prepared)
+                        )
+                        if pending is not None:
+                            for result in await self._store(await pending):
+                                results.put_nowait(result)
+                finally:
+                    # Charges already sent to providers are stored even if
+                    # reading the rest of the input failed
+                    if charging is not None:
+                        for result in await self._store(await charging):
+                            results.put_nowait(result)
+        finally:
+            results.put_nowait(_DONE)
+
+    async def _prepare(
+        self,
+        start: int,
+        chunk: List[Any],
+        idempotency_key: Optional[str] = None,
+    ) -> List[_Charge]:
+        """Validate a batch and resolve provider customers with one query.
+
+        Every item gets a _Charge so results stay in input order; items that
+        cannot be charged have their result marked failed and no customer.
+        """
+        charges: List[_Charge] = []
+        for offset, item in enumerate(chunk):
+            result: Dict[str, Any] = {"index": start + offset}
+            try:
+                if isinstance(item, Exception):
+                    raise item
+                payment = (
+                    item
+                    if isinstance(item, PaymentCreate)
+                    else PaymentBatchItem(**item)
+                )
+            except (ValidationError, ValueError, TypeError) as e:
+                result.update(status="failed", error=str(e))
+                charges.append(_Charge(result, None, None, None))
+                continue
+            # Same provider selection as PaymentService.process_payment
+            provider_name = payment.provider or self.service.default_provider
+            payment_method_id = payment.payment_method_id
+            if (
+                not payment.provider
+                and payment_method_id
+                and ":" in payment_method_id
+            ):
+                provider_name, payment_method_id = payment_method_id.split(
+                    ":", 1
+                )
+            key = getattr(payment, "idempotency_key", None)
+            if key is None and idempotency_key:
+                key = f"{idempotency_key}:{result['index']}"
+            charges.append(
+                _Charge(result, payment, provider_name, payment_method_id, key)
+            )
+
+        customers = await self.customer_repo.get_many_with_provider_customers(
+            [
+                charge.payment.customer_id
+                for charge in charges
+                if charge.payment is not None
+            ]
+        )
+        for charge in charges:
+            if charge.payment is None:
+                continue
+            customer = customers.get(charge.payment.customer_id)
+            if customer is None:
+                charge.result.update(
+                    status="failed",
+                    error=f"Customer not found: {charge.payment.customer_id}",
+                )
+                continue
+            link = next(
+                (
+                    pc
+                    for pc in customer.provider_customers
+                    if pc.provider == charge.provider
+                ),
+                None,
+            )
+            if link is None:
+                charge.result.update(
+                    status="failed",
+                    error=f"Customer not found for provider {charge.provider}",
+                )
+                continue
+            charge.customer = customer
+            charge.provider_customer_id = link.provider_customer_id
+        return charges
+
+    async def _charge_all(self, charges: List[_Charge]) -> List[_Charge]:
+        await asyncio.gather(
+            *(
+                self._charge(charge)
+                for charge in charges
+                if charge.customer is not None
+            )
+        )
+        return charges
+
+    async def _charge(self, charge: _Charge) -> None:
+        provider_limit = self._provider_limits.get(charge.provider)
+        if provider_limit is not None:
+            async with provider_limit:
+                await self._charge_limited(charge)
+        else:
+            await self._charge_limited(charge)
+
+    async def _charge_limited(self, charge: _Charge) -> None:
+        payment = charge.payment
+        async with self._global_limit:
+            try:
+                provider_instance = self.service.get_provider(charge.provider)
+                charge.outcome = await provider_instance.process_payment(
+                    amount=payment.amount,
+                    currency=payment.currency,
+                    provider_customer_id=charge.provider_customer_id,
+                    payment_method_id=charge.payment_method_id,
+                    description=payment.description,
+                    mandate_id=payment.mandate_id,
+                    meta_info=self.service._provider_payment_meta(
+                        charge.customer, payment.meta_info
+                    ),
+                    **provider_idempotency_kwargs(
+                        provider_instance.process_payment,
+                        "process_payment",
+                        charge.idempotency_key,
+                    ),
+                )
+            except Exception as e:
+                charge.outcome = e
+
+    async def _recorded(self, charges: List[_Charge]) -> Dict[Any, Any]:
+        """Payments already stored for charges that carry an idempotency key.
+
+        A provider answers a retried charge with the original payment, which
+        an earlier run of the batch may already have stored.
+        """
+        ids: Dict[str, List[str]] = {}
+        for charge in charges:
+            if charge.idempotency_key and isinstance(charge.outcome, dict):
+                ids.setdefault(charge.provider, []).append(
+                    charge.outcome["provider_payment_id"]
+                )
+        recorded: Dict[Any, Any] = {}
+        for provider, provider_payment_ids in ids.items():
+            found = await self.payment_repo.get_by_provider_payment_ids(
+                provider, provider_payment_ids
+            )
+            recorded.update(
+                ((provider, pid), payment) for pid, payment in found.items()
+            )
+        return recorded
+
+    async def _store(self, charges: List[_Charge]) -> List[Dict[str, Any]]:
+        charged = [charge for charge in charges if charge.customer is not None]
+        try:
+            recorded = await self._recorded(charged)
+        except Exception as e:
+            logger.error(f"Error looking up retried batch payments: {str(e)}")
+            recorded = {}
+        stored = []
+        for charge in charged:
+            if isinstance(charge.outcome, Exception):
+                charge.result.update(
+                    status="failed", error=str(charge.outcome)
+                )
+                continue
+            existing = recorded.get(
+                (charge.provider, charge.outcome["provider_payment_id"])
+            )
+            if existing is not None:
+                values = {
+                    c.name: getattr(existing, c.name)
+                    for c in existing.__table__.columns
+                }
+                charge.result.update(
+                    status="created",
+                    payment=_payment_json(
+                        values, charge.outcome.get("meta_info")
+                    ),
+                )
+                continue
+            payment = charge.payment
+            stored.append(
+                (
+                    charge,
+                    {
+                        "customer_id": payment.customer_id,
+                        "provider": charge.provider,
+                        "provider_payment_id": charge.outcome[
+                            "provider_payment_id"
+                        ],
+                        "amount": payment.amount,
+                        "currency": payment.currency,
+                        "status": charge.outcome["status"],
+                        "payment_method": charge.payment_method_id,
+                        "error_message": charge.outcome.get("error_message"),
+                        "meta_info": self.service._stored_payment_meta(
+                            payment.meta_info,
+                            charge.outcome,
+                            payment.description,
+                        ),
+                    },
+                )
+            )
+
+        try:
+            async with unit_of_work(self.payment_repo.session):
+                rows = await self.payment_repo.create_many(
+                    [entry for _, entry in stored]
+                )
+                await self.snapshot_repo.stage_many(
+                    "payment",
+                    (
+                        (
+                            row["id"],
+                            row["provider"],
+                            charge.outcome.get("meta_info"),
+                        )
+                        for (charge, _), row in zip(stored, rows)
+                    ),
+                    check_latest=False,
+                )
+        except Exception as e:
+            logger.error(f"Error storing batch payments: {str(e)}")
+            # The provider charged these payments; report their IDs so they
+            # can be reconciled.
+            for charge, entry in stored:
+                charge.result.update(
+                    status="failed",
+                    error=str(e),
+                    provider=entry["provider"],
+                    provider_payment_id=entry["provider_payment_id"],
+                )
+            return [charge.result for charge in charges]
+
+        events = []
+        for (charge, entry), row in zip(stored, rows):
+            payment = charge.payment
+            events.append(
+                self.service._payment_event(
+                    row["id"],
+                    payment.customer_id,
+                    payment.amount,
+                    payment.currency,
+                    charge.provider,
+                    charge.outcome,
+                )
+            )
+            charge.result.update(
+                status="created",
+                payment=_payment_json(row, charge.outcome.get("meta_info")),
+            )
+        await publish_batch(
+            self.service.event_publisher, events, "batch payment"
+        )
+        return [charge.result for charge in charges]
@@ -1,10 +1,24 @@
-from typing import Dict, Any, Optional, List
+from typing import (
+    Dict,
+    Any,
+    Optional,
+    List,
+    Awaitable,
+    Callable,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Tuple,
+    Union,
+)
+import asyncio
+import copy
 import logging
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..config.config_schema import PaymentConfig
-from ..providers import get_provider
+from ..providers import ProviderRegistry
 from ..messaging.publishers import PaymentEventPublisher, PaymentEvents
 from ..db.repositories import (
     BaseRepository,
@@ -14,7 +28,24 @@ from ..db.repositories import (
     SubscriptionRepository,
     ProductRepository,
     PlanRepository,
+    ProviderSnapshotRepository,
+    UsageRecordRepository,
+    UsageRollupRepository,
+    unit_of_work,
+)
+from ..db.repositories.base import decode_cursor
+from .archive import Archiver
+from .customer_import import CustomerImporter
+from .export import Exporter
+from .idempotency import (
+    IdempotencyStore,
+    idempotent,
+    provider_idempotency_kwargs,
 )
+from .payment_batch import PaymentBatch
+from .sync_pipeline import IncrementalSync, SyncPipeline
+from .usage_ingest import UsageIngestor
+from .usage_push import UsagePusher
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +58,7 @@ class PaymentService:
         config: PaymentConfig,
         event_publisher: PaymentEventPublisher,
         db_session=None,
+        registry: Optional[ProviderRegistry] = None,
     ):
         """
         Initialize the payment service.
@@ -35,22 +67,50 @@ class PaymentService:
             config: Payment configuration
             event_publisher: Event publisher for notifications
             db_session: Database session
+            registry: Shared provider registry; built from config if omitted
         """
         self.config = config
         self.default_provider = config.default_provider
         self.event_publisher = event_publisher
         self.db_session = db_session
 
-        # Initialize provider instances
-        self.providers = {}
-        for provider_name, provider_config in config.providers.items():
-            self.providers[provider_name] = get_provider(
-                provider_name, provider_config)
+        # Initialize provider instances (or reuse the process-wide registry)
+        self.registry = (
+            registry
+            if registry is not None
+            else ProviderRegistry.from_config(config)
+        )
+        self.providers = dict(self.registry)
+
+        # Shared by bound copies so in-flight duplicates see each other
+        self.idempotency = IdempotencyStore(config.idempotency)
+        # Shared so concurrent requests are written in the same batches
+        self.usage_ingestor = UsageIngestor(config.usage, event_publisher)
+        self.archiver = Archiver(config.archive)
+        self.exporter = Exporter(chunk_size=config.bulk.export_chunk_size)
 
         # Initialize repositories if session is provided
         if db_session:
             self.set_db_session(db_session)
 
+    def bind(self, session: AsyncSession) -> "PaymentService":
+        """
+        Return a request-scoped handle bound to the given database session.
+
+        The handle shares config, event publisher and provider instances with
+        this service but owns its session and repositories, so concurrent
+        requests never see each other's session.
+
+        Args:
+            session: SQLAlchemy AsyncSession for this request or job
+
+        Returns:
+            PaymentService bound to `session`
+        """
+        handle = copy.copy(self)
+        handle.set_db_session(session)
+        return handle
+
     def set_db_session(self, session: AsyncSession):
         """
         Set the database session.
@@ -113,18 +173,23 @@ class PaymentService:
 
         # Save to database if session available
         if hasattr(self, "customer_repo"):
-            # Persist address into the dedicated column. The repository will
-            # detect and migrate any address embedded in meta_info if needed.
-            customer = await self.customer_repo.create(
-                email=email, name=name, meta_info=meta_info, address=address
-            )
+            async with unit_of_work(self.db_session):
+                # Persist address into the dedicated column. The repository
+                # will detect and migrate any address embedded in meta_info
+                # if needed.
+                customer = await self.customer_repo.create(
+                    email=email,
+                    name=name,
+                    meta_info=meta_info,
+                    address=address,
+                )
 
-            # Link the provider's customer ID to our customer
-            await self.customer_repo.add_provider_customer(
-                customer_id=customer.id,
-                provider=provider or self.default_provider,
-                provider_customer_id=customer_data["provider_customer_id"],
-            )
+                # Link the provider's customer ID to our customer
+                await self.customer_repo.add_provider_customer(
+                    customer_id=customer.id,
+                    provider=provider or self.default_provider,
+                    provider_customer_id=customer_data["provider_customer_id"],
+                )
 
             # Return standardized customer data (include top-level address)
             return {
@@ -143,6 +208,40 @@ class PaymentService:
                 **customer_data,
             }
 
+    def import_customers(
+        self,
+        customers: Union[Iterable[Any], AsyncIterable[Any]],
+        provider: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Import many customers in batches.
+
+        Provider customers are created concurrently under
+        `config.bulk.concurrency`, and local customers and provider links
+        are inserted with multi-row INSERTs of `config.bulk.batch_size` rows.
+
+        Args:
+            customers: Customer payloads, as a list or an async stream
+            provider: Name of the provider to use (default is default_provider)
+
+        Returns:
+            Async iterator of per-item results in input order
+        """
+        if not self.db_session:
+            raise RuntimeError("Database session not set")
+
+        bulk_config = self.config.bulk
+        provider_name = provider or self.default_provider
+        importer = CustomerImporter(
+            self,
+            provider=provider_name,
+            batch_size=bulk_config.batch_size,
+            concurrency=bulk_config.provider_concurrency.get(
+                provider_name, bulk_config.concurrency
+            ),
+        )
+        return importer.run(customers)
+
     async def ensure_provider_customer(self, customer_id: str, provider: str) -> Dict[str, Any]:
         """Ensure the customer is registered with the requested provider."""
         if not self.db_session:
@@ -182,12 +281,54 @@ class PaymentService:
 
         return {"provider": provider, "provider_customer_id": provider_customer_id}
 
-    async def get_customer(self, customer_id: str) -> Optional[Dict[str, Any]]:
+    def _provider_timeout(self, provider_name: str) -> float:
+        """Return the read deadline for a provider, in seconds."""
+        provider_config = getattr(
+            self.providers.get(provider_name), "config", None
+        )
+        timeout = getattr(provider_config, "timeout", None)
+        return timeout if timeout is not None else self.config.provider_timeout
+
+    async def _call_provider_with_deadline(
+        self, provider_name: str, call: Awaitable[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Await a provider read call, converting failures into error entries.
+
+        Args:
+            provider_name: Provider the call is made against
+            call: Awaitable returning the provider payload
+
+        Returns:
+            Provider payload, {"error": "timeout"} if the deadline passed, or
+            {"error": <message>} if the call raised
+        """
+        try:
+            return await asyncio.wait_for(
+                call, timeout=self._provider_timeout(provider_name)
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Timed out retrieving data from provider {provider_name}"
+            )
+            return {"error": "timeout"}
+        except Exception as e:
+            logger.error(
+                f"Error retrieving provider data from {provider_name}: "
+                f"{str(e)}"
+            )
+            return {"error": str(e)}
+
+    async def get_customer(
+        self, customer_id: str, include_provider_data: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """
         Get customer details.
 
         Args:
             customer_id: Customer ID
+            include_provider_data: Fetch live data from each linked provider.
+                Provider calls run concurrently, each bounded by its timeout.
 
         Returns:
             Customer data if found, None otherwise
@@ -201,19 +342,37 @@ class PaymentService:
         if not customer:
             return None
 
-        # Get provider-specific data for each provider
+        # Get provider-specific data for each provider concurrently
         provider_data = {}
-        for provider_customer in customer.provider_customers:
-            provider_instance = self.get_provider(provider_customer.provider)
-            try:
-                provider_data[provider_customer.provider] = (
-                    await provider_instance.retrieve_customer(
+        if include_provider_data and customer.provider_customers:
+            calls = []
+            for provider_customer in customer.provider_customers:
+                try:
+                    provider_instance = self.get_provider(
+                        provider_customer.provider
+                    )
+                    call = provider_instance.retrieve_customer(
                         provider_customer.provider_customer_id
                     )
+                except Exception as e:
+                    logger.error(
+                        f"Error retrieving provider customer: {str(e)}"
+                    )
+                    provider_data[provider_customer.provider] = {
+                        "error": str(e)
+                    }
+                    continue
+                calls.append(
+                    (
+                        provider_customer.provider,
+                        self._call_provider_with_deadline(
+                            provider_customer.provider, call
+                        ),
+                    )
                 )
-            except Exception as e:
-                logger.error(f"Error retrieving provider customer: {str(e)}")
-                provider_data[provider_customer.provider] = {"error": str(e)}
+            results = await asyncio.gather(*(call for _, call in calls))
+            for (provider_name, _), data in zip(calls, results):
+                provider_data[provider_name] = data
 
         # Return combined data
         return {
@@ -228,7 +387,11 @@ class PaymentService:
                 {
                     "provider": pc.provider,
                     "provider_customer_id": pc.provider_customer_id,
-                    "provider_data": provider_data.get(pc.provider, {}),
+                    "provider_data": (
+                        provider_data.get(pc.provider, {})
+                        if include_provider_data
+                        else None
+                    ),
                 }
                 for pc in customer.provider_customers
             ],
@@ -240,8 +403,14 @@ class PaymentService:
         limit: int = 50,
         offset: int = 0,
         search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_meta_info: bool = True,
     ) -> List[Dict[str, Any]]:
-        """List customers stored in the service database."""
+        """List customers stored in the service database, newest first.
+
+        With `include_meta_info=False` meta_info is neither loaded nor
+        returned.
+        """
 
         if not self.db_session:
             raise RuntimeError("Database session not set")
@@ -252,6 +421,8 @@ class PaymentService:
             offset=offset,
             search=search,
             include_provider_customers=True,
+            cursor=cursor,
+            include_meta_info=include_meta_info,
         )
 
         results: List[Dict[str, Any]] = []
@@ -269,7 +440,9 @@ class PaymentService:
                     "id": customer.id,
                     "email": customer.email,
                     "name": customer.name,
-                    "meta_info": customer.meta_info,
+                    "meta_info": (
+                        customer.meta_info if include_meta_info else None
+                    ),
                     "address": customer.address,
                     "created_at": customer.created_at.isoformat(),
                     "updated_at": customer.updated_at.isoformat()
@@ -761,13 +934,16 @@ class PaymentService:
         *,
         limit: int = 50,
         offset: int = 0,
+        cursor: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """Return products stored in the local database."""
 
         if not self.db_session:
             raise RuntimeError("Database session not set")
 
-        products = await self.product_repo.list(limit=limit, offset=offset)
+        products = await self.product_repo.list(
+            limit=limit, offset=offset, cursor=cursor
+        )
         results: List[Dict[str, Any]] = []
         for product in products:
             meta_info = product.meta_info or {}
@@ -831,8 +1007,7 @@ class PaymentService:
         if not product:
             raise ValueError(f"Product not found: {product_id}")
 
-        # Get provider product ID from meta_info
-        provider_product_id = product.meta_info.get("provider_product_id")
+        provider_product_id = product.provider_product_id
         
         # For PayU, we don't create prices via API - just store locally
         if provider_name == "payu":
@@ -923,6 +1098,7 @@ class PaymentService:
         product_id: Optional[str] = None,
         limit: int = 50,
         offset: int = 0,
+        cursor: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """Return plans, optionally filtered by product."""
 
@@ -930,7 +1106,7 @@ class PaymentService:
             raise RuntimeError("Database session not set")
 
         plans = await self.plan_repo.list(
-            product_id=product_id, limit=limit, offset=offset
+            product_id=product_id, limit=limit, offset=offset, cursor=cursor
         )
 
         results: List[Dict[str, Any]] = []
@@ -962,6 +1138,7 @@ class PaymentService:
 
         return results
 
+    @idempotent("create_subscription")
     async def create_subscription(
         self,
         customer_id: str,
@@ -969,6 +1146,7 @@ class PaymentService:
         quantity: int = 1,
         trial_period_days: Optional[int] = None,
         meta_info: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Create a subscription for a customer.
@@ -979,6 +1157,8 @@ class PaymentService:
             quantity: Number of units/seats
             trial_period_days: Optional trial period in days
             meta_info: Optional subscription meta_info
+            idempotency_key: Optional key; repeated calls with it return the
+                first result instead of creating another subscription
 
         Returns:
             Created subscription data
@@ -1001,11 +1181,16 @@ class PaymentService:
         if not customer:
             raise ValueError(f"Customer not found: {customer_id}")
 
-        # Get provider from plan meta_info or from passed meta_info
-        provider_name = (meta_info or {}).get("provider") or plan.meta_info.get("provider")
-        provider_price_id = plan.meta_info.get("provider_price_id")
+        # Get provider from the plan or from passed meta_info
+        provider_name = (meta_info or {}).get("provider") or plan.provider
+        provider_price_id = plan.provider_price_id
         
-        logger.info(f"Provider resolution: meta_info provider={meta_info.get('provider') if meta_info else None}, plan provider={plan.meta_info.get('provider')}, resolved provider={provider_name}")
+        logger.info(
+            "Provider resolution: meta_info provider="
+            f"{meta_info.get('provider') if meta_info else None}, "
+            f"plan provider={plan.provider}, "
+            f"resolved provider={provider_name}"
+        )
         logger.info(f"Plan meta_info: {plan.meta_info}")
 
         # For PayU, we don't need provider_price_id since we don't create prices in external APIs
@@ -1021,7 +1206,10 @@ class PaymentService:
         )
         
         # For PayU and similar hosted providers, auto-create provider customer if not exists
-        if not provider_customer:
+        new_provider_customer_id = None
+        if provider_customer:
+            provider_customer_id = provider_customer.provider_customer_id
+        else:
             logger.info(f"Provider customer not found for {provider_name}, creating one")
             provider_instance = self.get_provider(provider_name)
             provider_customer_data = await provider_instance.create_customer(
@@ -1029,13 +1217,11 @@ class PaymentService:
                 name=customer.name,
                 meta_info=meta_info,
             )
-            
-            # Create provider customer link in database
-            provider_customer = await customer_repo.add_provider_customer(
-                customer_id=customer_id,
-                provider=provider_name,
-                provider_customer_id=provider_customer_data["provider_customer_id"],
-            )
+            # The link is stored together with the subscription below
+            new_provider_customer_id = provider_customer_data[
+                "provider_customer_id"
+            ]
+            provider_customer_id = new_provider_customer_id
 
         # Create subscription in provider
         provider_instance = self.get_provider(provider_name)
@@ -1063,15 +1249,24 @@ class PaymentService:
                     "phone": customer.meta_info.get("phone") if customer.meta_info else None,
                 }
         
-        logger.info(f"Calling {provider_name}.create_subscription with provider_customer_id={provider_customer.provider_customer_id}, price_id={provider_price_id}")
+        logger.info(
+            f"Calling {provider_name}.create_subscription with "
+            f"provider_customer_id={provider_customer_id}, "
+            f"price_id={provider_price_id}"
+        )
         logger.info(f"Passing meta_info to provider: {meta_info}")
         
         provider_subscription = await provider_instance.create_subscription(
-            provider_customer_id=provider_customer.provider_customer_id,
+            provider_customer_id=provider_customer_id,
             price_id=provider_price_id,
             quantity=quantity,
             trial_period_days=trial_period_days or plan.trial_period_days,
             meta_info=meta_info,
+            **provider_idempotency_kwargs(
+                provider_instance.create_subscription,
+                "create_subscription",
+                idempotency_key,
+            ),
         )
         
         logger.info(f"Provider {provider_name} returned subscription: status={provider_subscription.get('status')}, has_meta_info={provider_subscription.get('meta_info') is not None}")
@@ -1124,25 +1319,42 @@ class PaymentService:
                     "fields": {},
                 }
 
-        subscription = await subscription_repo.create(
-            customer_id=customer_id,
-            plan_id=plan_id,
-            provider=provider_name,
-            provider_subscription_id=provider_subscription["provider_subscription_id"],
-            status=provider_subscription["status"],
-            quantity=quantity,
-            current_period_start=current_period_start,
-            current_period_end=current_period_end,
-            cancel_at_period_end=provider_subscription.get(
-                "cancel_at_period_end", False
-            ),
-            meta_info={
-                **(meta_info or {}),
-                "provider_data": provider_subscription,  # Store full provider response
-                "redirect": redirect_info,
-                "checkout_config": checkout_config,  # Razorpay Checkout JS config (top-level)
-            },
-        )
+        async with unit_of_work(self.db_session):
+            if new_provider_customer_id:
+                await customer_repo.add_provider_customer(
+                    customer_id=customer_id,
+                    provider=provider_name,
+                    provider_customer_id=new_provider_customer_id,
+                )
+            subscription = await subscription_repo.create(
+                customer_id=customer_id,
+                plan_id=plan_id,
+                provider=provider_name,
+                provider_subscription_id=provider_subscription[
+                    "provider_subscription_id"
+                ],
+                status=provider_subscription["status"],
+                quantity=quantity,
+                current_period_start=current_period_start,
+                current_period_end=current_period_end,
+                cancel_at_period_end=provider_subscription.get(
+                    "cancel_at_period_end", False
+                ),
+                meta_info={
+                    **(meta_info or {}),
+                    "redirect": redirect_info,
+                    # Razorpay Checkout JS config (top-level)
+                    "checkout_config": checkout_config,
+                },
+            )
+            # The full provider response lives in provider_snapshots
+            await ProviderSnapshotRepository(self.db_session).stage(
+                "subscription",
+                subscription.id,
+                provider_name,
+                provider_subscription,
+                check_latest=False,
+            )
         
         logger.info(f"Subscription created in DB with id={subscription.id}, meta_info keys={list((subscription.meta_info or {}).keys())}")
         if subscription.meta_info.get('redirect'):
@@ -1185,6 +1397,7 @@ class PaymentService:
             ),
             "cancel_at_period_end": subscription.cancel_at_period_end,
             "created_at": subscription.created_at.isoformat(),
+            "provider_data": provider_subscription,
             "meta_info": subscription.meta_info or {},
         }
         
@@ -1258,8 +1471,14 @@ class PaymentService:
         status: Optional[str] = None,
         limit: int = 50,
         offset: int = 0,
+        cursor: Optional[str] = None,
+        include_meta_info: bool = True,
     ) -> List[Dict[str, Any]]:
-        """Return subscriptions filtered by optional criteria."""
+        """Return subscriptions filtered by optional criteria.
+
+        `provider_data`, the latest stored provider snapshot, is only
+        loaded together with meta_info.
+        """
 
         if not self.db_session:
             raise RuntimeError("Database session not set")
@@ -1270,12 +1489,27 @@ class PaymentService:
             limit=limit,
             offset=offset,
             include_plan=True,
+            cursor=cursor,
+            include_meta_info=include_meta_info,
         )
 
+        snapshots: Dict[str, Dict[str, Any]] = {}
+        if include_meta_info:
+            snapshots = await ProviderSnapshotRepository(
+                self.db_session
+            ).latest_many("subscription", [s.id for s in subscriptions])
+
         results: List[Dict[str, Any]] = []
         for subscription in subscriptions:
-            provider_data = None
-            if subscription.meta_info:
+            provider_data = snapshots.get(subscription.id, {}).get(
+                subscription.provider
+            )
+            if (
+                provider_data is None
+                and include_meta_info
+                and subscription.meta_info
+            ):
+                # Rows written before snapshots kept the payload in meta_info
                 provider_data = subscription.meta_info.get("provider_data")
             results.append(
                 {
@@ -1352,6 +1586,7 @@ class PaymentService:
         # Return updated subscription
         return await self.get_subscription(subscription_id)
 
+    @idempotent("process_payment")
     async def process_payment(
         self,
         customer_id: str,
@@ -1362,6 +1597,7 @@ class PaymentService:
         meta_info: Optional[Dict[str, Any]] = None,
         mandate_id: Optional[str] = None,
         provider: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Process a one-time payment.
@@ -1373,6 +1609,8 @@ class PaymentService:
             payment_method_id: Optional payment method ID
             description: Optional payment description
             meta_info: Optional payment meta_info
+            idempotency_key: Optional key; repeated calls with it return the
+                first result instead of charging again
 
         Returns:
             Payment data
@@ -1401,14 +1639,9 @@ class PaymentService:
                 f"Customer not found for provider {provider_name}")
 
         # Enrich meta info with customer context for providers that need it
-        request_meta_info = dict(meta_info or {})
-        provider_meta_payload = dict(request_meta_info)
-        provider_meta_payload["customer_context"] = {
-            "id": customer.id,
-            "email": customer.email,
-            "name": customer.name,
-            "meta_info": customer.meta_info or {},
-        }
+        provider_meta_payload = self._provider_payment_meta(
+            customer, meta_info
+        )
 
         # Process payment with provider
         provider_instance = self.get_provider(provider_name)
@@ -1420,52 +1653,47 @@ class PaymentService:
             description=description,
             mandate_id=mandate_id,
             meta_info=provider_meta_payload,
+            **provider_idempotency_kwargs(
+                provider_instance.process_payment,
+                "process_payment",
+                idempotency_key,
+            ),
         )
 
-        combined_meta_info = dict(request_meta_info)
-        if provider_payment.get("meta_info"):
-            combined_meta_info.setdefault("provider_data", {})
-            combined_meta_info["provider_data"][provider_name] = provider_payment["meta_info"]
-            # Bubble up checkout_config to the top level so _payment_payload can find it.
-            if provider_payment["meta_info"].get("checkout_config"):
-                combined_meta_info["checkout_config"] = provider_payment["meta_info"]["checkout_config"]
-        stored_meta_info = combined_meta_info or None
-
         # Create payment in database
         payment_repo = PaymentRepository(self.db_session)
-        payment = await payment_repo.create(
-            customer_id=customer_id,
-            provider=provider_name,
-            provider_payment_id=provider_payment["provider_payment_id"],
-            amount=amount,
-            currency=currency,
-            status=provider_payment["status"],
-            payment_method=payment_method_id,
-            error_message=provider_payment.get("error_message"),
-            meta_info=(
-                {**stored_meta_info, "description": description}
-                if stored_meta_info
-                else ({"description": description} if description else None)
-            ),
-        )
+        async with unit_of_work(self.db_session):
+            payment = await payment_repo.create(
+                customer_id=customer_id,
+                provider=provider_name,
+                provider_payment_id=provider_payment["provider_payment_id"],
+                amount=amount,
+                currency=currency,
+                status=provider_payment["status"],
+                payment_method=payment_method_id,
+                error_message=provider_payment.get("error_message"),
+                meta_info=self._stored_payment_meta(
+                    meta_info, provider_payment, description
+                ),
+            )
+            await ProviderSnapshotRepository(self.db_session).stage(
+                "payment",
+                payment.id,
+                provider_name,
+                provider_payment.get("meta_info"),
+                check_latest=False,
+            )
 
         # Publish event
-        event_type = (
-            PaymentEvents.PAYMENT_SUCCEEDED
-            if provider_payment["status"] == "COMPLETED"
-            else PaymentEvents.PAYMENT_CREATED
-        )
         await self.event_publisher.publish_event(
-            event_type,
-            {
-                "payment_id": payment.id,
-                "customer_id": customer_id,
-                "amount": amount,
-                "currency": currency,
-                "status": provider_payment["status"],
-                "provider": provider_name,
-                "provider_payment_id": provider_payment["provider_payment_id"],
-            },
+            *self._payment_event(
+                payment.id,
+                customer_id,
+                amount,
+                currency,
+                provider_name,
+                provider_payment,
+            )
         )
 
         # Return payment data
@@ -1480,16 +1708,118 @@ class PaymentService:
             "provider": payment.provider,
             "provider_payment_id": payment.provider_payment_id,
             "created_at": payment.created_at.isoformat(),
+            "provider_data": provider_payment.get("meta_info"),
             "meta_info": payment.meta_info,
         }
 
+    def process_payments(
+        self,
+        payments: Union[Iterable[Any], AsyncIterable[Any]],
+        idempotency_key: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process many one-time payments, such as nightly mandate debits.
+
+        Provider calls run concurrently under `config.bulk.concurrency` and
+        any `config.bulk.provider_concurrency` limits. Payments are stored
+        with one multi-row INSERT per batch of `config.bulk.batch_size`, and
+        their events are published together once the batch is committed.
+        The batch runs in the background with its own database session and
+        finishes even if the returned iterator is abandoned.
+
+        Args:
+            payments: Payment payloads with the fields of process_payment
+                and an optional per-item `idempotency_key`, as a list or an
+                async stream
+            idempotency_key: Optional key for the batch; items without their
+                own key are sent to the provider with this key and their index
+
+        Returns:
+            Async iterator of per-item results in input order
+        """
+        bulk_config = self.config.bulk
+        batch = PaymentBatch(
+            self,
+            batch_size=bulk_config.batch_size,
+            concurrency=bulk_config.concurrency,
+            provider_concurrency=bulk_config.provider_concurrency,
+        )
+        return batch.run(payments, idempotency_key)
+
+    @staticmethod
+    def _provider_payment_meta(
+        customer: Any, meta_info: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Payment meta_info sent to the provider, with customer context."""
+        provider_meta_payload = dict(meta_info or {})
+        provider_meta_payload["customer_context"] = {
+            "id": customer.id,
+            "email": customer.email,
+            "name": customer.name,
+            "meta_info": customer.meta_info or {},
+        }
+        return provider_meta_payload
+
+    @staticmethod
+    def _stored_payment_meta(
+        meta_info: Optional[Dict[str, Any]],
+        provider_payment: Dict[str, Any],
+        description: Optional[str],
+    ) -> Optional[Dict[str, Any]]:
+        """Payment meta_info stored locally.
+
+        The provider's full payload goes to provider_snapshots; only the
+        checkout config clients need is copied onto the row.
+        """
+        combined_meta_info = dict(meta_info or {})
+        if provider_payment.get("meta_info"):
+            # Bubble up checkout_config to the top level so _payment_payload can find it.
+            if provider_payment["meta_info"].get("checkout_config"):
+                combined_meta_info["checkout_config"] = provider_payment[
+                    "meta_info"
+                ]["checkout_config"]
+        stored_meta_info = combined_meta_info or None
+        if stored_meta_info:
+            return {**stored_meta_info, "description": description}
+        return {"description": description} if description else None
+
+    @staticmethod
+    def _payment_event(
+        payment_id: str,
+        customer_id: str,
+        amount: float,
+        currency: str,
+        provider_name: str,
+        provider_payment: Dict[str, Any],
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Event type and payload published for a processed payment."""
+        event_type = (
+            PaymentEvents.PAYMENT_SUCCEEDED
+            if provider_payment["status"] == "COMPLETED"
+            else PaymentEvents.PAYMENT_CREATED
+        )
+        return event_type, {
+            "payment_id": payment_id,
+            "customer_id": customer_id,
+            "amount": amount,
+            "currency": currency,
+            "status": provider_payment["status"],
+            "provider": provider_name,
+            "provider_payment_id": provider_payment["provider_payment_id"],
+        }
+
     async def sync_resources(
         self,
         resources: Optional[List[str]] = None,
         provider: Optional[str] = None,
         filters: Optional[Dict[str, Any]] = None,
-        limit: int = 100,
+        limit: Optional[int] = 100,
         offset: int = 0,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        progress: Optional[Dict[str, Any]] = None,
+        on_checkpoint: Optional[
+            Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+        ] = None,
     ) -> Dict[str, Any]:
         """Synchronize local DB state with provider(s).
 
@@ -1499,311 +1829,113 @@ class PaymentService:
         retrieval method for a resource, the resource is skipped for that
         provider.
 
+        Rows are streamed in batches (`config.sync.batch_size`); provider
+        calls for a batch run concurrently under `config.sync.concurrency`
+        and any `config.sync.provider_concurrency` limits, and each batch is
+        written in a single transaction.
+
         Args:
             resources: list of resource names to sync (customers, products,
                 plans, payments, subscriptions, payment_methods). If None,
                 all supported resources are synced.
             provider: optional provider name to limit sync to one provider.
             filters: resource-specific filters e.g. {'customer_id': '...'}
-            limit/offset: pagination for resource listing.
+            limit/offset: pagination for resource listing; a limit of None
+                walks every row with a keyset cursor.
+            checkpoint/progress: saved cursors and counters to resume a
+                full walk from; `checkpoint` is updated in place.
+            on_checkpoint: awaited with (checkpoint, progress) after each
+                batch so callers can persist them.
 
         Returns:
-            A dict summarizing how many items were examined/updated and any
-            errors encountered for each resource.
+            A dict summarizing how many items were examined/updated, any
+            errors encountered and the throughput (rows/s) for each resource.
         """
         if not self.db_session:
             raise RuntimeError("Database session not set")
 
-        supported = [
-            "customers",
-            "products",
-            "plans",
-            "payments",
-            "subscriptions",
-            "payment_methods",
-        ]
-
-        to_sync = set(resources or supported)
-        result: Dict[str, Any] = {r: {"synced": 0, "updated": 0, "created": 0, "errors": []} for r in to_sync if r in supported}
-        filters = filters or {}
-
-        # CUSTOMERS
-        if "customers" in to_sync:
-            try:
-                cust_repo = CustomerRepository(self.db_session)
-                if filters.get("customer_id"):
-                    customers = [await cust_repo.get_with_provider_customers(filters["customer_id"])]
-                else:
-                    customers = await cust_repo.list(limit=limit, offset=offset, include_provider_customers=True)
-
-                for customer in customers:
-                    if not customer:
-                        continue
-                    result["customers"]["synced"] += 1
-                    # For each provider link, try to retrieve provider data
-                    for pc in customer.provider_customers:
-                        if provider and pc.provider != provider:
-                            continue
-                        provider_instance = self.get_provider(pc.provider)
-                        retrieve = getattr(provider_instance, "retrieve_customer", None)
-                        if not callable(retrieve):
-                            continue
-                        try:
-                            pdata = await retrieve(pc.provider_customer_id)
-                            # Persist provider data into customer.meta_info.provider_data
-                            meta = dict(customer.meta_info or {})
-                            provider_map = dict(meta.get("provider_data") or {})
-                            provider_map[pc.provider] = pdata
-                            meta["provider_data"] = provider_map
-                            await cust_repo.update(customer.id, meta_info=meta)
-                            result["customers"]["updated"] += 1
-                        except Exception as e:
-                            result["customers"]["errors"].append(str(e))
-            except Exception as e:
-                result["customers"]["errors"].append(str(e))
-
-        # PRODUCTS
-        if "products" in to_sync:
-            try:
-                prod_repo = ProductRepository(self.db_session)
-                if filters.get("product_id"):
-                    prods = [await prod_repo.get_by_id(filters["product_id"])]
-                else:
-                    prods = await prod_repo.list(limit=limit, offset=offset)
-
-                for p in prods:
-                    if not p:
-                        continue
-                    result["products"]["synced"] += 1
-                    meta = p.meta_info or {}
-                    prov = provider or meta.get("provider")
-                    prov_pid = meta.get("provider_product_id")
-                    if not prov or not prov_pid:
-                        continue
-                    provider_instance = self.get_provider(prov)
-                    retrieve = getattr(provider_instance, "retrieve_product", None)
-                    if not callable(retrieve):
-                        # provider doesn't expose retrieve_product: skip
-                        continue
-                    try:
-                        pdata = await retrieve(prov_pid)
-                        provider_map = dict(meta.get("provider_data") or {})
-                        provider_map[prov] = pdata
-                        meta["provider_data"] = provider_map
-                        await prod_repo.update(p.id, meta_info=meta)
-                        result["products"]["updated"] += 1
-                    except Exception as e:
-                        result["products"]["errors"].append(str(e))
-            except Exception as e:
-                result["products"]["errors"].append(str(e))
-
-        # PLANS
-        if "plans" in to_sync:
-            try:
-                plan_repo = PlanRepository(self.db_session)
-                if filters.get("plan_id"):
-                    plans = [await plan_repo.get_by_id(filters["plan_id"])]
-                else:
-                    plans = await plan_repo.list(limit=limit, offset=offset)
-
-                for pl in plans:
-                    if not pl:
-                        continue
-                    result["plans"]["synced"] += 1
-                    meta = pl.meta_info or {}
-                    prov = provider or meta.get("provider")
-                    prov_price_id = meta.get("provider_price_id")
-                    if not prov or not prov_price_id:
-                        continue
-                    provider_instance = self.get_provider(prov)
-                    # Try a couple of possible method names
-                    retrieve = getattr(provider_instance, "retrieve_price", None) or getattr(provider_instance, "retrieve_plan", None)
-                    if not callable(retrieve):
-                        continue
-                    try:
-                        pdata = await retrieve(prov_price_id)
-                        provider_map = dict(meta.get("provider_data") or {})
-                        provider_map[prov] = pdata
-                        meta["provider_data"] = provider_map
-                        await plan_repo.update(pl.id, meta_info=meta)
-                        result["plans"]["updated"] += 1
-                    except Exception as e:
-                        result["plans"]["errors"].append(str(e))
-            except Exception as e:
-                result["plans"]["errors"].append(str(e))
+        sync_config = self.config.sync
+        pipeline = SyncPipeline(
+            self,
+            batch_size=sync_config.batch_size,
+            concurrency=sync_config.concurrency,
+            provider_concurrency=sync_config.provider_concurrency,
+            provider_filter=provider,
+        )
+        return await pipeline.run(
+            resources=resources,
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            checkpoint=checkpoint,
+            progress=progress,
+            on_checkpoint=on_checkpoint,
+        )
 
-        # SUBSCRIPTIONS
-        if "subscriptions" in to_sync:
-            try:
-                sub_repo = SubscriptionRepository(self.db_session)
-                if filters.get("subscription_id"):
-                    subs = [await sub_repo.get_by_id(filters["subscription_id"])]
-                else:
-                    subs = await sub_repo.list(limit=limit, offset=offset, include_plan=True)
-
-                for s in subs:
-                    if not s:
-                        continue
-                    result["subscriptions"]["synced"] += 1
-                    if provider and s.provider != provider:
-                        continue
-                    provider_instance = self.get_provider(s.provider)
-                    retrieve = getattr(provider_instance, "retrieve_subscription", None)
-                    if not callable(retrieve):
-                        continue
-                    try:
-                        pdata = await retrieve(s.provider_subscription_id)
-                        # Update local subscription fields where appropriate
-                        update_fields: Dict[str, Any] = {}
-                        status = pdata.get("status")
-                        if status:
-                            update_fields["status"] = status
-                        cps = pdata.get("current_period_start") or pdata.get("current_period_start_iso")
-                        cpe = pdata.get("current_period_end") or pdata.get("current_period_end_iso")
-                        if cps:
-                            try:
-                                update_fields["current_period_start"] = (
-                                    datetime.fromisoformat(cps.replace("Z", "+00:00"))
-                                    if isinstance(cps, str)
-                                    else cps
-                                )
-                            except Exception:
-                                pass
-                        if cpe:
-                            try:
-                                update_fields["current_period_end"] = (
-                                    datetime.fromisoformat(cpe.replace("Z", "+00:00"))
-                                    if isinstance(cpe, str)
-                                    else cpe
-                                )
-                            except Exception:
-                                pass
-                        if "cancel_at_period_end" in pdata:
-                            update_fields["cancel_at_period_end"] = pdata.get("cancel_at_period_end")
-                        if update_fields:
-                            await sub_repo.update(s.id, **update_fields)
-                            result["subscriptions"]["updated"] += 1
-                    except Exception as e:
-                        result["subscriptions"]["errors"].append(str(e))
-            except Exception as e:
-                result["subscriptions"]["errors"].append(str(e))
+    async def sync_changes(
+        self,
+        resources: Optional[List[str]] = None,
+        provider: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Apply only the provider-side changes made since the last run.
 
-        # PAYMENTS
-        if "payments" in to_sync:
-            try:
-                pay_repo = PaymentRepository(self.db_session)
-                if filters.get("payment_id"):
-                    pays = [await pay_repo.get_by_id(filters["payment_id"])]
-                else:
-                    pays = await pay_repo.list(limit=limit, offset=offset)
-
-                for p in pays:
-                    if not p:
-                        continue
-                    result["payments"]["synced"] += 1
-                    if provider and p.provider != provider:
-                        continue
-                    provider_instance = self.get_provider(p.provider)
-                    retrieve = getattr(provider_instance, "retrieve_payment", None)
-                    if not callable(retrieve):
-                        continue
-                    try:
-                        pdata = await retrieve(p.provider_payment_id)
-                        update_fields = {}
-                        if pdata.get("status"):
-                            update_fields["status"] = pdata.get("status")
-                        if pdata.get("meta_info"):
-                            update_fields["meta_info"] = {**(p.meta_info or {}), "provider_data": {p.provider: pdata.get("meta_info")}}
-                        if update_fields:
-                            await pay_repo.update(p.id, **update_fields)
-                            result["payments"]["updated"] += 1
-                    except Exception as e:
-                        result["payments"]["errors"].append(str(e))
-            except Exception as e:
-                result["payments"]["errors"].append(str(e))
+        Reads each provider's change feed (Stripe events, Razorpay lists
+        filtered by `from`) starting at the high-water mark stored per
+        provider and resource, updates the matching local rows and advances
+        the mark in the same transaction. The first run for a provider only
+        records its current position.
 
-        # PAYMENT METHODS (attempt reconcile provider-side saved methods)
-        if "payment_methods" in to_sync:
-            try:
-                cust_repo = CustomerRepository(self.db_session)
-                pm_repo = PaymentMethodRepository(self.db_session)
-                # If a customer_id filter is present we only fetch for that customer
-                if filters.get("customer_id"):
-                    customers = [await cust_repo.get_with_provider_customers(filters["customer_id"])]
-                else:
-                    customers = await cust_repo.list(limit=limit, offset=offset, include_provider_customers=True)
-
-                for customer in customers:
-                    if not customer:
-                        continue
-                    # For each provider-link, fetch provider's payment methods
-                    for pc in customer.provider_customers:
-                        if provider and pc.provider != provider:
-                            continue
-                        prov = pc.provider
-                        provider_instance = self.get_provider(prov)
-                        list_pm = getattr(provider_instance, "list_payment_methods", None)
-                        if not callable(list_pm):
-                            continue
-                        try:
-                            pms = await list_pm(pc.provider_customer_id)
-                            result["payment_methods"]["synced"] += len(pms)
-                            for pm in pms:
-                                # pm should include payment_method_id and card data
-                                pid = pm.get("payment_method_id")
-                                if not pid:
-                                    continue
-                                existing = await pm_repo.get_by_provider_method_id(prov, pid)
-                                if existing:
-                                    # update metadata
-                                    await pm_repo.update(existing.id, meta_info={**(existing.meta_info or {}), "provider_data": pm})
-                                    result["payment_methods"]["updated"] += 1
-                                else:
-                                    # create new DB-backed method
-                                    card = pm.get("card") or {}
-                                    await pm_repo.create(
-                                        customer_id=customer.id,
-                                        provider=prov,
-                                        provider_payment_method_id=pid,
-                                        mandate_id=pm.get("mandate_id"),
-                                        is_default=pm.get("is_default", False),
-                                        card_brand=card.get("brand"),
-                                        card_last4=card.get("last4"),
-                                        card_exp_month=card.get("exp_month"),
-                                        card_exp_year=card.get("exp_year"),
-                                        meta_info={"provider_data": pm},
-                                    )
-                                    result["payment_methods"]["created"] += 1
-                        except Exception as e:
-                            result["payment_methods"]["errors"].append(str(e))
-            except Exception as e:
-                result["payment_methods"]["errors"].append(str(e))
+        Args:
+            resources: list of resource names (customers, subscriptions,
+                payments). If None, all incremental resources are synced.
+            provider: optional provider name to limit sync to one provider.
 
-        # Convert result payload items into simpler dicts
-        # (ensure errors lists exist)
-        for k, v in result.items():
-            if "errors" not in v or v["errors"] is None:
-                v["errors"] = []
+        Returns:
+            A dict summarizing how many changes were read and applied, any
+            errors encountered and the throughput for each resource.
+        """
+        if not self.db_session:
+            raise RuntimeError("Database session not set")
 
-        return {"summary": result}
+        sync = IncrementalSync(
+            self,
+            batch_size=self.config.sync.batch_size,
+            provider_filter=provider,
+        )
+        return await sync.run(resources=resources)
 
-    async def create_sync_job(self, resources: Optional[List[str]] = None, provider: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def create_sync_job(
+        self,
+        resources: Optional[List[str]] = None,
+        provider: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        mode: str = "full",
+    ) -> Dict[str, Any]:
         """Create a SyncJob record and return its basic details.
 
-        Actual work is performed by execute_sync_job which is expected to be
-        scheduled as a background task by the API layer.
+        Actual work is performed by execute_sync_job, run by whichever sync
+        worker (see fastapi_payments.workers) claims the queued job. `mode`
+        is "full" to walk every local row or "incremental" to apply only
+        provider changes since the last run.
         """
         if not self.db_session:
             raise RuntimeError("Database session not set")
 
-        job = await self.sync_job_repo.create(resources=resources, provider=provider, filters=filters)
+        job = await self.sync_job_repo.create(
+            resources=resources, provider=provider, filters=filters, mode=mode
+        )
         return {"id": job.id, "status": job.status, "created_at": job.created_at.isoformat(), "updated_at": job.updated_at.isoformat()}
 
     async def execute_sync_job(self, job_id: str):
         """Run sync_resources for a previously created job and persist results.
 
-        This method will set job status to 'running', invoke sync_resources,
-        and finally store the result and mark job 'completed' or 'failed'.
+        This method will set job status to 'running', walk every row of the
+        requested resources, and finally store the result and mark job
+        'completed' or 'failed'. A checkpoint and progress counters are saved
+        on the job after each batch; running a job again (for example after
+        the process crashed mid-way) resumes from its last checkpoint. A job
+        with a resource that stopped on an error is left running for the
+        sync worker to retry once its lease expires.
         """
         # For background execution we cannot rely on the request-scoped DB
         # session. Create a fresh session from the repositories' sessionmaker
@@ -1814,26 +1946,89 @@ class PaymentService:
             raise RuntimeError("Database not initialized; cannot run job")
 
         async with _sessionmaker() as session:
-            # Use a fresh PaymentService instance tied to this session so
-            # repositories use a valid session for the duration of the job.
-            svc = PaymentService(self.config, self.event_publisher, session)
+            # Bind a handle to this session so repositories use a valid
+            # session for the duration of the job without rebuilding providers.
+            svc = self.bind(session)
 
             job = await svc.sync_job_repo.get_by_id(job_id)
             if not job:
                 raise ValueError(f"Sync job not found: {job_id}")
 
+            checkpoint = copy.deepcopy(job.checkpoint or {})
+            progress = copy.deepcopy(job.progress or {})
+            if checkpoint:
+                logger.info(f"Resuming sync job {job_id} from checkpoint")
+
             # mark running
             await svc.sync_job_repo.update_status(job_id, "running")
 
+            async def save_checkpoint(
+                checkpoint: Dict[str, Any], progress: Dict[str, Any]
+            ) -> None:
+                await svc.sync_job_repo.save_checkpoint(
+                    job_id, checkpoint, progress
+                )
+
             try:
-                res = await svc.sync_resources(resources=job.resources, provider=job.provider, filters=job.filters)
+                if getattr(job, "mode", "full") == "incremental":
+                    res = await svc.sync_changes(
+                        resources=job.resources, provider=job.provider
+                    )
+                    await svc.sync_job_repo.update_status(
+                        job_id, "completed", result=res
+                    )
+                    return
+                res = await svc.sync_resources(
+                    resources=job.resources,
+                    provider=job.provider,
+                    filters=job.filters,
+                    limit=None,
+                    checkpoint=checkpoint,
+                    progress=progress,
+                    on_checkpoint=save_checkpoint,
+                )
+                if res.get("incomplete"):
+                    # Stay "running": once the lease expires the job is
+                    # claimed again and resumes from its checkpoint, until
+                    # sync.max_attempts claims have been used up
+                    logger.warning(
+                        f"Sync job {job_id} stopped early on "
+                        f"{', '.join(res['incomplete'])}"
+                    )
+                    await svc.sync_job_repo.update_status(
+                        job_id, "running", result=res
+                    )
+                    return
                 await svc.sync_job_repo.update_status(job_id, "completed", result=res)
             except Exception as e:
                 await svc.sync_job_repo.update_status(job_id, "failed", result={"error": str(e)})
                 raise
 
+    async def resume_sync_jobs(self) -> List[str]:
+        """Run queued jobs and resume jobs interrupted mid-way.
+
+        Jobs are claimed with the same lease as the sync worker pool, so
+        this is safe to call while workers are running.
+
+        Returns:
+            IDs of the jobs that were executed
+        """
+        from ..workers import SyncWorker
+
+        worker = SyncWorker(self)
+        job_ids: List[str] = []
+        while True:
+            job_id = await worker.run_once()
+            if job_id is None:
+                return job_ids
+            job_ids.append(job_id)
+
+    @idempotent("refund_payment")
     async def refund_payment(
-        self, payment_id: str, amount: Optional[float] = None
+        self,
+        payment_id: str,
+        amount: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Refund a payment, partially or fully.
@@ -1841,6 +2036,8 @@ class PaymentService:
         Args:
             payment_id: Payment ID
             amount: Optional refund amount (full refund if not specified)
+            idempotency_key: Optional key; repeated calls with it return the
+                first result instead of refunding again
 
         Returns:
             Updated payment data
@@ -1857,7 +2054,13 @@ class PaymentService:
         # Refund payment in provider
         provider_instance = self.get_provider(payment.provider)
         refund = await provider_instance.refund_payment(
-            payment.provider_payment_id, amount
+            payment.provider_payment_id,
+            amount,
+            **provider_idempotency_kwargs(
+                provider_instance.refund_payment,
+                "refund_payment",
+                idempotency_key,
+            ),
         )
 
         # Update payment in database
@@ -1903,8 +2106,18 @@ class PaymentService:
         status: Optional[str] = None,
         limit: int = 50,
         offset: int = 0,
+        cursor: Optional[str] = None,
+        include_meta_info: bool = True,
+        include_archived: bool = False,
     ) -> List[Dict[str, Any]]:
-        """Return payments filtered by optional criteria."""
+        """Return payments filtered by optional criteria.
+
+        With `include_meta_info=False` meta_info is neither loaded nor
+        returned, and neither is `provider_data`, the latest stored provider
+        snapshot. With `include_archived=True` a page that runs past the
+        oldest payment still in the database continues with archived
+        payments (see `archive_old_rows`).
+        """
 
         if not self.db_session:
             raise RuntimeError("Database session not set")
@@ -1914,14 +2127,32 @@ class PaymentService:
             status=status,
             limit=limit,
             offset=offset,
-            include_customer=True,
+            include_customer=False,
+            cursor=cursor,
+            include_meta_info=include_meta_info,
         )
 
+        snapshots: Dict[str, Dict[str, Any]] = {}
+        if include_meta_info:
+            snapshots = await ProviderSnapshotRepository(
+                self.db_session
+            ).latest_many("payment", [p.id for p in payments])
+
         results: List[Dict[str, Any]] = []
         for payment in payments:
             status_value = (
                 payment.status.value if hasattr(payment.status, "value") else payment.status
             )
+            provider_data = snapshots.get(payment.id, {}).get(payment.provider)
+            if (
+                provider_data is None
+                and include_meta_info
+                and payment.meta_info
+            ):
+                # Rows written before snapshots kept the payload in meta_info
+                provider_data = (
+                    payment.meta_info.get("provider_data") or {}
+                ).get(payment.provider)
             results.append(
                 {
                     "id": payment.id,
@@ -1935,12 +2166,93 @@ class PaymentService:
                     "provider": payment.provider,
                     "provider_payment_id": payment.provider_payment_id,
                     "created_at": payment.created_at.isoformat(),
-                    "meta_info": payment.meta_info,
+                    "provider_data": provider_data,
+                    "meta_info": (
+                        payment.meta_info if include_meta_info else None
+                    ),
                 }
             )
 
+        if include_archived and len(results) < limit:
+            before, skip = None, 0
+            if results:
+                before = (
+                    datetime.fromisoformat(results[-1]["created_at"]),
+                    results[-1]["id"],
+                )
+            else:
+                before = decode_cursor(cursor) if cursor else None
+                if offset:
+                    # The offset also skipped every live payment
+                    live = await self.payment_repo.count(
+                        customer_id=customer_id, status=status
+                    )
+                    skip = max(offset - live, 0)
+            archived = await self.archiver.list_payments(
+                customer_id=customer_id,
+                status=status,
+                before=before,
+                limit=limit - len(results),
+                skip=skip,
+            )
+            for row in archived:
+                results.append(
+                    {
+                        **{
+                            key: row.get(key)
+                            for key in (
+                                "id",
+                                "customer_id",
+                                "amount",
+                                "refunded_amount",
+                                "currency",
+                                "status",
+                                "payment_method",
+                                "error_message",
+                                "provider",
+                                "provider_payment_id",
+                                "created_at",
+                            )
+                        },
+                        "provider_data": (
+                            row.get("provider_data")
+                            if include_meta_info
+                            else None
+                        ),
+                        "meta_info": (
+                            row.get("meta_info") if include_meta_info else None
+                        ),
+                    }
+                )
+
         return results
 
+    def export(
+        self,
+        resource: str,
+        format: str = "ndjson",
+        *,
+        status: Optional[str] = None,
+        provider: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream matching payments, subscriptions or customers as NDJSON or CSV.
+
+        The export reads through a server-side cursor in its own session,
+        `bulk.export_chunk_size` rows at a time, and does not need a bound
+        database session. Invalid arguments raise ValueError immediately.
+        """
+        return self.exporter.export(
+            resource,
+            format,
+            status=status,
+            provider=provider,
+            created_from=created_from,
+            created_to=created_to,
+        )
+
     async def record_usage(
         self,
         subscription_id: str,
@@ -1951,6 +2263,9 @@ class PaymentService:
         """
         Record usage for a subscription.
 
+        Usage is stored locally and reported to the provider in aggregate
+        by push_usage, not per call.
+
         Args:
             subscription_id: Subscription ID
             quantity: Usage quantity
@@ -1969,18 +2284,8 @@ class PaymentService:
         if not subscription:
             raise ValueError(f"Subscription not found: {subscription_id}")
 
-        # Record usage with provider
-        provider_instance = self.get_provider(subscription.provider)
-        usage = await provider_instance.record_usage(
-            subscription.provider_subscription_id, quantity, timestamp
-        )
-
-        # Record usage in database
-        from ..db.models import UsageRecord
-
-        usage_repo = BaseRepository(UsageRecord, self.db_session)
-
-        usage_record = await usage_repo.create(
+        # Record usage in database, together with its rollups
+        usage_record = await UsageRecordRepository(self.db_session).create(
             subscription_id=subscription_id,
             quantity=quantity,
             timestamp=(
@@ -1996,21 +2301,164 @@ class PaymentService:
             {
                 "subscription_id": subscription_id,
                 "quantity": quantity,
-                "timestamp": usage_record.timestamp.isoformat(),
+                "timestamp": usage_record["timestamp"].isoformat(),
                 "description": description,
             },
         )
 
         # Return usage data
         return {
-            "id": usage_record.id,
-            "subscription_id": usage_record.subscription_id,
-            "quantity": usage_record.quantity,
-            "timestamp": usage_record.timestamp.isoformat(),
-            "description": usage_record.description,
-            "provider_usage_id": usage.get("id"),
+            "id": usage_record["id"],
+            "subscription_id": usage_record["subscription_id"],
+            "quantity": usage_record["quantity"],
+            "timestamp": usage_record["timestamp"].isoformat(),
+            "description": usage_record["description"],
+        }
+
+    async def ingest_usage(self, events: Iterable[Any]) -> Dict[str, Any]:
+        """
+        Record many usage events through the buffered usage ingestor.
+
+        Events from concurrent callers are written together with multi-row
+        INSERTs; this returns once the events are committed. Providers
+        receive the usage later through push_usage.
+
+        Args:
+            events: Usage payloads with the UsageEventCreate fields
+
+        Returns:
+            Counts of "recorded" and "failed" events and per-event "results"
+        """
+        results = await self.usage_ingestor.submit(list(events))
+        recorded = sum(1 for r in results if r["status"] == "recorded")
+        return {
+            "recorded": recorded,
+            "failed": len(results) - recorded,
+            "results": results,
+        }
+
+    async def get_usage_summary(
+        self,
+        subscription_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Total usage of a subscription, read from usage rollups.
+
+        Args:
+            subscription_id: Subscription ID
+            start: Start of the range; defaults to the current period start
+            end: End of the range (exclusive); defaults to the current period
+                end
+
+        Returns:
+            The subscription ID, the range and the total "quantity"
+        """
+        if not self.db_session:
+            raise RuntimeError("Database session not set")
+
+        subscription = await SubscriptionRepository(self.db_session).get_by_id(
+            subscription_id
+        )
+        if not subscription:
+            raise ValueError(f"Subscription not found: {subscription_id}")
+
+        start = start or subscription.current_period_start
+        end = end or subscription.current_period_end
+        if start is None or end is None:
+            raise ValueError(
+                "Subscription has no current period; pass start and end"
+            )
+
+        quantity = await UsageRollupRepository(self.db_session).total(
+            subscription_id, start, end
+        )
+        return {
+            "subscription_id": subscription_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "quantity": quantity,
         }
 
+    async def get_usage_totals(
+        self,
+        start: datetime,
+        end: datetime,
+        subscription_ids: Optional[List[str]] = None,
+    ) -> Dict[str, float]:
+        """
+        Total usage per subscription over one range, e.g. for invoicing.
+
+        Args:
+            start: Start of the range
+            end: End of the range (exclusive)
+            subscription_ids: Subscriptions to total; all by default
+
+        Returns:
+            Quantity keyed by subscription ID, for subscriptions with usage
+        """
+        if not self.db_session:
+            raise RuntimeError("Database session not set")
+
+        return await UsageRollupRepository(self.db_session).totals(
+            subscription_ids, start, end
+        )
+
+    async def compact_usage_rollups(
+        self,
+        start: datetime,
+        end: datetime,
+        subscription_ids: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Recompute usage rollups for a range from raw usage records.
+
+        Rollups are kept current as usage is recorded; run this once to
+        backfill usage recorded before rollups existed, or periodically
+        over recent days if usage rows are also inserted by other means.
+
+        Returns:
+            Number of hourly buckets written
+        """
+        if not self.db_session:
+            raise RuntimeError("Database session not set")
+
+        return await UsageRollupRepository(self.db_session).rebuild(
+            start, end, subscription_ids
+        )
+
+    async def archive_old_rows(
+        self, now: Optional[datetime] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Move payments and usage records past their `archive` horizon to files.
+
+        Run periodically (every `archive.interval` seconds), e.g. by the
+        worker started with ``--archive``. Usage rollups are kept, so usage
+        totals still include archived records; do not run
+        `compact_usage_rollups` over archived time ranges.
+
+        Returns:
+            Per table, the number of rows "archived" and "files" written
+        """
+        return await self.archiver.archive_expired(now)
+
+    async def push_usage(
+        self, now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Report unreported usage to providers, one call per subscription item.
+
+        Run periodically (every `usage.push_interval` seconds), e.g. by
+        the worker started with ``--usage-push``. Safe to retry and to run
+        from more than one process.
+
+        Returns:
+            Counts of "pushed", "failed" and "skipped" pushes
+        """
+        return await UsagePusher(self).push_once(now)
+
     async def handle_webhook(
         self, provider: str, payload: Any, signature: Optional[str] = None
     ) -> Dict[str, Any]:
@@ -0,0 +1,955 @@
+"""Streaming pipeline that reconciles local rows with provider state."""
+
+import asyncio
+import copy
+import logging
+import time
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from ..db.repositories import (
+    CustomerRepository,
+    PaymentMethodRepository,
+    PaymentRepository,
+    PlanRepository,
+    ProductRepository,
+    ProviderSnapshotRepository,
+    SubscriptionRepository,
+    SyncCursorRepository,
+)
+from ..providers.cache import CachedProvider
+
+logger = logging.getLogger(__name__)
+
+# Resources in the order they are synced
+SUPPORTED_RESOURCES = [
+    "customers",
+    "products",
+    "plans",
+    "subscriptions",
+    "payments",
+    "payment_methods",
+]
+
+# Resources that incremental sync can read from provider change feeds
+INCREMENTAL_RESOURCES = ["customers", "subscriptions", "payments"]
+
+
+class FetchJob:
+    """A single provider call needed to sync a local row."""
+
+    __slots__ = ("provider", "call", "result", "error")
+
+    def __init__(self, provider: str, call: Callable[[], Awaitable[Any]]):
+        self.provider = provider
+        self.call = call
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+
+class SyncItem:
+    """A local row together with the provider calls that refresh it."""
+
+    __slots__ = ("row", "jobs")
+
+    def __init__(self, row: Any, jobs: List[FetchJob]):
+        self.row = row
+        self.jobs = jobs
+
+
+def _parse_datetime(value: Any) -> Any:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+
+def _with_provider_data(
+    meta_info: Optional[Dict[str, Any]], provider: str, data: Any
+) -> Dict[str, Any]:
+    meta = dict(meta_info or {})
+    provider_map = dict(meta.get("provider_data") or {})
+    provider_map[provider] = data
+    meta["provider_data"] = provider_map
+    return meta
+
+
+def _subscription_fields(pdata: Dict[str, Any]) -> Dict[str, Any]:
+    """Local subscription columns to update from a provider payload."""
+    update_fields: Dict[str, Any] = {}
+    if pdata.get("status"):
+        update_fields["status"] = pdata["status"]
+    for field in ("current_period_start", "current_period_end"):
+        value = pdata.get(field) or pdata.get(f"{field}_iso")
+        if value:
+            try:
+                update_fields[field] = _parse_datetime(value)
+            except Exception:
+                pass
+    if "cancel_at_period_end" in pdata:
+        update_fields["cancel_at_period_end"] = pdata.get(
+            "cancel_at_period_end"
+        )
+    return update_fields
+
+
+def _payment_fields(row: Any, pdata: Dict[str, Any]) -> Dict[str, Any]:
+    """Local payment columns to update from a provider payload.
+
+    The payload itself is kept as a provider snapshot (see
+    `_payment_snapshot`); a copy left in meta_info by older versions is
+    dropped once a fresh snapshot replaces it.
+    """
+    update_fields: Dict[str, Any] = {}
+    if pdata.get("status"):
+        update_fields["status"] = pdata["status"]
+    if pdata.get("meta_info") and "provider_data" in (row.meta_info or {}):
+        meta = dict(row.meta_info)
+        meta.pop("provider_data")
+        update_fields["meta_info"] = meta
+    return update_fields
+
+
+def _payment_snapshot(
+    row: Any, pdata: Dict[str, Any]
+) -> Optional[Tuple[str, str, Any]]:
+    if not pdata.get("meta_info"):
+        return None
+    return row.id, row.provider, pdata["meta_info"]
+
+
+class ResourceSync:
+    """Reads, plans and writes one resource type for the pipeline."""
+
+    # Filter key that narrows the sync to a single local row
+    filter_key: str = ""
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        self.pipeline = pipeline
+        self.session = pipeline.service.db_session
+
+    async def load_one(self, obj_id: str) -> Any:
+        raise NotImplementedError
+
+    async def load_batch(self, limit: int, offset: int) -> List[Any]:
+        raise NotImplementedError
+
+    async def load_after(
+        self, after_id: Optional[str], limit: int
+    ) -> List[Any]:
+        raise NotImplementedError
+
+    def plan(self, row: Any, summary: Dict[str, Any]) -> Optional[SyncItem]:
+        """Count the row and describe the provider calls it needs."""
+        raise NotImplementedError
+
+    async def write(
+        self, items: List[SyncItem], summary: Dict[str, Any]
+    ) -> None:
+        """Persist provider results for a batch in one transaction."""
+        raise NotImplementedError
+
+    def job(
+        self, provider_name: str, method_names: List[str], *args: Any
+    ) -> Optional[FetchJob]:
+        """Build a FetchJob for the first provider method that exists."""
+        provider = self.pipeline.provider(provider_name)
+        for method_name in method_names:
+            method = getattr(provider, method_name, None)
+            if callable(method):
+                return FetchJob(provider_name, lambda: method(*args))
+        return None
+
+
+class _MetaProviderDataSync(ResourceSync):
+    """Products and plans keep provider payloads in meta_info.provider_data."""
+
+    id_key: str = ""
+    method_names: List[str] = []
+    repo: Any
+
+    def plan(self, row: Any, summary: Dict[str, Any]) -> Optional[SyncItem]:
+        summary["synced"] += 1
+        meta = row.meta_info or {}
+        prov = self.pipeline.provider_filter or meta.get("provider")
+        prov_id = meta.get(self.id_key)
+        if not prov or not prov_id:
+            return None
+        job = self.job(prov, self.method_names, prov_id)
+        return SyncItem(row, [job]) if job else None
+
+    async def write(
+        self, items: List[SyncItem], summary: Dict[str, Any]
+    ) -> None:
+        updates = []
+        for item in items:
+            job = item.jobs[0]
+            if job.error is not None:
+                continue
+            meta = _with_provider_data(
+                item.row.meta_info, job.provider, job.result
+            )
+            updates.append((item.row, {"meta_info": meta}))
+        await self.repo.update_many(updates)
+        summary["updated"] += len(updates)
+
+
+class CustomerSync(ResourceSync):
+    filter_key = "customer_id"
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        super().__init__(pipeline)
+        self.repo = CustomerRepository(self.session)
+
+    async def load_one(self, obj_id: str) -> Any:
+        return await self.repo.get_with_provider_customers(obj_id)
+
+    async def load_batch(self, limit: int, offset: int) -> List[Any]:
+        return await self.repo.list(
+            limit=limit, offset=offset, include_provider_customers=True
+        )
+
+    async def load_after(
+        self, after_id: Optional[str], limit: int
+    ) -> List[Any]:
+        return await self.repo.list_after(
+            after_id, limit=limit, include_provider_customers=True
+        )
+
+    def plan(self, row: Any, summary: Dict[str, Any]) -> Optional[SyncItem]:
+        summary["synced"] += 1
+        jobs = []
+        for pc in row.provider_customers:
+            if not self.pipeline.wants(pc.provider):
+                continue
+            job = self.job(
+                pc.provider, ["retrieve_customer"], pc.provider_customer_id
+            )
+            if job:
+                jobs.append(job)
+        return SyncItem(row, jobs) if jobs else None
+
+    async def write(
+        self, items: List[SyncItem], summary: Dict[str, Any]
+    ) -> None:
+        updates = []
+        refreshed = 0
+        for item in items:
+            meta = item.row.meta_info
+            ok = [job for job in item.jobs if job.error is None]
+            for job in ok:
+                meta = _with_provider_data(meta, job.provider, job.result)
+            if ok:
+                updates.append((item.row, {"meta_info": meta}))
+                refreshed += len(ok)
+        await self.repo.update_many(updates)
+        summary["updated"] += refreshed
+
+
+class ProductSync(_MetaProviderDataSync):
+    filter_key = "product_id"
+    id_key = "provider_product_id"
+    method_names = ["retrieve_product"]
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        super().__init__(pipeline)
+        self.repo = ProductRepository(self.session)
+
+    async def load_one(self, obj_id: str) -> Any:
+        return await self.repo.get_by_id(obj_id)
+
+    async def load_batch(self, limit: int, offset: int) -> List[Any]:
+        return await self.repo.list(limit=limit, offset=offset)
+
+    async def load_after(
+        self, after_id: Optional[str], limit: int
+    ) -> List[Any]:
+        return await self.repo.list_after(after_id, limit=limit)
+
+
+class PlanSync(_MetaProviderDataSync):
+    filter_key = "plan_id"
+    id_key = "provider_price_id"
+    method_names = ["retrieve_price", "retrieve_plan"]
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        super().__init__(pipeline)
+        self.repo = PlanRepository(self.session)
+
+    async def load_one(self, obj_id: str) -> Any:
+        return await self.repo.get_by_id(obj_id)
+
+    async def load_batch(self, limit: int, offset: int) -> List[Any]:
+        return await self.repo.list(limit=limit, offset=offset)
+
+    async def load_after(
+        self, after_id: Optional[str], limit: int
+    ) -> List[Any]:
+        return await self.repo.list_after(after_id, limit=limit)
+
+
+class SubscriptionSync(ResourceSync):
+    filter_key = "subscription_id"
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        super().__init__(pipeline)
+        self.repo = SubscriptionRepository(self.session)
+
+    async def load_one(self, obj_id: str) -> Any:
+        return await self.repo.get_by_id(obj_id)
+
+    async def load_batch(self, limit: int, offset: int) -> List[Any]:
+        return await self.repo.list(
+            limit=limit, offset=offset, include_plan=True
+        )
+
+    async def load_after(
+        self, after_id: Optional[str], limit: int
+    ) -> List[Any]:
+        return await self.repo.list_after(
+            after_id, limit=limit, include_plan=True
+        )
+
+    def plan(self, row: Any, summary: Dict[str, Any]) -> Optional[SyncItem]:
+        summary["synced"] += 1
+        if not self.pipeline.wants(row.provider):
+            return None
+        job = self.job(
+            row.provider,
+            ["retrieve_subscription"],
+            row.provider_subscription_id,
+        )
+        return SyncItem(row, [job]) if job else None
+
+    async def write(
+        self, items: List[SyncItem], summary: Dict[str, Any]
+    ) -> None:
+        updates = []
+        snapshots = []
+        for item in items:
+            job = item.jobs[0]
+            if job.error is not None:
+                continue
+            update_fields = _subscription_fields(job.result or {})
+            if update_fields:
+                updates.append((item.row, update_fields))
+            if job.result:
+                snapshots.append((item.row.id, item.row.provider, job.result))
+        # Unchanged payloads are skipped; new versions commit with the updates
+        await ProviderSnapshotRepository(self.session).stage_many(
+            "subscription", snapshots
+        )
+        await self.repo.update_many(updates)
+        summary["updated"] += len(updates)
+
+
+class PaymentSync(ResourceSync):
+    filter_key = "payment_id"
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        super().__init__(pipeline)
+        self.repo = PaymentRepository(self.session)
+
+    async def load_one(self, obj_id: str) -> Any:
+        return await self.repo.get_by_id(obj_id)
+
+    async def load_batch(self, limit: int, offset: int) -> List[Any]:
+        return await self.repo.list(limit=limit, offset=offset)
+
+    async def load_after(
+        self, after_id: Optional[str], limit: int
+    ) -> List[Any]:
+        return await self.repo.list_after(after_id, limit=limit)
+
+    def plan(self, row: Any, summary: Dict[str, Any]) -> Optional[SyncItem]:
+        summary["synced"] += 1
+        if not self.pipeline.wants(row.provider):
+            return None
+        job = self.job(
+            row.provider, ["retrieve_payment"], row.provider_payment_id
+        )
+        return SyncItem(row, [job]) if job else None
+
+    async def write(
+        self, items: List[SyncItem], summary: Dict[str, Any]
+    ) -> None:
+        updates = []
+        snapshots = []
+        for item in items:
+            job = item.jobs[0]
+            if job.error is not None:
+                continue
+            update_fields = _payment_fields(item.row, job.result or {})
+            if update_fields:
+                updates.append((item.row, update_fields))
+            snapshot = _payment_snapshot(item.row, job.result or {})
+            if snapshot:
+                snapshots.append(snapshot)
+        # Staged snapshots are committed together with the updates
+        await ProviderSnapshotRepository(self.session).stage_many(
+            "payment", snapshots
+        )
+        await self.repo.update_many(updates)
+        summary["updated"] += len(updates)
+
+
+class PaymentMethodSync(CustomerSync):
+    """Reconcile provider-side saved payment methods for each customer."""
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        super().__init__(pipeline)
+        self.pm_repo = PaymentMethodRepository(self.session)
+
+    def plan(self, row: Any, summary: Dict[str, Any]) -> Optional[SyncItem]:
+        jobs = []
+        for pc in row.provider_customers:
+            if not self.pipeline.wants(pc.provider):
+                continue
+            job = self.job(
+                pc.provider, ["list_payment_methods"], pc.provider_customer_id
+            )
+            if job:
+                jobs.append(job)
+        return SyncItem(row, jobs) if jobs else None
+
+    async def write(
+        self, items: List[SyncItem], summary: Dict[str, Any]
+    ) -> None:
+        # Group the listed methods by provider so existing rows are looked
+        # up with one query per provider instead of one per method.
+        listed: Dict[str, List[Any]] = {}
+        synced = 0
+        for item in items:
+            for job in item.jobs:
+                if job.error is not None:
+                    continue
+                pms = job.result or []
+                synced += len(pms)
+                for pm in pms:
+                    if pm.get("payment_method_id"):
+                        listed.setdefault(job.provider, []).append(
+                            (item.row, pm)
+                        )
+
+        updates = []
+        creates: Dict[str, Dict[str, Any]] = {}
+        for prov, entries in listed.items():
+            existing = await self.pm_repo.get_by_provider_method_ids(
+                prov, [pm["payment_method_id"] for _, pm in entries]
+            )
+            for customer, pm in entries:
+                pid = pm["payment_method_id"]
+                stored = existing.get(pid)
+                if stored is not None:
+                    meta = {**(stored.meta_info or {}), "provider_data": pm}
+                    updates.append((stored, {"meta_info": meta}))
+                    continue
+                card = pm.get("card") or {}
+                # A method listed twice in one batch is created once
+                creates[pid] = {
+                    "customer_id": customer.id,
+                    "provider": prov,
+                    "provider_payment_method_id": pid,
+                    "mandate_id": pm.get("mandate_id"),
+                    "is_default": pm.get("is_default", False),
+                    "card_brand": card.get("brand"),
+                    "card_last4": card.get("last4"),
+                    "card_exp_month": card.get("exp_month"),
+                    "card_exp_year": card.get("exp_year"),
+                    "meta_info": {"provider_data": pm},
+                }
+
+        await self.pm_repo.save_many(updates=updates, creates=creates.values())
+        summary["synced"] += synced
+        summary["updated"] += len(updates)
+        summary["created"] += len(creates)
+
+
+RESOURCE_SYNCS = {
+    "customers": CustomerSync,
+    "products": ProductSync,
+    "plans": PlanSync,
+    "subscriptions": SubscriptionSync,
+    "payments": PaymentSync,
+    "payment_methods": PaymentMethodSync,
+}
+
+
+class SyncPipeline:
+    """Batched, bounded-concurrency reconciliation of local rows.
+
+    Each resource is streamed in batches of `batch_size` rows. Provider
+    calls for a batch run concurrently, limited by a global semaphore and
+    an optional per-provider semaphore, while the next batch is read from
+    the database. Updates for a batch are written in a single transaction.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        batch_size: int = 100,
+        concurrency: int = 10,
+        provider_concurrency: Optional[Dict[str, int]] = None,
+        provider_filter: Optional[str] = None,
+    ):
+        self.service = service
+        self.batch_size = batch_size
+        self.provider_filter = provider_filter
+        self._global_limit = asyncio.Semaphore(concurrency)
+        self._provider_limits = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in (provider_concurrency or {}).items()
+        }
+
+    def wants(self, provider_name: str) -> bool:
+        return (
+            not self.provider_filter or provider_name == self.provider_filter
+        )
+
+    def provider(self, provider_name: str) -> Any:
+        provider = self.service.get_provider(provider_name)
+        # Sync needs authoritative provider state, not cached reads
+        if isinstance(provider, CachedProvider):
+            return provider.wrapped
+        return provider
+
+    async def run(
+        self,
+        resources: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = 100,
+        offset: int = 0,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        progress: Optional[Dict[str, Any]] = None,
+        on_checkpoint: Optional[
+            Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+        ] = None,
+    ) -> Dict[str, Any]:
+        """
+        Sync the requested resources.
+
+        With `limit=None` and no offset, each table is walked in primary-key
+        order with a keyset cursor. `checkpoint` then records, per resource,
+        the last row written and whether the resource is done; it is updated
+        in place after every batch and passed to `on_checkpoint` together
+        with the running counters, so an interrupted run can be resumed by
+        calling run() again with the saved checkpoint and progress.
+
+        Args:
+            resources: Resource names to sync; all supported if omitted
+            filters: Resource-specific filters e.g. {'customer_id': '...'}
+            limit: Maximum rows read per resource, or None for all rows
+            offset: Rows to skip per resource
+            checkpoint: Saved per-resource cursors to resume from
+            progress: Saved per-resource counters to continue from
+            on_checkpoint: Awaited with (checkpoint, progress) after each batch
+
+        Returns:
+            Per-resource counters and throughput under "summary", plus
+            overall duration and rows per second. Resources that stopped on
+            an error are listed under "incomplete"; they are not marked done
+            in `checkpoint`, so a run resumed from it retries them.
+        """
+        requested = set(resources or SUPPORTED_RESOURCES)
+        filters = filters or {}
+        checkpoint = checkpoint if checkpoint is not None else {}
+        progress = progress or {}
+        result: Dict[str, Any] = {}
+        incomplete: List[str] = []
+
+        for resource in SUPPORTED_RESOURCES:
+            if resource not in requested:
+                continue
+            summary = copy.deepcopy(
+                progress.get(resource)
+                or {"synced": 0, "updated": 0, "created": 0, "errors": []}
+            )
+            result[resource] = summary
+            state = checkpoint.setdefault(
+                resource, {"after": None, "done": False}
+            )
+            if state.get("done"):
+                continue
+
+            prior_duration = summary.get("duration_seconds") or 0.0
+            resource_started = time.monotonic()
+
+            async def save() -> None:
+                _record_throughput(
+                    summary,
+                    summary["synced"],
+                    resource_started,
+                    prior_duration,
+                )
+                if on_checkpoint is not None:
+                    await on_checkpoint(checkpoint, result)
+
+            try:
+                await self._run_resource(
+                    RESOURCE_SYNCS[resource](self),
+                    summary,
+                    filters,
+                    limit,
+                    offset,
+                    state,
+                    save,
+                )
+            except Exception as e:
+                # Keep the last cursor so a retry resumes this resource
+                summary["errors"].append(str(e))
+                incomplete.append(resource)
+            else:
+                state["done"] = True
+            await save()
+
+        totals: Dict[str, Any] = {"summary": result}
+        if incomplete:
+            totals["incomplete"] = incomplete
+        duration = sum(
+            r.get("duration_seconds") or 0.0 for r in result.values()
+        )
+        synced = sum(r["synced"] for r in result.values())
+        totals["duration_seconds"] = round(duration, 3)
+        totals["rows_per_second"] = (
+            round(synced / duration, 2) if duration > 0 else None
+        )
+        return totals
+
+    async def _run_resource(
+        self,
+        handler: ResourceSync,
+        summary: Dict[str, Any],
+        filters: Dict[str, Any],
+        limit: Optional[int],
+        offset: int,
+        state: Dict[str, Any],
+        save: Callable[[], Awaitable[None]],
+    ) -> None:
+        keyset = (
+            limit is None
+            and not offset
+            and not filters.get(handler.filter_key)
+        )
+        batches = self._batches(
+            handler, filters, limit, offset, state.get("after")
+        )
+        rows = await _next_batch(batches)
+        while rows is not None:
+            items = []
+            for row in rows:
+                try:
+                    item = handler.plan(row, summary)
+                except Exception as e:
+                    summary["errors"].append(str(e))
+                    continue
+                if item is not None:
+                    items.append(item)
+
+            # Fetch this batch from providers while the next one is read
+            fetching = asyncio.ensure_future(self._fetch_all(items))
+            try:
+                next_rows = await _next_batch(batches)
+            except BaseException:
+                fetching.cancel()
+                raise
+            await fetching
+
+            summary["errors"].extend(
+                job.error
+                for item in items
+                for job in item.jobs
+                if job.error is not None
+            )
+            try:
+                await handler.write(items, summary)
+            except Exception as e:
+                # Stop before the cursor passes this batch so a resumed
+                # run writes it again
+                logger.error(f"Error writing sync batch: {str(e)}")
+                raise
+            if keyset:
+                state["after"] = rows[-1].id
+            await save()
+            rows = next_rows
+
+    async def _batches(
+        self,
+        handler: ResourceSync,
+        filters: Dict[str, Any],
+        limit: Optional[int],
+        offset: int,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[List[Any]]:
+        if filters.get(handler.filter_key):
+            row = await handler.load_one(filters[handler.filter_key])
+            if row is not None:
+                yield [row]
+            return
+
+        if limit is None and not offset:
+            while True:
+                rows = await handler.load_after(after, self.batch_size)
+                if not rows:
+                    return
+                yield rows
+                after = rows[-1].id
+                if len(rows) < self.batch_size:
+                    return
+
+        fetched = 0
+        while limit is None or fetched < limit:
+            size = (
+                self.batch_size
+                if limit is None
+                else min(self.batch_size, limit - fetched)
+            )
+            rows = await handler.load_batch(size, offset + fetched)
+            if not rows:
+                return
+            yield rows
+            fetched += len(rows)
+            if len(rows) < size:
+                return
+
+    async def _fetch_all(self, items: List[SyncItem]) -> None:
+        await asyncio.gather(
+            *(self._fetch(job) for item in items for job in item.jobs)
+        )
+
+    async def _fetch(self, job: FetchJob) -> None:
+        provider_limit = self._provider_limits.get(job.provider)
+        if provider_limit is not None:
+            async with provider_limit:
+                await self._fetch_limited(job)
+        else:
+            await self._fetch_limited(job)
+
+    async def _fetch_limited(self, job: FetchJob) -> None:
+        async with self._global_limit:
+            try:
+                job.result = await asyncio.wait_for(
+                    job.call(),
+                    timeout=self.service._provider_timeout(job.provider),
+                )
+            except asyncio.TimeoutError:
+                job.error = f"Timed out calling provider {job.provider}"
+            except Exception as e:
+                job.error = str(e)
+
+
+class IncrementalSync:
+    """Apply provider-side changes made since the last stored high-water mark.
+
+    Instead of re-reading every local row, each provider's change feed
+    (`list_changes`) is read from the cursor saved in `sync_cursors` for that
+    provider and resource. Changed objects are matched to local rows with
+    one query per page, and the page's updates are committed together with
+    the advanced cursor, so a crash never skips or loses a change.
+    Objects with no local row are counted as synced but not created.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        batch_size: int = 100,
+        provider_filter: Optional[str] = None,
+    ):
+        self.service = service
+        self.session = service.db_session
+        self.batch_size = batch_size
+        self.provider_filter = provider_filter
+        self.cursors = SyncCursorRepository(self.session)
+
+    async def run(
+        self, resources: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Pull changes for the requested resources from every provider that
+        supports them.
+
+        The first run for a provider and resource only records the current
+        position of its change feed; later runs apply what changed since.
+
+        Args:
+            resources: Resource names; all incremental resources if omitted
+
+        Returns:
+            Per-resource counters and throughput under "summary", plus
+            overall duration and rows per second
+        """
+        requested = set(resources or INCREMENTAL_RESOURCES)
+        result: Dict[str, Any] = {}
+
+        for resource in INCREMENTAL_RESOURCES:
+            if resource not in requested:
+                continue
+            summary: Dict[str, Any] = {
+                "synced": 0,
+                "updated": 0,
+                "created": 0,
+                "errors": [],
+            }
+            result[resource] = summary
+            started = time.monotonic()
+            for provider_name, provider in self._providers(resource):
+                try:
+                    await self._run_provider(
+                        provider_name, provider, resource, summary
+                    )
+                except Exception as e:
+                    logger.error(
+                        f"Incremental sync of {resource} from "
+                        f"{provider_name} failed: {str(e)}"
+                    )
+                    summary["errors"].append(str(e))
+            _record_throughput(summary, summary["synced"], started)
+
+        totals: Dict[str, Any] = {"summary": result}
+        duration = sum(r["duration_seconds"] for r in result.values())
+        synced = sum(r["synced"] for r in result.values())
+        totals["duration_seconds"] = round(duration, 3)
+        totals["rows_per_second"] = (
+            round(synced / duration, 2) if duration > 0 else None
+        )
+        return totals
+
+    def _providers(self, resource: str) -> List[Any]:
+        found = []
+        for provider_name in self.service.providers:
+            if self.provider_filter and provider_name != self.provider_filter:
+                continue
+            provider = self.service.get_provider(provider_name)
+            if isinstance(provider, CachedProvider):
+                provider = provider.wrapped
+            if resource in getattr(
+                provider, "incremental_resources", ()
+            ) and callable(getattr(provider, "list_changes", None)):
+                found.append((provider_name, provider))
+        return found
+
+    async def _run_provider(
+        self,
+        provider_name: str,
+        provider: Any,
+        resource: str,
+        summary: Dict[str, Any],
+    ) -> None:
+        cursor = await self.cursors.get_cursor(provider_name, resource)
+        timeout = self.service._provider_timeout(provider_name)
+        while True:
+            try:
+                page = await asyncio.wait_for(
+                    provider.list_changes(
+                        resource, cursor, limit=self.batch_size
+                    ),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                raise RuntimeError(
+                    f"Timed out calling provider {provider_name}"
+                )
+
+            items = page.get("items") or []
+            summary["synced"] += len(items)
+            repo, updates = await self._plan(provider_name, resource, items)
+            await self.cursors.stage(
+                provider_name, resource, page.get("cursor")
+            )
+            # The cursor commits in the same transaction as the updates
+            await repo.update_many(updates)
+            summary["updated"] += len(updates)
+
+            cursor = page.get("cursor")
+            if not page.get("has_more") or not items:
+                return
+
+    async def _plan(
+        self, provider_name: str, resource: str, items: List[Dict[str, Any]]
+    ) -> Any:
+        updates: List[Any] = []
+        snapshots: List[Tuple[Any, str, Any]] = []
+        if resource == "customers":
+            customers = CustomerRepository(self.session)
+            local = await customers.get_by_provider_customer_ids(
+                provider_name, _provider_ids(items, "provider_customer_id")
+            )
+            for item in items:
+                customer = local.get(item.get("provider_customer_id", ""))
+                if customer is not None:
+                    meta = _with_provider_data(
+                        customer.meta_info, provider_name, item
+                    )
+                    updates.append((customer, {"meta_info": meta}))
+            return customers, updates
+
+        if resource == "subscriptions":
+            subscriptions = SubscriptionRepository(self.session)
+            subs = await subscriptions.get_by_provider_subscription_ids(
+                provider_name,
+                _provider_ids(items, "provider_subscription_id"),
+            )
+            for item in items:
+                sub = subs.get(item.get("provider_subscription_id", ""))
+                if sub is None:
+                    continue
+                fields = _subscription_fields(item)
+                if fields:
+                    updates.append((sub, fields))
+                snapshots.append((sub.id, provider_name, item))
+            await ProviderSnapshotRepository(self.session).stage_many(
+                "subscription", snapshots
+            )
+            return subscriptions, updates
+
+        payments = PaymentRepository(self.session)
+        known = await payments.get_by_provider_payment_ids(
+            provider_name, _provider_ids(items, "provider_payment_id")
+        )
+        for item in items:
+            payment = known.get(item.get("provider_payment_id", ""))
+            if payment is None:
+                continue
+            fields = _payment_fields(payment, item)
+            if fields:
+                updates.append((payment, fields))
+            snapshot = _payment_snapshot(payment, item)
+            if snapshot:
+                snapshots.append(snapshot)
+        await ProviderSnapshotRepository(self.session).stage_many(
+            "payment", snapshots
+        )
+        return payments, updates
+
+
+def _provider_ids(items: List[Dict[str, Any]], key: str) -> List[str]:
+    return [item[key] for item in items if item.get(key)]
+
+
+async def _next_batch(
+    batches: AsyncIterator[List[Any]],
+) -> Optional[List[Any]]:
+    try:
+        return await batches.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def _record_throughput(
+    target: Dict[str, Any],
+    rows: int,
+    started: float,
+    prior_duration: float = 0.0,
+) -> None:
+    elapsed = prior_duration + time.monotonic() - started
+    target["duration_seconds"] = round(elapsed, 3)
+    target["rows_per_second"] = (
+        round(rows / elapsed, 2) if elapsed > 0 else None
+    )
@@ -0,0 +1,242 @@
+"""Buffered, batched ingestion of metered usage events."""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import generate_uuid
+from ..db.repositories import (
+    SubscriptionRepository,
+    UsageRecordRepository,
+    new_session,
+)
+from ..messaging.publishers import PaymentEvents, publish_batch
+from ..schemas.payment import UsageEventCreate
+from ..utils.exceptions import UsageBufferFullError
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    """A buffered usage row and the future its submitter waits on."""
+
+    __slots__ = ("row", "future")
+
+    def __init__(
+        self, row: Dict[str, Any], future: "asyncio.Future[Optional[str]]"
+    ):
+        self.row = row
+        self.future = future
+
+
+class UsageIngestor:
+    """Group-commits usage events from many concurrent submitters.
+
+    Submitted events are validated and buffered in memory. A background
+    task writes up to `flush_size` events with multi-row INSERTs in one
+    transaction as soon as that many are buffered, or `flush_interval`
+    seconds after the buffer became non-empty, whichever comes first.
+    Each submitter is answered only after the transaction holding its
+    events has committed, so an acknowledged event is durable; if the write
+    fails, the submitter gets the error and can retry. Providers are not
+    called.
+    """
+
+    def __init__(
+        self,
+        config: Any,
+        event_publisher: Any,
+        sessionmaker: Optional[Callable[[], AsyncSession]] = None,
+    ):
+        self.config = config
+        self.event_publisher = event_publisher
+        self._sessionmaker = sessionmaker or new_session
+        self._buffer: List[_Pending] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._has_events: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._flusher: Optional["asyncio.Task[None]"] = None
+        self._writing: Optional["asyncio.Future[None]"] = None
+
+    @property
+    def buffered(self) -> int:
+        """Events accepted but not yet written."""
+        return len(self._buffer)
+
+    async def submit(self, events: Sequence[Any]) -> List[Dict[str, Any]]:
+        """
+        Buffer usage events and wait until they are committed.
+
+        Args:
+            events: Dicts with the UsageEventCreate fields, or
+                UsageEventCreate objects. An item that is an exception, such
+                as a line that failed to parse, is reported as a failed
+                result.
+
+        Returns:
+            One result per event, in input order, with "index", "status"
+            ("recorded" or "failed") and either the record "id" or an "error"
+
+        Raises:
+            UsageBufferFullError: Accepting the events would exceed
+                `max_buffered`; none of them were accepted
+        """
+        self._ensure_flusher()
+        results: List[Dict[str, Any]] = []
+        pending: List[Optional[_Pending]] = []
+        received_at = datetime.now(timezone.utc)
+        for index, item in enumerate(events):
+            result: Dict[str, Any] = {"index": index}
+            results.append(result)
+            try:
+                if isinstance(item, Exception):
+                    raise item
+                event = (
+                    item
+                    if isinstance(item, UsageEventCreate)
+                    else UsageEventCreate(**item)
+                )
+            except (ValidationError, ValueError, TypeError) as e:
+                result.update(status="failed", error=str(e))
+                pending.append(None)
+                continue
+            timestamp = event.timestamp or received_at
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(timezone.utc)
+            row = {
+                "id": generate_uuid(),
+                "subscription_id": event.subscription_id,
+                "quantity": event.quantity,
+                "timestamp": timestamp,
+                "description": event.description,
+            }
+            pending.append(_Pending(row, self._loop.create_future()))
+
+        accepted = [p for p in pending if p is not None]
+        if len(self._buffer) + len(accepted) > self.config.max_buffered:
+            raise UsageBufferFullError(
+                f"Usage buffer is full ({len(self._buffer)} events waiting); "
+                "retry shortly"
+            )
+        if accepted:
+            self._buffer.extend(accepted)
+            self._has_events.set()
+            if len(self._buffer) >= self.config.flush_size:
+                self._full.set()
+            # Shielded: a disconnecting client does not cancel the write
+            await asyncio.shield(
+                asyncio.gather(
+                    *(p.future for p in accepted), return_exceptions=True
+                )
+            )
+
+        for result, entry in zip(results, pending):
+            if entry is None:
+                continue
+            error = entry.future.exception()
+            if error is not None:
+                result.update(status="failed", error=str(error))
+            else:
+                result.update(status="recorded", id=entry.row["id"])
+        return results
+
+    async def flush(self) -> None:
+        """Write everything buffered now, without waiting for a trigger."""
+        while self._buffer:
+            await self._write(self._take())
+
+    async def aclose(self) -> None:
+        """Flush the buffer and stop the background task."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._writing is not None and not self._writing.done():
+            await self._writing
+        await self.flush()
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures and events cannot cross event loops; start over
+            self._loop = loop
+            self._buffer = []
+            self._has_events = asyncio.Event()
+            self._full = asyncio.Event()
+            self._flusher = None
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_events.wait()
+            try:
+                await asyncio.wait_for(
+                    self._full.wait(), timeout=self.config.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            # Shielded so stopping the flusher never abandons a taken batch
+            self._writing = asyncio.ensure_future(self._write(self._take()))
+            await asyncio.shield(self._writing)
+
+    def _take(self) -> List[_Pending]:
+        batch = self._buffer[: self.config.flush_size]
+        del self._buffer[: self.config.flush_size]
+        if len(self._buffer) < self.config.flush_size:
+            self._full.clear()
+        if not self._buffer:
+            self._has_events.clear()
+        return batch
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        if not batch:
+            return
+        try:
+            async with self._sessionmaker() as session:
+                known = await SubscriptionRepository(session).existing_ids(
+                    p.row["subscription_id"] for p in batch
+                )
+                valid = [p for p in batch if p.row["subscription_id"] in known]
+                await UsageRecordRepository(session).create_many(
+                    [p.row for p in valid]
+                )
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} usage events: {str(e)}")
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+
+        events = []
+        for p in batch:
+            if p.future.done():
+                continue
+            if p.row["subscription_id"] not in known:
+                p.future.set_exception(
+                    ValueError(
+                        f"Subscription not found: {p.row['subscription_id']}"
+                    )
+                )
+                continue
+            p.future.set_result(p.row["id"])
+            events.append(
+                (
+                    PaymentEvents.USAGE_RECORDED,
+                    {
+                        "subscription_id": p.row["subscription_id"],
+                        "quantity": p.row["quantity"],
+                        "timestamp": p.row["timestamp"].isoformat(),
+                        "description": p.row["description"],
+                    },
+                )
+            )
+        if events:
+            await publish_batch(self.event_publisher, events, "usage")
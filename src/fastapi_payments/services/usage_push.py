@@ -0,0 +1,271 @@
+"""Periodic, aggregated reporting of recorded usage to providers."""
+
+import asyncio
+import inspect
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import Subscription, UsagePush
+from ..db.repositories import (
+    ProviderSnapshotRepository,
+    UsagePushRepository,
+    UsageRollupRepository,
+    new_session,
+)
+from ..db.repositories.usage_rollup_repository import as_utc
+from .idempotency import provider_idempotency_kwargs
+
+logger = logging.getLogger(__name__)
+
+
+def push_key(subscription_id: str, period_start: datetime, target: int) -> str:
+    """Idempotency key for pushing a period total; the same on every retry."""
+    return (
+        f"{subscription_id}:{int(as_utc(period_start).timestamp())}:{target}"
+    )
+
+
+class _Push:
+    """One provider call: bring a subscription period up to `target`."""
+
+    __slots__ = (
+        "subscription_id",
+        "provider",
+        "item_id",
+        "period_start",
+        "period_end",
+        "pushed",
+        "target",
+        "key",
+        "final",
+    )
+
+    def __init__(self, **fields: Any):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+class UsagePusher:
+    """Reports usage totals to providers instead of one call per event.
+
+    Each run totals every subscription's usage for its current billing
+    period from usage rollups and, where the total grew since the last
+    push, makes one provider call per subscription item. Providers whose
+    `default_usage_action` is "set" receive the period total at the period
+    start timestamp, which replaces the previous push; others receive the
+    increase. Usage still unreported when a period ends is pushed once
+    more for that period, after which the period is closed.
+
+    Before calling the provider the push is claimed in usage_pushes with
+    its target total and an idempotency key. A push that fails, or whose
+    outcome is unknown because the process stopped, is retried with the
+    same quantity and key, so the provider applies it at most once.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        sessionmaker: Optional[Callable[[], AsyncSession]] = None,
+    ):
+        self.service = service
+        self.config = service.config.usage
+        self._sessionmaker = sessionmaker or new_session
+
+    async def push_once(
+        self, now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Push all unreported usage once.
+
+        Returns:
+            Counts of "pushed", "failed" and "skipped" pushes; a push is
+            skipped when another pusher claimed it first
+        """
+        now = as_utc(now or datetime.now(timezone.utc))
+        pushes = await self._plan(now)
+        semaphore = asyncio.Semaphore(self.config.push_concurrency)
+        counts = {"pushed": 0, "failed": 0, "skipped": 0}
+
+        async def run(push: _Push) -> None:
+            async with semaphore:
+                outcome = await self._push(push, now)
+            counts[outcome] += 1
+
+        await asyncio.gather(*(run(push) for push in pushes))
+        if pushes:
+            logger.info(
+                f"Usage push: {counts['pushed']} pushed, "
+                f"{counts['failed']} failed, {counts['skipped']} skipped"
+            )
+        return counts
+
+    async def _plan(self, now: datetime) -> List[_Push]:
+        async with self._sessionmaker() as session:
+            repo = UsagePushRepository(session)
+            subscriptions = {
+                s.id: s for s in await repo.subscriptions_to_push()
+            }
+            open_pushes = await repo.open_pushes()
+            missing = {p.subscription_id for p in open_pushes} - set(
+                subscriptions
+            )
+            if missing:
+                result = await session.execute(
+                    select(Subscription).where(
+                        Subscription.id.in_(list(missing))
+                    )
+                )
+                subscriptions.update({s.id: s for s in result.scalars().all()})
+
+            states: Dict[Tuple[str, datetime], UsagePush] = {
+                (p.subscription_id, as_utc(p.period_start)): p
+                for p in open_pushes
+            }
+            # (subscription, period start) -> (period end, final)
+            periods: Dict[
+                Tuple[str, datetime], Tuple[Optional[datetime], bool]
+            ] = {}
+            for subscription in subscriptions.values():
+                if subscription.current_period_start is None:
+                    continue
+                start = as_utc(subscription.current_period_start)
+                end = subscription.current_period_end
+                periods[(subscription.id, start)] = (
+                    as_utc(end) if end else None,
+                    False,
+                )
+            for key, state in states.items():
+                if key not in periods:
+                    # The subscription has moved on to a new period
+                    end = state.period_end
+                    periods[key] = (as_utc(end) if end else now, True)
+
+            windows: Dict[Tuple[datetime, datetime], List[str]] = {}
+            for (subscription_id, start), (end, _) in periods.items():
+                stop = min(end, now) if end else now
+                windows.setdefault((start, stop), []).append(subscription_id)
+            rollups = UsageRollupRepository(session)
+            totals: Dict[Tuple[str, datetime], float] = {}
+            for (start, stop), ids in windows.items():
+                for subscription_id, quantity in (
+                    await rollups.totals(ids, start, stop)
+                ).items():
+                    totals[(subscription_id, start)] = quantity
+
+            snapshots = await ProviderSnapshotRepository(session).latest_many(
+                "subscription", {key[0] for key in periods}
+            )
+
+            pushes = []
+            for (subscription_id, start), (end, final) in periods.items():
+                subscription = subscriptions[subscription_id]
+                state = states.get((subscription_id, start))
+                pushed = state.pushed_quantity if state else 0
+                if state and state.pending_key:
+                    target, key = state.pending_quantity, state.pending_key
+                else:
+                    # Providers take whole units; fractions carry into later
+                    # pushes
+                    target = int(totals.get((subscription_id, start), 0.0))
+                    key = push_key(subscription_id, start, target)
+                    if target == pushed or (
+                        target < pushed
+                        and self._action(subscription.provider) != "set"
+                    ):
+                        if target < pushed:
+                            logger.warning(
+                                f"Usage of subscription {subscription_id} "
+                                "fell below what was already pushed "
+                                f"({target} < {pushed}); not pushing"
+                            )
+                        if final:
+                            await repo.close(subscription_id, start)
+                        continue
+                snapshot = (
+                    snapshots.get(subscription_id, {}).get(
+                        subscription.provider
+                    )
+                    or {}
+                )
+                pushes.append(
+                    _Push(
+                        subscription_id=subscription_id,
+                        provider=subscription.provider,
+                        item_id=(
+                            snapshot.get("subscription_item_id")
+                            or subscription.provider_subscription_id
+                        ),
+                        period_start=start,
+                        period_end=end,
+                        pushed=pushed,
+                        target=target,
+                        key=key,
+                        final=final,
+                    )
+                )
+            return pushes
+
+    async def _push(self, push: _Push, now: datetime) -> str:
+        async with self._sessionmaker() as session:
+            repo = UsagePushRepository(session)
+            claimed = await repo.claim(
+                push.subscription_id,
+                push.period_start,
+                push.period_end,
+                push.provider,
+                push.pushed,
+                push.target,
+                push.key,
+            )
+            if not claimed:
+                return "skipped"
+
+            try:
+                provider = self.service.get_provider(push.provider)
+                action = self._action(push.provider)
+                kwargs = dict(
+                    provider_idempotency_kwargs(
+                        provider.record_usage, "usage", push.key
+                    )
+                )
+                if (
+                    "action"
+                    in inspect.signature(provider.record_usage).parameters
+                ):
+                    kwargs["action"] = action
+                if action == "set":
+                    quantity, timestamp = push.target, push.period_start
+                else:
+                    quantity, timestamp = push.target - push.pushed, now
+                result = await provider.record_usage(
+                    push.item_id, quantity, timestamp, **kwargs
+                )
+            except Exception as e:
+                logger.error(
+                    "Error pushing usage for subscription "
+                    f"{push.subscription_id}: {str(e)}"
+                )
+                await repo.fail(
+                    push.subscription_id, push.period_start, push.key, str(e)
+                )
+                return "failed"
+
+            await repo.complete(
+                push.subscription_id,
+                push.period_start,
+                push.key,
+                result.get("provider_usage_record_id") or result.get("id"),
+                close=push.final,
+            )
+            return "pushed"
+
+    def _action(self, provider_name: str) -> str:
+        try:
+            provider = self.service.get_provider(provider_name)
+        except ValueError:
+            return "increment"
+        return getattr(provider, "default_usage_action", "increment")
@@ -65,3 +65,25 @@ class PaymentRequiresActionError(PaymentError):
         self.action_url = action_url
         self.action_type = action_type
         super().__init__(message, "payment_requires_action")
+
+
+class IdempotencyError(PaymentError):
+    """Exception raised when an Idempotency-Key cannot be honoured.
+
+    `code` is "idempotency_key_reused" when the key was already used with
+    different request parameters, or "idempotency_in_progress" when the
+    request holding the key has not finished in time.
+    """
+
+    pass
+
+
+class UsageBufferFullError(PaymentError):
+    """Exception raised when usage events arrive faster than they are written.
+
+    No event of the rejected submission was accepted; retry after a short
+    delay.
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message, "usage_buffer_full")
@@ -1,4 +1,13 @@
-from typing import Dict, Any, List, Optional, Union
+from typing import (
+    Dict,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
 from datetime import datetime, timedelta, timezone
 import json
 import re
@@ -325,3 +334,33 @@ def normalize_webhook_event(
         # Add more Adyen event mappings as needed
 
     return event
+
+
+async def abatched(
+    items: Union[Iterable[Any], AsyncIterable[Any]], size: int
+) -> AsyncIterator[List[Any]]:
+    """
+    Group a sync or async iterable into lists of up to `size` items.
+
+    Args:
+        items: Items to group; consumed lazily
+        size: Maximum items per list
+
+    Yields:
+        Lists of consecutive items; only the last may be shorter than `size`
+    """
+    batch: List[Any] = []
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    else:
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,14 @@
+"""Out-of-process workers for long-running payment tasks."""
+
+from .archive_worker import ArchiveWorker
+from .periodic import PeriodicWorker
+from .sync_worker import SyncWorker, run_workers
+from .usage_push_worker import UsagePushWorker
+
+__all__ = [
+    "ArchiveWorker",
+    "PeriodicWorker",
+    "SyncWorker",
+    "UsagePushWorker",
+    "run_workers",
+]
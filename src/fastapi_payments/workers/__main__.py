@@ -0,0 +1,3 @@
+from .sync_worker import main
+
+main()
@@ -0,0 +1,26 @@
+"""Worker that periodically archives old payments and usage records."""
+
+from typing import Any, Optional
+
+from .periodic import PeriodicWorker
+
+
+class ArchiveWorker(PeriodicWorker):
+    """Runs `PaymentService.archive_old_rows` every `archive.interval`."""
+
+    name = "Archive worker"
+
+    def __init__(self, service: Any, interval: Optional[float] = None):
+        """
+        Initialize the worker.
+
+        Args:
+            service: Shared PaymentService
+            interval: Seconds between runs; defaults to
+                `config.archive.interval`
+        """
+        super().__init__(interval or service.config.archive.interval)
+        self.service = service
+
+    async def run_once(self) -> None:
+        await self.service.archive_old_rows()
@@ -0,0 +1,51 @@
+"""Base loop shared by the background workers."""
+
+import asyncio
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """Runs `run_once` every `interval` seconds until `stop()` is called.
+
+    Errors from `run_once` are logged and the loop carries on; cancellation
+    ends it. When `repeat_while_busy` is set, a `run_once` that returns
+    something other than None is called again at once instead of after
+    the interval, so a queue is drained before the worker sleeps.
+    """
+
+    name = "Worker"
+    repeat_while_busy = False
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop after the run in progress, if any."""
+        self._stopping.set()
+
+    async def run_once(self) -> Any:
+        raise NotImplementedError
+
+    async def run(self) -> None:
+        """Call `run_once` until stopped."""
+        logger.info(f"{self.name} started (every {self.interval:g}s)")
+        while not self._stopping.is_set():
+            try:
+                busy = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.name} error: {str(e)}")
+                busy = None
+            if busy is None or not self.repeat_while_busy:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        logger.info(f"{self.name} stopped")
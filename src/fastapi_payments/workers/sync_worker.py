@@ -0,0 +1,270 @@
+"""Lease-based worker pool that runs queued sync jobs.
+
+Run it as a separate process from the web application::
+
+    python -m fastapi_payments.workers \\
+        --config config/payment_config.json --workers 4
+
+Add ``--usage-push`` to also report aggregated usage to providers from
+this process.
+
+Any number of these processes can run on any number of nodes against the
+same database. Each job is leased to one worker at a time; the lease is
+renewed while the job runs, and a job whose worker dies is claimed by
+another worker once the lease expires and resumed from its checkpoint.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import Any, List, Optional
+
+from ..db.repositories import SyncJobRepository, new_session
+from .archive_worker import ArchiveWorker
+from .periodic import PeriodicWorker
+from .usage_push_worker import UsagePushWorker
+
+logger = logging.getLogger(__name__)
+
+
+class SyncWorker(PeriodicWorker):
+    """Claims queued SyncJob rows under a lease and executes them.
+
+    Jobs are run back to back; the worker only waits `poll_interval`
+    seconds when no job is queued. `stop()` also hands the job in
+    progress back to the queue.
+    """
+
+    repeat_while_busy = True
+
+    def __init__(
+        self,
+        service: Any,
+        worker_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            service: Shared PaymentService used to execute jobs
+            worker_id: Lease owner identifier; unique per worker by default
+            lease_seconds: How long a claim is valid without a heartbeat
+            heartbeat_interval: Seconds between lease renewals
+            poll_interval: Seconds to wait when no job is queued
+            max_attempts: Claims after which an abandoned job is failed
+        """
+        sync_config = service.config.sync
+        super().__init__(poll_interval or sync_config.poll_interval)
+        self.service = service
+        self.worker_id = worker_id or (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        )
+        self.name = f"Sync worker {self.worker_id}"
+        self.lease_seconds = lease_seconds or sync_config.lease_seconds
+        self.heartbeat_interval = (
+            heartbeat_interval or sync_config.heartbeat_interval
+        )
+        self.max_attempts = max_attempts or sync_config.max_attempts
+
+    @property
+    def poll_interval(self) -> float:
+        return self.interval
+
+    async def run_once(self) -> Optional[str]:
+        """
+        Claim and execute a single job.
+
+        Returns:
+            ID of the job that was run, or None if no job was available
+        """
+        async with new_session() as session:
+            repo = SyncJobRepository(session)
+            await repo.fail_exhausted(self.max_attempts)
+            job = await repo.claim_next(
+                self.worker_id, self.lease_seconds, self.max_attempts
+            )
+            job_id = job.id if job else None
+        if job_id is None:
+            return None
+
+        logger.info(f"Sync worker {self.worker_id} claimed job {job_id}")
+        await self._execute(job_id)
+        return job_id
+
+    async def _execute(self, job_id: str) -> None:
+        job_task = asyncio.ensure_future(self.service.execute_sync_job(job_id))
+        stop_task = asyncio.ensure_future(self._stopping.wait())
+        heartbeat_task = asyncio.ensure_future(self._heartbeat(job_id))
+        try:
+            await asyncio.wait(
+                [job_task, stop_task, heartbeat_task],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        except asyncio.CancelledError:
+            await self._abandon(job_task, job_id)
+            raise
+        finally:
+            stop_task.cancel()
+            heartbeat_task.cancel()
+
+        if job_task.done():
+            if not job_task.cancelled() and job_task.exception() is not None:
+                logger.error(
+                    f"Sync job {job_id} failed: {job_task.exception()}"
+                )
+            return
+
+        if heartbeat_task.done():
+            # Lease lost: another worker may already own the job
+            logger.warning(
+                f"Sync worker {self.worker_id} lost lease on job {job_id}"
+            )
+            job_task.cancel()
+            await asyncio.gather(job_task, return_exceptions=True)
+            return
+
+        # Shutting down: hand the job back so another worker resumes it
+        await self._abandon(job_task, job_id)
+
+    async def _abandon(
+        self, job_task: "asyncio.Future[Any]", job_id: str
+    ) -> None:
+        job_task.cancel()
+        await asyncio.gather(job_task, return_exceptions=True)
+        try:
+            async with new_session() as session:
+                await SyncJobRepository(session).release(
+                    job_id, self.worker_id
+                )
+        except Exception as e:
+            logger.error(f"Error releasing sync job {job_id}: {str(e)}")
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renew the lease until it is lost; returning signals the loss."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                async with new_session() as session:
+                    renewed = await SyncJobRepository(session).heartbeat(
+                        job_id, self.worker_id, self.lease_seconds
+                    )
+            except Exception as e:
+                # Keep trying until the lease actually expires
+                logger.error(
+                    f"Error renewing lease on sync job {job_id}: {str(e)}"
+                )
+                continue
+            if not renewed:
+                return
+
+
+async def run_workers(
+    service: Any,
+    count: Optional[int] = None,
+    usage_push: bool = False,
+    archive: bool = False,
+) -> None:
+    """
+    Run a pool of sync workers in this process until SIGINT/SIGTERM.
+
+    Args:
+        service: Shared PaymentService used to execute jobs
+        count: Number of workers; defaults to `config.sync.workers`
+        usage_push: Also run a UsagePushWorker reporting usage to providers
+        archive: Also run an ArchiveWorker moving old rows to archive files
+    """
+    count = count or service.config.sync.workers
+    workers: List[Any] = [SyncWorker(service) for _ in range(count)]
+    if usage_push:
+        workers.append(UsagePushWorker(service))
+    if archive:
+        workers.append(ArchiveWorker(service))
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(
+                sig, lambda: [worker.stop() for worker in workers]
+            )
+        except (NotImplementedError, RuntimeError):
+            # Signal handlers are unavailable on some platforms (e.g. Windows)
+            pass
+
+    await asyncio.gather(*(worker.run() for worker in workers))
+
+
+async def _main(
+    config_path: str,
+    count: Optional[int],
+    usage_push: bool = False,
+    archive: bool = False,
+) -> None:
+    from ..api.dependencies import initialize_dependencies
+    from ..api import dependencies
+    from ..config.config_schema import PaymentConfig
+    from ..db.repositories import ensure_schema, initialize_db
+
+    with open(config_path) as f:
+        config = PaymentConfig(**json.load(f))
+
+    logging.basicConfig(level=getattr(logging, config.logging_level))
+    initialize_db(config.database)
+    await ensure_schema()
+    initialize_dependencies(config)
+
+    await run_workers(
+        dependencies._payment_service, count, usage_push, archive
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point for the sync worker pool."""
+    parser = argparse.ArgumentParser(
+        description="Run fastapi-payments sync workers"
+    )
+    parser.add_argument(
+        "--config",
+        default=os.environ.get("PAYMENT_CONFIG", "config/payment_config.json"),
+        help="Path to the payment configuration JSON file",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=(
+            "Number of workers in this process (default: config.sync.workers)"
+        ),
+    )
+    parser.add_argument(
+        "--usage-push",
+        action="store_true",
+        help=(
+            "Also push aggregated usage to providers every "
+            "usage.push_interval seconds"
+        ),
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help=(
+            "Also archive rows past their archive horizon every "
+            "archive.interval seconds"
+        ),
+    )
+    args = parser.parse_args(argv)
+    asyncio.run(
+        _main(args.config, args.workers, args.usage_push, args.archive)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Worker that periodically reports aggregated usage to providers."""
+
+from typing import Any, Optional
+
+from .periodic import PeriodicWorker
+
+
+class UsagePushWorker(PeriodicWorker):
+    """Runs `PaymentService.push_usage` every `usage.push_interval`."""
+
+    name = "Usage push worker"
+
+    def __init__(self, service: Any, interval: Optional[float] = None):
+        """
+        Initialize the worker.
+
+        Args:
+            service: Shared PaymentService
+            interval: Seconds between pushes; defaults to
+                `config.usage.push_interval`
+        """
+        super().__init__(interval or service.config.usage.push_interval)
+        self.service = service
+
+    async def run_once(self) -> None:
+        await self.service.push_usage()
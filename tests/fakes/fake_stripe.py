@@ -1,3 +1,4 @@
+import copy
 import json
 from datetime import datetime, timezone
 from types import SimpleNamespace
@@ -10,7 +11,7 @@ class FakeStripe:
     This mirrors the previous in-test FakeStripe and is intentionally
     simplistic — it implements the small subset of Stripe SDK behavior used
     by our unit tests (Customer, PaymentMethod, Product, Price, Subscription,
-    PaymentIntent, Refund, UsageRecord, Webhook).
+    PaymentIntent, Refund, UsageRecord, Event, Webhook).
     """
 
     def __init__(self):
@@ -28,6 +29,10 @@ class FakeStripe:
         self.payment_intents = {}
         self.refunds = {}
         self.usage_records = {}
+        self.events = []
+        # Responses of create calls made with an idempotency_key, replayed
+        # for repeated keys like the real API does
+        self.idempotent_responses = {}
 
         self.Customer = SimpleNamespace(
             create=self._customer_create,
@@ -55,6 +60,7 @@ class FakeStripe:
         )
         self.Refund = SimpleNamespace(create=self._refund_create)
         self.UsageRecord = SimpleNamespace(create=self._usage_record_create)
+        self.Event = SimpleNamespace(list=self._event_list)
 
     @staticmethod
     def _construct_event(payload: str, sig_header: str, secret: str):
@@ -69,6 +75,14 @@ class FakeStripe:
     def _generate_id(prefix: str) -> str:
         return f"{prefix}_{uuid4().hex[:12]}"
 
+    def _idempotent(self, create, kwargs):
+        key = kwargs.pop("idempotency_key", None)
+        if key is None:
+            return create(**kwargs)
+        if key not in self.idempotent_responses:
+            self.idempotent_responses[key] = create(**kwargs)
+        return self.idempotent_responses[key]
+
     def _customer_create(self, **kwargs):
         customer_id = self._generate_id("cus")
         customer = {
@@ -187,6 +201,8 @@ class FakeStripe:
         return price
 
     def _subscription_create(self, **kwargs):
+        if "idempotency_key" in kwargs:
+            return self._idempotent(self._subscription_create, kwargs)
         subscription_id = self._generate_id("sub")
         price_id = kwargs["items"][0]["price"]
         quantity = kwargs["items"][0].get("quantity", 1)
@@ -213,6 +229,7 @@ class FakeStripe:
             "metadata": kwargs.get("metadata") or {},
         }
         self.subscriptions[subscription_id] = subscription
+        self._record_event("customer.subscription.created", subscription)
         return subscription
 
     def _subscription_retrieve(self, subscription_id: str):
@@ -229,6 +246,7 @@ class FakeStripe:
             subscription["items"]["data"][0]["quantity"] = quantity
         if "metadata" in kwargs:
             subscription["metadata"] = kwargs["metadata"]
+        self._record_event("customer.subscription.updated", subscription)
         return subscription
 
     def _subscription_delete(self, subscription_id: str):
@@ -236,9 +254,44 @@ class FakeStripe:
         subscription["status"] = "canceled"
         subscription["cancel_at_period_end"] = False
         subscription["canceled_at"] = self._now()
+        self._record_event("customer.subscription.deleted", subscription)
         return subscription
 
+    def _record_event(self, event_type: str, obj):
+        self.events.append(
+            {
+                "id": self._generate_id("evt"),
+                "type": event_type,
+                "created": self._now(),
+                "data": {"object": copy.deepcopy(obj)},
+            }
+        )
+
+    def _event_list(self, **kwargs):
+        # Newest first, like the Events API
+        events = [
+            e
+            for e in reversed(self.events)
+            if e["type"] in kwargs.get("types", [e["type"]])
+        ]
+        ending_before = kwargs.get("ending_before")
+        if ending_before:
+            ids = [e["id"] for e in events]
+            events = (
+                events[: ids.index(ending_before)]
+                if ending_before in ids
+                else []
+            )
+            # Stripe returns the page adjacent to the cursor
+            limit = kwargs.get("limit", 10)
+            page = events[-limit:]
+            return {"data": page, "has_more": len(events) > len(page)}
+        limit = kwargs.get("limit", 10)
+        return {"data": events[:limit], "has_more": len(events) > limit}
+
     def _payment_intent_create(self, **kwargs):
+        if "idempotency_key" in kwargs:
+            return self._idempotent(self._payment_intent_create, kwargs)
         intent_id = self._generate_id("pi")
         # Determine status based on confirm flag and attached payment method
         pm_id = kwargs.get("payment_method")
@@ -276,6 +329,8 @@ class FakeStripe:
         return self.payment_intents[intent_id]
 
     def _refund_create(self, **kwargs):
+        if "idempotency_key" in kwargs:
+            return self._idempotent(self._refund_create, kwargs)
         refund_id = self._generate_id("re")
         payment_intent_id = kwargs["payment_intent"]
         payment_intent = self.payment_intents[payment_intent_id]
@@ -292,12 +347,15 @@ class FakeStripe:
         return refund
 
     def _usage_record_create(self, **kwargs):
+        if "idempotency_key" in kwargs:
+            return self._idempotent(self._usage_record_create, kwargs)
         usage_id = self._generate_id("ur")
         usage_record = {
             "id": usage_id,
             "subscription_item": kwargs.get("subscription_item"),
             "quantity": kwargs.get("quantity"),
             "timestamp": kwargs.get("timestamp"),
+            "action": kwargs.get("action"),
         }
         self.usage_records[usage_id] = usage_record
         return usage_record
@@ -230,7 +230,10 @@ def test_sync_endpoint(client, mock_payment_service):
     assert data["id"] == job_info["id"]
     assert data["status"] == job_info["status"]
     mock_payment_service.create_sync_job.assert_called_once_with(
-        resources=["customers"], provider="stripe", filters={"customer_id": "cust_123"}
+        resources=["customers"],
+        provider="stripe",
+        filters={"customer_id": "cust_123"},
+        mode="full",
     )
 
 
@@ -0,0 +1,134 @@
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func, select
+
+from fastapi_payments.api.dependencies import get_payment_service
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.models import Customer, ProviderCustomer
+from fastapi_payments.db.repositories import get_db
+from fastapi_payments.services.payment_service import PaymentService
+
+from tests.conftest import TEST_CONFIG
+from tests.fakes.fake_stripe import FakeStripe
+
+
+class RejectingStripe(FakeStripe):
+    """FakeStripe that rejects one known email address."""
+
+    def __init__(self):
+        super().__init__()
+        self.Customer.create = self._rejecting_create
+
+    def _rejecting_create(self, **kwargs):
+        if kwargs.get("email") == "reject@example.com":
+            raise Exception("Customer rejected")
+        return self._customer_create(**kwargs)
+
+
+@pytest.fixture
+def import_service(mock_event_publisher):
+    config = PaymentConfig(
+        **{**TEST_CONFIG, "bulk": {"batch_size": 2, "concurrency": 2}}
+    )
+    service = PaymentService(config, mock_event_publisher, None)
+    stripe = service.providers["stripe"]
+    stripe._run_stripe_calls_in_thread = False
+    stripe.stripe = RejectingStripe()
+    stripe.stripe_error = stripe.stripe.error
+    return service
+
+
+async def _count(model, *where):
+    async for session in get_db():
+        return (
+            await session.execute(select(func.count(model.id)).where(*where))
+        ).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_import_customers_json(test_app, import_service):
+    test_app.dependency_overrides[get_payment_service] = lambda: import_service
+    payload = {
+        "customers": [
+            {"email": "bulk1@example.com", "name": "Bulk One"},
+            {"email": "not-an-email"},
+            {"email": "reject@example.com"},
+            {
+                "email": "bulk2@example.com",
+                "meta_info": {"address": {"city": "Pune"}},
+            },
+            {"email": "bulk3@example.com"},
+        ]
+    }
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=test_app), base_url="http://test"
+        ) as client:
+            resp = await client.post(
+                "/payments/customers/import", json=payload
+            )
+    finally:
+        test_app.dependency_overrides.pop(get_payment_service, None)
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["created"] == 3
+    assert body["failed"] == 2
+    statuses = [(r["index"], r["status"]) for r in body["results"]]
+    assert statuses == [
+        (0, "created"),
+        (1, "failed"),
+        (2, "failed"),
+        (3, "created"),
+        (4, "created"),
+    ]
+    assert body["results"][2]["error"]
+
+    created_ids = [
+        r["id"] for r in body["results"] if r["status"] == "created"
+    ]
+    assert await _count(Customer, Customer.id.in_(created_ids)) == 3
+    assert (
+        await _count(
+            ProviderCustomer, ProviderCustomer.customer_id.in_(created_ids)
+        )
+        == 3
+    )
+    async for session in get_db():
+        customer = await session.get(Customer, body["results"][3]["id"])
+        assert customer.address == {"city": "Pune"}
+        assert customer.meta_info == {}
+        break
+
+
+@pytest.mark.asyncio
+async def test_import_customers_ndjson_streams_results(
+    test_app, import_service
+):
+    test_app.dependency_overrides[get_payment_service] = lambda: import_service
+    lines = [
+        json.dumps({"email": "stream1@example.com"}),
+        "{not json",
+        "",
+        json.dumps({"email": "stream2@example.com", "name": "Stream Two"}),
+    ]
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=test_app), base_url="http://test"
+        ) as client:
+            resp = await client.post(
+                "/payments/customers/import",
+                content="\n".join(lines) + "\n",
+                headers={"content-type": "application/x-ndjson"},
+            )
+    finally:
+        test_app.dependency_overrides.pop(get_payment_service, None)
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    results = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["status"] for r in results] == ["created", "failed", "created"]
+    assert results[1]["error"] == "Invalid JSON on line 2"
+    assert results[2]["name"] == "Stream Two"
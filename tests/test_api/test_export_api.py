@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    PaymentRepository,
+)
+from fastapi_payments.services.export import Exporter
+
+
+async def _payments(email, count):
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email=email, name="Export"
+        )
+        await CustomerRepository(session).add_provider_customer(
+            customer.id, "exportpay", f"cus_{customer.id[:8]}"
+        )
+        repo = PaymentRepository(session)
+        ids = []
+        for i in range(count):
+            payment = await repo.create(
+                customer_id=customer.id,
+                provider="exportpay",
+                provider_payment_id=f"pi_export_{i}",
+                amount=float(i),
+                currency="USD",
+                status="failed" if i == 0 else "completed",
+                meta_info={"blob": "x" * 100},
+            )
+            ids.append(payment.id)
+        return customer.id, ids
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_and_csv_with_filters(test_app):
+    customer_id, ids = await _payments("export@example.com", 5)
+    since = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+
+    async with AsyncClient(
+        transport=ASGITransport(app=test_app), base_url="http://test"
+    ) as client:
+        ndjson = await client.get(
+            "/payments/payments/export",
+            params={
+                "provider": "exportpay",
+                "status": "completed",
+                "created_from": since,
+            },
+        )
+        as_csv = await client.get(
+            "/payments/payments/export",
+            params={"provider": "exportpay", "format": "csv"},
+        )
+        customers = await client.get(
+            "/payments/customers/export", params={"provider": "exportpay"}
+        )
+        bad_format = await client.get(
+            "/payments/payments/export", params={"format": "xml"}
+        )
+
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [row["id"] for row in rows] == ids[1:]
+    assert rows[0]["status"] == "completed" and "meta_info" not in rows[0]
+
+    assert as_csv.headers["content-type"].startswith("text/csv")
+    table = list(csv.DictReader(io.StringIO(as_csv.text)))
+    assert [row["provider_payment_id"] for row in table] == [
+        f"pi_export_{i}" for i in range(5)
+    ]
+    assert table[0]["status"] == "failed" and table[0]["amount"] == "0.0"
+
+    assert [
+        json.loads(line)["id"] for line in customers.text.splitlines()
+    ] == [customer_id]
+    assert bad_format.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_yields_one_chunk_per_cursor_partition():
+    _, ids = await _payments("export-chunks@example.com", 5)
+    chunks = [
+        chunk
+        async for chunk in Exporter(chunk_size=2).export(
+            "payments",
+            provider="exportpay",
+            created_to=datetime.now(timezone.utc) + timedelta(hours=1),
+        )
+    ]
+    # Five payments per call to _payments, two rows per chunk
+    assert all(chunk.count("\n") <= 2 for chunk in chunks)
+    exported = [
+        json.loads(line)["id"]
+        for chunk in chunks
+        for line in chunk.splitlines()
+    ]
+    assert exported[-5:] == ids
+
+    with pytest.raises(ValueError):
+        Exporter().export("customers", status="active")
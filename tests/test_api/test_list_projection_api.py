@@ -0,0 +1,113 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    PaymentRepository,
+)
+
+
+async def _customer_with_large_payment():
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email="lean@example.com", meta_info={"notes": "x" * 1000}
+        )
+        await CustomerRepository(session).add_provider_customer(
+            customer.id, "stripe", "cus_lean"
+        )
+        await PaymentRepository(session).create(
+            customer_id=customer.id,
+            provider="stripe",
+            provider_payment_id="pi_lean",
+            amount=5.0,
+            currency="USD",
+            status="completed",
+            meta_info={"provider_data": {"blob": "y" * 10000}},
+        )
+        return customer.id
+
+
+@pytest.mark.asyncio
+async def test_list_routes_skip_meta_info_unless_requested(test_app):
+    customer_id = await _customer_with_large_payment()
+
+    selects = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    async for session in get_db():
+        engine = (await session.connection()).engine.sync_engine
+        break
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=test_app), base_url="http://test"
+        ) as client:
+            lean = await client.get(
+                "/payments/payments", params={"customer_id": customer_id}
+            )
+            lean_customers = await client.get(
+                "/payments/customers", params={"search": "lean@"}
+            )
+            lean_selects = list(selects)
+            full = await client.get(
+                "/payments/payments",
+                params={
+                    "customer_id": customer_id,
+                    "include_meta_info": "true",
+                },
+            )
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+    assert lean.status_code == 200 and full.status_code == 200
+    assert lean.json()[0]["meta_info"] is None
+    assert full.json()[0]["meta_info"]["provider_data"]["blob"] == "y" * 10000
+    customer = lean_customers.json()[0]
+    assert customer["meta_info"] is None
+    assert customer["provider_customer_id"] == "cus_lean"
+
+    list_selects = [
+        sql
+        for sql in lean_selects
+        if "FROM payments" in sql or "FROM customers" in sql
+    ]
+    assert list_selects
+    assert not [sql for sql in list_selects if "meta_info" in sql]
+    # Provider links come from a separate IN query, not a join
+    assert not [
+        sql for sql in lean_selects if "JOIN provider_customers" in sql
+    ]
+
+
+@pytest.mark.asyncio
+async def test_lean_rows_do_not_shadow_full_lookups():
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email="shadow@example.com"
+        )
+        payments = PaymentRepository(session)
+        payment = await payments.create(
+            customer_id=customer.id,
+            provider="stripe",
+            provider_payment_id="pi_shadow",
+            amount=1.0,
+            currency="USD",
+            status="completed",
+            meta_info={"k": "v"},
+        )
+        payment_id = payment.id
+        session.expunge(payment)
+
+        lean = await payments.list(
+            customer_id=customer.id, include_meta_info=False
+        )
+        assert lean[0] not in session
+
+        reloaded = await payments.get_by_id(payment_id)
+        assert reloaded.meta_info == {"k": "v"}
+        break
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from fastapi_payments.db.models import Payment, PaymentStatus
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    PaymentRepository,
+)
+
+
+async def _customer_with_payments(count):
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email="pages@example.com"
+        )
+        payments = PaymentRepository(session)
+        for i in range(count):
+            await payments.create(
+                customer_id=customer.id,
+                provider="stripe",
+                provider_payment_id=f"pi_page_{i}",
+                amount=float(i),
+                currency="USD",
+                status="completed",
+            )
+        # Rows inserted in one go share a timestamp; the id breaks the tie
+        session.add_all(
+            Payment(
+                customer_id=customer.id,
+                provider="stripe",
+                provider_payment_id=f"pi_tie_{i}",
+                amount=100.0 + i,
+                currency="USD",
+                status=PaymentStatus.COMPLETED,
+                created_at=datetime(2020, 1, 1),
+            )
+            for i in range(3)
+        )
+        await session.commit()
+        return customer.id
+
+
+@pytest.mark.asyncio
+async def test_list_payments_cursor_pages_cover_every_row_once(test_app):
+    customer_id = await _customer_with_payments(7)
+
+    seen = []
+    cursor = None
+    pages = 0
+    async with AsyncClient(
+        transport=ASGITransport(app=test_app), base_url="http://test"
+    ) as client:
+        while True:
+            params = {"customer_id": customer_id, "limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            resp = await client.get("/payments/payments", params=params)
+            assert resp.status_code == 200
+            seen.extend(resp.json())
+            pages += 1
+            cursor = resp.headers.get("x-next-cursor")
+            if not cursor:
+                break
+
+        bad = await client.get(
+            "/payments/payments", params={"cursor": "not-a-cursor"}
+        )
+
+    assert pages == 4
+    assert len(seen) == 10
+    assert len({p["id"] for p in seen}) == 10
+    # Newest first, and each row gets its own creation time
+    assert [p["amount"] for p in seen[:7]] == [
+        6.0,
+        5.0,
+        4.0,
+        3.0,
+        2.0,
+        1.0,
+        0.0,
+    ]
+    assert len({p["created_at"] for p in seen[:7]}) == 7
+    assert sorted(p["amount"] for p in seen[7:]) == [100.0, 101.0, 102.0]
+    assert bad.status_code == 400
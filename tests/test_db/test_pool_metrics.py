@@ -0,0 +1,87 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import exc
+
+from fastapi_payments.config.config_schema import DatabaseConfig
+from fastapi_payments.db.pool import MeteredQueuePool, pool_stats
+from fastapi_payments.db.repositories import _create_engine
+
+
+@pytest.mark.asyncio
+async def test_pool_settings_and_checkout_metrics(tmp_path):
+    config = DatabaseConfig(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        pool_recycle=600,
+        pool_pre_ping=True,
+    )
+    engine = _create_engine(config.url, config)
+    pool = engine.sync_engine.pool
+    assert isinstance(pool, MeteredQueuePool)
+    assert (pool.size(), pool.timeout(), pool._recycle, pool._pre_ping) == (
+        1,
+        0.05,
+        600,
+        True,
+    )
+
+    async with engine.connect():
+        assert pool_stats(pool)["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+
+    stats = pool_stats(pool)
+    assert (stats["checked_out"], stats["checkouts"], stats["timeouts"]) == (
+        0,
+        1,
+        1,
+    )
+    assert stats["wait_seconds"]["count"] == 2
+    assert stats["wait_seconds"]["buckets"]["+Inf"] == 2
+    # The timed-out checkout waited at least pool_timeout
+    assert stats["wait_seconds"]["max"] >= 0.05
+
+    await engine.dispose()
+    # Metrics survive the pool being recreated
+    assert pool_stats(engine.sync_engine.pool)["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_endpoint(test_app):
+    async with AsyncClient(
+        transport=ASGITransport(app=test_app), base_url="http://test"
+    ) as client:
+        response = await client.get("/payments/metrics/pool")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["replicas"] == []
+    assert {
+        "size",
+        "checked_out",
+        "overflow",
+        "timeouts",
+        "wait_seconds",
+    } <= set(body["primary"])
+
+
+def test_statement_cache_size_reaches_asyncpg(monkeypatch):
+    from fastapi_payments.db import repositories
+
+    captured = {}
+    monkeypatch.setattr(
+        repositories,
+        "create_async_engine",
+        lambda url, **kwargs: captured.update(kwargs),
+    )
+    config = DatabaseConfig(
+        url="postgresql+asyncpg://u:p@db/payments", statement_cache_size=0
+    )
+    _create_engine(config.url, config)
+    assert captured["connect_args"] == {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+    }
+    assert captured["pool_timeout"] == 30.0
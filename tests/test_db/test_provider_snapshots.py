@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import func, select
+
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.models import Payment, ProviderSnapshot
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    ProviderSnapshotRepository,
+)
+from fastapi_payments.services.payment_service import PaymentService
+
+from tests.conftest import TEST_CONFIG
+from tests.fakes.fake_stripe import FakeStripe
+
+
+@pytest.mark.asyncio
+async def test_snapshots_are_versioned_deduplicated_and_compressed():
+    async for session in get_db():
+        repo = ProviderSnapshotRepository(session)
+        payload = {
+            "id": "sub_snap",
+            "status": "active",
+            "items": ["x" * 50] * 200,
+        }
+
+        first = await repo.save("subscription", "snap-1", "stripe", payload)
+        same = await repo.save(
+            "subscription", "snap-1", "stripe", dict(payload)
+        )
+        changed = await repo.save(
+            "subscription",
+            "snap-1",
+            "stripe",
+            {**payload, "status": "past_due"},
+        )
+        await repo.save(
+            "subscription", "snap-2", "stripe", {"id": "sub_other"}
+        )
+
+        assert first.version == 1
+        assert same is None
+        assert changed.version == 2
+        assert len(first.payload) < len(str(payload)) / 10
+
+        assert (await repo.latest("subscription", "snap-1"))[
+            "status"
+        ] == "past_due"
+        latest = await repo.latest_many(
+            "subscription", ["snap-1", "snap-2", "missing"]
+        )
+        assert latest["snap-1"]["stripe"]["status"] == "past_due"
+        assert latest["snap-2"] == {"stripe": {"id": "sub_other"}}
+        assert "missing" not in latest
+        break
+
+
+@pytest.mark.asyncio
+async def test_payment_payload_is_stored_off_row(mock_event_publisher):
+    service = PaymentService(
+        PaymentConfig(**TEST_CONFIG), mock_event_publisher, None
+    )
+    stripe = service.providers["stripe"]
+    stripe._run_stripe_calls_in_thread = False
+    stripe.stripe = FakeStripe()
+    stripe.stripe_error = stripe.stripe.error
+
+    async for session in get_db():
+        service = service.bind(session)
+        customers = CustomerRepository(session)
+        customer = await customers.create(email="snapshot@example.com")
+        await customers.add_provider_customer(
+            customer.id, "stripe", "cus_snapshot"
+        )
+
+        created = await service.process_payment(
+            customer_id=customer.id,
+            amount=12.0,
+            currency="USD",
+            description="snap",
+        )
+
+        row = await session.get(Payment, created["id"])
+        assert "provider_data" not in (row.meta_info or {})
+        assert created["provider_data"]
+        stored = await session.execute(
+            select(func.count())
+            .select_from(ProviderSnapshot)
+            .where(
+                ProviderSnapshot.entity_type == "payment",
+                ProviderSnapshot.entity_id == created["id"],
+            )
+        )
+        assert stored.scalar_one() == 1
+
+        lean = await service.list_payments(
+            customer_id=customer.id, include_meta_info=False
+        )
+        full = await service.list_payments(customer_id=customer.id)
+        assert lean[0]["provider_data"] is None
+        assert full[0]["provider_data"] == created["provider_data"]
+        break
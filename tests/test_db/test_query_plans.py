@@ -0,0 +1,250 @@
+"""Query-plan regression tests for the repository lookups.
+
+Each repository lookup is run against a fresh SQLite database while its SQL
+is captured, then every captured SELECT is run through EXPLAIN QUERY PLAN.
+A table read with a full scan instead of an index search fails the test.
+"""
+
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from fastapi_payments.db.migrations import (
+    create_missing_columns,
+    create_missing_indexes,
+    create_schema,
+)
+from fastapi_payments.db.models import Base, Plan, UsageRecord
+from fastapi_payments.db.repositories import (
+    BaseRepository,
+    CustomerRepository,
+    PaymentMethodRepository,
+    PaymentRepository,
+    PlanRepository,
+    ProductRepository,
+    SubscriptionRepository,
+)
+from fastapi_payments.db.repositories.base import encode_cursor
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$")
+
+
+@asynccontextmanager
+async def _plan_session(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path.as_posix()}")
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    async with sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )() as session:
+        yield session
+    await engine.dispose()
+
+
+async def _seed(session):
+    customers = CustomerRepository(session)
+    customer = await customers.create(email="plans@example.com")
+    await customers.add_provider_customer(customer.id, "stripe", "cus_plans")
+    product = await ProductRepository(session).create(
+        name="Plans",
+        meta_info={"provider": "stripe", "provider_product_id": "prod_plans"},
+    )
+    plan = await PlanRepository(session).create(
+        product_id=product.id,
+        name="Basic",
+        description=None,
+        pricing_model="subscription",
+        amount=10.0,
+        currency="USD",
+        billing_interval="month",
+        billing_interval_count=1,
+        trial_period_days=None,
+        is_active=True,
+        meta_info={"provider": "stripe", "provider_price_id": "price_plans"},
+    )
+    now = datetime.now(timezone.utc)
+    subscription = await SubscriptionRepository(session).create(
+        customer_id=customer.id,
+        plan_id=plan.id,
+        provider="stripe",
+        provider_subscription_id="sub_plans",
+        status="active",
+        quantity=1,
+        current_period_start=now,
+        current_period_end=now,
+        cancel_at_period_end=False,
+    )
+    await PaymentRepository(session).create(
+        customer_id=customer.id,
+        provider="stripe",
+        provider_payment_id="pi_plans",
+        amount=10.0,
+        currency="USD",
+        status="completed",
+    )
+    await PaymentMethodRepository(session).create(
+        customer_id=customer.id,
+        provider="stripe",
+        provider_payment_method_id="pm_plans",
+    )
+    return customer, product, subscription
+
+
+async def _explain(session, statements):
+    """Return (sql, full-scanned tables) for each captured statement."""
+    results = []
+    for sql, params in statements:
+        connection = await session.connection()
+        plan = await connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {sql}", params
+        )
+        details = [row[-1] for row in plan.fetchall()]
+        scans = [m.group(1) for m in map(_FULL_SCAN.match, details) if m]
+        results.append((sql, scans))
+    return results
+
+
+@pytest.mark.asyncio
+async def test_repository_lookups_use_indexes(tmp_path):
+    async with _plan_session(tmp_path / "plans.db") as session:
+        await _check_lookups(session)
+
+
+async def _check_lookups(session):
+    customer, product, subscription = await _seed(session)
+
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    sync_engine = (await session.connection()).engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _capture)
+    try:
+        customers = CustomerRepository(session)
+        await customers.get_by_id(customer.id)
+        await customers.get_provider_customers(customer.id)
+        await customers.get_with_provider_customers(customer.id)
+        await customers.get_many_with_provider_customers([customer.id])
+        await customers.get_provider_customer(customer.id, "stripe")
+        await customers.get_by_provider_customer_ids("stripe", ["cus_plans"])
+
+        payments = PaymentRepository(session)
+        await payments.list(customer_id=customer.id)
+        await payments.list(
+            customer_id=customer.id,
+            cursor=encode_cursor(datetime.now(timezone.utc), "~"),
+        )
+        await payments.get_by_provider_payment_ids("stripe", ["pi_plans"])
+
+        subscriptions = SubscriptionRepository(session)
+        await subscriptions.get_with_plan(subscription.id)
+        await subscriptions.list(customer_id=customer.id)
+        await subscriptions.list(customer_id=customer.id, status="active")
+        await subscriptions.get_by_provider_subscription_ids(
+            "stripe", ["sub_plans"]
+        )
+
+        methods = PaymentMethodRepository(session)
+        await methods.get_by_provider_method_id("stripe", "pm_plans")
+        await methods.get_by_provider_method_id(None, "pm_plans")
+        await methods.get_by_provider_method_ids("stripe", ["pm_plans"])
+        await methods.list_for_customer(customer.id)
+        await methods.list_for_customer(customer.id, provider="stripe")
+
+        plans = PlanRepository(session)
+        await plans.list_for_product(product.id)
+        await plans.get_by_provider_price_id("price_plans")
+        await plans.get_by_provider_price_id("price_plans", provider="stripe")
+        await ProductRepository(session).get_by_provider_product_id(
+            "prod_plans", provider="stripe"
+        )
+        await BaseRepository(UsageRecord, session).list(
+            subscription_id=subscription.id
+        )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _capture)
+
+    assert captured
+    offenders = [
+        (sql, scans)
+        for sql, scans in await _explain(session, captured)
+        if scans
+    ]
+    assert not offenders, "Full table scans:\n" + "\n\n".join(
+        f"{', '.join(scans)}: {sql}" for sql, scans in offenders
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_missing_indexes_upgrades_existing_tables(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{(tmp_path / 'old.db').as_posix()}"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # Simulate a database created before the indexes existed
+        await conn.exec_driver_sql("DROP INDEX ix_payments_customer_created")
+        await conn.exec_driver_sql(
+            "DROP INDEX ix_provider_customers_customer_provider"
+        )
+
+    async with engine.begin() as conn:
+        created = await conn.run_sync(create_missing_indexes)
+        again = await conn.run_sync(create_missing_indexes)
+    await engine.dispose()
+
+    assert sorted(created) == [
+        "ix_payments_customer_created",
+        "ix_provider_customers_customer_provider",
+    ]
+    assert again == []
+
+
+@pytest.mark.asyncio
+async def test_create_missing_columns_backfills_meta_info_lookups(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{(tmp_path / 'old.db').as_posix()}"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # Simulate a database created before the lookup columns existed
+        await conn.exec_driver_sql("DROP INDEX ix_plans_provider_price_id")
+        await conn.exec_driver_sql(
+            "ALTER TABLE plans DROP COLUMN provider_price_id"
+        )
+        await conn.exec_driver_sql("ALTER TABLE plans DROP COLUMN provider")
+        await conn.exec_driver_sql(
+            "INSERT INTO products (id, name) VALUES ('prod', 'Old')"
+        )
+        await conn.exec_driver_sql(
+            "INSERT INTO plans "
+            "(id, product_id, name, pricing_model, meta_info) VALUES "
+            "('plan_old', 'prod', 'Old', 'SUBSCRIPTION', "
+            '\'{"provider": "stripe", "provider_price_id": "price_old"}\')'
+        )
+
+    async with engine.begin() as conn:
+        added = await conn.run_sync(create_missing_columns)
+        again = await conn.run_sync(create_missing_columns)
+        created = await conn.run_sync(create_missing_indexes)
+    async with AsyncSession(engine) as session:
+        plan = await PlanRepository(session).get_by_provider_price_id(
+            "price_old", provider="stripe"
+        )
+        missing = await PlanRepository(session).get_by_provider_price_id(
+            "price_old", provider="paypal"
+        )
+    await engine.dispose()
+
+    assert added == ["plans.provider", "plans.provider_price_id"]
+    assert again == []
+    assert created == ["ix_plans_provider_price_id"]
+    assert isinstance(plan, Plan) and plan.id == "plan_old"
+    assert missing is None
@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from fastapi_payments.db.migrations import create_schema
+from fastapi_payments.db.models import Customer
+from fastapi_payments.db.repositories import (
+    CustomerRepository,
+    RoutingSession,
+    read_from_replica,
+    use_primary,
+)
+from fastapi_payments.db.repositories.routing import ReplicaSet
+
+
+async def _engine(path, email):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    async with AsyncSession(engine) as session:
+        session.add(Customer(email=email))
+        await session.commit()
+    return engine
+
+
+async def _emails(session):
+    return set((await session.execute(select(Customer.email))).scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replicas_until_the_session_writes(tmp_path):
+    primary = await _engine(tmp_path / "primary.db", "primary@example.com")
+    replicas = ReplicaSet(
+        [
+            await _engine(tmp_path / "replica1.db", "replica1@example.com"),
+            await _engine(tmp_path / "replica2.db", "replica2@example.com"),
+        ]
+    )
+    factory = sessionmaker(
+        primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        replicas=replicas,
+        expire_on_commit=False,
+    )
+
+    async with factory() as session:
+        # Sessions only use replicas when opted in
+        assert await _emails(session) == {"primary@example.com"}
+
+    async with factory() as session:
+        read_from_replica(session)
+        # Round robin across the replicas
+        seen = {frozenset(await _emails(session)) for _ in range(2)}
+        assert seen == {
+            frozenset({"replica1@example.com"}),
+            frozenset({"replica2@example.com"}),
+        }
+        with use_primary(session):
+            assert await _emails(session) == {"primary@example.com"}
+        assert await _emails(session) != {"primary@example.com"}
+
+        await CustomerRepository(session).create(email="new@example.com")
+        # Read-your-writes: the session now stays on the primary
+        assert await _emails(session) == {
+            "primary@example.com",
+            "new@example.com",
+        }
+
+    for engine in [primary, *replicas.engines]:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_least_connections_prefers_idle_replica(tmp_path):
+    busy = await _engine(tmp_path / "busy.db", "busy@example.com")
+    idle = await _engine(tmp_path / "idle.db", "idle@example.com")
+    replicas = ReplicaSet([busy, idle], "least_connections")
+
+    async with busy.connect():
+        assert replicas.choose() is idle
+    await busy.dispose()
+    await idle.dispose()
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fastapi_payments.db.migrations import create_schema
+from fastapi_payments.db.repositories import SyncJobRepository
+
+# sync_jobs as created by the first release
+_BASELINE_SYNC_JOBS = """
+CREATE TABLE sync_jobs (
+    id VARCHAR NOT NULL,
+    status VARCHAR NOT NULL,
+    resources JSON,
+    provider VARCHAR,
+    filters JSON,
+    result JSON,
+    created_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id)
+)
+"""
+
+
+async def _upgraded(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path.as_posix()}")
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(_BASELINE_SYNC_JOBS)
+        await conn.exec_driver_sql(
+            "INSERT INTO sync_jobs (id, status, created_at) "
+            "VALUES ('job_old', 'queued', '2025-01-01 00:00:00')"
+        )
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_baseline_sync_jobs_gain_lease_columns(tmp_path):
+    engine = await _upgraded(tmp_path / "baseline.db")
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(
+            lambda sync: {
+                c["name"] for c in inspect(sync).get_columns("sync_jobs")
+            }
+        )
+        attempts = (
+            await conn.exec_driver_sql(
+                "SELECT attempts FROM sync_jobs WHERE id = 'job_old'"
+            )
+        ).scalar()
+    await engine.dispose()
+
+    assert {
+        "attempts",
+        "lease_owner",
+        "lease_expires_at",
+        "checkpoint",
+        "progress",
+    } <= columns
+    # Existing rows get the server default
+    assert attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_baseline_sync_jobs_work_with_the_repository(tmp_path):
+    engine = await _upgraded(tmp_path / "baseline.db")
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        repo = SyncJobRepository(session)
+        new = await repo.create(resources=["payments"], mode="incremental")
+
+        job = await repo.claim_next(
+            "worker-1", lease_seconds=60, max_attempts=3
+        )
+        assert job.id == "job_old"
+        assert job.mode == "full" and job.attempts == 1
+        assert await repo.heartbeat(job.id, "worker-1", 60)
+        assert await repo.fail_exhausted(max_attempts=1) == 0
+        assert (await repo.get_by_id(new.id)).mode == "incremental"
+    await engine.dispose()
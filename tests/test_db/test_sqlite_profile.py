@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from fastapi_payments.config.config_schema import DatabaseConfig, SQLiteConfig
+from fastapi_payments.db.migrations import create_schema
+from fastapi_payments.db.models import Customer
+from fastapi_payments.db.repositories import (
+    CustomerRepository,
+    _create_engine,
+    unit_of_work,
+)
+from fastapi_payments.db.sqlite import configure_sqlite
+
+
+def test_high_throughput_profile_fills_unset_settings():
+    settings = SQLiteConfig(
+        profile="high_throughput", synchronous="FULL"
+    ).resolved()
+    assert settings["journal_mode"] == "WAL"
+    assert settings["synchronous"] == "FULL"
+    assert settings["single_writer"] is True
+    assert SQLiteConfig().resolved()["journal_mode"] is None
+
+    with pytest.raises(ValueError):
+        SQLiteConfig(profile="fast")
+
+
+@pytest.mark.asyncio
+async def test_profile_sets_pragmas_on_each_connection(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'pragmas.db'}"
+    engine = _create_engine(
+        url, DatabaseConfig(url=url, sqlite={"profile": "high_throughput"})
+    )
+    async with engine.connect() as conn:
+
+        async def pragma(name):
+            return await conn.exec_driver_sql(f"PRAGMA {name}")
+
+        assert (await pragma("journal_mode")).scalar() == "wal"
+        assert (await pragma("synchronous")).scalar() == 1  # NORMAL
+        assert (await pragma("cache_size")).scalar() == -64 * 1024
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_writer_queue_serializes_concurrent_writers(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'writers.db'}",
+        pool_size=10,
+        max_overflow=0,
+    )
+    # No busy_timeout: without the queue, overlapping writers fail at once
+    queue = configure_sqlite(
+        engine,
+        {"journal_mode": "WAL", "busy_timeout": 0, "single_writer": True},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def write(i):
+        async with factory() as session:
+            async with unit_of_work(session):
+                await CustomerRepository(session).create(
+                    email=f"writer{i}@example.com"
+                )
+                # Hold the write transaction across a yield to the event loop
+                await asyncio.sleep(0.01)
+                await CustomerRepository(session).create(
+                    email=f"writer{i}b@example.com"
+                )
+
+    await asyncio.gather(*(write(i) for i in range(10)))
+
+    async with factory() as session:
+        assert (
+            await session.scalar(select(func.count()).select_from(Customer))
+            == 20
+        )
+    assert queue.waits > 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_writer_queue_times_out_instead_of_deadlocking(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'timeout.db'}"
+    )
+    configure_sqlite(engine, {"single_writer": True}, timeout=0.1)
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as first, factory() as second:
+        async with unit_of_work(first):
+            await CustomerRepository(first).create(email="first@example.com")
+            with pytest.raises(exc.TimeoutError):
+                await CustomerRepository(second).create(
+                    email="second@example.com"
+                )
+            await second.rollback()
+        # The first session's commit handed the turn back
+        await CustomerRepository(second).create(email="second@example.com")
+    await engine.dispose()
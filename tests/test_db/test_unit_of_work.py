@@ -0,0 +1,144 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import sessionmaker
+
+from fastapi_payments.db.migrations import create_schema
+from fastapi_payments.db.models import Customer, ProviderCustomer
+from fastapi_payments.db.repositories import (
+    CustomerRepository,
+    PlanRepository,
+    ProductRepository,
+    SubscriptionRepository,
+    unit_of_work,
+)
+
+
+@asynccontextmanager
+async def _counted_session(path):
+    """Yield (session, counts) where counts tracks statements and commits."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path.as_posix()}")
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+    counts = {"select": 0, "insert": 0, "commit": 0}
+
+    def _statement(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].lower()
+        if verb in counts:
+            counts[verb] += 1
+
+    def _commit(conn):
+        counts["commit"] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _statement)
+    event.listen(engine.sync_engine, "commit", _commit)
+    async with sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )() as session:
+        yield session, counts
+    await engine.dispose()
+
+
+async def _plan(session):
+    product = await ProductRepository(session).create(name="UoW")
+    return await PlanRepository(session).create(
+        product_id=product.id,
+        name="Basic",
+        description=None,
+        pricing_model="subscription",
+        amount=10.0,
+        currency="USD",
+        billing_interval="month",
+        billing_interval_count=1,
+        trial_period_days=None,
+        is_active=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_writes_share_one_commit_without_refreshes(tmp_path):
+    async with _counted_session(tmp_path / "uow.db") as (session, counts):
+        plan = await _plan(session)
+        counts.update(select=0, insert=0, commit=0)
+
+        now = datetime.now(timezone.utc)
+        async with unit_of_work(session):
+            customers = CustomerRepository(session)
+            customer = await customers.create(email="uow@example.com")
+            await customers.add_provider_customer(
+                customer.id, "stripe", "cus_uow"
+            )
+            subscription = await SubscriptionRepository(session).create(
+                customer_id=customer.id,
+                plan_id=plan.id,
+                provider="stripe",
+                provider_subscription_id="sub_uow",
+                status="active",
+                quantity=1,
+                current_period_start=now,
+                current_period_end=now,
+                cancel_at_period_end=False,
+            )
+            assert counts["commit"] == 0
+
+        assert counts == {"select": 0, "insert": 3, "commit": 1}
+        # Generated values are available without reloading the rows
+        assert customer.id and customer.created_at and customer.name is None
+        assert (
+            subscription.created_at
+            and subscription.cancel_at_period_end is False
+        )
+
+
+@pytest.mark.asyncio
+async def test_failure_rolls_back_every_write(tmp_path):
+    async with _counted_session(tmp_path / "uow.db") as (session, counts):
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(session):
+                customers = CustomerRepository(session)
+                customer = await customers.create(email="rollback@example.com")
+                await customers.add_provider_customer(
+                    customer.id, "stripe", "cus_rollback"
+                )
+                raise RuntimeError("provider call failed")
+
+        for model in (Customer, ProviderCustomer):
+            result = await session.execute(
+                select(func.count()).select_from(model)
+            )
+            assert result.scalar_one() == 0
+        assert counts["commit"] == 0
+
+
+@pytest.mark.asyncio
+async def test_writes_return_loaded_rows_with_expire_on_commit(tmp_path):
+    # A host application's sessionmaker expires instances on commit
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{(tmp_path / 'expire.db').as_posix()}"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+    async with async_sessionmaker(engine)() as session:
+        customers = CustomerRepository(session)
+        customer = await customers.create(
+            email="expire@example.com", name="Expire"
+        )
+        assert customer.id
+        assert customer.email == "expire@example.com"
+        assert customer.name == "Expire"
+        assert customer.created_at is not None
+
+        updated = await customers.update(customer.id, name="Renamed")
+        assert updated.id == customer.id
+        assert updated.email == "expire@example.com"
+        assert updated.name == "Renamed"
+    await engine.dispose()
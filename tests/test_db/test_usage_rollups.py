@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.models import UsageRecord, UsageRollup, generate_uuid
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    PlanRepository,
+    ProductRepository,
+    SubscriptionRepository,
+    UsageRecordRepository,
+    UsageRollupRepository,
+)
+from fastapi_payments.services.payment_service import PaymentService
+
+from tests.conftest import TEST_CONFIG
+
+PERIOD_START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+PERIOD_END = datetime(2026, 4, 1, tzinfo=timezone.utc)
+
+
+async def _subscription(session, email):
+    customer = await CustomerRepository(session).create(email=email)
+    product = await ProductRepository(session).create(name="Metered")
+    plan = await PlanRepository(session).create(
+        product_id=product.id,
+        name="Metered",
+        description=None,
+        pricing_model="usage_based",
+        amount=0.01,
+        currency="USD",
+        billing_interval="month",
+        billing_interval_count=1,
+        trial_period_days=None,
+        is_active=True,
+    )
+    subscription = await SubscriptionRepository(session).create(
+        customer_id=customer.id,
+        plan_id=plan.id,
+        provider="stripe",
+        provider_subscription_id=f"sub_{customer.id[:8]}",
+        status="active",
+        quantity=1,
+        current_period_start=PERIOD_START,
+        current_period_end=PERIOD_END,
+        cancel_at_period_end=False,
+    )
+    return subscription.id
+
+
+def _rows(subscription_id, count, step):
+    return [
+        {
+            "id": generate_uuid(),
+            "subscription_id": subscription_id,
+            "quantity": float(i % 7 + 1),
+            "timestamp": PERIOD_START + step * i,
+            "description": None,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_totals_combine_rollups_with_partial_hours():
+    async for session in get_db():
+        subscription_id = await _subscription(session, "rollup@example.com")
+        rows = _rows(subscription_id, 500, timedelta(minutes=97))
+        await UsageRecordRepository(session).create_many(rows[:200])
+        await UsageRecordRepository(session).create_many(rows[200:])
+
+        buckets = await session.execute(
+            select(
+                UsageRollup.granularity,
+                func.count(),
+                func.sum(UsageRollup.record_count),
+            )
+            .where(UsageRollup.subscription_id == subscription_id)
+            .group_by(UsageRollup.granularity)
+        )
+        by_granularity = {g: (n, records) for g, n, records in buckets.all()}
+        assert by_granularity["hour"][1] == by_granularity["day"][1] == 500
+        assert by_granularity["day"][0] < by_granularity["hour"][0]
+
+        rollups = UsageRollupRepository(session)
+        start = PERIOD_START + timedelta(hours=5, minutes=20)
+        for end in (
+            start + timedelta(minutes=30),
+            start + timedelta(hours=7, minutes=3),
+            start + timedelta(days=9, hours=4, minutes=45),
+        ):
+            expected = sum(
+                r["quantity"] for r in rows if start <= r["timestamp"] < end
+            )
+            assert await rollups.total(
+                subscription_id, start, end
+            ) == pytest.approx(expected)
+        break
+
+
+@pytest.mark.asyncio
+async def test_compactor_backfills_raw_usage():
+    async for session in get_db():
+        subscription_id = await _subscription(
+            session, "rollup-backfill@example.com"
+        )
+        rows = _rows(subscription_id, 48, timedelta(hours=1))
+        # Written without rollups, as by an earlier version
+        await session.execute(insert(UsageRecord), rows)
+        await session.commit()
+
+        service = PaymentService(
+            PaymentConfig(**TEST_CONFIG), None, None
+        ).bind(session)
+        before = await service.get_usage_summary(subscription_id)
+        assert before["quantity"] == 0
+
+        written = await service.compact_usage_rollups(
+            PERIOD_START, PERIOD_START + timedelta(days=2), [subscription_id]
+        )
+        assert written == 48
+        after = await service.get_usage_summary(subscription_id)
+        assert after["quantity"] == pytest.approx(
+            sum(r["quantity"] for r in rows)
+        )
+
+        # Rebuilding again replaces the buckets instead of adding to them
+        await service.compact_usage_rollups(PERIOD_START, PERIOD_END)
+        totals = await service.get_usage_totals(
+            PERIOD_START, PERIOD_END, [subscription_id]
+        )
+        assert totals == {subscription_id: after["quantity"]}
+        break
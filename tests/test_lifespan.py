@@ -0,0 +1,63 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from fastapi_payments import FastAPIPayments
+from fastapi_payments.api import dependencies
+from fastapi_payments.db.repositories import ensure_schema
+
+from tests.conftest import TEST_CONFIG
+
+
+class WarmProvider:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.warmed = self.closed = False
+
+    async def warm_up(self):
+        if self.fail:
+            raise ConnectionError("token endpoint unavailable")
+        self.warmed = True
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_lifespan_prepares_everything_before_serving(monkeypatch):
+    warm, broken = WarmProvider(), WarmProvider(fail=True)
+    monkeypatch.setattr(
+        dependencies,
+        "_provider_registry",
+        dependencies._provider_registry.with_overrides(
+            warm=warm, broken=broken
+        ),
+    )
+    payments = FastAPIPayments(TEST_CONFIG)
+    app = FastAPI(lifespan=payments.lifespan)
+    payments.include_router(app)
+
+    async with app.router.lifespan_context(app):
+        lifespan = payments.lifespan
+        assert lifespan.ready
+        assert set(lifespan.timings) == {
+            "dependencies",
+            "schema",
+            "pool",
+            "providers",
+        }
+        # The schema was created at startup, not by the first request
+        assert await ensure_schema() is False
+        assert warm.warmed
+        assert (
+            lifespan.provider_errors["broken"] == "token endpoint unavailable"
+        )
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get("/payments/customers")
+        assert response.status_code == 200
+
+    assert not lifespan.ready
+    assert warm.closed and broken.closed
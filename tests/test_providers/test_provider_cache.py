@@ -0,0 +1,192 @@
+import asyncio
+
+import pytest
+
+from fastapi_payments.config.config_schema import (
+    PaymentConfig,
+    ProviderCacheConfig,
+)
+from fastapi_payments.providers.cache import (
+    CachedProvider,
+    InMemoryCacheBackend,
+    ProviderReadCache,
+    collect_object_ids,
+)
+from fastapi_payments.providers.registry import ProviderRegistry
+
+from tests.conftest import TEST_CONFIG
+
+
+class CountingProvider:
+    """Provider stub that counts remote calls."""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = {"retrieve_customer": 0, "retrieve_subscription": 0}
+        self.sdk_setting = None
+
+    async def retrieve_customer(self, provider_customer_id):
+        self.calls["retrieve_customer"] += 1
+        await asyncio.sleep(self.delay)
+        return {"provider_customer_id": provider_customer_id, "name": "Jane"}
+
+    async def retrieve_subscription(self, provider_subscription_id):
+        self.calls["retrieve_subscription"] += 1
+        return {
+            "provider_subscription_id": provider_subscription_id,
+            "status": "active",
+        }
+
+    async def update_customer(self, provider_customer_id, data):
+        return {"provider_customer_id": provider_customer_id, **data}
+
+    async def webhook_handler(self, payload, signature=None):
+        return {
+            "event_type": payload["type"],
+            "standardized_event_type": "subscription.updated",
+            "data": payload["data"],
+        }
+
+
+def _cached(provider, **config):
+    cache = ProviderReadCache(ProviderCacheConfig(**config))
+    return CachedProvider("stripe", provider, cache)
+
+
+@pytest.mark.asyncio
+async def test_repeated_reads_hit_cache():
+    inner = CountingProvider()
+    provider = _cached(inner)
+
+    first = await provider.retrieve_customer("cus_1")
+    first["name"] = "mutated by caller"
+    second = await provider.retrieve_customer("cus_1")
+
+    assert inner.calls["retrieve_customer"] == 1
+    assert second["name"] == "Jane"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced():
+    inner = CountingProvider(delay=0.05)
+    provider = _cached(inner)
+
+    results = await asyncio.gather(
+        *(provider.retrieve_customer("cus_1") for _ in range(50))
+    )
+
+    assert inner.calls["retrieve_customer"] == 1
+    assert all(r["provider_customer_id"] == "cus_1" for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_abort_shared_load():
+    inner = CountingProvider(delay=0.05)
+    provider = _cached(inner)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(
+            provider.retrieve_customer("cus_1"), timeout=0.01
+        )
+    result = await provider.retrieve_customer("cus_1")
+
+    assert result["provider_customer_id"] == "cus_1"
+    assert inner.calls["retrieve_customer"] == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_per_resource_ttl():
+    inner = CountingProvider()
+    provider = _cached(inner, ttl={"customer": 0.01, "subscription": 60})
+
+    await provider.retrieve_customer("cus_1")
+    await provider.retrieve_subscription("sub_1")
+    await asyncio.sleep(0.02)
+    await provider.retrieve_customer("cus_1")
+    await provider.retrieve_subscription("sub_1")
+
+    assert inner.calls["retrieve_customer"] == 2
+    assert inner.calls["retrieve_subscription"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_is_bounded():
+    backend = InMemoryCacheBackend(max_entries=2)
+    await backend.set("a", 1, 60)
+    await backend.set("b", 2, 60)
+    await backend.get("a")
+    await backend.set("c", 3, 60)
+
+    assert await backend.get("a") == 1
+    assert await backend.get("b") is None
+    assert await backend.get("c") == 3
+
+
+@pytest.mark.asyncio
+async def test_writes_and_webhooks_invalidate():
+    inner = CountingProvider()
+    provider = _cached(inner)
+
+    await provider.retrieve_customer("cus_1")
+    await provider.update_customer("cus_1", {"name": "Updated"})
+    await provider.retrieve_customer("cus_1")
+    assert inner.calls["retrieve_customer"] == 2
+
+    await provider.retrieve_subscription("sub_1")
+    await provider.webhook_handler(
+        {
+            "type": "customer.subscription.updated",
+            "data": {"object": {"id": "sub_1", "customer": "cus_9"}},
+        }
+    )
+    await provider.retrieve_subscription("sub_1")
+    assert inner.calls["retrieve_subscription"] == 2
+
+
+def test_attribute_writes_reach_wrapped_provider():
+    inner = CountingProvider()
+    provider = _cached(inner)
+
+    provider.sdk_setting = "fake-sdk"
+    assert inner.sdk_setting == "fake-sdk"
+    assert provider.wrapped is inner
+
+    del provider.sdk_setting
+    assert not hasattr(inner, "sdk_setting")
+    assert not hasattr(provider, "sdk_setting")
+
+
+def test_cache_is_opt_in(monkeypatch):
+    monkeypatch.setattr(
+        "fastapi_payments.providers.get_provider",
+        lambda name, cfg: CountingProvider(),
+    )
+    config = {
+        **TEST_CONFIG,
+        "providers": {"stripe": TEST_CONFIG["providers"]["stripe"]},
+    }
+    config.pop("provider_cache", None)
+
+    plain = ProviderRegistry.from_config(PaymentConfig(**config))
+    assert not isinstance(plain.get("stripe"), CachedProvider)
+
+    cached = ProviderRegistry.from_config(
+        PaymentConfig(**config, provider_cache={"enabled": True})
+    )
+    assert isinstance(cached.get("stripe"), CachedProvider)
+
+
+def test_collect_object_ids_walks_provider_payload_shapes():
+    stripe_data = {
+        "object": {
+            "id": "pi_1",
+            "customer": "cus_1",
+            "object": "payment_intent",
+        }
+    }
+    razorpay_data = {
+        "payment": {"entity": {"id": "pay_1", "subscription_id": "sub_1"}}
+    }
+
+    assert collect_object_ids(stripe_data) == {"pi_1", "cus_1"}
+    assert collect_object_ids(razorpay_data) == {"pay_1", "sub_1"}
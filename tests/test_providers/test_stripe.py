@@ -612,3 +612,62 @@ async def test_process_payment_requires_3ds(stripe_provider):
     )
 
     assert result["status"] in ("requires_action", "requires_source_action", "requires_payment_method")
+
+
+@pytest.mark.asyncio
+async def test_list_changes_pages_events_from_cursor(stripe_provider):
+    """list_changes records a baseline, then returns each change once."""
+    customer = await stripe_provider.create_customer(
+        "events@example.com", "Events"
+    )
+    price = await stripe_provider.create_price(
+        (await stripe_provider.create_product("Events product"))[
+            "provider_product_id"
+        ],
+        amount=10,
+        currency="USD",
+        interval="month",
+    )
+    first = await stripe_provider.create_subscription(
+        customer["provider_customer_id"], price["provider_price_id"]
+    )
+
+    baseline = await stripe_provider.list_changes("subscriptions")
+    assert baseline["items"] == []
+    assert (
+        baseline["cursor"]["event_id"]
+        == stripe_provider.stripe.events[-1]["id"]
+    )
+
+    second = await stripe_provider.create_subscription(
+        customer["provider_customer_id"], price["provider_price_id"]
+    )
+    await stripe_provider.cancel_subscription(
+        first["provider_subscription_id"]
+    )
+    await stripe_provider.cancel_subscription(
+        second["provider_subscription_id"]
+    )
+
+    page = await stripe_provider.list_changes(
+        "subscriptions", baseline["cursor"], limit=2
+    )
+    assert page["has_more"] is True
+    rest = await stripe_provider.list_changes(
+        "subscriptions", page["cursor"], limit=2
+    )
+    assert rest["has_more"] is False
+
+    changed = {
+        i["provider_subscription_id"]: i for i in page["items"] + rest["items"]
+    }
+    assert set(changed) == {
+        first["provider_subscription_id"],
+        second["provider_subscription_id"],
+    }
+    assert (
+        rest["cursor"]["event_id"] == stripe_provider.stripe.events[-1]["id"]
+    )
+
+    empty = await stripe_provider.list_changes("subscriptions", rest["cursor"])
+    assert empty == {"items": [], "cursor": rest["cursor"], "has_more": False}
@@ -0,0 +1,183 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select, update
+
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.models import (
+    Payment,
+    ProviderSnapshot,
+    UsageRecord,
+    generate_uuid,
+)
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    PaymentRepository,
+    ProviderSnapshotRepository,
+    UsageRecordRepository,
+)
+from fastapi_payments.services.payment_service import PaymentService
+
+from tests.conftest import TEST_CONFIG
+
+
+def _service(mock_event_publisher, session, tmp_path, **archive):
+    config = PaymentConfig(
+        **TEST_CONFIG,
+        archive={
+            "path": str(tmp_path),
+            "batch_size": 2,
+            "rows_per_file": 3,
+            "delete_chunk": 2,
+            **archive,
+        },
+    )
+    return PaymentService(config, mock_event_publisher, session)
+
+
+@pytest.mark.asyncio
+async def test_old_payments_are_archived_and_listed_through(
+    mock_event_publisher, tmp_path
+):
+    now = datetime.now(timezone.utc)
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email="archive@example.com"
+        )
+        repo = PaymentRepository(session)
+        ids = []
+        # Two years back a month apart, oldest first, then one today
+        for i in range(6):
+            payment = await repo.create(
+                customer_id=customer.id,
+                provider="stripe",
+                provider_payment_id=f"pi_arch_{i}",
+                amount=10.0 + i,
+                currency="USD",
+                status="succeeded",
+                meta_info={"n": i},
+            )
+            created_at = (
+                now - timedelta(days=2 * 365 - 31 * i) if i < 5 else now
+            )
+            await session.execute(
+                update(Payment)
+                .where(Payment.id == payment.id)
+                .values(created_at=created_at)
+            )
+            ids.append(payment.id)
+        await session.commit()
+        await ProviderSnapshotRepository(session).save(
+            "payment", ids[0], "stripe", {"id": "pi_arch_0"}
+        )
+        live_page = await _service(
+            mock_event_publisher, session, tmp_path
+        ).list_payments(customer_id=customer.id, limit=10)
+
+        service = _service(
+            mock_event_publisher, session, tmp_path, payments_after_days=365
+        )
+        result = await service.archive_old_rows(now)
+        # Other tests may have left old payments too
+        assert result["payments"]["archived"] >= 5
+        assert await repo.count(customer_id=customer.id) == 1
+        snapshots = await session.execute(
+            select(func.count())
+            .select_from(ProviderSnapshot)
+            .where(ProviderSnapshot.entity_id == ids[0])
+        )
+        assert snapshots.scalar_one() == 0
+
+        files = sorted(p for p in tmp_path.rglob("*") if p.is_file())
+        assert files and all(p.name.endswith(".ndjson.gz") for p in files)
+        assert all(p.parent.parent.name.startswith("year=") for p in files)
+        with gzip.open(files[0]) as f:
+            assert set(json.loads(f.readline())) >= {
+                "id",
+                "customer_id",
+                "created_at",
+                "provider_data",
+            }
+
+        assert (
+            await service.list_payments(customer_id=customer.id, limit=10)
+            == live_page[:1]
+        )
+        merged = await service.list_payments(
+            customer_id=customer.id, limit=10, include_archived=True
+        )
+        assert merged == live_page
+        assert merged[-1]["provider_data"] == {"id": "pi_arch_0"}
+
+        # Keyset and offset pages continue into the archive
+        first = await service.list_payments(
+            customer_id=customer.id, limit=2, include_archived=True
+        )
+        assert [p["id"] for p in first] == [ids[5], ids[4]]
+        deep = await service.list_payments(
+            customer_id=customer.id, limit=2, offset=3, include_archived=True
+        )
+        assert [p["id"] for p in deep] == [ids[2], ids[1]]
+        assert (
+            await service.list_payments(
+                customer_id=customer.id, status="failed", include_archived=True
+            )
+            == []
+        )
+        break
+
+
+@pytest.mark.asyncio
+async def test_usage_archive_keeps_rollup_totals(
+    mock_event_publisher, tmp_path
+):
+    from fastapi_payments.db.models import Subscription
+
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=800)
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email="archive-usage@example.com"
+        )
+        subscription = Subscription(
+            customer_id=customer.id,
+            plan_id=generate_uuid(),
+            provider="stripe",
+            provider_subscription_id="sub_archive",
+            status="active",
+        )
+        session.add(subscription)
+        await session.commit()
+        await UsageRecordRepository(session).create_many(
+            [
+                {
+                    "id": generate_uuid(),
+                    "subscription_id": subscription.id,
+                    "quantity": 2.0,
+                    "timestamp": old + timedelta(hours=i),
+                    "description": None,
+                }
+                for i in range(7)
+            ]
+        )
+
+        service = _service(
+            mock_event_publisher, session, tmp_path, usage_after_days=365
+        )
+        assert (await service.archive_old_rows(now))["usage_records"][
+            "archived"
+        ] >= 7
+        remaining = await session.execute(
+            select(func.count())
+            .select_from(UsageRecord)
+            .where(UsageRecord.subscription_id == subscription.id)
+        )
+        assert remaining.scalar_one() == 0
+        totals = await service.get_usage_totals(
+            old - timedelta(days=1), old + timedelta(days=1), [subscription.id]
+        )
+        assert totals == {subscription.id: 14.0}
+        break
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.repositories import get_db, CustomerRepository
+from fastapi_payments.services.payment_service import PaymentService
+
+from tests.conftest import TEST_CONFIG
+
+
+class DelayedProvider:
+    """Provider stub whose retrieve_customer takes a fixed amount of time."""
+
+    def __init__(self, delay: float, timeout: float = None):
+        self.delay = delay
+        self.config = type("Cfg", (), {"timeout": timeout})()
+        self.calls = 0
+
+    async def retrieve_customer(self, provider_customer_id):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {
+            "provider_customer_id": provider_customer_id,
+            "delay": self.delay,
+        }
+
+
+@pytest.mark.asyncio
+async def test_get_customer_fans_out_with_per_provider_timeout(
+    mock_event_publisher,
+):
+    config = PaymentConfig(**{**TEST_CONFIG, "provider_timeout": 0.5})
+    service = PaymentService(config, mock_event_publisher, None)
+    service.providers["fast_a"] = DelayedProvider(0.2)
+    service.providers["fast_b"] = DelayedProvider(0.2)
+    # Per-provider override is shorter than the global default
+    service.providers["slow"] = DelayedProvider(5, timeout=0.05)
+
+    async for session in get_db():
+        service = service.bind(session)
+        repo = CustomerRepository(session)
+        customer = await repo.create(
+            email="fanout@example.com", name="Fan Out"
+        )
+        for name in ("fast_a", "fast_b", "slow"):
+            await repo.add_provider_customer(customer.id, name, f"{name}_cust")
+
+        started = time.monotonic()
+        result = await service.get_customer(customer.id)
+        elapsed = time.monotonic() - started
+
+        by_provider = {
+            pc["provider"]: pc["provider_data"]
+            for pc in result["provider_customers"]
+        }
+        assert by_provider["fast_a"]["provider_customer_id"] == "fast_a_cust"
+        assert by_provider["fast_b"]["provider_customer_id"] == "fast_b_cust"
+        assert by_provider["slow"] == {"error": "timeout"}
+        # Concurrent: bounded by the slowest successful call, not the sum
+        assert elapsed < 0.4
+        break
+
+
+@pytest.mark.asyncio
+async def test_get_customer_can_skip_provider_calls(mock_event_publisher):
+    service = PaymentService(
+        PaymentConfig(**TEST_CONFIG), mock_event_publisher, None
+    )
+    provider = DelayedProvider(0)
+    service.providers["local_only"] = provider
+
+    async for session in get_db():
+        service = service.bind(session)
+        repo = CustomerRepository(session)
+        customer = await repo.create(email="skip@example.com", name="Skip")
+        await repo.add_provider_customer(customer.id, "local_only", "lo_cust")
+
+        result = await service.get_customer(
+            customer.id, include_provider_data=False
+        )
+
+        assert provider.calls == 0
+        assert result["provider_customers"] == [
+            {
+                "provider": "local_only",
+                "provider_customer_id": "lo_cust",
+                "provider_data": None,
+            }
+        ]
+        break
@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from fastapi_payments.config.config_schema import (
+    IdempotencyConfig,
+    PaymentConfig,
+)
+from fastapi_payments.db.models import Payment
+from fastapi_payments.db.repositories import get_db, CustomerRepository
+from fastapi_payments.services.idempotency import IdempotencyStore
+from fastapi_payments.services.payment_service import PaymentService
+from fastapi_payments.utils.exceptions import IdempotencyError
+
+from tests.conftest import TEST_CONFIG
+from tests.fakes.fake_stripe import FakeStripe
+
+
+class SlowStripe(FakeStripe):
+    """FakeStripe whose PaymentIntent.create can be made to fail once."""
+
+    def __init__(self):
+        super().__init__()
+        self.intent_calls = []
+        self.fail_next = False
+        self.PaymentIntent.create = self._counting_create
+
+    def _counting_create(self, **kwargs):
+        self.intent_calls.append(kwargs.get("idempotency_key"))
+        if self.fail_next:
+            self.fail_next = False
+            raise Exception("provider unavailable")
+        return self._payment_intent_create(**kwargs)
+
+
+@pytest.fixture
+def idempotent_service(mock_event_publisher):
+    config = PaymentConfig(
+        **{**TEST_CONFIG, "idempotency": {"wait_timeout": 1}}
+    )
+    service = PaymentService(config, mock_event_publisher, None)
+    stripe = service.providers["stripe"]
+    stripe._run_stripe_calls_in_thread = False
+    stripe.stripe = SlowStripe()
+    stripe.stripe_error = stripe.stripe.error
+    return service
+
+
+async def _customer(session, email):
+    repo = CustomerRepository(session)
+    customer = await repo.create(email=email)
+    await repo.add_provider_customer(
+        customer.id, "stripe", f"cus_{customer.id[:8]}"
+    )
+    return customer
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_charge_once(idempotent_service):
+    sessions = [get_db() for _ in range(3)]
+    bound = [
+        idempotent_service.bind(await gen.__anext__()) for gen in sessions
+    ]
+    customer = await _customer(bound[0].db_session, "idem@example.com")
+
+    results = await asyncio.gather(
+        *(
+            service.process_payment(
+                customer_id=customer.id,
+                amount=25.0,
+                currency="USD",
+                idempotency_key="order-1",
+            )
+            for service in bound
+        )
+    )
+
+    assert len({r["id"] for r in results}) == 1
+    stripe = idempotent_service.providers["stripe"].stripe
+    assert stripe.intent_calls == ["process_payment:order-1"]
+    stored = await bound[0].db_session.execute(
+        select(func.count(Payment.id)).where(
+            Payment.customer_id == customer.id
+        )
+    )
+    assert stored.scalar_one() == 1
+
+    # A later retry, even from a fresh process cache, replays the stored
+    # response
+    idempotent_service.idempotency._cache = type(
+        idempotent_service.idempotency._cache
+    )()
+    replay = await bound[1].process_payment(
+        customer_id=customer.id,
+        amount=25.0,
+        currency="USD",
+        idempotency_key="order-1",
+    )
+    assert replay == results[0]
+    assert len(stripe.intent_calls) == 1
+
+    for gen in sessions:
+        await gen.aclose()
+
+
+@pytest.mark.asyncio
+async def test_reused_key_with_different_body_is_rejected(idempotent_service):
+    async for session in get_db():
+        service = idempotent_service.bind(session)
+        customer = await _customer(session, "idem-reuse@example.com")
+        await service.process_payment(
+            customer_id=customer.id,
+            amount=10.0,
+            currency="USD",
+            idempotency_key="order-2",
+        )
+        with pytest.raises(IdempotencyError) as exc:
+            await service.process_payment(
+                customer_id=customer.id,
+                amount=11.0,
+                currency="USD",
+                idempotency_key="order-2",
+            )
+        assert exc.value.code == "idempotency_key_reused"
+        break
+
+
+@pytest.mark.asyncio
+async def test_failed_request_releases_key(idempotent_service):
+    async for session in get_db():
+        service = idempotent_service.bind(session)
+        customer_id = (await _customer(session, "idem-retry@example.com")).id
+        stripe = idempotent_service.providers["stripe"].stripe
+        stripe.fail_next = True
+
+        with pytest.raises(Exception):
+            await service.process_payment(
+                customer_id=customer_id,
+                amount=5.0,
+                currency="USD",
+                idempotency_key="order-3",
+            )
+        result = await service.process_payment(
+            customer_id=customer_id,
+            amount=5.0,
+            currency="USD",
+            idempotency_key="order-3",
+        )
+        assert result["provider_payment_id"]
+        assert stripe.intent_calls == [
+            "process_payment:order-3",
+            "process_payment:order-3",
+        ]
+
+        # Without a key every call is a new payment
+        await service.process_payment(
+            customer_id=customer_id, amount=5.0, currency="USD"
+        )
+        assert stripe.intent_calls[-1] is None
+        break
+
+
+@pytest.mark.asyncio
+async def test_long_request_keeps_its_key_locked():
+    config = IdempotencyConfig(
+        lock_seconds=0.15, wait_timeout=2, poll_interval=0.02
+    )
+    calls = []
+
+    async def slow_charge():
+        calls.append(1)
+        # Runs well past lock_seconds
+        await asyncio.sleep(0.6)
+        return {"id": "pay_slow"}
+
+    # Two stores stand in for two processes sharing the table
+    first, second = IdempotencyStore(config), IdempotencyStore(config)
+    running = asyncio.ensure_future(
+        first.run("charge", "order-slow", "fp", slow_charge)
+    )
+    await asyncio.sleep(0.3)
+    duplicate = await second.run("charge", "order-slow", "fp", slow_charge)
+
+    assert duplicate == await running == {"id": "pay_slow"}
+    assert len(calls) == 1
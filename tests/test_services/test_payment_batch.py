@@ -0,0 +1,260 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, func, select
+
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.models import Payment
+from fastapi_payments.db.repositories import get_db, CustomerRepository
+from fastapi_payments.services.payment_batch import wait_for_batches
+from fastapi_payments.services.payment_service import PaymentService
+
+from tests.conftest import TEST_CONFIG
+
+
+class BatchProvider:
+    """Provider stub that records how many charges are in flight at once."""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.charged = []
+
+    async def process_payment(
+        self, amount, currency, provider_customer_id, **kwargs
+    ):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if amount == 13:
+            raise RuntimeError("card declined")
+        self.charged.append(kwargs.get("mandate_id"))
+        return {
+            "provider_payment_id": f"pay_{kwargs.get('mandate_id')}",
+            "status": "COMPLETED",
+            "meta_info": {"mandate": kwargs.get("mandate_id")},
+        }
+
+
+@pytest.mark.asyncio
+async def test_process_payments_batches_writes_and_streams_results(
+    mock_event_publisher,
+):
+    config = PaymentConfig(
+        **{
+            **TEST_CONFIG,
+            "bulk": {
+                "batch_size": 10,
+                "concurrency": 8,
+                "provider_concurrency": {"batchfake": 3},
+            },
+        }
+    )
+    service = PaymentService(config, mock_event_publisher, None)
+    provider = BatchProvider()
+    service.providers["batchfake"] = provider
+
+    async for session in get_db():
+        service = service.bind(session)
+        repo = CustomerRepository(session)
+        customer = await repo.create(email="batch@example.com")
+        await repo.add_provider_customer(customer.id, "batchfake", "cus_batch")
+        unlinked = await repo.create(email="unlinked@example.com")
+
+        payments = [
+            {
+                "customer_id": customer.id,
+                "amount": 10 + (i % 5),
+                "currency": "INR",
+                "mandate_id": f"mandate_{i}",
+                "provider": "batchfake",
+            }
+            for i in range(25)
+        ]
+        payments[3] = {
+            "customer_id": customer.id,
+            "amount": -1,
+            "provider": "batchfake",
+        }
+        payments[7] = {
+            "customer_id": unlinked.id,
+            "amount": 10,
+            "provider": "batchfake",
+        }
+        payments[20] = {
+            "customer_id": "missing",
+            "amount": 10,
+            "provider": "batchfake",
+        }
+
+        commits = []
+
+        def _count_commit(connection):
+            commits.append(connection)
+
+        # The batch commits through its own session
+        engine = session.bind.sync_engine
+        event.listen(engine, "commit", _count_commit)
+        results = [r async for r in service.process_payments(payments)]
+        event.remove(engine, "commit", _count_commit)
+
+        assert [r["index"] for r in results] == list(range(25))
+        failed = {
+            r["index"]: r["error"] for r in results if r["status"] == "failed"
+        }
+        assert set(failed) == {3, 7, 8, 13, 18, 20, 23}
+        assert failed[7] == "Customer not found for provider batchfake"
+        assert failed[20] == "Customer not found: missing"
+        assert failed[8] == "card declined"
+
+        created = [r["payment"] for r in results if r["status"] == "created"]
+        assert len(created) == 18
+        assert created[0]["provider_payment_id"] == "pay_mandate_0"
+        assert created[0]["provider_data"] == {"mandate": "mandate_0"}
+        assert "provider_data" not in (created[0]["meta_info"] or {})
+
+        # One multi-row insert per batch, not one commit per payment
+        assert len(commits) == 3
+        assert provider.max_in_flight == 3
+        stored = await session.execute(
+            select(func.count(Payment.id)).where(
+                Payment.id.in_([p["id"] for p in created])
+            )
+        )
+        assert stored.scalar_one() == 18
+
+        published = [
+            e
+            for e in mock_event_publisher.events
+            if e["data"].get("provider") == "batchfake"
+        ]
+        assert len(published) == 18
+        break
+
+
+class IdempotentProvider:
+    """Provider stub that replays the first charge for a repeated key."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.keys = []
+        self.charges = {}
+
+    async def process_payment(
+        self,
+        amount,
+        currency,
+        provider_customer_id,
+        idempotency_key=None,
+        **kwargs,
+    ):
+        await asyncio.sleep(0.01)
+        self.keys.append(idempotency_key)
+        charge = self.charges.setdefault(
+            idempotency_key,
+            {
+                "provider_payment_id": f"{self.prefix}_{len(self.charges)}",
+                "status": "COMPLETED",
+            },
+        )
+        return dict(charge)
+
+
+async def _batch_service(mock_event_publisher, provider, email):
+    config = PaymentConfig(**{**TEST_CONFIG, "bulk": {"batch_size": 2}})
+    service = PaymentService(config, mock_event_publisher, None)
+    service.providers["idemfake"] = provider
+    async for session in get_db():
+        repo = CustomerRepository(session)
+        customer = await repo.create(email=email)
+        await repo.add_provider_customer(
+            customer.id, "idemfake", f"cus_{customer.id[:8]}"
+        )
+        return service, customer.id
+
+
+async def _stored(customer_id):
+    async for session in get_db():
+        rows = await session.execute(
+            select(Payment.provider_payment_id).where(
+                Payment.customer_id == customer_id
+            )
+        )
+        return sorted(rows.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_batch_is_stored_after_the_consumer_goes_away(
+    mock_event_publisher,
+):
+    provider = IdempotentProvider("pay_gone")
+    service, customer_id = await _batch_service(
+        mock_event_publisher, provider, "gone@example.com"
+    )
+    payments = [
+        {
+            "customer_id": customer_id,
+            "amount": 5,
+            "provider": "idemfake",
+            "idempotency_key": f"k{i}",
+        }
+        for i in range(5)
+    ]
+
+    async def read_one():
+        async for _ in service.process_payments(payments):
+            # The client disconnects after the first result
+            await asyncio.sleep(10)
+
+    reader = asyncio.ensure_future(read_one())
+    await asyncio.sleep(0.05)
+    reader.cancel()
+    await asyncio.gather(reader, return_exceptions=True)
+    assert await wait_for_batches(timeout=5) == 0
+
+    assert len(await _stored(customer_id)) == 5
+    assert provider.keys == [f"process_payment:k{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_resent_batch_does_not_charge_or_store_twice(
+    mock_event_publisher,
+):
+    provider = IdempotentProvider("pay_resend")
+    service, customer_id = await _batch_service(
+        mock_event_publisher, provider, "resend@example.com"
+    )
+    payments = [
+        {"customer_id": customer_id, "amount": 5, "provider": "idemfake"}
+        for _ in range(3)
+    ]
+
+    first = [
+        r
+        async for r in service.process_payments(
+            payments, idempotency_key="batch-1"
+        )
+    ]
+    again = [
+        r
+        async for r in service.process_payments(
+            payments, idempotency_key="batch-1"
+        )
+    ]
+
+    assert provider.keys[:3] == [
+        f"process_payment:batch-1:{i}" for i in range(3)
+    ]
+    assert len(provider.charges) == 3
+    assert [r["payment"]["id"] for r in again] == [
+        r["payment"]["id"] for r in first
+    ]
+    assert await _stored(customer_id) == [
+        "pay_resend_0",
+        "pay_resend_1",
+        "pay_resend_2",
+    ]
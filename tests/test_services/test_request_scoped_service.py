@@ -0,0 +1,81 @@
+import asyncio
+import random
+
+import pytest
+
+from fastapi_payments.api.dependencies import get_payment_service_with_db
+from fastapi_payments.providers import ProviderRegistry
+from fastapi_payments.services.payment_service import PaymentService
+
+
+class TaggedSession:
+    """Stand-in for AsyncSession that reports which session served a call."""
+
+    def __init__(self, tag: int):
+        self.tag = tag
+
+    async def get(self, model, obj_id):
+        # Yield to the loop so concurrent requests interleave mid-call
+        await asyncio.sleep(random.random() / 1000)
+        return self.tag
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_keep_their_own_session(
+    initialize_test_dependencies, mock_event_publisher
+):
+    service = PaymentService(
+        initialize_test_dependencies, mock_event_publisher, None
+    )
+
+    async def handle_request(tag: int) -> None:
+        session = TaggedSession(tag)
+        handle = await get_payment_service_with_db(
+            payment_service=service, db=session
+        )
+        await asyncio.sleep(random.random() / 1000)
+
+        assert handle.db_session is session
+        assert await handle.customer_repo.get_by_id("cust") == tag
+        await asyncio.sleep(random.random() / 1000)
+        assert await handle.payment_repo.get_by_id("pay") == tag
+        assert handle.sync_job_repo.session is session
+
+    await asyncio.gather(*(handle_request(i) for i in range(500)))
+
+    # The shared service itself is never bound to a request session
+    assert service.db_session is None
+
+
+@pytest.mark.asyncio
+async def test_bound_handles_share_provider_instances(
+    initialize_test_dependencies, mock_event_publisher, monkeypatch
+):
+    registry = ProviderRegistry.from_config(initialize_test_dependencies)
+    service = PaymentService(
+        initialize_test_dependencies,
+        mock_event_publisher,
+        None,
+        registry=registry,
+    )
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("providers must not be rebuilt per request")
+
+    monkeypatch.setattr(ProviderRegistry, "from_config", classmethod(_fail))
+
+    handle = service.bind(TaggedSession(1))
+    assert handle.registry is registry
+    assert handle.get_provider("stripe") is registry["stripe"]
+
+
+def test_registry_is_read_only(initialize_test_dependencies):
+    registry = ProviderRegistry.from_config(initialize_test_dependencies)
+
+    with pytest.raises(TypeError):
+        registry["stripe"] = object()
+
+    fake = object()
+    overridden = registry.with_overrides(stripe=fake)
+    assert overridden["stripe"] is fake
+    assert registry["stripe"] is not fake
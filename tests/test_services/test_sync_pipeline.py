@@ -0,0 +1,561 @@
+import asyncio
+import math
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, func, select
+
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.models import Subscription
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    PaymentMethodRepository,
+    PlanRepository,
+    ProductRepository,
+    SubscriptionRepository,
+    SyncJobRepository,
+)
+from fastapi_payments.services import sync_pipeline
+from fastapi_payments.services.payment_service import PaymentService
+
+from tests.conftest import TEST_CONFIG
+
+
+class SlowSyncProvider:
+    """Provider stub that records how many calls are in flight at once."""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def retrieve_subscription(self, provider_subscription_id):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if provider_subscription_id == "sub_broken":
+            raise RuntimeError("provider unavailable")
+        return {"status": "past_due", "cancel_at_period_end": True}
+
+    async def list_payment_methods(self, provider_customer_id):
+        method = {
+            "payment_method_id": "pm_sync_1",
+            "card": {"brand": "visa", "last4": "4242"},
+        }
+        # The same method listed twice must only be stored once
+        return [method, dict(method)]
+
+
+def _service(mock_event_publisher, **sync):
+    config = PaymentConfig(**{**TEST_CONFIG, "sync": sync})
+    return PaymentService(config, mock_event_publisher, None)
+
+
+@pytest.mark.asyncio
+async def test_sync_streams_batches_under_provider_limit(mock_event_publisher):
+    service = _service(
+        mock_event_publisher,
+        batch_size=10,
+        concurrency=8,
+        provider_concurrency={"syncfake": 3},
+    )
+    provider = SlowSyncProvider()
+    service.providers["syncfake"] = provider
+
+    async for session in get_db():
+        service = service.bind(session)
+        customer = await CustomerRepository(session).create(
+            email="sync@example.com"
+        )
+        product = await ProductRepository(session).create(name="Sync product")
+        plan = await PlanRepository(session).create(
+            product_id=product.id,
+            name="Sync plan",
+            description=None,
+            pricing_model="subscription",
+            amount=10.0,
+            currency="USD",
+            billing_interval="month",
+            billing_interval_count=1,
+            trial_period_days=None,
+            is_active=True,
+        )
+        sub_repo = SubscriptionRepository(session)
+        now = datetime.now(timezone.utc)
+        created = []
+        for i in range(24):
+            created.append(
+                await sub_repo.create(
+                    customer_id=customer.id,
+                    plan_id=plan.id,
+                    provider="syncfake",
+                    provider_subscription_id=f"sub_sync_{i}",
+                    status="active",
+                    quantity=1,
+                    current_period_start=now,
+                    current_period_end=now,
+                    cancel_at_period_end=False,
+                )
+            )
+        created.append(
+            await sub_repo.create(
+                customer_id=customer.id,
+                plan_id=plan.id,
+                provider="syncfake",
+                provider_subscription_id="sub_broken",
+                status="active",
+                quantity=1,
+                current_period_start=now,
+                current_period_end=now,
+                cancel_at_period_end=False,
+            )
+        )
+        total = (
+            await session.execute(select(func.count(Subscription.id)))
+        ).scalar_one()
+
+        commits = []
+
+        def _count_commit(sync_session):
+            commits.append(sync_session)
+
+        event.listen(session.sync_session, "after_commit", _count_commit)
+        result = await service.sync_resources(
+            resources=["subscriptions"], provider="syncfake", limit=None
+        )
+        event.remove(session.sync_session, "after_commit", _count_commit)
+
+        summary = result["summary"]["subscriptions"]
+        assert summary["synced"] == total
+        assert summary["updated"] == 24
+        assert summary["errors"] == ["provider unavailable"]
+        assert summary["rows_per_second"] > 0
+        assert result["rows_per_second"] > 0
+        assert provider.calls == 25
+        assert provider.max_in_flight == 3
+        # One transaction per batch rather than one per row
+        assert len(commits) == math.ceil(total / 10)
+
+        for sub in created[:-1]:
+            assert sub.status == "past_due"
+            assert sub.cancel_at_period_end is True
+        assert created[-1].status == "active"
+        break
+
+
+@pytest.mark.asyncio
+async def test_sync_payment_methods_creates_each_method_once(
+    mock_event_publisher,
+):
+    service = _service(mock_event_publisher)
+    service.providers["syncfake"] = SlowSyncProvider()
+
+    async for session in get_db():
+        service = service.bind(session)
+        repo = CustomerRepository(session)
+        customer = await repo.create(email="sync-pm@example.com")
+        await repo.add_provider_customer(
+            customer.id, "syncfake", "cus_sync_pm"
+        )
+
+        first = await service.sync_resources(
+            resources=["payment_methods"], filters={"customer_id": customer.id}
+        )
+        second = await service.sync_resources(
+            resources=["payment_methods"], filters={"customer_id": customer.id}
+        )
+
+        assert first["summary"]["payment_methods"]["created"] == 1
+        assert second["summary"]["payment_methods"]["created"] == 0
+        assert second["summary"]["payment_methods"]["updated"] == 2
+        methods = await PaymentMethodRepository(session).list_for_customer(
+            customer.id
+        )
+        assert [m.card_last4 for m in methods] == ["4242"]
+        break
+
+
+class WorkerCrash(BaseException):
+    """Simulates the process dying mid-job; best-effort handlers miss it."""
+
+
+class CrashingProvider:
+    def __init__(self, crash_on=None):
+        self.crash_on = crash_on
+        self.retrieved = []
+
+    async def retrieve_subscription(self, provider_subscription_id):
+        if provider_subscription_id == self.crash_on:
+            raise WorkerCrash()
+        self.retrieved.append(provider_subscription_id)
+        return {"status": "paused"}
+
+
+@pytest.mark.asyncio
+async def test_sync_job_resumes_from_checkpoint(mock_event_publisher):
+    service = _service(mock_event_publisher, batch_size=5)
+
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email="resume@example.com"
+        )
+        product = await ProductRepository(session).create(
+            name="Resume product"
+        )
+        plan = await PlanRepository(session).create(
+            product_id=product.id,
+            name="Resume plan",
+            description=None,
+            pricing_model="subscription",
+            amount=5.0,
+            currency="USD",
+            billing_interval="month",
+            billing_interval_count=1,
+            trial_period_days=None,
+            is_active=True,
+        )
+        sub_repo = SubscriptionRepository(session)
+        now = datetime.now(timezone.utc)
+        subs = []
+        for i in range(12):
+            subs.append(
+                await sub_repo.create(
+                    customer_id=customer.id,
+                    plan_id=plan.id,
+                    provider="resumefake",
+                    provider_subscription_id=f"sub_resume_{i}",
+                    status="active",
+                    quantity=1,
+                    current_period_start=now,
+                    current_period_end=now,
+                    cancel_at_period_end=False,
+                )
+            )
+        total = (
+            await session.execute(select(func.count(Subscription.id)))
+        ).scalar_one()
+        job = await SyncJobRepository(session).create(
+            resources=["subscriptions"], provider="resumefake"
+        )
+        break
+
+    # Crash while syncing the row that sorts last, after earlier batches
+    # committed
+    last = max(subs, key=lambda sub: sub.id)
+    service.providers["resumefake"] = CrashingProvider(
+        crash_on=last.provider_subscription_id
+    )
+    with pytest.raises(WorkerCrash):
+        await service.execute_sync_job(job.id)
+
+    async for session in get_db():
+        interrupted = await SyncJobRepository(session).get_by_id(job.id)
+        assert interrupted.status == "running"
+        assert interrupted.checkpoint["subscriptions"]["after"] is not None
+        assert interrupted.checkpoint["subscriptions"]["done"] is False
+        break
+
+    provider = CrashingProvider()
+    service.providers["resumefake"] = provider
+    resumed = await service.resume_sync_jobs()
+    assert job.id in resumed
+
+    async for session in get_db():
+        finished = await SyncJobRepository(session).get_by_id(job.id)
+        assert finished.status == "completed"
+        summary = finished.result["summary"]["subscriptions"]
+        # Counters carry over from the interrupted run without double counting
+        assert summary["synced"] == total
+        assert summary["updated"] == 12
+        # Only rows after the checkpoint were fetched again
+        assert last.provider_subscription_id in provider.retrieved
+        assert len(provider.retrieved) < 12
+
+        rows = await session.execute(
+            select(Subscription.status).where(
+                Subscription.id.in_([s.id for s in subs])
+            )
+        )
+        assert set(rows.scalars().all()) == {"paused"}
+        break
+
+
+@pytest.mark.asyncio
+async def test_sync_job_error_leaves_resource_resumable(
+    mock_event_publisher, monkeypatch
+):
+    service = _service(mock_event_publisher, batch_size=5)
+
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email="transient@example.com"
+        )
+        product = await ProductRepository(session).create(
+            name="Transient product"
+        )
+        plan = await PlanRepository(session).create(
+            product_id=product.id,
+            name="Transient plan",
+            description=None,
+            pricing_model="subscription",
+            amount=5.0,
+            currency="USD",
+            billing_interval="month",
+            billing_interval_count=1,
+            trial_period_days=None,
+            is_active=True,
+        )
+        now = datetime.now(timezone.utc)
+        subs = [
+            await SubscriptionRepository(session).create(
+                customer_id=customer.id,
+                plan_id=plan.id,
+                provider="transientfake",
+                provider_subscription_id=f"sub_transient_{i}",
+                status="active",
+                quantity=1,
+                current_period_start=now,
+                current_period_end=now,
+                cancel_at_period_end=False,
+            )
+            for i in range(7)
+        ]
+        job = await SyncJobRepository(session).create(
+            resources=["subscriptions"], provider="transientfake"
+        )
+        break
+
+    # The database goes away while the second batch is synced
+    load_after = sync_pipeline.SubscriptionSync.load_after
+    calls = []
+
+    async def flaky_load_after(self, after_id, limit):
+        calls.append(after_id)
+        if len(calls) == 3:
+            raise RuntimeError("database is unavailable")
+        return await load_after(self, after_id, limit)
+
+    monkeypatch.setattr(
+        sync_pipeline.SubscriptionSync, "load_after", flaky_load_after
+    )
+    service.providers["transientfake"] = CrashingProvider()
+    await service.execute_sync_job(job.id)
+
+    async for session in get_db():
+        stopped = await SyncJobRepository(session).get_by_id(job.id)
+        assert stopped.status == "running"
+        assert stopped.result["incomplete"] == ["subscriptions"]
+        assert stopped.checkpoint["subscriptions"] == {
+            "after": calls[1],
+            "done": False,
+        }
+        break
+
+    monkeypatch.setattr(
+        sync_pipeline.SubscriptionSync, "load_after", load_after
+    )
+    assert job.id in await service.resume_sync_jobs()
+
+    async for session in get_db():
+        finished = await SyncJobRepository(session).get_by_id(job.id)
+        assert finished.status == "completed"
+        assert finished.checkpoint["subscriptions"]["done"] is True
+        rows = await session.execute(
+            select(Subscription.status).where(
+                Subscription.id.in_([s.id for s in subs])
+            )
+        )
+        assert set(rows.scalars().all()) == {"paused"}
+        break
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_write_is_retried_on_resume(
+    mock_event_publisher, monkeypatch
+):
+    service = _service(mock_event_publisher, batch_size=5)
+
+    async for session in get_db():
+        customer = await CustomerRepository(session).create(
+            email="writefail@example.com"
+        )
+        product = await ProductRepository(session).create(
+            name="Write failure product"
+        )
+        plan = await PlanRepository(session).create(
+            product_id=product.id,
+            name="Write failure plan",
+            description=None,
+            pricing_model="subscription",
+            amount=5.0,
+            currency="USD",
+            billing_interval="month",
+            billing_interval_count=1,
+            trial_period_days=None,
+            is_active=True,
+        )
+        now = datetime.now(timezone.utc)
+        subs = [
+            await SubscriptionRepository(session).create(
+                customer_id=customer.id,
+                plan_id=plan.id,
+                provider="writefailfake",
+                provider_subscription_id=f"sub_writefail_{i}",
+                status="active",
+                quantity=1,
+                current_period_start=now,
+                current_period_end=now,
+                cancel_at_period_end=False,
+            )
+            for i in range(7)
+        ]
+        job = await SyncJobRepository(session).create(
+            resources=["subscriptions"], provider="writefailfake"
+        )
+        break
+
+    # Writing the first batch with our subscriptions in it fails
+    write = sync_pipeline.SubscriptionSync.write
+    failed = []
+
+    async def failing_write(self, items, summary):
+        if items and not failed:
+            failed.extend(item.row.id for item in items)
+            raise RuntimeError("database is unavailable")
+        return await write(self, items, summary)
+
+    monkeypatch.setattr(
+        sync_pipeline.SubscriptionSync, "write", failing_write
+    )
+    service.providers["writefailfake"] = CrashingProvider()
+    await service.execute_sync_job(job.id)
+
+    async for session in get_db():
+        stopped = await SyncJobRepository(session).get_by_id(job.id)
+        assert stopped.status == "running"
+        assert stopped.result["incomplete"] == ["subscriptions"]
+        # The cursor has not moved past the batch that failed
+        state = stopped.checkpoint["subscriptions"]
+        assert state["done"] is False
+        assert state["after"] is None or state["after"] < min(failed)
+        break
+
+    monkeypatch.setattr(sync_pipeline.SubscriptionSync, "write", write)
+    assert job.id in await service.resume_sync_jobs()
+
+    async for session in get_db():
+        finished = await SyncJobRepository(session).get_by_id(job.id)
+        assert finished.status == "completed"
+        rows = await session.execute(
+            select(Subscription.status).where(
+                Subscription.id.in_([s.id for s in subs])
+            )
+        )
+        # Including the rows of the batch whose write failed
+        assert set(rows.scalars().all()) == {"paused"}
+        break
+
+
+class ChangeFeedProvider:
+    """Provider stub exposing a change feed of subscription updates."""
+
+    incremental_resources = ("subscriptions",)
+
+    def __init__(self):
+        self.changes = []
+        self.cursors_seen = []
+
+    async def list_changes(self, resource, cursor=None, limit=100):
+        self.cursors_seen.append(cursor)
+        if cursor is None:
+            return {
+                "items": [],
+                "cursor": {"seq": len(self.changes)},
+                "has_more": False,
+            }
+        start = cursor["seq"]
+        page = self.changes[start:start + limit]
+        end = start + len(page)
+        return {
+            "items": page,
+            "cursor": {"seq": end},
+            "has_more": end < len(self.changes),
+        }
+
+
+@pytest.mark.asyncio
+async def test_sync_changes_applies_only_changes_since_cursor(
+    mock_event_publisher,
+):
+    service = _service(mock_event_publisher, batch_size=2)
+    provider = ChangeFeedProvider()
+    service.providers["feedfake"] = provider
+
+    async for session in get_db():
+        service = service.bind(session)
+        customer = await CustomerRepository(session).create(
+            email="feed@example.com"
+        )
+        product = await ProductRepository(session).create(name="Feed product")
+        plan = await PlanRepository(session).create(
+            product_id=product.id,
+            name="Feed plan",
+            description=None,
+            pricing_model="subscription",
+            amount=5.0,
+            currency="USD",
+            billing_interval="month",
+            billing_interval_count=1,
+            trial_period_days=None,
+            is_active=True,
+        )
+        sub_repo = SubscriptionRepository(session)
+        now = datetime.now(timezone.utc)
+        subs = [
+            await sub_repo.create(
+                customer_id=customer.id,
+                plan_id=plan.id,
+                provider="feedfake",
+                provider_subscription_id=f"sub_feed_{i}",
+                status="active",
+                quantity=1,
+                current_period_start=now,
+                current_period_end=now,
+                cancel_at_period_end=False,
+            )
+            for i in range(3)
+        ]
+
+        # First run only records the high-water mark
+        baseline = await service.sync_changes(
+            resources=["subscriptions"], provider="feedfake"
+        )
+        assert baseline["summary"]["subscriptions"]["synced"] == 0
+
+        provider.changes = [
+            {"provider_subscription_id": "sub_feed_0", "status": "past_due"},
+            {"provider_subscription_id": "sub_feed_2", "status": "canceled"},
+            {"provider_subscription_id": "sub_unknown", "status": "canceled"},
+        ]
+        result = await service.sync_changes(
+            resources=["subscriptions"], provider="feedfake"
+        )
+        summary = result["summary"]["subscriptions"]
+        assert summary["synced"] == 3
+        assert summary["updated"] == 2
+        assert summary["errors"] == []
+        assert [s.status for s in subs] == ["past_due", "active", "canceled"]
+
+        # The cursor advanced past the applied changes
+        again = await service.sync_changes(
+            resources=["subscriptions"], provider="feedfake"
+        )
+        assert again["summary"]["subscriptions"]["synced"] == 0
+        assert provider.cursors_seen[-1] == {"seq": 3}
+        break
@@ -0,0 +1,183 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func, select
+
+from fastapi_payments.config.config_schema import UsageConfig
+from fastapi_payments.db.models import UsageRecord
+from fastapi_payments.db.repositories import (
+    get_db,
+    new_session,
+    CustomerRepository,
+    PlanRepository,
+    ProductRepository,
+    SubscriptionRepository,
+)
+from fastapi_payments.messaging.publishers import PaymentEvents
+from fastapi_payments.services.usage_ingest import UsageIngestor
+from fastapi_payments.utils.exceptions import UsageBufferFullError
+
+
+async def _subscription(session, email):
+    customer = await CustomerRepository(session).create(email=email)
+    product = await ProductRepository(session).create(name="Metered")
+    plan = await PlanRepository(session).create(
+        product_id=product.id,
+        name="Metered",
+        description=None,
+        pricing_model="usage_based",
+        amount=0.01,
+        currency="USD",
+        billing_interval="month",
+        billing_interval_count=1,
+        trial_period_days=None,
+        is_active=True,
+    )
+    now = datetime.now(timezone.utc)
+    subscription = await SubscriptionRepository(session).create(
+        customer_id=customer.id,
+        plan_id=plan.id,
+        provider="stripe",
+        provider_subscription_id=f"sub_{customer.id[:8]}",
+        status="active",
+        quantity=1,
+        current_period_start=now,
+        current_period_end=now,
+        cancel_at_period_end=False,
+    )
+    return subscription.id
+
+
+def _counting_sessionmaker():
+    opened = []
+
+    def factory():
+        opened.append(1)
+        return new_session()
+
+    return factory, opened
+
+
+async def _count_records(subscription_id):
+    async for session in get_db():
+        result = await session.execute(
+            select(func.count(UsageRecord.id)).where(
+                UsageRecord.subscription_id == subscription_id
+            )
+        )
+        return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submissions_share_batches(mock_event_publisher):
+    async for session in get_db():
+        subscription_id = await _subscription(session, "ingest@example.com")
+        break
+
+    factory, writes = _counting_sessionmaker()
+    ingestor = UsageIngestor(
+        UsageConfig(flush_size=100, flush_interval=5),
+        mock_event_publisher,
+        factory,
+    )
+    requests = [
+        [{"subscription_id": subscription_id, "quantity": 1.0}] * 50
+        for _ in range(4)
+    ]
+    requests[0][3] = {"subscription_id": "missing", "quantity": 1.0}
+    # Rejected before buffering, so it does not count towards a batch
+    requests[1].insert(7, {"subscription_id": subscription_id})
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(ingestor.submit(events) for events in requests)),
+        timeout=2,
+    )
+    await ingestor.aclose()
+
+    # 200 events reach the size trigger twice; the long timer never fires
+    assert len(writes) == 2
+    flat = [r for batch in results for r in batch]
+    failed = [r for r in flat if r["status"] == "failed"]
+    assert len(failed) == 2
+    assert "Subscription not found" in results[0][3]["error"]
+    assert "quantity" in results[1][7]["error"]
+    assert all(r["id"] for r in flat if r["status"] == "recorded")
+    assert await _count_records(subscription_id) == 199
+    usage_events = [
+        e
+        for e in mock_event_publisher.events
+        if e["event_type"] == PaymentEvents.USAGE_RECORDED
+    ]
+    assert len(usage_events) == 199
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_written_after_flush_interval(
+    mock_event_publisher,
+):
+    async for session in get_db():
+        subscription_id = await _subscription(
+            session, "ingest-timer@example.com"
+        )
+        break
+
+    ingestor = UsageIngestor(
+        UsageConfig(flush_size=1000, flush_interval=0.05), mock_event_publisher
+    )
+    results = await asyncio.wait_for(
+        ingestor.submit(
+            [{"subscription_id": subscription_id, "quantity": 2.5}]
+        ),
+        timeout=2,
+    )
+    assert results[0]["status"] == "recorded"
+    assert await _count_records(subscription_id) == 1
+
+    small = UsageIngestor(UsageConfig(max_buffered=2), mock_event_publisher)
+    with pytest.raises(UsageBufferFullError):
+        await small.submit(
+            [{"subscription_id": subscription_id, "quantity": 1}] * 3
+        )
+    assert small.buffered == 0
+    await ingestor.aclose()
+    await small.aclose()
+
+
+@pytest.mark.asyncio
+async def test_usage_endpoint_accepts_ndjson(test_app):
+    async for session in get_db():
+        subscription_id = await _subscription(
+            session, "ingest-api@example.com"
+        )
+        break
+
+    body = "\n".join(
+        [
+            f'{{"subscription_id": "{subscription_id}", "quantity": 3}}',
+            "not json",
+            json.dumps(
+                {
+                    "subscription_id": subscription_id,
+                    "quantity": 4,
+                    "timestamp": "2026-01-01T00:00:00Z",
+                }
+            ),
+        ]
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=test_app), base_url="http://test"
+    ) as client:
+        resp = await client.post(
+            "/payments/usage",
+            content=body,
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert (data["recorded"], data["failed"]) == (2, 1)
+    assert data["results"][1]["error"] == "Invalid JSON on line 2"
+    assert await _count_records(subscription_id) == 2
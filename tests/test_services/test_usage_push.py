@@ -0,0 +1,203 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.models import Subscription, UsagePush, generate_uuid
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    PlanRepository,
+    ProductRepository,
+    ProviderSnapshotRepository,
+    SubscriptionRepository,
+    UsageRecordRepository,
+)
+from fastapi_payments.services.payment_service import PaymentService
+
+from tests.conftest import TEST_CONFIG
+from tests.fakes.fake_stripe import FakeStripe
+
+
+def _service(mock_event_publisher):
+    service = PaymentService(
+        PaymentConfig(**TEST_CONFIG), mock_event_publisher, None
+    )
+    stripe = service.providers["stripe"]
+    stripe._run_stripe_calls_in_thread = False
+    stripe.stripe = FakeStripe()
+    stripe.stripe_error = stripe.stripe.error
+    return service, stripe
+
+
+async def _subscription(session, email, period_start):
+    customer = await CustomerRepository(session).create(email=email)
+    product = await ProductRepository(session).create(name="Metered")
+    plan = await PlanRepository(session).create(
+        product_id=product.id,
+        name="Metered",
+        description=None,
+        pricing_model="usage_based",
+        amount=0.01,
+        currency="USD",
+        billing_interval="month",
+        billing_interval_count=1,
+        trial_period_days=None,
+        is_active=True,
+    )
+    subscription = await SubscriptionRepository(session).create(
+        customer_id=customer.id,
+        plan_id=plan.id,
+        provider="stripe",
+        provider_subscription_id=f"sub_{customer.id[:8]}",
+        status="active",
+        quantity=1,
+        current_period_start=period_start,
+        current_period_end=period_start + timedelta(days=30),
+        cancel_at_period_end=False,
+    )
+    await ProviderSnapshotRepository(session).save(
+        "subscription",
+        subscription.id,
+        "stripe",
+        {"subscription_item_id": f"si_{subscription.id[:8]}"},
+    )
+    return subscription.id
+
+
+async def _record(session, subscription_id, *entries):
+    await UsageRecordRepository(session).create_many(
+        [
+            {
+                "id": generate_uuid(),
+                "subscription_id": subscription_id,
+                "quantity": quantity,
+                "timestamp": timestamp,
+                "description": None,
+            }
+            for timestamp, quantity in entries
+        ]
+    )
+
+
+def _records(stripe, subscription_id):
+    item = f"si_{subscription_id[:8]}"
+    return [
+        r
+        for r in stripe.stripe.usage_records.values()
+        if r["subscription_item"] == item
+    ]
+
+
+@pytest.mark.asyncio
+async def test_usage_is_pushed_as_increments_and_retried_with_same_key(
+    mock_event_publisher,
+):
+    service, stripe = _service(mock_event_publisher)
+    now = datetime.now(timezone.utc)
+    async for session in get_db():
+        subscription_id = await _subscription(
+            session, "push@example.com", now - timedelta(days=2)
+        )
+        await _record(
+            session,
+            subscription_id,
+            (now - timedelta(days=1), 4.0),
+            (now - timedelta(hours=3), 6.0),
+            (now, 0.5),
+        )
+        break
+
+    await service.push_usage(now + timedelta(minutes=1))
+    assert [
+        (r["quantity"], r["action"]) for r in _records(stripe, subscription_id)
+    ] == [(10, "increment")]
+    assert await service.push_usage(now + timedelta(minutes=2)) == {
+        "pushed": 0,
+        "failed": 0,
+        "skipped": 0,
+    }
+
+    # The provider applies the push but the response is lost
+    create = stripe.stripe.UsageRecord.create
+
+    def lost_response(**kwargs):
+        create(**kwargs)
+        raise ConnectionError("connection reset")
+
+    stripe.stripe.UsageRecord.create = lost_response
+    async for session in get_db():
+        await _record(session, subscription_id, (now, 3.0))
+        break
+    assert (await service.push_usage(now + timedelta(minutes=3)))[
+        "failed"
+    ] == 1
+
+    stripe.stripe.UsageRecord.create = create
+    async for session in get_db():
+        # Usage recorded meanwhile waits for the next push
+        await _record(session, subscription_id, (now, 2.0))
+        break
+    assert (await service.push_usage(now + timedelta(minutes=4)))[
+        "pushed"
+    ] == 1
+    assert [r["quantity"] for r in _records(stripe, subscription_id)] == [
+        10,
+        3,
+    ]
+    await service.push_usage(now + timedelta(minutes=5))
+    assert [r["quantity"] for r in _records(stripe, subscription_id)] == [
+        10,
+        3,
+        2,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_set_pushes_period_total_and_closes_ended_period(
+    mock_event_publisher,
+):
+    service, stripe = _service(mock_event_publisher)
+    stripe.default_usage_action = "set"
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    period_start = now - timedelta(days=30)
+    async for session in get_db():
+        subscription_id = await _subscription(
+            session, "push-set@example.com", period_start
+        )
+        await _record(session, subscription_id, (now - timedelta(days=3), 7.0))
+        break
+
+    await service.push_usage(now)
+    async for session in get_db():
+        # Late usage for the old period, then the subscription renews
+        await _record(session, subscription_id, (now - timedelta(days=1), 5.0))
+        subscription = await session.get(Subscription, subscription_id)
+        subscription.current_period_start = period_start + timedelta(days=30)
+        subscription.current_period_end = period_start + timedelta(days=60)
+        await session.commit()
+        break
+
+    await service.push_usage(now + timedelta(hours=1))
+    records = _records(stripe, subscription_id)
+    assert [(r["quantity"], r["action"]) for r in records] == [
+        (7, "set"),
+        (12, "set"),
+    ]
+    assert {r["timestamp"] for r in records} == {int(period_start.timestamp())}
+
+    async for session in get_db():
+        push = (
+            await session.execute(
+                select(UsagePush).where(
+                    UsagePush.subscription_id == subscription_id
+                )
+            )
+        ).scalar_one()
+        assert (push.pushed_quantity, push.closed, push.pending_key) == (
+            12,
+            True,
+            None,
+        )
+        break
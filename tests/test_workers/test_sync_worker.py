@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from fastapi_payments.config.config_schema import PaymentConfig
+from fastapi_payments.db.models import SyncJob
+from fastapi_payments.db.repositories import (
+    get_db,
+    CustomerRepository,
+    SyncJobRepository,
+)
+from fastapi_payments.services.payment_service import PaymentService
+from fastapi_payments.workers import SyncWorker
+
+from tests.conftest import TEST_CONFIG
+
+
+class SlowCustomerProvider:
+    async def retrieve_customer(self, provider_customer_id):
+        await asyncio.sleep(5)
+        return {"id": provider_customer_id}
+
+
+async def _fresh_job(session, **fields):
+    """Retire jobs left by other tests and queue a new one."""
+    await session.execute(
+        update(SyncJob)
+        .where(SyncJob.status.in_(["queued", "running"]))
+        .values(status="failed")
+    )
+    await session.commit()
+    return await SyncJobRepository(session).create(**fields)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_workers_claim_a_job_once():
+    async for session in get_db():
+        job = await _fresh_job(session, resources=["products"])
+        break
+
+    async def claim(worker_id):
+        async for session in get_db():
+            return await SyncJobRepository(session).claim_next(
+                worker_id, lease_seconds=60
+            )
+
+    claims = await asyncio.gather(*(claim(f"worker-{i}") for i in range(4)))
+
+    winners = [c for c in claims if c is not None]
+    assert len(winners) == 1
+    assert winners[0].id == job.id
+    assert winners[0].status == "running"
+    assert winners[0].attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed_and_old_owner_loses_it():
+    async for session in get_db():
+        job = await _fresh_job(session, resources=["products"])
+        repo = SyncJobRepository(session)
+
+        # Lease expires immediately, as if the worker died
+        assert (
+            await repo.claim_next("dead-worker", lease_seconds=0)
+        ).id == job.id
+        await asyncio.sleep(0.01)
+        reclaimed = await repo.claim_next("live-worker", lease_seconds=60)
+
+        assert reclaimed.id == job.id
+        assert reclaimed.lease_owner == "live-worker"
+        assert reclaimed.attempts == 2
+        assert await repo.heartbeat(job.id, "dead-worker", 60) is False
+        assert await repo.heartbeat(job.id, "live-worker", 60) is True
+
+        # Once out of attempts an abandoned job is failed instead of reclaimed
+        await repo.heartbeat(job.id, "live-worker", 0)
+        await asyncio.sleep(0.01)
+        assert await repo.fail_exhausted(max_attempts=2) == 1
+        assert (
+            await repo.claim_next("other", lease_seconds=60, max_attempts=2)
+            is None
+        )
+        break
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_claimed_job_to_completion(mock_event_publisher):
+    service = PaymentService(
+        PaymentConfig(**TEST_CONFIG), mock_event_publisher, None
+    )
+
+    async for session in get_db():
+        job = await _fresh_job(
+            session,
+            resources=["products"],
+            filters={"product_id": "prod_missing"},
+        )
+        break
+
+    worker = SyncWorker(service, worker_id="worker-1")
+    assert await worker.run_once() == job.id
+    assert await worker.run_once() is None
+
+    async for session in get_db():
+        finished = await SyncJobRepository(session).get_by_id(job.id)
+        assert finished.status == "completed"
+        assert finished.lease_owner is None
+        assert finished.result["summary"]["products"]["synced"] == 0
+        break
+
+
+@pytest.mark.asyncio
+async def test_stopping_worker_hands_job_back(mock_event_publisher):
+    service = PaymentService(
+        PaymentConfig(**TEST_CONFIG), mock_event_publisher, None
+    )
+    service.providers["slowjob"] = SlowCustomerProvider()
+
+    async for session in get_db():
+        repo = CustomerRepository(session)
+        customer = await repo.create(email="slowjob@example.com")
+        await repo.add_provider_customer(customer.id, "slowjob", "cus_slow")
+        job = await _fresh_job(
+            session,
+            resources=["customers"],
+            filters={"customer_id": customer.id},
+        )
+        break
+
+    worker = SyncWorker(
+        service, worker_id="worker-stop", heartbeat_interval=0.05
+    )
+    running = asyncio.ensure_future(worker.run_once())
+    await asyncio.sleep(0.2)
+    worker.stop()
+    assert await asyncio.wait_for(running, timeout=1) == job.id
+
+    async for session in get_db():
+        released = await SyncJobRepository(session).get_by_id(job.id)
+        assert released.status == "queued"
+        assert released.lease_owner is None
+        break